@@ -5,16 +5,42 @@ Sistema de cacheo multi-nivel y lazy loading
 
 from .cache_manager import CacheManager
 from .memory_cache import MemoryCache  
+from .sharded_memory_cache import ShardedMemoryCache
 from .disk_cache import DiskCache
+from .log_structured_cache import LogStructuredDiskCache
+from .sqlite_cache import SQLiteDiskCache
 from .index_cache import IndexCache
 from .lazy_loader import LazyIndexLoader
 from .performance_monitor import PerformanceMonitor
+from .single_flight import SingleFlight, AsyncSingleFlight
+from .expiry_scheduler import ExpiryHeap, ExpirySweeper
+from .async_cache import AsyncCacheExecutor
+from .query_keys import QueryKeyBuilder
+from .invalidation import InvalidationBus
+from .index_watcher import IndexWatcher
+from .compiled_index import CompiledIndex
+from .index_registry import IndexRegistry
+from .index_integrity import IndexIntegrityValidator
 
 __all__ = [
     'CacheManager',
     'MemoryCache', 
+    'ShardedMemoryCache',
     'DiskCache',
+    'LogStructuredDiskCache',
+    'SQLiteDiskCache',
     'IndexCache',
     'LazyIndexLoader',
-    'PerformanceMonitor'
+    'PerformanceMonitor',
+    'SingleFlight',
+    'AsyncSingleFlight',
+    'ExpiryHeap',
+    'ExpirySweeper',
+    'AsyncCacheExecutor',
+    'QueryKeyBuilder',
+    'InvalidationBus',
+    'IndexWatcher',
+    'CompiledIndex',
+    'IndexRegistry',
+    'IndexIntegrityValidator'
 ]
\ No newline at end of file
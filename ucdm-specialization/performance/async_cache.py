@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Async Cache - API asíncrona no bloqueante para los caches en disco
+Pool de hilos acotado para I/O y (de)compresión, con escrituras agrupadas en lotes
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+class AsyncCacheExecutor:
+    """
+    Ejecutor de operaciones de cache fuera del event loop
+    
+    - Las lecturas y borrados se ejecutan en un pool de hilos acotado
+    - Las escrituras concurrentes se encolan y se aplican en lotes: un solo
+      salto al pool por lote y la misma clave escrita varias veces en el
+      lote se escribe una sola vez (gana la última)
+    - Métricas de profundidad de cola y espera para dimensionar el pool
+    """
+    
+    def __init__(self, max_workers: int = 4, max_batch: int = 64):
+        """
+        Inicializar ejecutor
+        
+        Args:
+            max_workers: Hilos del pool (limita el I/O concurrente)
+            max_batch: Máximo de escrituras aplicadas por lote
+        """
+        self.max_workers = max_workers
+        self.max_batch = max_batch
+        
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cache-io")
+        self._metrics_lock = threading.Lock()
+        
+        # Escrituras encoladas por cache: id(cache) -> [(key, value, ttl_hours, tags, soft_ttl_hours, future)]
+        self._write_queues: Dict[int, List[Tuple[str, Any, Optional[int], Tuple[str, ...],
+                                                 Optional[float], asyncio.Future]]] = {}
+        
+        # Métricas
+        self.submitted = 0
+        self.completed = 0
+        self.queued = 0
+        self.running = 0
+        self.max_queue_depth = 0
+        self.total_wait_ms = 0.0
+        self.max_wait_ms = 0.0
+        self.write_batches = 0
+        self.batched_writes = 0
+        self.coalesced_writes = 0
+        
+        self.logger = self._setup_logging()
+    
+    def _setup_logging(self) -> logging.Logger:
+        """Configurar logging específico"""
+        logger = logging.getLogger(f"{__name__}.AsyncCacheExecutor")
+        logger.setLevel(logging.INFO)
+        
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            )
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        
+        return logger
+    
+    @property
+    def pending_writes(self) -> int:
+        return sum(len(queue) for queue in self._write_queues.values())
+    
+    async def run(self, func: Callable, *args: Any) -> Any:
+        """
+        Ejecutar una función bloqueante en el pool
+        
+        Args:
+            func: Operación síncrona del cache
+            *args: Argumentos posicionales
+        
+        Returns:
+            Any: Resultado de la operación
+        """
+        loop = asyncio.get_running_loop()
+        submitted_at = time.perf_counter()
+        
+        with self._metrics_lock:
+            self.submitted += 1
+            self.queued += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queued)
+        
+        def task():
+            wait_ms = (time.perf_counter() - submitted_at) * 1000
+            with self._metrics_lock:
+                self.queued -= 1
+                self.running += 1
+                self.total_wait_ms += wait_ms
+                self.max_wait_ms = max(self.max_wait_ms, wait_ms)
+            try:
+                return func(*args)
+            finally:
+                with self._metrics_lock:
+                    self.running -= 1
+                    self.completed += 1
+        
+        return await loop.run_in_executor(self._executor, task)
+    
+    async def put(self, cache: Any, key: str, value: Any, ttl_hours: Optional[int] = None,
+                  tags: Optional[Iterable[str]] = None, soft_ttl_hours: Optional[float] = None) -> bool:
+        """
+        Encolar una escritura; se aplica junto con las demás escrituras concurrentes
+        
+        Args:
+            cache: Cache destino
+            key: Clave única
+            value: Valor a almacenar
+            ttl_hours: TTL en horas
+            tags: Etiquetas de invalidación
+            soft_ttl_hours: TTL blando en horas
+        
+        Returns:
+            bool: Resultado de cache.put para esta clave
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        
+        queue = self._write_queues.get(id(cache))
+        if queue is None:
+            queue = self._write_queues[id(cache)] = []
+            loop.create_task(self._drain_writes(cache))
+        queue.append((key, value, ttl_hours, tuple(tags or ()), soft_ttl_hours, future))
+        
+        return await future
+    
+    async def _drain_writes(self, cache: Any):
+        """Aplicar en lotes las escrituras encoladas para un cache"""
+        # Ceder un turno para que las escrituras del mismo tick se unan al lote
+        await asyncio.sleep(0)
+        
+        queue = self._write_queues[id(cache)]
+        try:
+            while queue:
+                batch = queue[:self.max_batch]
+                del queue[:self.max_batch]
+                
+                try:
+                    results = await self.run(self._apply_batch, cache, batch)
+                except Exception as e:
+                    for *_, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+                
+                for (key, *_, future), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+        finally:
+            self._write_queues.pop(id(cache), None)
+    
+    def _apply_batch(self, cache: Any, batch: List[Tuple[str, Any, Optional[int], Tuple[str, ...],
+                                                          Optional[float], Any]]) -> List[bool]:
+        """Escribir un lote en el hilo del pool (una sola toma del lock del cache)"""
+        # La última escritura de cada clave es la que cuenta
+        latest: Dict[str, int] = {}
+        for position, (key, *_rest) in enumerate(batch):
+            latest[key] = position
+        
+        results: Dict[str, bool] = {}
+        if hasattr(cache, "put_many"):
+            # put_many toma el lock y escribe el journal una vez por grupo de TTL (duro y blando)
+            by_ttl: Dict[Tuple[Optional[int], Optional[float]], Dict[str, Any]] = {}
+            batch_tags: Dict[str, Tuple[str, ...]] = {}
+            for key, position in latest.items():
+                _, value, ttl_hours, tags, soft_ttl_hours, _ = batch[position]
+                by_ttl.setdefault((ttl_hours, soft_ttl_hours), {})[key] = value
+                if tags:
+                    batch_tags[key] = tags
+            for (ttl_hours, soft_ttl_hours), items in by_ttl.items():
+                group_tags = {key: batch_tags[key] for key in items if key in batch_tags}
+                results.update(cache.put_many(items, ttl_hours=ttl_hours,
+                                              **self._put_options(group_tags, soft_ttl_hours)))
+        else:
+            lock = getattr(cache, "_lock", None)
+            if lock is not None:
+                lock.acquire()
+            try:
+                for key, position in latest.items():
+                    _, value, ttl_hours, tags, soft_ttl_hours, _ = batch[position]
+                    results[key] = cache.put(key, value, ttl_hours=ttl_hours,
+                                             **self._put_options(tags, soft_ttl_hours))
+            finally:
+                if lock is not None:
+                    lock.release()
+        
+        with self._metrics_lock:
+            self.write_batches += 1
+            self.batched_writes += len(batch)
+            self.coalesced_writes += len(batch) - len(latest)
+        
+        return [results[key] for key, *_ in batch]
+    
+    def _put_options(self, tags: Any, soft_ttl_hours: Optional[float]) -> Dict[str, Any]:
+        """Argumentos opcionales de put/put_many (solo los usados: no todos los caches los aceptan)"""
+        options: Dict[str, Any] = {}
+        if tags:
+            options["tags"] = tags
+        if soft_ttl_hours:
+            options["soft_ttl_hours"] = soft_ttl_hours
+        return options
+    
+    def shutdown(self, wait: bool = True):
+        """Detener el pool de hilos"""
+        self._executor.shutdown(wait=wait)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtener métricas de cola y lotes"""
+        with self._metrics_lock:
+            started = self.completed + self.running
+            return {
+                "max_workers": self.max_workers,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "running": self.running,
+                "queue_depth": self.queued,
+                "max_queue_depth": self.max_queue_depth,
+                "pending_writes": self.pending_writes,
+                "avg_wait_ms": round(self.total_wait_ms / started, 3) if started else 0.0,
+                "max_wait_ms": round(self.max_wait_ms, 3),
+                "write_batches": self.write_batches,
+                "avg_batch_size": round(self.batched_writes / self.write_batches, 2) if self.write_batches else 0.0,
+                "coalesced_writes": self.coalesced_writes
+            }
+
+class AsyncCacheMixin:
+    """
+    aget/aput/adelete para caches con I/O bloqueante
+    
+    Las operaciones se delegan al AsyncCacheExecutor adjunto (uno compartido
+    por CacheManager o uno propio creado al primer uso).
+    """
+    
+    _async_executor: Optional[AsyncCacheExecutor] = None
+    
+    def attach_executor(self, executor: AsyncCacheExecutor):
+        """Usar un ejecutor compartido"""
+        self._async_executor = executor
+    
+    @property
+    def async_executor(self) -> AsyncCacheExecutor:
+        if self._async_executor is None:
+            self._async_executor = AsyncCacheExecutor()
+        return self._async_executor
+    
+    async def aget(self, key: str) -> Optional[Any]:
+        """Versión no bloqueante de get (I/O y descompresión en el pool)"""
+        return await self.async_executor.run(self.get, key)
+    
+    async def aput(self, key: str, value: Any, ttl_hours: Optional[int] = None,
+                   tags: Optional[Iterable[str]] = None, soft_ttl_hours: Optional[float] = None) -> bool:
+        """Versión no bloqueante de put (agrupada con escrituras concurrentes)"""
+        return await self.async_executor.put(self, key, value, ttl_hours, tags, soft_ttl_hours)
+    
+    async def adelete(self, key: str) -> bool:
+        """Versión no bloqueante de delete"""
+        return await self.async_executor.run(self.delete, key)
@@ -9,10 +9,27 @@ import json
 import asyncio
 import logging
 from pathlib import Path
-from typing import Dict, Any, Optional, Callable, List, Tuple
+from typing import Dict, Any, Optional, Callable, Iterable, List, Set, Tuple, Union
 from dataclasses import dataclass, asdict
 from datetime import datetime, timedelta
 
+from .memory_cache import MemoryCache
+from .sharded_memory_cache import ShardedMemoryCache
+from .disk_cache import DiskCache
+from .log_structured_cache import LogStructuredDiskCache
+from .sqlite_cache import SQLiteDiskCache
+from .index_cache import IndexCache
+from .single_flight import AsyncSingleFlight
+from .expiry_scheduler import ExpirySweeper
+from .async_cache import AsyncCacheExecutor
+from .invalidation import InvalidationBus
+from .index_watcher import IndexWatcher
+
+CACHE_LEVELS = ("l1", "l2", "l3")
+
+class _LoaderError(Exception):
+    """Error producido por la función de carga (no por el cache)"""
+
 @dataclass
 class CacheConfig:
     """Configuración del sistema de cache"""
@@ -20,22 +37,49 @@ class CacheConfig:
     memory_max_size_mb: int = 50
     memory_ttl_hours: int = 1
     memory_cleanup_threshold: float = 0.8
+    memory_sizer: str = "sampling"  # "pickle" | "structural" | "sampling"
+    memory_shards: int = 1  # >1 usa ShardedMemoryCache con un lock por segmento
+    memory_eviction_policy: str = "lru"  # "lru" | "lfu" | "arc" | "wtinylfu"
     
     # Disk Cache (L2) Config  
     disk_path: str = "data/cache"
     disk_max_size_gb: int = 2
     disk_ttl_hours: int = 24
     disk_compression: bool = True
+    disk_compression_codec: str = "zdict"  # none | gzip | zlib-1/6/9 | lzma | zdict (diccionario entrenado)
+    disk_engine: str = "files"  # "files" (un archivo por clave) | "log" (segmentos append-only) | "sqlite"
+    disk_segment_mb: int = 32
+    disk_journal_checkpoint_ops: int = 1000  # Mutaciones de índice entre snapshots (engine "files")
+    disk_io_workers: int = 4  # Hilos para I/O y (de)compresión de L2 fuera del event loop
+    disk_multiprocess: bool = False  # Directorio compartido por varios procesos (flock + journal)
+    disk_mmap_threshold_kb: int = 64  # Archivos desde este tamaño se leen con mmap (engine "files")
     
     # Index Cache (L3) Config
+    index_dir: str = "data/indices"
     index_preload_popular: bool = True
     index_dependency_tracking: bool = True
     index_lazy_threshold: float = 0.1
+    index_watch: bool = False  # Recargar en caliente los índices reescritos en disco
+    index_watch_interval_seconds: float = 2.0  # Sondeo de mtime (con watchdog los eventos lo adelantan)
+    
+    # Multi-level Engine Config
+    l1_enabled: bool = True
+    l2_enabled: bool = True
+    l3_enabled: bool = True
+    write_policy: str = "write_through"  # "write_through" | "write_back"
+    write_back_batch_size: int = 50
+    promote_on_l2_hit: bool = True
+    promote_on_l3_hit: bool = True
+    single_flight: bool = True
+    stale_while_revalidate: bool = False  # TTL blando: servir el valor vencido y regenerar en background
+    stale_grace_factor: float = 2.0  # TTL duro = TTL blando * factor (respaldo si la regeneración falla)
     
     # Performance Config
     metrics_enabled: bool = True
     cleanup_interval_minutes: int = 30
     background_cleanup: bool = True
+    expiry_sweep_interval_seconds: float = 1.0  # Barrendero de expiraciones L1/L2
+    expiry_sweep_max_per_tick: int = 256
 
 @dataclass
 class CacheMetrics:
@@ -48,6 +92,23 @@ class CacheMetrics:
     l3_hits: int = 0
     l3_misses: int = 0
     
+    # Latencia acumulada de búsqueda por nivel
+    l1_latency_ms: float = 0.0
+    l2_latency_ms: float = 0.0
+    l3_latency_ms: float = 0.0
+    
+    # Escrituras y promociones
+    l1_writes: int = 0
+    l2_writes: int = 0
+    l3_writes: int = 0
+    admission_rejections: int = 0
+    promotions: int = 0
+    write_back_flushes: int = 0
+    loader_calls: int = 0
+    stale_serves: int = 0
+    background_refreshes: int = 0
+    refresh_errors: int = 0
+    
     # Performance metrics
     total_requests: int = 0
     avg_response_time_ms: float = 0.0
@@ -73,6 +134,12 @@ class CacheMetrics:
             total_misses = self.l1_misses + self.l2_misses + self.l3_misses
             total_requests = total_hits + total_misses
             return total_hits / total_requests if total_requests > 0 else 0.0
+    
+    def avg_latency_ms(self, level: str) -> float:
+        """Calcular latencia promedio de búsqueda en un nivel"""
+        lookups = getattr(self, f"{level}_hits") + getattr(self, f"{level}_misses")
+        total_latency = getattr(self, f"{level}_latency_ms")
+        return total_latency / lookups if lookups > 0 else 0.0
 
 class CacheManager:
     """
@@ -89,10 +156,38 @@ class CacheManager:
         self.metrics = CacheMetrics(started_at=datetime.now())
         self.logger = self._setup_logging()
         
-        # Inicializar caches (será implementado por cada cache específico)
-        self.l1_cache = None  # MemoryCache
-        self.l2_cache = None  # DiskCache  
-        self.l3_cache = None  # IndexCache
+        # Caches por nivel (se crean en initialize() si no fueron inyectados)
+        self.l1_cache: Optional[Union[MemoryCache, ShardedMemoryCache]] = None
+        self.l2_cache: Optional[Union[DiskCache, LogStructuredDiskCache, SQLiteDiskCache]] = None
+        self.l3_cache: Optional[IndexCache] = None
+        
+        # Políticas de admisión por nivel: (key, data) -> bool
+        self._admission_policies: Dict[str, Callable[[str, Any], bool]] = {}
+        
+        # Escrituras L2 pendientes en modo write-back: key -> (data, ttl_hours, tags)
+        self._pending_writes: Dict[str, Tuple[Any, Optional[int], Tuple[str, ...]]] = {}
+        
+        # Bus de invalidación por etiquetas (opcional)
+        self.invalidation_bus: Optional[InvalidationBus] = None
+        
+        # Vigilante de índices para recarga en caliente de L3 (opcional)
+        self.index_watcher: Optional[IndexWatcher] = None
+        
+        # Coalescencia de cargas concurrentes para la misma clave
+        self._single_flight = AsyncSingleFlight()
+        
+        # Stale-while-revalidate: claves servidas vencidas y regeneraciones en curso
+        self._stale_keys: Set[str] = set()
+        self._refresh_tasks: Dict[str, asyncio.Task] = {}
+        
+        # Expiración en background de L1/L2 (trabajo acotado por tick)
+        self.expiry_sweeper = ExpirySweeper(
+            interval_seconds=self.config.expiry_sweep_interval_seconds,
+            max_per_tick=self.config.expiry_sweep_max_per_tick
+        )
+        
+        # Pool acotado para el I/O de L2 (el event loop nunca bloquea en disco)
+        self.io_executor = AsyncCacheExecutor(max_workers=self.config.disk_io_workers)
         
         # Control de estado
         self.is_running = False
@@ -129,26 +224,94 @@ class CacheManager:
             cache_dir = Path(self.config.disk_path)
             cache_dir.mkdir(parents=True, exist_ok=True)
             
-            # TODO: Inicializar caches específicos cuando estén implementados
-            # self.l1_cache = MemoryCache(self.config)
-            # self.l2_cache = DiskCache(self.config)  
-            # self.l3_cache = IndexCache(self.config)
+            if self.config.l1_enabled and self.l1_cache is None:
+                if self.config.memory_shards > 1:
+                    self.l1_cache = ShardedMemoryCache(
+                        max_size_mb=self.config.memory_max_size_mb,
+                        default_ttl_hours=self.config.memory_ttl_hours,
+                        cleanup_threshold=self.config.memory_cleanup_threshold,
+                        shards=self.config.memory_shards,
+                        sizer=self.config.memory_sizer,
+                        eviction_policy=self.config.memory_eviction_policy
+                    )
+                else:
+                    self.l1_cache = MemoryCache(
+                        max_size_mb=self.config.memory_max_size_mb,
+                        default_ttl_hours=self.config.memory_ttl_hours,
+                        cleanup_threshold=self.config.memory_cleanup_threshold,
+                        sizer=self.config.memory_sizer,
+                        eviction_policy=self.config.memory_eviction_policy
+                    )
+            
+            if self.config.l2_enabled and self.l2_cache is None:
+                if self.config.disk_engine == "log":
+                    self.l2_cache = LogStructuredDiskCache(
+                        cache_dir=self.config.disk_path,
+                        max_size_gb=self.config.disk_max_size_gb,
+                        default_ttl_hours=self.config.disk_ttl_hours,
+                        compress=self.config.disk_compression,
+                        max_segment_mb=self.config.disk_segment_mb
+                    )
+                elif self.config.disk_engine == "sqlite":
+                    self.l2_cache = SQLiteDiskCache(
+                        cache_dir=self.config.disk_path,
+                        max_size_gb=self.config.disk_max_size_gb,
+                        default_ttl_hours=self.config.disk_ttl_hours,
+                        compress=self.config.disk_compression
+                    )
+                else:
+                    self.l2_cache = DiskCache(
+                        cache_dir=self.config.disk_path,
+                        max_size_gb=self.config.disk_max_size_gb,
+                        default_ttl_hours=self.config.disk_ttl_hours,
+                        compress=self.config.disk_compression,
+                        journal_checkpoint_ops=self.config.disk_journal_checkpoint_ops,
+                        mmap_threshold_kb=self.config.disk_mmap_threshold_kb,
+                        compression_codec=self.config.disk_compression_codec,
+                        multiprocess=self.config.disk_multiprocess
+                    )
+            
+            if self.config.l3_enabled and self.l3_cache is None:
+                self.l3_cache = IndexCache(
+                    indices_dir=self.config.index_dir,
+                    preload_popular=self.config.index_preload_popular,
+                    dependency_tracking=self.config.index_dependency_tracking,
+                    lazy_threshold=self.config.index_lazy_threshold
+                )
+            
+            if self.config.index_watch and self.l3_cache is not None and self.index_watcher is None:
+                self.index_watcher = IndexWatcher(
+                    indices_dir=self.config.index_dir,
+                    poll_interval=self.config.index_watch_interval_seconds
+                )
+                self.index_watcher.watch(self.l3_cache)
+                self.index_watcher.subscribe(self._on_indices_rewritten)
+                self.index_watcher.start()
+            
+            if self.l2_cache is not None and hasattr(self.l2_cache, "attach_executor"):
+                self.l2_cache.attach_executor(self.io_executor)
+            
+            for cache in (self.l1_cache, self.l2_cache):
+                if cache is not None and hasattr(cache, "sweep_expired"):
+                    self.expiry_sweeper.register(cache)
             
             self.is_running = True
             
             # Iniciar limpieza en background si está habilitada
             if self.config.background_cleanup:
                 self.cleanup_task = asyncio.create_task(self._background_cleanup())
+                self.expiry_sweeper.start()
             
             self.logger.info(f"✅ Cache manager inicializado - Directorio: {cache_dir}")
             return True
-            
+        
         except Exception as e:
             self.logger.error(f"Error inicializando cache manager: {e}")
             return False
     
     async def get_or_load(self, key: str, loader_func: Callable, 
-                         cache_level: str = "auto", ttl_hours: Optional[int] = None) -> Any:
+                         cache_level: str = "auto", ttl_hours: Optional[int] = None,
+                         tags: Optional[Iterable[str]] = None) -> Any:
         """
         Obtener datos del cache o cargar usando función
         
@@ -157,7 +320,8 @@ class CacheManager:
             loader_func: Función para cargar datos si no están en cache
             cache_level: Nivel de cache preferido ("l1", "l2", "l3", "auto")
             ttl_hours: TTL personalizado en horas
-            
+            tags: Etiquetas de invalidación del dato cargado (p.ej. "lesson:12")
+        
         Returns:
             Any: Datos solicitados
         """
@@ -165,33 +329,40 @@ class CacheManager:
         
         try:
             self.metrics.total_requests += 1
+            tags = tuple(tags or ())
             
             # Estrategia de búsqueda en niveles
             if cache_level == "auto":
                 # Buscar en L1 -> L2 -> L3 -> Cargar
                 data = await self._search_multilevel(key)
-                if data is not None:
-                    return data
             else:
                 # Buscar en nivel específico
                 data = await self._search_specific_level(key, cache_level)
-                if data is not None:
-                    return data
-            
-            # Cache miss - cargar datos
-            self.logger.debug(f"Cache miss para key: {key}, cargando...")
-            data = await self._execute_loader(loader_func)
-            
-            # Almacenar en cache apropiado
-            await self._store_in_cache(key, data, cache_level, ttl_hours)
             
-            return data
+            if data is not None:
+                # Valor vencido en blando: se sirve ya y se regenera en background
+                if key in self._stale_keys:
+                    self._stale_keys.discard(key)
+                    self._schedule_refresh(key, loader_func, cache_level, ttl_hours, tags)
+                return data
             
+            # Cache miss - cargar datos (una sola carga por clave en vuelo)
+            self.logger.debug(f"Cache miss para key: {key}, cargando...")
+            if self.config.single_flight:
+                return await self._single_flight.do(
+                    key, lambda: self._load_and_store(key, loader_func, cache_level, ttl_hours, tags)
+                )
+            return await self._load_and_store(key, loader_func, cache_level, ttl_hours, tags)
+        
+        except _LoaderError as e:
+            # El error vino del loader: propagar el original a todos los solicitantes
+            raise e.__cause__
+        
         except Exception as e:
             self.logger.error(f"Error en get_or_load para key {key}: {e}")
             # En caso de error, intentar cargar directamente
             return await self._execute_loader(loader_func)
-            
+        
         finally:
             # Actualizar métricas de tiempo
             response_time = (time.time() - start_time) * 1000
@@ -203,57 +374,153 @@ class CacheManager:
     async def _search_multilevel(self, key: str) -> Optional[Any]:
         """Buscar en múltiples niveles de cache"""
         # L1 Memory Cache (más rápido)
-        if self.l1_cache:
-            data = await self._get_from_l1(key)
-            if data is not None:
-                self.metrics.l1_hits += 1
-                return data
-            self.metrics.l1_misses += 1
+        data = await self._lookup_level(key, "l1")
+        if data is not None:
+            return data
         
-        # L2 Disk Cache  
-        if self.l2_cache:
-            data = await self._get_from_l2(key)
-            if data is not None:
-                self.metrics.l2_hits += 1
-                # Promover a L1 para acceso futuro más rápido
+        # L2 Disk Cache
+        data = await self._lookup_level(key, "l2")
+        if data is not None:
+            # Promover a L1 para acceso futuro más rápido
+            if self.config.promote_on_l2_hit:
                 await self._promote_to_l1(key, data)
-                return data
-            self.metrics.l2_misses += 1
+            return data
         
         # L3 Index Cache
-        if self.l3_cache:
-            data = await self._get_from_l3(key)
-            if data is not None:
-                self.metrics.l3_hits += 1
-                # Opcional: promover a L2 si es frecuente
-                return data
-            self.metrics.l3_misses += 1
+        data = await self._lookup_level(key, "l3")
+        if data is not None:
+            if self.config.promote_on_l3_hit:
+                await self._promote_to_l1(key, data)
+            return data
         
         return None
     
     async def _search_specific_level(self, key: str, level: str) -> Optional[Any]:
         """Buscar en nivel específico de cache"""
-        if level == "l1" and self.l1_cache:
+        if level not in CACHE_LEVELS:
+            return None
+        return await self._lookup_level(key, level)
+    
+    async def _lookup_level(self, key: str, level: str) -> Optional[Any]:
+        """Buscar en un nivel registrando hits, misses y latencia"""
+        if self._get_level_cache(level) is None:
+            return None
+        
+        start_time = time.perf_counter()
+        if level == "l1":
             data = await self._get_from_l1(key)
-            if data is not None:
-                self.metrics.l1_hits += 1
-                return data
-            self.metrics.l1_misses += 1
-        elif level == "l2" and self.l2_cache:
+        elif level == "l2":
             data = await self._get_from_l2(key)
-            if data is not None:
-                self.metrics.l2_hits += 1
-                return data
-            self.metrics.l2_misses += 1
-        elif level == "l3" and self.l3_cache:
+        else:
             data = await self._get_from_l3(key)
-            if data is not None:
-                self.metrics.l3_hits += 1
-                return data
-            self.metrics.l3_misses += 1
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        
+        setattr(self.metrics, f"{level}_latency_ms",
+                getattr(self.metrics, f"{level}_latency_ms") + elapsed_ms)
+        if data is not None:
+            setattr(self.metrics, f"{level}_hits", getattr(self.metrics, f"{level}_hits") + 1)
+        else:
+            setattr(self.metrics, f"{level}_misses", getattr(self.metrics, f"{level}_misses") + 1)
         
+        return data
+    
+    def _get_level_cache(self, level: str) -> Optional[Any]:
+        """Obtener instancia de cache para un nivel"""
+        if level == "l1":
+            return self.l1_cache
+        elif level == "l2":
+            return self.l2_cache
+        elif level == "l3":
+            return self.l3_cache
         return None
     
+    def set_admission_policy(self, level: str, policy: Optional[Callable[[str, Any], bool]]):
+        """
+        Configurar política de admisión para un nivel
+        
+        Args:
+            level: Nivel de cache ("l1", "l2", "l3")
+            policy: Función (key, data) -> bool; None restaura admitir todo
+        """
+        if level not in CACHE_LEVELS:
+            raise ValueError(f"Nivel de cache inválido: {level}")
+        
+        if policy is None:
+            self._admission_policies.pop(level, None)
+        else:
+            self._admission_policies[level] = policy
+    
+    def _admits(self, level: str, key: str, data: Any) -> bool:
+        """Evaluar política de admisión del nivel"""
+        if self._get_level_cache(level) is None:
+            return False
+        
+        policy = self._admission_policies.get(level)
+        if policy is None:
+            return True
+        
+        try:
+            admitted = bool(policy(key, data))
+        except Exception as e:
+            self.logger.warning(f"Error en política de admisión {level} para {key}: {e}")
+            admitted = False
+        
+        if not admitted:
+            self.metrics.admission_rejections += 1
+        return admitted
+    
+    async def _load_and_store(self, key: str, loader_func: Callable, cache_level: str,
+                              ttl_hours: Optional[int], tags: Tuple[str, ...] = ()) -> Any:
+        """Ejecutar loader y almacenar el resultado en cache"""
+        self.metrics.loader_calls += 1
+        try:
+            data = await self._execute_loader(loader_func)
+        except Exception as e:
+            raise _LoaderError(str(e)) from e
+        
+        # Almacenar en cache apropiado
+        if data is not None:
+            await self._store_in_cache(key, data, cache_level, ttl_hours, tags)
+        
+        return data
+    
+    def _schedule_refresh(self, key: str, loader_func: Callable, cache_level: str,
+                          ttl_hours: Optional[int], tags: Tuple[str, ...]):
+        """Lanzar una única regeneración en background para una clave vencida"""
+        self.metrics.stale_serves += 1
+        if key in self._refresh_tasks:
+            return
+        self._refresh_tasks[key] = asyncio.create_task(
+            self._refresh(key, loader_func, cache_level, ttl_hours, tags)
+        )
+    
+    async def _refresh(self, key: str, loader_func: Callable, cache_level: str,
+                       ttl_hours: Optional[int], tags: Tuple[str, ...]):
+        """Regenerar y reescribir una clave sin bloquear a quien la pidió"""
+        try:
+            await self._single_flight.do(
+                key, lambda: self._load_and_store(key, loader_func, cache_level, ttl_hours, tags)
+            )
+            self.metrics.background_refreshes += 1
+        except Exception as e:
+            # El valor anterior sigue disponible hasta su TTL duro
+            self.metrics.refresh_errors += 1
+            self.logger.warning(f"Error regenerando {key} en background: {e}")
+        finally:
+            self._refresh_tasks.pop(key, None)
+    
+    def _ttl_for(self, level: str, ttl_hours: Optional[int]) -> Tuple[Optional[float], Optional[float]]:
+        """
+        TTL duro y blando para escribir en un nivel
+        
+        Returns:
+            Tuple: (ttl_hours, soft_ttl_hours); sin stale-while-revalidate el blando es None
+        """
+        if not self.config.stale_while_revalidate:
+            return ttl_hours, None
+        soft = ttl_hours or (self.config.memory_ttl_hours if level == "l1" else self.config.disk_ttl_hours)
+        return soft * self.config.stale_grace_factor, soft
+    
     async def _execute_loader(self, loader_func: Callable) -> Any:
         """Ejecutar función de carga de datos"""
         if asyncio.iscoroutinefunction(loader_func):
@@ -261,27 +528,278 @@ class CacheManager:
         else:
             return loader_func()
     
-    async def _store_in_cache(self, key: str, data: Any, level: str, ttl_hours: Optional[int]):
+    async def _store_in_cache(self, key: str, data: Any, level: str, ttl_hours: Optional[int],
+                              tags: Tuple[str, ...] = ()):
         """Almacenar datos en cache apropiado"""
-        # TODO: Implementar cuando los caches específicos estén disponibles
-        pass
+        if level == "auto":
+            # L3 contiene datos derivados de índices; solo se escribe explícitamente
+            target_levels = ["l1", "l2"]
+        else:
+            target_levels = [level]
+        
+        for target in target_levels:
+            if not self._admits(target, key, data):
+                continue
+            
+            if target == "l1":
+                hard, soft = self._ttl_for("l1", ttl_hours)
+                if self.l1_cache.put(key, data, ttl_hours=hard, tags=tags, soft_ttl_hours=soft):
+                    self.metrics.l1_writes += 1
+            elif target == "l2":
+                if self.config.write_policy == "write_back":
+                    self._pending_writes[key] = (data, ttl_hours, tags)
+                    if len(self._pending_writes) >= self.config.write_back_batch_size:
+                        await self.flush()
+                elif await self._put_to_l2(key, data, ttl_hours, tags):
+                    self.metrics.l2_writes += 1
+            elif target == "l3":
+                self.l3_cache.put_cached_query(key, data, tags=tags)
+                self.metrics.l3_writes += 1
     
-    # Métodos placeholder para caches específicos (implementar con caches reales)
     async def _get_from_l1(self, key: str) -> Optional[Any]:
         """Obtener de L1 Memory Cache"""
-        return None
+        if self.config.stale_while_revalidate:
+            data, stale = self.l1_cache.get_with_state(key)
+            if stale:
+                self._stale_keys.add(key)
+            return data
+        return self.l1_cache.get(key)
     
     async def _get_from_l2(self, key: str) -> Optional[Any]:
-        """Obtener de L2 Disk Cache"""
-        return None
+        """Obtener de L2 Disk Cache (incluye escrituras write-back pendientes)"""
+        if key in self._pending_writes:
+            return self._pending_writes[key][0]
+        if self.config.stale_while_revalidate and hasattr(self.l2_cache, "get_with_state"):
+            data, stale = await self.io_executor.run(self.l2_cache.get_with_state, key)
+            if stale:
+                self._stale_keys.add(key)
+            return data
+        if hasattr(self.l2_cache, "aget"):
+            return await self.l2_cache.aget(key)
+        return self.l2_cache.get(key)
+    
+    def _supports_tags(self, cache: Any) -> bool:
+        """Si el cache de un nivel guarda etiquetas de invalidación"""
+        return hasattr(cache, "invalidate_tags")
+    
+    async def _put_to_l2(self, key: str, data: Any, ttl_hours: Optional[int],
+                         tags: Tuple[str, ...] = ()) -> bool:
+        """Escribir en L2 sin bloquear el event loop (escrituras concurrentes se agrupan)"""
+        ttl_hours, soft = self._ttl_for("l2", ttl_hours)
+        if hasattr(self.l2_cache, "aput"):
+            return await self.l2_cache.aput(key, data, ttl_hours=ttl_hours, tags=tags, soft_ttl_hours=soft)
+        if (tags or soft) and self._supports_tags(self.l2_cache):
+            return self.l2_cache.put(key, data, ttl_hours=ttl_hours, tags=tags, soft_ttl_hours=soft)
+        return self.l2_cache.put(key, data, ttl_hours=ttl_hours)
     
     async def _get_from_l3(self, key: str) -> Optional[Any]:
         """Obtener de L3 Index Cache"""
+        data = self.l3_cache.get_cached_query(key)
+        if data is not None:
+            return data
+        
+        # Claves "index_<nombre>" se resuelven contra el índice completo
+        if key.startswith("index_"):
+            return self.l3_cache.get_index(key[len("index_"):], auto_load=True)
+        
         return None
     
     async def _promote_to_l1(self, key: str, data: Any):
         """Promover datos de L2/L3 a L1"""
-        pass
+        hard, soft = self._ttl_for("l1", None)
+        if self._admits("l1", key, data) and self.l1_cache.put(key, data, ttl_hours=hard, soft_ttl_hours=soft):
+            self.metrics.promotions += 1
+    
+    async def flush(self) -> int:
+        """
+        Persistir en L2 las escrituras pendientes del modo write-back
+        
+        Returns:
+            int: Número de entradas escritas
+        """
+        if not self._pending_writes or self.l2_cache is None:
+            return 0
+        
+        pending = self._pending_writes
+        self._pending_writes = {}
+        
+        # Un lote por TTL: put_many escribe el índice una sola vez por lote
+        by_ttl: Dict[Optional[int], Dict[str, Any]] = {}
+        tags_by_key: Dict[str, Tuple[str, ...]] = {}
+        for key, (data, ttl_hours, tags) in pending.items():
+            by_ttl.setdefault(ttl_hours, {})[key] = data
+            if tags:
+                tags_by_key[key] = tags
+        
+        written = 0
+        for ttl_hours, items in by_ttl.items():
+            results = await self._put_many_to_l2(items, ttl_hours, tags_by_key)
+            written += sum(1 for result in results.values() if result)
+        
+        self.metrics.l2_writes += written
+        self.metrics.write_back_flushes += 1
+        self.logger.debug(f"Write-back: {written}/{len(pending)} entradas persistidas en L2")
+        return written
+    
+    async def get_many(self, keys: List[str], cache_level: str = "auto") -> Dict[str, Any]:
+        """
+        Obtener varias claves con una operación por nivel
+        
+        Cada nivel recibe solo las claves que fallaron en el anterior; los
+        aciertos de L2/L3 se promueven a L1 en un único lote.
+        
+        Args:
+            keys: Claves a buscar
+            cache_level: Nivel de cache ("l1", "l2", "l3", "auto")
+        
+        Returns:
+            Dict[str, Any]: Aciertos de cualquier nivel; las claves ausentes son misses
+        """
+        start_time = time.time()
+        pending = list(dict.fromkeys(keys))
+        found: Dict[str, Any] = {}
+        if not pending:
+            return found
+        
+        if cache_level == "auto":
+            levels = list(CACHE_LEVELS)
+        elif cache_level in CACHE_LEVELS:
+            levels = [cache_level]
+        else:
+            levels = []
+        
+        for level in levels:
+            if not pending:
+                break
+            hits = await self._lookup_level_many(pending, level)
+            if not hits:
+                continue
+            
+            found.update(hits)
+            pending = [key for key in pending if key not in hits]
+            
+            promote = (level == "l2" and self.config.promote_on_l2_hit) or \
+                      (level == "l3" and self.config.promote_on_l3_hit)
+            if cache_level == "auto" and promote:
+                await self._promote_many_to_l1(hits)
+        
+        # Cada clave cuenta como una solicitud con la latencia media del lote
+        requested = len(found) + len(pending)
+        batch_time = (time.time() - start_time) * 1000
+        previous = self.metrics.total_requests
+        self.metrics.total_requests += requested
+        self.metrics.avg_response_time_ms = (
+            (self.metrics.avg_response_time_ms * previous + batch_time) / self.metrics.total_requests
+        )
+        
+        return found
+    
+    async def put_many(self, items: Dict[str, Any], cache_level: str = "auto",
+                       ttl_hours: Optional[int] = None,
+                       tags: Optional[Dict[str, Iterable[str]]] = None) -> Dict[str, bool]:
+        """
+        Almacenar varios valores con una operación por nivel
+        
+        Args:
+            items: Claves y valores a almacenar
+            cache_level: Nivel destino ("l1", "l2", "l3", "auto" = L1 + L2)
+            ttl_hours: TTL común en horas
+            tags: Etiquetas de invalidación por clave
+        
+        Returns:
+            Dict[str, bool]: True por clave si quedó almacenada (o encolada) en algún nivel
+        """
+        target_levels = ["l1", "l2"] if cache_level == "auto" else [cache_level]
+        stored = {key: False for key in items}
+        tags = {key: tuple(key_tags) for key, key_tags in (tags or {}).items() if key_tags}
+        
+        for target in target_levels:
+            admitted = {key: data for key, data in items.items()
+                        if data is not None and self._admits(target, key, data)}
+            if not admitted:
+                continue
+            
+            if target == "l1":
+                hard, soft = self._ttl_for("l1", ttl_hours)
+                results = self.l1_cache.put_many(admitted, ttl_hours=hard, tags=tags, soft_ttl_hours=soft)
+                self.metrics.l1_writes += sum(1 for result in results.values() if result)
+            elif target == "l2":
+                if self.config.write_policy == "write_back":
+                    for key, data in admitted.items():
+                        self._pending_writes[key] = (data, ttl_hours, tags.get(key, ()))
+                    results = {key: True for key in admitted}
+                    if len(self._pending_writes) >= self.config.write_back_batch_size:
+                        await self.flush()
+                else:
+                    results = await self._put_many_to_l2(admitted, ttl_hours, tags)
+                    self.metrics.l2_writes += sum(1 for result in results.values() if result)
+            else:
+                for key, data in admitted.items():
+                    self.l3_cache.put_cached_query(key, data, tags=tags.get(key))
+                results = {key: True for key in admitted}
+                self.metrics.l3_writes += len(admitted)
+            
+            for key, result in results.items():
+                stored[key] = stored[key] or result
+        
+        return stored
+    
+    async def _lookup_level_many(self, keys: List[str], level: str) -> Dict[str, Any]:
+        """Buscar varias claves en un nivel registrando hits, misses y latencia"""
+        cache = self._get_level_cache(level)
+        if cache is None:
+            return {}
+        
+        start_time = time.perf_counter()
+        if level == "l1":
+            hits = cache.get_many(keys)
+        elif level == "l2":
+            hits = {key: self._pending_writes[key][0] for key in keys if key in self._pending_writes}
+            remaining = [key for key in keys if key not in hits]
+            if remaining and hasattr(cache, "get_many"):
+                hits.update(await self.io_executor.run(cache.get_many, remaining))
+            elif remaining:
+                values = await asyncio.gather(*(self._get_from_l2(key) for key in remaining))
+                hits.update({key: value for key, value in zip(remaining, values) if value is not None})
+        else:
+            hits = {}
+            for key in keys:
+                data = await self._get_from_l3(key)
+                if data is not None:
+                    hits[key] = data
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        
+        setattr(self.metrics, f"{level}_latency_ms",
+                getattr(self.metrics, f"{level}_latency_ms") + elapsed_ms)
+        setattr(self.metrics, f"{level}_hits", getattr(self.metrics, f"{level}_hits") + len(hits))
+        setattr(self.metrics, f"{level}_misses",
+                getattr(self.metrics, f"{level}_misses") + len(keys) - len(hits))
+        
+        return hits
+    
+    async def _put_many_to_l2(self, items: Dict[str, Any], ttl_hours: Optional[int],
+                              tags: Optional[Dict[str, Tuple[str, ...]]] = None) -> Dict[str, bool]:
+        """Escribir un lote en L2 desde el pool de I/O"""
+        tags = tags or {}
+        if hasattr(self.l2_cache, "put_many"):
+            hard, soft = self._ttl_for("l2", ttl_hours)
+            if self._supports_tags(self.l2_cache):
+                batch_tags = {key: tags[key] for key in items if key in tags}
+                return await self.io_executor.run(self.l2_cache.put_many, items, hard, batch_tags, soft)
+            return await self.io_executor.run(self.l2_cache.put_many, items, hard)
+        
+        results = await asyncio.gather(*(
+            self._put_to_l2(key, data, ttl_hours, tags.get(key, ())) for key, data in items.items()
+        ))
+        return dict(zip(items, results))
+    
+    async def _promote_many_to_l1(self, items: Dict[str, Any]):
+        """Promover un lote de aciertos de L2/L3 a L1"""
+        admitted = {key: data for key, data in items.items() if self._admits("l1", key, data)}
+        if admitted:
+            hard, soft = self._ttl_for("l1", None)
+            results = self.l1_cache.put_many(admitted, ttl_hours=hard, soft_ttl_hours=soft)
+            self.metrics.promotions += sum(1 for result in results.values() if result)
     
     def invalidate_key(self, key: str, levels: List[str] = ["all"]) -> bool:
         """
@@ -290,7 +808,7 @@ class CacheManager:
         Args:
             key: Clave a invalidar
             levels: Lista de niveles ("l1", "l2", "l3", "all")
-            
+        
         Returns:
             bool: True si la invalidación fue exitosa
         """
@@ -301,18 +819,18 @@ class CacheManager:
             success = True
             for level in levels:
                 if level == "l1" and self.l1_cache:
-                    # TODO: Implementar invalidación L1
-                    pass
+                    self.l1_cache.delete(key)
                 elif level == "l2" and self.l2_cache:
-                    # TODO: Implementar invalidación L2
-                    pass
+                    self._pending_writes.pop(key, None)
+                    self.l2_cache.delete(key)
                 elif level == "l3" and self.l3_cache:
-                    # TODO: Implementar invalidación L3
-                    pass
+                    self.l3_cache.delete_cached_query(key)
+                    if key.startswith("index_"):
+                        self.l3_cache.invalidate_index(key[len("index_"):])
             
             self.logger.info(f"Clave invalidada: {key} en niveles: {levels}")
             return success
-            
+        
         except Exception as e:
             self.logger.error(f"Error invalidando clave {key}: {e}")
             return False
@@ -324,22 +842,113 @@ class CacheManager:
         Args:
             pattern: Patrón de búsqueda (ej: "lesson_*", "*_index")
             levels: Lista de niveles a limpiar
-            
+        
         Returns:
             int: Número de claves invalidadas
         """
         try:
+            import fnmatch
+            
+            if "all" in levels:
+                levels = ["l1", "l2", "l3"]
+            
             invalidated_count = 0
             
-            # TODO: Implementar invalidación por patrón en cada cache
+            if "l1" in levels and self.l1_cache:
+                for key in self.l1_cache.get_keys(pattern):
+                    if self.l1_cache.delete(key):
+                        invalidated_count += 1
+            
+            if "l2" in levels and self.l2_cache:
+                for key in [k for k in self._pending_writes if fnmatch.fnmatch(k, pattern)]:
+                    del self._pending_writes[key]
+                    invalidated_count += 1
+                for key in self.l2_cache.get_keys(pattern):
+                    if self.l2_cache.delete(key):
+                        invalidated_count += 1
+            
+            if "l3" in levels and self.l3_cache:
+                for key in self.l3_cache.get_query_keys():
+                    if fnmatch.fnmatch(key, pattern) and self.l3_cache.delete_cached_query(key):
+                        invalidated_count += 1
             
             self.logger.info(f"Invalidadas {invalidated_count} claves con patrón: {pattern}")
             return invalidated_count
-            
+        
         except Exception as e:
             self.logger.error(f"Error invalidando patrón {pattern}: {e}")
             return 0
     
+    def invalidate_tags(self, tags: Iterable[str], levels: List[str] = ["all"]) -> int:
+        """
+        Invalidar las entradas asociadas a alguna de las etiquetas
+        
+        Args:
+            tags: Etiquetas invalidadas (p.ej. {"lesson:12", "index:lesson_mapper"})
+            levels: Lista de niveles a limpiar
+        
+        Returns:
+            int: Número de entradas invalidadas
+        """
+        tags = set(tags)
+        if not tags:
+            return 0
+        if "all" in levels:
+            levels = ["l1", "l2", "l3"]
+        
+        invalidated_count = 0
+        try:
+            if "l1" in levels and self.l1_cache:
+                invalidated_count += self.l1_cache.invalidate_tags(tags)
+            
+            if "l2" in levels and self.l2_cache:
+                stale = [key for key, (_, _, key_tags) in self._pending_writes.items()
+                         if tags.intersection(key_tags)]
+                for key in stale:
+                    del self._pending_writes[key]
+                    invalidated_count += 1
+                if self._supports_tags(self.l2_cache):
+                    invalidated_count += self.l2_cache.invalidate_tags(tags)
+                else:
+                    self.logger.warning(
+                        f"{type(self.l2_cache).__name__} no guarda etiquetas; L2 no se invalida por etiqueta"
+                    )
+            
+            if "l3" in levels and self.l3_cache:
+                invalidated_count += self.l3_cache.invalidate_tags(tags)
+        
+        except Exception as e:
+            self.logger.error(f"Error invalidando etiquetas {sorted(tags)}: {e}")
+        
+        self.logger.info(f"Invalidadas {invalidated_count} entradas por {len(tags)} etiquetas")
+        return invalidated_count
+    
+    def attach_invalidation_bus(self, bus: InvalidationBus):
+        """
+        Suscribirse a un bus de invalidación
+        
+        Cada cambio publicado purga las entradas etiquetadas y descarta de L3 el
+        índice modificado y los que dependen de él.
+        
+        Args:
+            bus: Bus que detecta cambios en los índices
+        """
+        self.invalidation_bus = bus
+        bus.subscribe(self._on_index_changed)
+    
+    def _on_indices_rewritten(self, index_names: List[str]):
+        """Suscriptor del vigilante: L3 ya está recargado, purgar lo derivado en L1/L2"""
+        if self.invalidation_bus is not None:
+            self.invalidation_bus.check(index_names)
+    
+    def _on_index_changed(self, tags: Set[str], index_name: str) -> int:
+        """Suscriptor del bus de invalidación"""
+        # Con vigilante los segmentos de L3 ya se sustituyeron en caliente
+        if self.l3_cache and index_name and self.index_watcher is None:
+            for name in {index_name} | self.invalidation_bus.dependents(index_name):
+                self.l3_cache.invalidate_index(name)
+        return self.invalidate_tags(tags)
+    
     def get_performance_report(self) -> Dict[str, Any]:
         """
         Generar reporte completo de performance
@@ -348,6 +957,7 @@ class CacheManager:
             Dict con métricas detalladas del cache
         """
         uptime = datetime.now() - self.metrics.started_at if self.metrics.started_at else timedelta(0)
+        self._update_cache_size()
         
         report = {
             "overview": {
@@ -363,10 +973,34 @@ class CacheManager:
                 "total_hit_ratio": round(self.metrics.hit_ratio("total"), 3)
             },
             "detailed_stats": {
-                "l1": {"hits": self.metrics.l1_hits, "misses": self.metrics.l1_misses},
-                "l2": {"hits": self.metrics.l2_hits, "misses": self.metrics.l2_misses},
-                "l3": {"hits": self.metrics.l3_hits, "misses": self.metrics.l3_misses}
+                level: {
+                    "hits": getattr(self.metrics, f"{level}_hits"),
+                    "misses": getattr(self.metrics, f"{level}_misses"),
+                    "writes": getattr(self.metrics, f"{level}_writes"),
+                    "avg_latency_ms": round(self.metrics.avg_latency_ms(level), 3)
+                }
+                for level in CACHE_LEVELS
             },
+            "engine": {
+                "write_policy": self.config.write_policy,
+                "pending_writes": len(self._pending_writes),
+                "write_back_flushes": self.metrics.write_back_flushes,
+                "promotions": self.metrics.promotions,
+                "admission_rejections": self.metrics.admission_rejections,
+                "loader_calls": self.metrics.loader_calls
+            },
+            "stale_while_revalidate": {
+                "enabled": self.config.stale_while_revalidate,
+                "stale_serves": self.metrics.stale_serves,
+                "background_refreshes": self.metrics.background_refreshes,
+                "refresh_errors": self.metrics.refresh_errors,
+                "refreshing": len(self._refresh_tasks)
+            },
+            "single_flight": self._single_flight.get_stats(),
+            "expiry": self.expiry_sweeper.get_stats(),
+            "io": self.io_executor.get_stats(),
+            "invalidation": self.invalidation_bus.get_stats() if self.invalidation_bus else None,
+            "index_watcher": self.index_watcher.get_stats() if self.index_watcher else None,
             "config": asdict(self.config),
             "last_cleanup": self.metrics.last_cleanup.isoformat() if self.metrics.last_cleanup else None
         }
@@ -381,7 +1015,7 @@ class CacheManager:
                 
                 if self.is_running:  # Verificar que aún esté activo
                     await self._cleanup_expired()
-                    
+            
             except asyncio.CancelledError:
                 break
             except Exception as e:
@@ -392,14 +1026,36 @@ class CacheManager:
         try:
             self.logger.debug("Iniciando limpieza de cache...")
             
-            # TODO: Implementar limpieza para cada cache específico
+            await self.flush()
+            
+            # Purgar lo derivado de índices reescritos desde la última revisión
+            if self.invalidation_bus is not None:
+                await self.io_executor.run(self.invalidation_bus.check)
+            
+            if self.l1_cache:
+                self.l1_cache.cleanup_expired()
+            if self.l2_cache:
+                await self.io_executor.run(self.l2_cache.cleanup)
+            if self.l3_cache:
+                self.l3_cache.cleanup_unused()
+            
+            self._update_cache_size()
             
             self.metrics.last_cleanup = datetime.now()
             self.logger.debug("Limpieza de cache completada")
-            
+        
         except Exception as e:
             self.logger.error(f"Error en limpieza de cache: {e}")
     
+    def _update_cache_size(self):
+        """Actualizar tamaño total en memoria y disco"""
+        size_bytes = 0
+        if self.l1_cache:
+            size_bytes += self.l1_cache.current_size_bytes
+        if self.l2_cache:
+            size_bytes += self.l2_cache.current_size_bytes
+        self.metrics.cache_size_mb = size_bytes / 1024 / 1024
+    
     async def shutdown(self):
         """Cerrar cache manager de forma segura"""
         try:
@@ -407,6 +1063,11 @@ class CacheManager:
             
             self.is_running = False
             
+            # Detener barrendero de expiraciones y vigilante de índices
+            self.expiry_sweeper.stop()
+            if self.index_watcher is not None:
+                self.index_watcher.stop()
+            
             # Cancelar tarea de limpieza
             if self.cleanup_task:
                 self.cleanup_task.cancel()
@@ -415,10 +1076,16 @@ class CacheManager:
                 except asyncio.CancelledError:
                     pass
             
-            # TODO: Cerrar caches específicos de forma segura
+            # Dejar terminar las regeneraciones en curso y persistir escrituras pendientes
+            if self._refresh_tasks:
+                await asyncio.gather(*self._refresh_tasks.values(), return_exceptions=True)
+            await self.flush()
+            if self.l2_cache is not None:
+                self.l2_cache.checkpoint()
+            self.io_executor.shutdown()
             
             self.logger.info("✅ Cache manager cerrado correctamente")
-            
+        
         except Exception as e:
             self.logger.error(f"Error cerrando cache manager: {e}")
 
@@ -430,7 +1097,7 @@ def create_cache_manager(config: Optional[Dict[str, Any]] = None) -> CacheManage
     
     Args:
         config: Diccionario de configuración opcional
-        
+    
     Returns:
         CacheManager: Instancia configurada
     """
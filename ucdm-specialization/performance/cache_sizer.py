@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+Cache Sizer - Estimadores de tamaño para entradas de cache en memoria
+Evita serializar cada valor con pickle solo para medirlo
+"""
+
+import sys
+import pickle
+import threading
+from itertools import islice
+from typing import Any, Dict, Optional, Union
+
+# Overheads aproximados del formato pickle por tipo
+_CONTAINER_OVERHEAD = 4
+_ITEM_OVERHEAD = 2
+_SCALAR_SIZES = {
+    type(None): 1,
+    bool: 1,
+    int: 9,
+    float: 9,
+}
+
+class CacheSizer:
+    """Interfaz base de estimación de tamaño"""
+    
+    name = "base"
+    
+    def size_of(self, obj: Any) -> int:
+        """Estimar tamaño en bytes del objeto"""
+        raise NotImplementedError
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtener estadísticas del estimador"""
+        return {"sizer": self.name}
+
+class PickleSizer(CacheSizer):
+    """Tamaño exacto serializando con pickle (comportamiento original, costoso)"""
+    
+    name = "pickle"
+    
+    def size_of(self, obj: Any) -> int:
+        try:
+            return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
+        except (pickle.PickleError, TypeError, AttributeError):
+            # Fallback para objetos no serializables
+            return sys.getsizeof(obj)
+
+class StructuralSizer(CacheSizer):
+    """
+    Estimador estructural recursivo para payloads dict/list/str
+    
+    Recorre el objeto sin serializarlo y aproxima el tamaño que tendría
+    en pickle. Los contenedores grandes se estiman extrapolando una muestra
+    de sus primeros `max_items` elementos, por lo que el costo no depende
+    del tamaño del payload. Protegido contra ciclos y profundidad excesiva.
+    """
+    
+    name = "structural"
+    
+    def __init__(self, max_depth: int = 32, max_items: int = 16):
+        self.max_depth = max_depth
+        self.max_items = max_items
+    
+    def size_of(self, obj: Any) -> int:
+        return self._estimate(obj, 0, set())
+    
+    def _estimate(self, obj: Any, depth: int, seen: set) -> int:
+        obj_type = type(obj)
+        
+        if obj_type is str:
+            length = len(obj)
+            # Caracteres no ASCII (tildes, ñ) ocupan 2 bytes en UTF-8
+            if not obj.isascii():
+                length += length // 8
+            return length + 5
+        
+        if obj_type in (bytes, bytearray):
+            return len(obj) + 5
+        
+        scalar_size = _SCALAR_SIZES.get(obj_type)
+        if scalar_size is not None:
+            return scalar_size
+        
+        if depth >= self.max_depth:
+            return sys.getsizeof(obj)
+        
+        obj_id = id(obj)
+        if obj_id in seen:
+            return _ITEM_OVERHEAD  # Referencia memoizada
+        
+        if obj_type is dict:
+            seen.add(obj_id)
+            sampled = 0
+            for key, value in islice(obj.items(), self.max_items):
+                sampled += (self._estimate(key, depth + 1, seen)
+                            + self._estimate(value, depth + 1, seen)
+                            + _ITEM_OVERHEAD)
+            return _CONTAINER_OVERHEAD + self._extrapolate(sampled, len(obj))
+        
+        if obj_type in (list, tuple, set, frozenset):
+            seen.add(obj_id)
+            sampled = 0
+            for item in islice(obj, self.max_items):
+                sampled += self._estimate(item, depth + 1, seen) + _ITEM_OVERHEAD
+            return _CONTAINER_OVERHEAD + self._extrapolate(sampled, len(obj))
+        
+        # Objetos con atributos: estimar su __dict__
+        attrs = getattr(obj, "__dict__", None)
+        if isinstance(attrs, dict):
+            seen.add(obj_id)
+            return len(obj_type.__name__) + self._estimate(attrs, depth + 1, seen)
+        
+        return sys.getsizeof(obj)
+    
+    def _extrapolate(self, sampled_bytes: int, item_count: int) -> int:
+        """Escalar el tamaño de la muestra al total de elementos"""
+        if item_count <= self.max_items:
+            return sampled_bytes
+        return sampled_bytes * item_count // self.max_items
+
+class SamplingSizer(CacheSizer):
+    """
+    Estimador estructural calibrado periódicamente contra pickle real
+    
+    Cada `sample_every` estimaciones se mide el tamaño real con pickle y se
+    ajusta un factor de corrección (media móvil exponencial) que se aplica
+    al resto de estimaciones.
+    """
+    
+    name = "sampling"
+    
+    def __init__(self, sample_every: int = 64, smoothing: float = 0.2,
+                 base: Optional[CacheSizer] = None):
+        self.sample_every = max(1, sample_every)
+        self.smoothing = smoothing
+        self.base = base or StructuralSizer()
+        self._exact = PickleSizer()
+        self._lock = threading.Lock()
+        
+        # Estado de calibración
+        self.correction = 1.0
+        self.estimates = 0
+        self.samples = 0
+        self.last_error_ratio = 0.0
+    
+    def size_of(self, obj: Any) -> int:
+        estimate = self.base.size_of(obj)
+        
+        with self._lock:
+            self.estimates += 1
+            should_sample = self.estimates % self.sample_every == 1 or self.sample_every == 1
+        
+        if should_sample and estimate > 0:
+            actual = self._exact.size_of(obj)
+            self._calibrate(estimate, actual)
+            return actual
+        
+        return max(1, int(estimate * self.correction))
+    
+    def _calibrate(self, estimate: int, actual: int):
+        """Actualizar factor de corrección con una muestra real"""
+        ratio = actual / estimate
+        with self._lock:
+            if self.samples == 0:
+                self.correction = ratio
+            else:
+                self.correction += self.smoothing * (ratio - self.correction)
+            self.samples += 1
+            self.last_error_ratio = abs(1.0 - ratio)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sizer": self.name,
+                "correction": round(self.correction, 3),
+                "estimates": self.estimates,
+                "samples": self.samples,
+                "last_error_ratio": round(self.last_error_ratio, 3)
+            }
+
+
+_SIZERS = {
+    "pickle": PickleSizer,
+    "structural": StructuralSizer,
+    "sampling": SamplingSizer,
+}
+
+
+def create_sizer(sizer: Union[str, CacheSizer, None] = "sampling") -> CacheSizer:
+    """
+    Crear estimador de tamaño por nombre o devolver la instancia recibida
+    
+    Args:
+        sizer: Nombre ("pickle", "structural", "sampling") o instancia
+    
+    Returns:
+        CacheSizer: Estimador configurado
+    """
+    if isinstance(sizer, CacheSizer):
+        return sizer
+    if sizer is None:
+        sizer = "sampling"
+    if sizer not in _SIZERS:
+        raise ValueError(f"Estimador de tamaño desconocido: {sizer}")
+    return _SIZERS[sizer]()
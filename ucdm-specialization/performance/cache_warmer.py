@@ -0,0 +1,386 @@
+#!/usr/bin/env python3
+"""
+Cache Warmer - Precalentamiento del cache de respuestas
+Genera en paralelo las consultas canónicas del CLI y las carga en bloque en L1/L2
+"""
+
+import os
+import json
+import math
+import time
+import asyncio
+import logging
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, date, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from .enhanced_response_engine import EnhancedUCDMResponseEngine
+
+# Formas canónicas de las consultas que emite el CLI
+LESSON_QUERY = "Explícame la Lección {num}"
+DAILY_QUERY = "¿Cuál es la lección de hoy?"
+CONCEPT_QUERY = "Háblame sobre {concept} en UCDM"
+
+# TTL con los que el motor escribe cada nivel
+MEMORY_TTL_HOURS = 1
+DISK_TTL_HOURS = 24
+
+STATE_FILE_NAME = "warmup_state.json"
+
+@dataclass
+class WarmupJob:
+    """Consulta a precalcular"""
+    key: str
+    query: str
+    kind: str  # "lesson" | "daily" | "concept"
+    target_date: Optional[str] = None  # ISO; solo consultas diarias
+    ttl_hours: int = DISK_TTL_HOURS
+
+
+# Motor propio de cada proceso del pool (lo crea el inicializador)
+_worker_engine: Optional[EnhancedUCDMResponseEngine] = None
+
+def _init_worker(indices_dir: str, use_compiled_index: bool):
+    """Cargar el motor una vez por proceso, sobre los mismos índices que el motor padre"""
+    global _worker_engine
+    _worker_engine = EnhancedUCDMResponseEngine(use_cache=False, indices_dir=indices_dir,
+                                                use_compiled_index=use_compiled_index)
+    _worker_engine.load_data()
+
+def _generate_chunk(jobs: List[Tuple[str, str, Optional[str]]]) -> List[Tuple[str, Dict[str, Any]]]:
+    """Generar un bloque de consultas (ejecutado en un proceso del pool)"""
+    results = []
+    for key, query, target_date in jobs:
+        when = datetime.fromisoformat(target_date) if target_date else None
+        results.append((key, _worker_engine.generate_result(query, when)))
+    return results
+
+class CacheWarmer:
+    """
+    Precalentador del cache de respuestas de EnhancedUCDMResponseEngine
+    
+    - Enumera las consultas canónicas: una por lección, la lección del día
+      para cada fecha de date_mapping y una por concepto
+    - Genera en un pool de procesos y carga cada bloque con put_many
+    - Reanudable: el progreso se guarda en el directorio del cache y una
+      ejecución interrumpida continúa donde quedó
+    - Programable antes del cambio de día (run_daily)
+    """
+    
+    def __init__(self, engine: EnhancedUCDMResponseEngine, workers: Optional[int] = None,
+                 chunk_size: int = 32, progress_callback: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Inicializar precalentador
+        
+        Args:
+            engine: Motor con cache habilitado y datos cargados
+            workers: Procesos del pool (0 o 1 = generar en el proceso actual)
+            chunk_size: Consultas por bloque enviado al pool
+            progress_callback: Recibe el progreso tras cada bloque almacenado
+        """
+        if not engine.use_cache:
+            raise ValueError("El motor no tiene cache habilitado")
+        
+        self.engine = engine
+        self.workers = workers if workers is not None else min(4, os.cpu_count() or 1)
+        self.chunk_size = chunk_size
+        self.progress_callback = progress_callback
+        self.state_file = Path(engine.disk_cache.cache_dir) / STATE_FILE_NAME
+        self.last_run: Dict[str, Any] = {}
+        
+        self.logger = self._setup_logging()
+    
+    def _setup_logging(self) -> logging.Logger:
+        """Configurar logging específico"""
+        logger = logging.getLogger(f"{__name__}.CacheWarmer")
+        logger.setLevel(logging.INFO)
+        
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            )
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        
+        return logger
+    
+    @staticmethod
+    def _concept_label(concept_key: str) -> str:
+        """Nombre legible de un concepto del índice ("titulo_perdón." -> "perdón")"""
+        label = concept_key.split("_", 1)[1] if "_" in concept_key else concept_key
+        return label.strip(" .,;:")
+    
+    @staticmethod
+    def _next_occurrence(date_key: str, start: date) -> Optional[date]:
+        """Próxima fecha (desde start inclusive) con el mes-día "MM-DD" """
+        month, day = (int(part) for part in date_key.split("-"))
+        for year in range(start.year, start.year + 8):
+            try:
+                candidate = date(year, month, day)
+            except ValueError:
+                continue  # 29 de febrero en año no bisiesto
+            if candidate >= start:
+                return candidate
+        return None
+    
+    def build_jobs(self, target_date: Optional[datetime] = None) -> List[WarmupJob]:
+        """
+        Enumerar las consultas canónicas a precalcular
+        
+        Args:
+            target_date: Primer día de las consultas diarias (por defecto hoy)
+        
+        Returns:
+            List[WarmupJob]: Trabajos sin claves repetidas
+        """
+        now = datetime.now()
+        start = (target_date or now).date()
+        jobs: Dict[str, WarmupJob] = {}
+        
+        for num in sorted(self.engine.lessons_index, key=lambda n: int(n)):
+            query = LESSON_QUERY.format(num=num)
+            key = self.engine.cache_key_for(query)
+            jobs.setdefault(key, WarmupJob(key=key, query=query, kind="lesson"))
+        
+        for date_key in sorted(self.engine.date_mapper):
+            day = self._next_occurrence(date_key, start)
+            if day is None:
+                continue
+            when = datetime.combine(day, datetime.min.time())
+            key = self.engine.cache_key_for(DAILY_QUERY, when)
+            # Válida hasta el final de su día
+            end_of_day = when + timedelta(days=1)
+            ttl_hours = max(1, math.ceil((end_of_day - now).total_seconds() / 3600))
+            jobs.setdefault(key, WarmupJob(key=key, query=DAILY_QUERY, kind="daily",
+                                           target_date=when.isoformat(), ttl_hours=ttl_hours))
+        
+        for concept_key in self.engine.concept_index:
+            label = self._concept_label(concept_key)
+            if not label:
+                continue
+            query = CONCEPT_QUERY.format(concept=label)
+            key = self.engine.cache_key_for(query)
+            jobs.setdefault(key, WarmupJob(key=key, query=query, kind="concept"))
+        
+        return list(jobs.values())
+    
+    def _load_state(self, target_date: str) -> set:
+        """Claves ya completadas por una ejecución interrumpida para la misma fecha"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return set()
+        
+        if state.get("target_date") != target_date or state.get("finished"):
+            return set()
+        return set(state.get("completed", []))
+    
+    def _save_state(self, target_date: str, completed: set, finished: bool = False):
+        """Guardar progreso de forma atómica"""
+        state = {
+            "target_date": target_date,
+            "updated_at": datetime.now().isoformat(),
+            "finished": finished,
+            "completed": sorted(completed)
+        }
+        temp_file = self.state_file.with_suffix('.tmp')
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        temp_file.replace(self.state_file)
+    
+    def _chunks(self, jobs: List[WarmupJob]) -> Iterator[List[WarmupJob]]:
+        for start in range(0, len(jobs), self.chunk_size):
+            yield jobs[start:start + self.chunk_size]
+    
+    def _generate(self, chunks: List[List[WarmupJob]]) -> Iterator[Tuple[List[WarmupJob], List[Tuple[str, Dict[str, Any]]]]]:
+        """Generar bloques en el pool (o en el proceso actual) en orden de finalización"""
+        if self.workers <= 1:
+            for chunk in chunks:
+                yield chunk, [
+                    (job.key, self.engine.generate_result(
+                        job.query, datetime.fromisoformat(job.target_date) if job.target_date else None))
+                    for job in chunk
+                ]
+            return
+        
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=self._worker_initargs()) as pool:
+            futures = {
+                pool.submit(_generate_chunk, [(job.key, job.query, job.target_date) for job in chunk]): chunk
+                for chunk in chunks
+            }
+            for future in as_completed(futures):
+                yield futures[future], future.result()
+    
+    def _worker_initargs(self) -> Tuple[str, bool]:
+        """Configuración del motor que replican los procesos del pool"""
+        return str(self.engine.indices_dir), self.engine.use_compiled_index
+    
+    def _store(self, chunk: List[WarmupJob], generated: List[Tuple[str, Dict[str, Any]]]) -> Tuple[int, int]:
+        """Cargar un bloque en L2 (por TTL) y en L1 lo que ya es válido hoy"""
+        jobs = {job.key: job for job in chunk}
+        today = datetime.now().date().isoformat()
+        
+        by_ttl: Dict[int, Dict[str, Any]] = {}
+        current: Dict[str, Any] = {}
+        tags: Dict[str, List[str]] = {}
+        for key, result in generated:
+            job = jobs[key]
+            by_ttl.setdefault(job.ttl_hours, {})[key] = result
+            tags[key] = self.engine.response_tags(result)
+            if job.target_date is None or job.target_date.startswith(today):
+                current[key] = result
+        
+        stored_disk = 0
+        for ttl_hours, items in by_ttl.items():
+            results = self.engine.disk_cache.put_many(items, tags=tags, **self.engine.ttl_args(ttl_hours))
+            stored_disk += sum(1 for stored in results.values() if stored)
+        
+        stored_memory = 0
+        if current:
+            results = self.engine.memory_cache.put_many(current, tags=tags, **self.engine.ttl_args(MEMORY_TTL_HOURS))
+            stored_memory = sum(1 for stored in results.values() if stored)
+        
+        return stored_disk, stored_memory
+    
+    def run(self, target_date: Optional[datetime] = None, resume: bool = True) -> Dict[str, Any]:
+        """
+        Precalcular y cargar todas las consultas canónicas
+        
+        Args:
+            target_date: Primer día de las consultas diarias (por defecto hoy)
+            resume: Continuar una ejecución interrumpida para la misma fecha
+        
+        Returns:
+            Dict con el resumen de la ejecución
+        """
+        start_time = time.time()
+        target_key = (target_date or datetime.now()).date().isoformat()
+        
+        jobs = self.build_jobs(target_date)
+        completed = self._load_state(target_key) if resume else set()
+        pending = [job for job in jobs if job.key not in completed]
+        
+        summary = {
+            "target_date": target_key,
+            "total_jobs": len(jobs),
+            "resumed": len(jobs) - len(pending),
+            "generated": 0,
+            "stored_disk": 0,
+            "stored_memory": 0,
+            "by_kind": {},
+            "workers": self.workers
+        }
+        for job in jobs:
+            summary["by_kind"][job.kind] = summary["by_kind"].get(job.kind, 0) + 1
+        
+        self.logger.info(
+            f"Precalentando {len(pending)} consultas ({summary['resumed']} ya completadas) "
+            f"para {target_key} con {self.workers} procesos"
+        )
+        
+        for chunk, generated in self._generate(list(self._chunks(pending))):
+            stored_disk, stored_memory = self._store(chunk, generated)
+            summary["generated"] += len(generated)
+            summary["stored_disk"] += stored_disk
+            summary["stored_memory"] += stored_memory
+            
+            completed.update(key for key, _ in generated)
+            self._save_state(target_key, completed)
+            
+            progress = {
+                "done": summary["resumed"] + summary["generated"],
+                "total": len(jobs),
+                "percent": round((summary["resumed"] + summary["generated"]) / len(jobs) * 100, 1)
+            }
+            self.logger.debug(f"Progreso: {progress['done']}/{progress['total']} ({progress['percent']}%)")
+            if self.progress_callback:
+                self.progress_callback(progress)
+        
+        self._save_state(target_key, completed, finished=True)
+        self.engine.disk_cache.checkpoint()
+        
+        summary["elapsed_seconds"] = round(time.time() - start_time, 2)
+        self.last_run = summary
+        self.logger.info(
+            f"✅ Precalentamiento completado: {summary['generated']} generadas, "
+            f"{summary['stored_disk']} en disco en {summary['elapsed_seconds']}s"
+        )
+        return summary
+    
+    @staticmethod
+    def seconds_until_rollover(lead_minutes: int = 30, now: Optional[datetime] = None) -> float:
+        """Segundos hasta `lead_minutes` antes de la próxima medianoche"""
+        now = now or datetime.now()
+        midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+        run_at = midnight - timedelta(minutes=lead_minutes)
+        if run_at <= now:
+            run_at += timedelta(days=1)
+        return (run_at - now).total_seconds()
+    
+    async def run_daily(self, lead_minutes: int = 30):
+        """Precalentar cada día antes del cambio de fecha (cancelar la tarea para detener)"""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.seconds_until_rollover(lead_minutes))
+            tomorrow = datetime.now() + timedelta(days=1)
+            try:
+                await loop.run_in_executor(None, self.run, tomorrow, False)
+            except Exception as e:
+                self.logger.error(f"Error en precalentamiento programado: {e}")
+
+
+def create_cache_warmer(engine: Optional[EnhancedUCDMResponseEngine] = None,
+                        workers: Optional[int] = None) -> CacheWarmer:
+    """
+    Crear precalentador (con un motor nuevo si no se proporciona)
+    
+    Args:
+        engine: Motor con cache habilitado
+        workers: Procesos del pool
+    
+    Returns:
+        CacheWarmer: Instancia configurada
+    """
+    if engine is None:
+        engine = EnhancedUCDMResponseEngine(use_cache=True)
+        engine.load_data()
+    return CacheWarmer(engine, workers=workers)
+
+
+def main():
+    """Ejecutar precalentamiento desde línea de comandos (apto para cron antes de medianoche)"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Precalentar el cache de respuestas UCDM")
+    parser.add_argument('--date', help='Primer día de las consultas diarias (YYYY-MM-DD)')
+    parser.add_argument('--tomorrow', action='store_true', help='Precalentar para mañana')
+    parser.add_argument('--workers', type=int, default=None, help='Procesos de generación')
+    parser.add_argument('--no-resume', action='store_true', help='Ignorar progreso previo')
+    parser.add_argument('--daemon', action='store_true', help='Repetir cada día antes de medianoche')
+    parser.add_argument('--lead-minutes', type=int, default=30, help='Antelación sobre la medianoche')
+    
+    args = parser.parse_args()
+    
+    warmer = create_cache_warmer(workers=args.workers)
+    
+    if args.daemon:
+        asyncio.run(warmer.run_daily(args.lead_minutes))
+        return 0
+    
+    target_date = None
+    if args.date:
+        target_date = datetime.strptime(args.date, "%Y-%m-%d")
+    elif args.tomorrow:
+        target_date = datetime.now() + timedelta(days=1)
+    
+    summary = warmer.run(target_date, resume=not args.no_resume)
+    print(json.dumps(summary, indent=2, ensure_ascii=False))
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
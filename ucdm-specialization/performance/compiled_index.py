@@ -0,0 +1,551 @@
+#!/usr/bin/env python3
+"""
+Compiled Index - Formato binario mapeable en memoria para ucdm_comprehensive_index
+Tabla de cadenas + registros de lección de ancho fijo + postings concepto -> lecciones (CSR)
+"""
+
+import os
+import json
+import mmap
+import struct
+import hashlib
+import logging
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+MAGIC = b"UCDMIDX1"
+FORMAT_VERSION = 1
+COMPILED_SUFFIX = ".idx"
+
+# Sin cadena / campo ausente
+NO_STRING = 0xFFFFFFFF
+
+# Bits de campos presentes en un registro de lección
+_F_TITLE = 1
+_F_WORD_COUNT = 2
+_F_CONCEPTS = 4
+_F_DAILY_DATES = 8
+_F_FILE_PATH = 16
+_F_METHOD = 32
+_F_CONFIDENCE = 64
+
+# Bits de la cabecera
+_FLAG_STR_POSTINGS = 1  # Las lecciones de concept_index eran cadenas ("1", "3")
+
+# magic, versión, flags, sha256 del origen, tamaño y mtime del origen, 8 contadores, 7 offsets
+_HEADER = struct.Struct("<8sHH32sQq8I7Q")
+# número, presentes, título, palabras, ruta, método, confianza, conceptos (inicio, n), fechas (inicio, n), extra
+_LESSON = struct.Struct("<IIIqIIdIIIII")
+# clave, inicio y longitud de sus postings
+_CONCEPT = struct.Struct("<III")
+# clave MM-DD, lección
+_DATE = struct.Struct("<Ii")
+_U32 = struct.Struct("<I")
+
+_KNOWN_SECTIONS = ("metadata", "date_mapping", "concept_index", "lesson_details")
+
+logger = logging.getLogger(__name__)
+
+def compiled_path_for(source_path: Union[str, Path]) -> Path:
+    """Ruta por defecto del índice compilado: junto al JSON, con extensión .idx"""
+    return Path(source_path).with_suffix(COMPILED_SUFFIX)
+
+class _StringTable:
+    """Tabla de cadenas deduplicadas durante la compilación"""
+    
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self.strings: List[bytes] = []
+    
+    def add(self, text: str) -> int:
+        string_id = self._ids.get(text)
+        if string_id is None:
+            string_id = self._ids[text] = len(self.strings)
+            self.strings.append(text.encode('utf-8'))
+        return string_id
+
+def _pad(buffer: bytearray) -> int:
+    """Alinear a 8 bytes y devolver el offset de la siguiente sección"""
+    buffer.extend(b"\0" * (-len(buffer) % 8))
+    return len(buffer)
+
+def _lesson_number(key: Any) -> int:
+    number = int(key)
+    if str(number) != str(key) or not 0 <= number < NO_STRING:
+        raise ValueError(f"Clave de lección no numérica: {key!r}")
+    return number
+
+def compile_index(source_path: Union[str, Path], output_path: Optional[Union[str, Path]] = None) -> Path:
+    """
+    Compilar ucdm_comprehensive_index.json al formato binario
+    
+    Los campos de lección con el tipo esperado van en el registro de ancho
+    fijo; cualquier otro campo (y las secciones de primer nivel desconocidas)
+    se guardan como JSON en la tabla de cadenas, así la conversión no pierde
+    información. La escritura es atómica (archivo temporal + rename).
+    
+    Args:
+        source_path: Índice JSON de origen
+        output_path: Destino (por defecto compiled_path_for(source_path))
+    
+    Returns:
+        Path: Ruta del índice compilado
+    
+    Raises:
+        ValueError: Si el JSON no tiene la forma de un índice completo
+    """
+    source = Path(source_path)
+    target = Path(output_path) if output_path else compiled_path_for(source)
+    
+    # stat antes de leer: si se reescribe entre medias, la firma no coincidirá
+    stat = source.stat()
+    raw = source.read_bytes()
+    data = json.loads(raw)
+    if not isinstance(data, dict):
+        raise ValueError("El índice completo debe ser un objeto JSON")
+    
+    strings = _StringTable()
+    
+    # Registros de lección, ordenados por número para la búsqueda binaria
+    lessons = sorted(
+        ((_lesson_number(key), value) for key, value in data.get("lesson_details", {}).items()),
+        key=lambda item: item[0]
+    )
+    lesson_records = []
+    refs: List[int] = []
+    for number, details in lessons:
+        present = 0
+        fields = dict(details)
+        title = file_path = method = extra = NO_STRING
+        word_count, confidence = 0, 0.0
+        concepts = dates = (0, 0)
+        
+        if isinstance(fields.get("title"), str):
+            title = strings.add(fields.pop("title"))
+            present |= _F_TITLE
+        value = fields.get("word_count")
+        if isinstance(value, int) and not isinstance(value, bool) and -2**63 <= value < 2**63:
+            word_count = fields.pop("word_count")
+            present |= _F_WORD_COUNT
+        for name, flag in (("concepts", _F_CONCEPTS), ("daily_dates", _F_DAILY_DATES)):
+            value = fields.get(name)
+            if isinstance(value, list) and all(isinstance(item, str) for item in value):
+                span = (len(refs), len(value))
+                refs.extend(strings.add(item) for item in fields.pop(name))
+                present |= flag
+                if name == "concepts":
+                    concepts = span
+                else:
+                    dates = span
+        if isinstance(fields.get("file_path"), str):
+            file_path = strings.add(fields.pop("file_path"))
+            present |= _F_FILE_PATH
+        if isinstance(fields.get("extraction_method"), str):
+            method = strings.add(fields.pop("extraction_method"))
+            present |= _F_METHOD
+        if type(fields.get("confidence")) is float:
+            confidence = fields.pop("confidence")
+            present |= _F_CONFIDENCE
+        if fields:
+            extra = strings.add(json.dumps(fields, ensure_ascii=False))
+        
+        lesson_records.append(_LESSON.pack(
+            number, present, title, word_count, file_path, method, confidence,
+            concepts[0], concepts[1], dates[0], dates[1], extra
+        ))
+    
+    # Postings concepto -> lecciones en formato CSR, conceptos ordenados por clave
+    concept_index = data.get("concept_index", {})
+    postings_as_str = any(isinstance(lesson, str) for posting in concept_index.values() for lesson in posting)
+    concept_records = []
+    postings: List[int] = []
+    for concept in sorted(concept_index):
+        posting = [_lesson_number(lesson) for lesson in concept_index[concept]]
+        if any(isinstance(lesson, str) != postings_as_str for lesson in concept_index[concept]):
+            raise ValueError(f"Postings con tipos mezclados en el concepto {concept!r}")
+        concept_records.append(_CONCEPT.pack(strings.add(concept), len(postings), len(posting)))
+        postings.extend(posting)
+    
+    date_records = []
+    date_mapping = data.get("date_mapping", {})
+    for date_key in sorted(date_mapping):
+        lesson = date_mapping[date_key]
+        if not isinstance(lesson, int) or isinstance(lesson, bool):
+            raise ValueError(f"Lección no entera en date_mapping[{date_key!r}]")
+        date_records.append(_DATE.pack(strings.add(date_key), lesson))
+    
+    metadata_id = strings.add(json.dumps(data["metadata"], ensure_ascii=False)) if "metadata" in data else NO_STRING
+    extras = {key: value for key, value in data.items() if key not in _KNOWN_SECTIONS}
+    extras_id = strings.add(json.dumps(extras, ensure_ascii=False)) if extras else NO_STRING
+    
+    # Secciones en orden tras la cabecera
+    buffer = bytearray(_HEADER.size)
+    offsets = []
+    
+    offsets.append(_pad(buffer))
+    position = 0
+    string_offsets = [0]
+    for encoded in strings.strings:
+        position += len(encoded)
+        string_offsets.append(position)
+    buffer.extend(struct.pack(f"<{len(string_offsets)}I", *string_offsets))
+    
+    offsets.append(_pad(buffer))
+    buffer.extend(b"".join(strings.strings))
+    
+    for section in (lesson_records, concept_records):
+        offsets.append(_pad(buffer))
+        buffer.extend(b"".join(section))
+    offsets.append(_pad(buffer))
+    buffer.extend(struct.pack(f"<{len(postings)}I", *postings))
+    offsets.append(_pad(buffer))
+    buffer.extend(b"".join(date_records))
+    offsets.append(_pad(buffer))
+    buffer.extend(struct.pack(f"<{len(refs)}I", *refs))
+    
+    _HEADER.pack_into(
+        buffer, 0, MAGIC, FORMAT_VERSION, _FLAG_STR_POSTINGS if postings_as_str else 0,
+        hashlib.sha256(raw).digest(), stat.st_size, stat.st_mtime_ns,
+        len(strings.strings), len(lesson_records), len(concept_records), len(date_records),
+        len(postings), len(refs), metadata_id, extras_id, *offsets
+    )
+    
+    target.parent.mkdir(parents=True, exist_ok=True)
+    temp_file = target.with_name(f"{target.name}.{os.getpid()}.tmp")
+    with open(temp_file, 'wb') as f:
+        f.write(buffer)
+    os.replace(temp_file, target)
+    return target
+
+class CompiledIndex:
+    """
+    Índice completo compilado, mapeado en memoria
+    
+    Nada se materializa al abrir: cada consulta decodifica solo los registros
+    que toca con búsqueda binaria sobre las secciones ordenadas. Las páginas
+    del mmap son compartidas entre procesos, así que N workers leyendo el
+    mismo archivo no multiplican el RSS. lesson_details, concept_index y
+    date_mapping son vistas de solo lectura con interfaz de dict para los
+    motores que consumían el JSON.
+    """
+    
+    def __init__(self, path: Union[str, Path]):
+        """
+        Abrir índice compilado
+        
+        Args:
+            path: Archivo .idx generado por compile_index
+        
+        Raises:
+            ValueError: Si el archivo está vacío, truncado o es de otro formato/versión
+        """
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        
+        if len(self._mm) < _HEADER.size:
+            self._mm.close()
+            raise ValueError(f"Índice compilado truncado: {self.path}")
+        
+        (magic, version, self._flags, self.source_hash, self.source_size, self.source_mtime_ns,
+         self.string_count, self.lesson_count, self.concept_count, self.date_count,
+         self.posting_count, self._ref_count, self._metadata_id, self._extras_id,
+         self._string_offsets, self._string_data, self._lessons, self._concepts,
+         self._postings, self._dates, self._refs) = _HEADER.unpack_from(self._mm, 0)
+        
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f"Formato de índice compilado no soportado: {self.path}")
+        if self._refs + self._ref_count * _U32.size > len(self._mm):
+            self._mm.close()
+            raise ValueError(f"Índice compilado truncado: {self.path}")
+        
+        self._metadata: Optional[Dict[str, Any]] = None
+        
+        self.lesson_details = _LessonDetailsView(self)
+        self.concept_index = _ConceptIndexView(self)
+        self.date_mapping = _DateMappingView(self)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc):
+        self.close()
+    
+    def close(self):
+        """Liberar el mapeo"""
+        self._mm.close()
+    
+    def is_current(self, source_path: Union[str, Path]) -> bool:
+        """Si el índice se compiló a partir del contenido actual de source_path"""
+        source = Path(source_path)
+        try:
+            stat = source.stat()
+        except FileNotFoundError:
+            return False
+        if stat.st_size == self.source_size and stat.st_mtime_ns == self.source_mtime_ns:
+            return True
+        # Reescrito con el mismo contenido (p. ej. touch): no hace falta recompilar
+        return stat.st_size == self.source_size and hashlib.sha256(source.read_bytes()).digest() == self.source_hash
+    
+    def _string(self, string_id: int) -> str:
+        start, end = struct.unpack_from("<2I", self._mm, self._string_offsets + string_id * _U32.size)
+        return self._mm[self._string_data + start:self._string_data + end].decode('utf-8')
+    
+    def _string_bytes(self, string_id: int) -> bytes:
+        start, end = struct.unpack_from("<2I", self._mm, self._string_offsets + string_id * _U32.size)
+        return self._mm[self._string_data + start:self._string_data + end]
+    
+    def _u32_array(self, base: int, start: int, count: int) -> Tuple[int, ...]:
+        return struct.unpack_from(f"<{count}I", self._mm, base + start * _U32.size)
+    
+    def _search(self, base: int, record: struct.Struct, count: int, key: bytes) -> Optional[Tuple]:
+        """Búsqueda binaria por la clave (id de cadena en el primer campo) de una sección ordenada"""
+        low, high = 0, count
+        while low < high:
+            middle = (low + high) // 2
+            fields = record.unpack_from(self._mm, base + middle * record.size)
+            current = self._string_bytes(fields[0])
+            if current == key:
+                return fields
+            if current < key:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+    
+    @property
+    def metadata(self) -> Dict[str, Any]:
+        if self._metadata is None:
+            self._metadata = json.loads(self._string(self._metadata_id)) if self._metadata_id != NO_STRING else {}
+        return self._metadata
+    
+    def lesson_numbers(self) -> List[int]:
+        """Números de lección en orden ascendente"""
+        return [
+            _U32.unpack_from(self._mm, self._lessons + position * _LESSON.size)[0]
+            for position in range(self.lesson_count)
+        ]
+    
+    def _decode_lesson(self, fields: Tuple) -> Dict[str, Any]:
+        (_, present, title, word_count, file_path, method, confidence,
+         concepts_start, concepts_len, dates_start, dates_len, extra) = fields
+        lesson: Dict[str, Any] = {}
+        if present & _F_TITLE:
+            lesson["title"] = self._string(title)
+        if present & _F_WORD_COUNT:
+            lesson["word_count"] = word_count
+        if present & _F_CONCEPTS:
+            lesson["concepts"] = [self._string(ref) for ref in self._u32_array(self._refs, concepts_start, concepts_len)]
+        if present & _F_DAILY_DATES:
+            lesson["daily_dates"] = [self._string(ref) for ref in self._u32_array(self._refs, dates_start, dates_len)]
+        if present & _F_FILE_PATH:
+            lesson["file_path"] = self._string(file_path)
+        if present & _F_METHOD:
+            lesson["extraction_method"] = self._string(method)
+        if present & _F_CONFIDENCE:
+            lesson["confidence"] = confidence
+        if extra != NO_STRING:
+            lesson.update(json.loads(self._string(extra)))
+        return lesson
+    
+    def _lesson_offset(self, number: Union[int, str]) -> Optional[int]:
+        """Offset del registro de una lección (búsqueda binaria por número)"""
+        try:
+            number = _lesson_number(number)
+        except (TypeError, ValueError):
+            return None
+        low, high = 0, self.lesson_count
+        while low < high:
+            middle = (low + high) // 2
+            offset = self._lessons + middle * _LESSON.size
+            current = _U32.unpack_from(self._mm, offset)[0]
+            if current == number:
+                return offset
+            if current < number:
+                low = middle + 1
+            else:
+                high = middle
+        return None
+    
+    def has_lesson(self, number: Union[int, str]) -> bool:
+        return self._lesson_offset(number) is not None
+    
+    def lesson(self, number: Union[int, str]) -> Optional[Dict[str, Any]]:
+        """
+        Detalles de una lección
+        
+        Args:
+            number: Número de lección (int o su forma de cadena)
+        
+        Returns:
+            Optional[Dict]: Mismo dict que lesson_details[str(number)] en el JSON, o None
+        """
+        offset = self._lesson_offset(number)
+        return self._decode_lesson(_LESSON.unpack_from(self._mm, offset)) if offset is not None else None
+    
+    def _decode_posting(self, start: int, count: int) -> List[Union[int, str]]:
+        lessons = self._u32_array(self._postings, start, count)
+        if self._flags & _FLAG_STR_POSTINGS:
+            return [str(lesson) for lesson in lessons]
+        return list(lessons)
+    
+    def lessons_for_concept(self, concept: str) -> Optional[List[Union[int, str]]]:
+        """Lecciones de un concepto (exacto) o None si no está indexado"""
+        fields = self._search(self._concepts, _CONCEPT, self.concept_count, concept.encode('utf-8'))
+        return self._decode_posting(fields[1], fields[2]) if fields else None
+    
+    def concepts(self) -> Iterator[str]:
+        """Conceptos en orden de clave"""
+        for position in range(self.concept_count):
+            yield self._string(_U32.unpack_from(self._mm, self._concepts + position * _CONCEPT.size)[0])
+    
+    def lesson_for_date(self, date_key: str) -> Optional[int]:
+        """Lección asignada a una fecha MM-DD"""
+        fields = self._search(self._dates, _DATE, self.date_count, date_key.encode('utf-8'))
+        return fields[1] if fields else None
+    
+    def dates(self) -> Iterator[str]:
+        """Fechas MM-DD en orden"""
+        for position in range(self.date_count):
+            yield self._string(_U32.unpack_from(self._mm, self._dates + position * _DATE.size)[0])
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Materializar el índice completo con la misma forma que el JSON de origen"""
+        data: Dict[str, Any] = {}
+        if self._metadata_id != NO_STRING:
+            data["metadata"] = dict(self.metadata)
+        data["date_mapping"] = dict(self.date_mapping)
+        data["concept_index"] = dict(self.concept_index)
+        data["lesson_details"] = dict(self.lesson_details)
+        if self._extras_id != NO_STRING:
+            data.update(json.loads(self._string(self._extras_id)))
+        return data
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Tamaño y contenido del índice compilado"""
+        return {
+            "path": str(self.path),
+            "size_bytes": len(self._mm),
+            "strings": self.string_count,
+            "lessons": self.lesson_count,
+            "concepts": self.concept_count,
+            "dates": self.date_count,
+            "postings": self.posting_count,
+            "source_sha256": self.source_hash.hex()
+        }
+
+class _LessonDetailsView(Mapping):
+    """lesson_details de solo lectura: "N" -> dict de la lección, decodificado bajo demanda"""
+    
+    def __init__(self, index: CompiledIndex):
+        self._index = index
+    
+    def __getitem__(self, key):
+        lesson = self._index.lesson(key) if isinstance(key, str) else None
+        if lesson is None:
+            raise KeyError(key)
+        return lesson
+    
+    def __contains__(self, key):
+        return isinstance(key, str) and self._index.has_lesson(key)
+    
+    def __iter__(self):
+        return (str(number) for number in self._index.lesson_numbers())
+    
+    def __len__(self):
+        return self._index.lesson_count
+
+class _ConceptIndexView(Mapping):
+    """concept_index de solo lectura: concepto -> lecciones"""
+    
+    def __init__(self, index: CompiledIndex):
+        self._index = index
+    
+    def __getitem__(self, key):
+        lessons = self._index.lessons_for_concept(key) if isinstance(key, str) else None
+        if lessons is None:
+            raise KeyError(key)
+        return lessons
+    
+    def __iter__(self):
+        return self._index.concepts()
+    
+    def __len__(self):
+        return self._index.concept_count
+
+class _DateMappingView(Mapping):
+    """date_mapping de solo lectura: "MM-DD" -> número de lección"""
+    
+    def __init__(self, index: CompiledIndex):
+        self._index = index
+    
+    def __getitem__(self, key):
+        lesson = self._index.lesson_for_date(key) if isinstance(key, str) else None
+        if lesson is None:
+            raise KeyError(key)
+        return lesson
+    
+    def __iter__(self):
+        return self._index.dates()
+    
+    def __len__(self):
+        return self._index.date_count
+
+
+def load_compiled_index(source_path: Union[str, Path], compiled_path: Optional[Union[str, Path]] = None,
+                        compile_if_stale: bool = True) -> Optional[CompiledIndex]:
+    """
+    Abrir el índice compilado de source_path, recompilándolo si falta o quedó obsoleto
+    
+    Args:
+        source_path: Índice JSON de origen
+        compiled_path: Archivo compilado (por defecto compiled_path_for(source_path))
+        compile_if_stale: Compilar cuando no existe o no corresponde al JSON actual
+    
+    Returns:
+        Optional[CompiledIndex]: Índice mapeado, o None si hay que usar el JSON
+    """
+    source = Path(source_path)
+    target = Path(compiled_path) if compiled_path else compiled_path_for(source)
+    try:
+        if not source.exists():
+            return None
+        if target.exists():
+            try:
+                index = CompiledIndex(target)
+            except ValueError:
+                index = None
+            if index is not None:
+                if index.is_current(source):
+                    return index
+                index.close()
+        if not compile_if_stale:
+            return None
+        compile_index(source, target)
+        logger.info(f"Índice compilado: {source.name} -> {target}")
+        return CompiledIndex(target)
+    except Exception as e:
+        logger.warning(f"Índice compilado no disponible para {source}, se usa el JSON: {e}")
+        return None
+
+
+def main():
+    """Compilar índices desde línea de comandos"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Compilar ucdm_comprehensive_index.json a formato binario mapeable")
+    parser.add_argument('source', nargs='?', default="data/indices/ucdm_comprehensive_index.json",
+                        help='Índice JSON de origen')
+    parser.add_argument('-o', '--output', default=None, help='Archivo compilado (por defecto <origen>.idx)')
+    
+    args = parser.parse_args()
+    
+    target = compile_index(args.source, args.output)
+    with CompiledIndex(target) as index:
+        print(json.dumps(index.get_stats(), indent=2, ensure_ascii=False))
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+"""
+Compression Codecs - Códecs de compresión intercambiables para DiskCache
+Registro de códecs (none, gzip, zlib por nivel, lzma y zlib con diccionario entrenado)
+"""
+
+import gzip
+import lzma
+import zlib
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional
+
+# Bloque de lectura al descomprimir por partes desde un mapeo
+STREAM_CHUNK_BYTES = 256 * 1024
+
+# Ventana máxima de zlib: bytes del diccionario más allá de este límite no se usan
+MAX_DICTIONARY_BYTES = 32 * 1024
+
+class CompressionCodec:
+    """
+    Interfaz de códec de compresión
+    
+    `decompress_stream` acepta cualquier objeto buffer (p.ej. un memoryview
+    sobre un archivo mapeado) y descomprime por bloques sin copiar la entrada.
+    """
+    
+    name = "none"
+    
+    def compress(self, data: bytes) -> bytes:
+        return data
+    
+    def decompress(self, data: Any) -> bytes:
+        return bytes(data)
+    
+    def _decompressor(self) -> Any:
+        """Objeto incremental con decompress(chunk) (y opcionalmente flush())"""
+        raise NotImplementedError
+    
+    def decompress_stream(self, view: memoryview) -> bytearray:
+        """Descomprimir por bloques desde un buffer"""
+        decompressor = self._decompressor()
+        output = bytearray()
+        for start in range(0, len(view), STREAM_CHUNK_BYTES):
+            output += decompressor.decompress(view[start:start + STREAM_CHUNK_BYTES])
+        flush = getattr(decompressor, "flush", None)
+        if flush is not None:
+            output += flush()
+        return output
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {"codec": self.name}
+
+class NoneCodec(CompressionCodec):
+    """Sin compresión"""
+    
+    name = "none"
+    
+    def decompress_stream(self, view: memoryview) -> bytearray:
+        return bytearray(view)
+
+class GzipCodec(CompressionCodec):
+    """Gzip nivel por defecto (formato original de DiskCache)"""
+    
+    name = "gzip"
+    
+    def compress(self, data: bytes) -> bytes:
+        return gzip.compress(data)
+    
+    def decompress(self, data: Any) -> bytes:
+        return zlib.decompress(data, wbits=31)
+    
+    def _decompressor(self) -> Any:
+        return zlib.decompressobj(wbits=31)
+
+class ZlibCodec(CompressionCodec):
+    """Zlib crudo (sin cabecera gzip) con nivel configurable"""
+    
+    def __init__(self, level: int = 6):
+        if not 0 <= level <= 9:
+            raise ValueError(f"Nivel zlib fuera de rango: {level}")
+        self.level = level
+        self.name = f"zlib-{level}"
+    
+    def compress(self, data: bytes) -> bytes:
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+    
+    def decompress(self, data: Any) -> bytes:
+        return zlib.decompress(data, wbits=-zlib.MAX_WBITS)
+    
+    def _decompressor(self) -> Any:
+        return zlib.decompressobj(wbits=-zlib.MAX_WBITS)
+
+class LzmaCodec(CompressionCodec):
+    """LZMA (xz): mejor ratio, codificación más lenta"""
+    
+    name = "lzma"
+    
+    def __init__(self, preset: int = 6):
+        self.preset = preset
+    
+    def compress(self, data: bytes) -> bytes:
+        return lzma.compress(data, preset=self.preset)
+    
+    def decompress(self, data: Any) -> bytes:
+        return lzma.decompress(data)
+    
+    def _decompressor(self) -> Any:
+        return lzma.LZMADecompressor()
+
+class ZlibDictionaryCodec(CompressionCodec):
+    """
+    Zlib con diccionario preentrenado
+    
+    Las respuestas estructuradas comparten la plantilla HOOK / APLICACIÓN /
+    INTEGRACIÓN / CIERRE: con ese texto precargado en la ventana, incluso
+    las entradas pequeñas se comprimen bien. El nombre incluye el CRC32 del
+    diccionario para que cada entrada sepa con cuál fue comprimida.
+    """
+    
+    def __init__(self, dictionary: bytes, level: int = 6):
+        if not dictionary:
+            raise ValueError("El diccionario no puede estar vacío")
+        self.dictionary = bytes(dictionary[-MAX_DICTIONARY_BYTES:])
+        self.level = level
+        self.dictionary_id = f"{zlib.crc32(self.dictionary):08x}"
+        self.name = f"zdict-{self.dictionary_id}"
+    
+    def compress(self, data: bytes) -> bytes:
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, -zlib.MAX_WBITS,
+                                      zdict=self.dictionary)
+        return compressor.compress(data) + compressor.flush()
+    
+    def decompress(self, data: Any) -> bytes:
+        decompressor = self._decompressor()
+        return decompressor.decompress(data) + decompressor.flush()
+    
+    def _decompressor(self) -> Any:
+        return zlib.decompressobj(wbits=-zlib.MAX_WBITS, zdict=self.dictionary)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {"codec": self.name, "dictionary_bytes": len(self.dictionary)}
+
+
+def train_dictionary(samples: Iterable[bytes], max_size: int = MAX_DICTIONARY_BYTES,
+                     min_segment: int = 8, max_segment: int = 1024) -> bytes:
+    """
+    Entrenar diccionario zlib a partir de muestras representativas
+    
+    Se cuentan los segmentos (líneas) que aparecen en varias muestras y se
+    concatenan los más rentables. Los de mayor peso van al final, donde
+    zlib los encuentra con distancias más cortas.
+    
+    Args:
+        samples: Payloads representativos (respuestas serializadas)
+        max_size: Tamaño máximo del diccionario
+        min_segment: Longitud mínima de segmento considerado
+        max_segment: Longitud máxima de segmento considerado
+    
+    Returns:
+        bytes: Diccionario (vacío si las muestras no comparten contenido)
+    """
+    document_frequency: Counter = Counter()
+    sample_count = 0
+    
+    for sample in samples:
+        sample_count += 1
+        segments = {
+            segment for segment in bytes(sample).split(b"\n")
+            if min_segment <= len(segment) <= max_segment
+        }
+        document_frequency.update(segments)
+    
+    min_frequency = 2 if sample_count > 1 else 1
+    candidates = [
+        (frequency * len(segment), segment)
+        for segment, frequency in document_frequency.items()
+        if frequency >= min_frequency
+    ]
+    # Más rentables primero para decidir qué entra; luego se invierte el orden
+    candidates.sort(key=lambda x: (x[0], x[1]), reverse=True)
+    
+    selected: List[bytes] = []
+    total = 0
+    for _, segment in candidates:
+        if total + len(segment) + 1 > max_size:
+            continue
+        selected.append(segment)
+        total += len(segment) + 1
+    
+    return b"\n".join(reversed(selected))
+
+
+CODEC_FACTORIES = {
+    "none": NoneCodec,
+    "gzip": GzipCodec,
+    "zlib-1": lambda: ZlibCodec(1),
+    "zlib-6": lambda: ZlibCodec(6),
+    "zlib-9": lambda: ZlibCodec(9),
+    "lzma": LzmaCodec,
+}
+
+
+def create_codec(codec: Optional[str] = "zlib-6", dictionary: Optional[bytes] = None) -> CompressionCodec:
+    """
+    Crear códec por nombre
+    
+    Args:
+        codec: Nombre registrado en CODEC_FACTORIES o "zdict" (requiere diccionario)
+        dictionary: Diccionario entrenado para "zdict"
+    
+    Returns:
+        CompressionCodec: Códec configurado
+    """
+    if codec is None:
+        codec = "none"
+    if codec == "zdict":
+        if not dictionary:
+            raise ValueError("El códec zdict requiere un diccionario entrenado")
+        return ZlibDictionaryCodec(dictionary)
+    if codec not in CODEC_FACTORIES:
+        raise ValueError(f"Códec de compresión desconocido: {codec}")
+    return CODEC_FACTORIES[codec]()
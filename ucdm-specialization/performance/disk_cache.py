@@ -5,16 +5,46 @@ Implementa almacenamiento persistente para índices compilados y datos de median
 """
 
 import os
-import gzip
 import json
+import mmap
+import zlib
 import pickle
+import struct
 import hashlib
 import logging
 import threading
 from pathlib import Path
-from typing import Any, Optional, Dict, List, Tuple
+from collections import Counter, OrderedDict
+from contextlib import contextmanager, nullcontext
+from typing import Any, Optional, Dict, Iterable, Iterator, List, Tuple
 from datetime import datetime, timedelta
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, field
+
+from .expiry_scheduler import ExpiryHeap
+from .compression_codecs import CompressionCodec, create_codec, train_dictionary
+from .file_lock import InterProcessLock, HAS_FCNTL
+from .async_cache import AsyncCacheMixin
+
+# Formatos de payload en disco
+PAYLOAD_PICKLE = "pickle"
+PAYLOAD_OUT_OF_BAND = "pickle5-oob"
+
+# Formato fuera de banda: magic, nº de buffers, longitud del stream pickle; luego longitudes,
+# stream y buffers alineados (se pueden referenciar directamente desde el mapeo)
+OOB_MAGIC = b"UCB5"
+OOB_HEADER = struct.Struct("<4sIQ")
+OOB_LENGTH = struct.Struct("<Q")
+OOB_ALIGNMENT = 64
+
+CHECKSUM_PREFIX = "crc32:"
+
+# Códec "zdict": se entrena un diccionario con las primeras N muestras comprimibles
+DICTIONARY_CODEC = "zdict"
+DICTIONARY_FALLBACK_CODEC = "zlib-6"
+DICTIONARY_SAMPLE_BYTES = 64 * 1024
+
+class _ChecksumMismatch(Exception):
+    """El contenido del archivo no coincide con el checksum registrado"""
 
 @dataclass
 class DiskCacheEntry:
@@ -28,6 +58,10 @@ class DiskCacheEntry:
     compressed: bool
     access_count: int
     checksum: str
+    payload_format: str = PAYLOAD_PICKLE
+    codec: str = "none"
+    tags: List[str] = field(default_factory=list)
+    soft_expires_at: Optional[datetime] = None
     
     def is_expired(self) -> bool:
         """Verificar si la entrada ha expirado"""
@@ -35,6 +69,12 @@ class DiskCacheEntry:
             return False
         return datetime.now() > self.expires_at
     
+    def is_stale(self) -> bool:
+        """Verificar si pasó el TTL blando"""
+        if self.soft_expires_at is None:
+            return False
+        return datetime.now() > self.soft_expires_at
+    
     def to_dict(self) -> Dict[str, Any]:
         """Convertir a diccionario para serialización"""
         return {
@@ -46,7 +86,11 @@ class DiskCacheEntry:
             'size_bytes': self.size_bytes,
             'compressed': self.compressed,
             'access_count': self.access_count,
-            'checksum': self.checksum
+            'checksum': self.checksum,
+            'payload_format': self.payload_format,
+            'codec': self.codec,
+            'tags': self.tags,
+            'soft_expires_at': self.soft_expires_at.isoformat() if self.soft_expires_at else None
         }
     
     @classmethod
@@ -61,25 +105,37 @@ class DiskCacheEntry:
             size_bytes=data['size_bytes'],
             compressed=data['compressed'],
             access_count=data['access_count'],
-            checksum=data['checksum']
+            checksum=data['checksum'],
+            payload_format=data.get('payload_format', PAYLOAD_PICKLE),
+            # Entradas anteriores al registro de códecs: gzip o sin comprimir
+            codec=data.get('codec') or ('gzip' if data['compressed'] else 'none'),
+            tags=data.get('tags', []),
+            soft_expires_at=datetime.fromisoformat(data['soft_expires_at']) if data.get('soft_expires_at') else None
         )
 
-class DiskCache:
+class DiskCache(AsyncCacheMixin):
     """
     Cache en disco L2 con compresión automática y gestión de TTL
     
     Características:
     - Compresión gzip automática para archivos >1KB
     - TTL configurable por entrada
-    - Verificación de integridad con checksums
-    - Limpieza automática de archivos expirados
-    - Gestión de espacio en disco
-    - Thread-safe
+    - Verificación de integridad con CRC32 (MD5 para entradas antiguas)
+    - Lecturas grandes vía mmap sin copiar el archivo a memoria
+    - Limpieza de expirados vía heap (sin recorrer el índice en cada put)
+    - Gestión de espacio en disco con expulsión LRU en O(1)
+    - Índice persistido como snapshot + journal JSONL (una línea por mutación)
+    - Thread-safe; con multiprocess=True, seguro entre procesos (flock + journal compartido)
+    - API asíncrona (aget/aput/adelete) con I/O en un pool de hilos acotado
+    - Operaciones en lote (get_many/put_many): un lock y una escritura de journal por lote
     """
     
     def __init__(self, cache_dir: str = "data/cache", max_size_gb: int = 2,
                  default_ttl_hours: int = 24, compression_threshold_kb: int = 1,
-                 auto_cleanup: bool = True):
+                 auto_cleanup: bool = True, journal_checkpoint_ops: int = 1000,
+                 mmap_threshold_kb: int = 64, compression_codec: str = DICTIONARY_CODEC,
+                 dictionary_samples: int = 64, multiprocess: bool = False,
+                 compress: bool = True):
         """
         Inicializar cache en disco
         
@@ -89,19 +145,56 @@ class DiskCache:
             default_ttl_hours: TTL por defecto en horas
             compression_threshold_kb: Umbral para compresión en KB
             auto_cleanup: Limpieza automática habilitada
+            journal_checkpoint_ops: Operaciones de journal tras las que se compacta el snapshot
+            mmap_threshold_kb: Archivos de este tamaño o mayores se leen con mmap
+            compression_codec: Códec para entradas nuevas ("none", "gzip", "zlib-1/6/9",
+                "lzma" o "zdict" = zlib con diccionario entrenado sobre las respuestas)
+            dictionary_samples: Muestras recogidas antes de entrenar el diccionario de "zdict"
+            multiprocess: Compartir el directorio con otros procesos. Los escritores toman
+                un flock exclusivo; los lectores solo aplican la cola del journal sin bloquear
+            compress: Comprimir entradas nuevas (False = guardar siempre sin comprimir)
         """
         self.cache_dir = Path(cache_dir)
         self.max_size_bytes = max_size_gb * 1024 * 1024 * 1024
         self.default_ttl = timedelta(hours=default_ttl_hours)
         self.compression_threshold = compression_threshold_kb * 1024
+        self.compress = compress
         self.auto_cleanup = auto_cleanup
+        self.journal_checkpoint_ops = journal_checkpoint_ops
+        self.mmap_threshold = mmap_threshold_kb * 1024
+        self.compression_codec = compression_codec
+        self.dictionary_samples = dictionary_samples
+        if compression_codec != DICTIONARY_CODEC:
+            create_codec(compression_codec)  # Validar nombre
         
         # Archivos de control
         self.index_file = self.cache_dir / "cache_index.json"
+        self.journal_file = self.cache_dir / "cache_index.journal"
         self.lock_file = self.cache_dir / "cache.lock"
+        self.dictionary_dir = self.cache_dir / "dictionaries"
+        
+        # Códecs por nombre (incluye diccionarios con los que se comprimieron entradas existentes)
+        self._codecs: Dict[str, CompressionCodec] = {}
+        self._active_codec: Optional[CompressionCodec] = None
+        self._dictionary_samples: List[bytes] = []
         
-        # Estado interno
-        self._index: Dict[str, DiskCacheEntry] = {}
+        # Journal de mutaciones del índice (write-behind del snapshot)
+        self._journal_handle = None
+        self._journal_ops = 0
+        self._journal_buffer: Optional[List[bytes]] = None
+        self._dirty_access: set = set()
+        self.checkpoints = 0
+        
+        # Coordinación entre procesos: posición leída del journal e identidad del snapshot
+        self._process_lock: Optional[InterProcessLock] = None
+        self._journal_position = 0
+        self._snapshot_stamp: Optional[Tuple[int, int, int]] = None
+        self.external_ops_applied = 0
+        self.index_reloads = 0
+        
+        # Estado interno (el índice mantiene orden de acceso: primero el menos reciente)
+        self._index: "OrderedDict[str, DiskCacheEntry]" = OrderedDict()
+        self._expiry = ExpiryHeap()
         self._lock = threading.RLock()
         self.current_size_bytes = 0
         
@@ -111,6 +204,15 @@ class DiskCache:
         self.writes = 0
         self.deletes = 0
         self.compressions = 0
+        self.bytes_before_compression = 0
+        self.bytes_after_compression = 0
+        self.mmap_reads = 0
+        self.buffered_reads = 0
+        self.bytes_read = 0
+        self.bytes_copied = 0
+        self.batch_gets = 0
+        self.batch_puts = 0
+        self.stale_hits = 0
         self.created_at = datetime.now()
         
         # Logging
@@ -118,7 +220,14 @@ class DiskCache:
         
         # Inicialización
         self._initialize_cache_dir()
-        self._load_index()
+        if multiprocess:
+            if HAS_FCNTL:
+                self._process_lock = InterProcessLock(self.lock_file)
+            else:
+                self.logger.warning("fcntl no disponible: DiskCache funcionará en modo de un solo proceso")
+        self._load_dictionaries()
+        with self._exclusive():
+            self._load_index()
         
         self.logger.info(f"DiskCache inicializado - Dir: {cache_dir}, Límite: {max_size_gb}GB")
     
@@ -146,46 +255,268 @@ class DiskCache:
             (self.cache_dir / "responses").mkdir(exist_ok=True)
             (self.cache_dir / "indices").mkdir(exist_ok=True)
             (self.cache_dir / "temp").mkdir(exist_ok=True)
-            
+        
         except Exception as e:
             self.logger.error(f"Error creando directorio de cache: {e}")
             raise
     
-    def _load_index(self):
-        """Cargar índice desde disco"""
+    def _load_index(self, consolidate: bool = True):
+        """
+        Cargar índice desde disco (snapshot + replay del journal)
+        
+        Args:
+            consolidate: Reescribir el snapshot si se reprodujo journal (requiere lock exclusivo)
+        """
         try:
-            if self.index_file.exists():
+            snapshot_exists = self.index_file.exists()
+            self._snapshot_stamp = self._stat_snapshot()
+            entries_data: Dict[str, Dict[str, Any]] = {}
+            
+            if snapshot_exists:
                 with open(self.index_file, 'r', encoding='utf-8') as f:
                     index_data = json.load(f)
-                
+                entries_data.update(index_data.get('entries', {}))
+            
+            replayed = self._replay_journal(entries_data)
+            
+            if snapshot_exists or replayed:
                 # Reconstruir índice
-                for key, entry_data in index_data.get('entries', {}).items():
+                loaded_entries = []
+                for key, entry_data in entries_data.items():
                     try:
                         entry = DiskCacheEntry.from_dict(entry_data)
                         
                         # Verificar que el archivo existe
                         file_path = self.cache_dir / entry.file_path
                         if file_path.exists():
-                            self._index[key] = entry
-                            self.current_size_bytes += entry.size_bytes
+                            loaded_entries.append(entry)
                         else:
                             self.logger.warning(f"Archivo de cache faltante: {entry.file_path}")
                     
                     except Exception as e:
                         self.logger.warning(f"Error cargando entrada de índice {key}: {e}")
                 
+                # Restaurar orden de acceso y expiraciones
+                loaded_entries.sort(key=lambda entry: entry.last_accessed)
+                for entry in loaded_entries:
+                    self._index[entry.key] = entry
+                    self._expiry.schedule(entry.key, entry.expires_at)
+                    self.current_size_bytes += entry.size_bytes
+                
                 self.logger.info(f"Índice cargado - {len(self._index)} entradas, {self.current_size_bytes/1024/1024:.1f}MB")
+                
+                # Consolidar el journal reproducido en un snapshot nuevo
+                if replayed and consolidate:
+                    self._save_index()
             
-            else:
+            elif consolidate:
                 self.logger.info("Índice no existe, creando nuevo cache")
                 self._save_index()
         
         except Exception as e:
             self.logger.error(f"Error cargando índice: {e}")
-            self._index = {}
+            self._index = OrderedDict()
+            self._expiry.clear()
+    
+    def _replay_journal(self, entries_data: Dict[str, Dict[str, Any]]) -> int:
+        """
+        Aplicar las mutaciones del journal sobre las entradas del snapshot
+        
+        Args:
+            entries_data: Entradas serializadas (se modifican en sitio)
+        
+        Returns:
+            int: Número de operaciones aplicadas
+        """
+        self._journal_position = 0
+        if not self.journal_file.exists():
+            return 0
+        
+        applied = 0
+        with open(self.journal_file, 'rb') as f:
+            for line in f:
+                try:
+                    if not line.endswith(b'\n'):
+                        raise ValueError("línea incompleta")
+                    op = json.loads(line)
+                except ValueError:
+                    # Última línea cortada por una caída (o aún escribiéndose): descartar el resto
+                    self.logger.warning("Journal de índice truncado, ignorando operaciones incompletas")
+                    break
+                
+                self._journal_position += len(line)
+                kind = op.get('op')
+                if kind == 'put':
+                    entries_data[op['entry']['key']] = op['entry']
+                elif kind == 'del':
+                    entries_data.pop(op['key'], None)
+                elif kind == 'touch' and op['key'] in entries_data:
+                    entries_data[op['key']]['last_accessed'] = op['last_accessed']
+                    entries_data[op['key']]['access_count'] = op['access_count']
+                applied += 1
+        
+        if applied:
+            self.logger.info(f"Journal reproducido - {applied} operaciones")
+        return applied
+    
+    def _exclusive(self):
+        """Lock exclusivo entre procesos (no-op en modo de un solo proceso)"""
+        if self._process_lock is None:
+            return nullcontext()
+        return self._process_lock.exclusive()
+    
+    def _stat_snapshot(self) -> Optional[Tuple[int, int, int]]:
+        """Identidad del snapshot: cambia cuando otro proceso lo reescribe"""
+        try:
+            stat = self.index_file.stat()
+            return (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            return None
+    
+    def _forget(self, key: str):
+        """Quitar entrada del índice en memoria (sin tocar disco ni journal)"""
+        entry = self._index.pop(key, None)
+        if entry is not None:
+            self.current_size_bytes -= entry.size_bytes
+            self._expiry.cancel(key)
+            self._dirty_access.discard(key)
+    
+    def _apply_external_op(self, op: Dict[str, Any]):
+        """Aplicar al índice en memoria una mutación registrada por otro proceso"""
+        kind = op.get('op')
+        if kind == 'put':
+            entry = DiskCacheEntry.from_dict(op['entry'])
+            self._forget(entry.key)
+            self._index[entry.key] = entry
+            self._expiry.schedule(entry.key, entry.expires_at)
+            self.current_size_bytes += entry.size_bytes
+        elif kind == 'del':
+            self._forget(op['key'])
+        elif kind == 'touch' and op['key'] in self._index:
+            entry = self._index[op['key']]
+            entry.last_accessed = datetime.fromisoformat(op['last_accessed'])
+            entry.access_count = op['access_count']
+            self._index.move_to_end(op['key'])
+        self.external_ops_applied += 1
+    
+    def _reload_index(self):
+        """Recargar snapshot + journal tras un checkpoint de otro proceso"""
+        if self._journal_handle is not None:
+            self._journal_handle.close()
+            self._journal_handle = None
+        
+        with self._process_lock.shared():
+            self._index = OrderedDict()
+            self._expiry.clear()
+            self._dirty_access.clear()
+            self.current_size_bytes = 0
+            self._load_index(consolidate=False)
+        self.index_reloads += 1
+    
+    def _sync(self):
+        """
+        Incorporar las mutaciones de otros procesos (solo modo multiproceso)
+        
+        Camino común sin lock: leer la cola del journal desde la última posición
+        y aplicar solo líneas completas. Si el snapshot cambió (checkpoint de
+        otro proceso), recargar todo bajo lock compartido.
+        """
+        if self._process_lock is None:
+            return
+        
+        if self._stat_snapshot() != self._snapshot_stamp:
+            self._reload_index()
+            return
+        
+        try:
+            with open(self.journal_file, 'rb') as f:
+                f.seek(self._journal_position)
+                tail = f.read()
+        except FileNotFoundError:
+            return
+        
+        complete = tail[:tail.rfind(b'\n') + 1]
+        if not complete:
+            return
+        
+        # Un checkpoint concurrente invalida lo leído: recargar en vez de aplicar
+        if self._stat_snapshot() != self._snapshot_stamp:
+            self._reload_index()
+            return
+        
+        for line in complete.splitlines():
+            try:
+                self._apply_external_op(json.loads(line))
+            except (ValueError, KeyError) as e:
+                self.logger.warning(f"Operación de journal ilegible: {e}")
+        self._journal_position += len(complete)
+    
+    def _journal(self, op: Dict[str, Any]):
+        """Añadir una mutación al journal (O(1), sin reescribir el índice)"""
+        line = (json.dumps(op, ensure_ascii=False, separators=(',', ':')) + '\n').encode('utf-8')
+        if self._journal_buffer is not None:
+            self._journal_buffer.append(line)
+            return
+        self._write_journal([line])
+    
+    def _write_journal(self, lines: List[bytes]):
+        """Escribir líneas de journal con un solo write + flush"""
+        try:
+            if self._journal_handle is None:
+                self._journal_handle = open(self.journal_file, 'ab')
+            # Descartar una línea cortada por una caída antes de seguir añadiendo
+            if os.fstat(self._journal_handle.fileno()).st_size > self._journal_position:
+                self._journal_handle.truncate(self._journal_position)
+            self._journal_handle.write(b''.join(lines))
+            self._journal_handle.flush()
+            self._journal_ops += len(lines)
+            # Nuestras propias líneas ya están aplicadas en memoria
+            self._journal_position = self._journal_handle.tell()
+        except Exception as e:
+            self.logger.error(f"Error escribiendo journal de índice: {e}")
+    
+    @contextmanager
+    def _batched_journal(self) -> Iterator[None]:
+        """
+        Acumular las mutaciones del journal y escribirlas al salir en un solo write
+        
+        Debe usarse con los locks de escritura tomados: las líneas se publican
+        a otros procesos antes de soltar el lock exclusivo.
+        """
+        if self._journal_buffer is not None:
+            yield
+            return
+        
+        self._journal_buffer = []
+        try:
+            yield
+        finally:
+            lines, self._journal_buffer = self._journal_buffer, None
+            if lines:
+                self._write_journal(lines)
+    
+    def _flush_access_updates(self):
+        """Registrar en el journal los accesos acumulados desde el último volcado"""
+        for key in self._dirty_access:
+            entry = self._index.get(key)
+            if entry is not None:
+                self._journal({
+                    'op': 'touch',
+                    'key': key,
+                    'last_accessed': entry.last_accessed.isoformat(),
+                    'access_count': entry.access_count
+                })
+        self._dirty_access.clear()
+    
+    def _maybe_checkpoint(self, threshold: int) -> bool:
+        """Compactar snapshot + journal si el journal supera el umbral"""
+        if self._journal_ops >= threshold:
+            self._save_index()
+            return True
+        return False
     
     def _save_index(self):
-        """Guardar índice a disco"""
+        """Guardar snapshot completo del índice y truncar el journal"""
         try:
             index_data = {
                 'metadata': {
@@ -200,16 +531,39 @@ class DiskCache:
             # Escribir de forma atómica
             temp_file = self.index_file.with_suffix('.tmp')
             with open(temp_file, 'w', encoding='utf-8') as f:
-                json.dump(index_data, f, indent=2, ensure_ascii=False)
+                json.dump(index_data, f, ensure_ascii=False, separators=(',', ':'))
             
             temp_file.replace(self.index_file)
             
+            # El snapshot ya contiene todo lo registrado en el journal
+            if self._journal_handle is not None:
+                self._journal_handle.close()
+                self._journal_handle = None
+            if self.journal_file.exists():
+                self.journal_file.unlink()
+            if self._journal_buffer is not None:
+                self._journal_buffer.clear()
+            self._journal_ops = 0
+            self._journal_position = 0
+            self._snapshot_stamp = self._stat_snapshot()
+            self._dirty_access.clear()
+            self.checkpoints += 1
+        
         except Exception as e:
             self.logger.error(f"Error guardando índice: {e}")
     
-    def _calculate_checksum(self, data: bytes) -> str:
-        """Calcular checksum MD5 de los datos"""
-        return hashlib.md5(data).hexdigest()
+    def _calculate_checksum(self, *chunks: Any) -> str:
+        """Calcular checksum CRC32 de uno o varios fragmentos (bytes o memoryview, sin copiar)"""
+        crc = 0
+        for chunk in chunks:
+            crc = zlib.crc32(chunk, crc)
+        return f"{CHECKSUM_PREFIX}{crc:08x}"
+    
+    def _verify_checksum(self, data: Any, expected: str) -> bool:
+        """Verificar checksum (CRC32 o MD5 de entradas creadas por versiones anteriores)"""
+        if expected.startswith(CHECKSUM_PREFIX):
+            return self._calculate_checksum(data) == expected
+        return hashlib.md5(data).hexdigest() == expected
     
     def _generate_file_path(self, key: str, compressed: bool = False) -> str:
         """Generar ruta de archivo para la clave"""
@@ -229,38 +583,242 @@ class DiskCache:
         
         return f"{subdir}/{filename}"
     
-    def _compress_data(self, data: bytes) -> Tuple[bytes, bool]:
+    def _load_dictionaries(self):
+        """Cargar diccionarios entrenados; el más reciente es el activo para zdict"""
+        if not self.dictionary_dir.exists():
+            return
+        
+        dictionary_files = sorted(self.dictionary_dir.glob("*.zdict"), key=lambda p: p.stat().st_mtime)
+        for dictionary_file in dictionary_files:
+            try:
+                codec = create_codec(DICTIONARY_CODEC, dictionary_file.read_bytes())
+                self._codecs[codec.name] = codec
+                if self.compression_codec == DICTIONARY_CODEC:
+                    self._active_codec = codec
+            except Exception as e:
+                self.logger.warning(f"Diccionario inválido {dictionary_file.name}: {e}")
+    
+    def _codec_for(self, name: str) -> CompressionCodec:
+        """Obtener códec por nombre (ValueError si falta su diccionario)"""
+        codec = self._codecs.get(name)
+        if codec is None:
+            if name.startswith(f"{DICTIONARY_CODEC}-"):
+                # Diccionario entrenado por otro proceso
+                dictionary_file = self.dictionary_dir / f"{name.split('-', 1)[1]}.zdict"
+                codec = create_codec(DICTIONARY_CODEC, dictionary_file.read_bytes())
+            else:
+                codec = create_codec(name)
+            self._codecs[name] = codec
+        return codec
+    
+    def _current_codec(self) -> CompressionCodec:
+        """Códec para nuevas entradas ("zdict" usa zlib hasta tener diccionario)"""
+        if self._active_codec is None:
+            if self.compression_codec == DICTIONARY_CODEC:
+                return self._codec_for(DICTIONARY_FALLBACK_CODEC)
+            self._active_codec = self._codec_for(self.compression_codec)
+        return self._active_codec
+    
+    def train_compression_dictionary(self, samples: Optional[List[bytes]] = None) -> Optional[str]:
+        """
+        Entrenar y activar un diccionario de compresión
+        
+        Args:
+            samples: Payloads representativos (por defecto, las muestras recogidas en put)
+        
+        Returns:
+            Optional[str]: Nombre del códec activado o None si no hubo contenido común
+        """
+        with self._lock:
+            samples = samples if samples is not None else self._dictionary_samples
+            dictionary = train_dictionary(samples)
+            self._dictionary_samples = []
+            if not dictionary:
+                return None
+            
+            codec = create_codec(DICTIONARY_CODEC, dictionary)
+            self.dictionary_dir.mkdir(parents=True, exist_ok=True)
+            dictionary_file = self.dictionary_dir / f"{codec.dictionary_id}.zdict"
+            temp_path = dictionary_file.with_suffix('.tmp')
+            temp_path.write_bytes(codec.dictionary)
+            os.replace(temp_path, dictionary_file)
+            
+            self._codecs[codec.name] = codec
+            self._active_codec = codec
+            self.logger.info(f"Diccionario de compresión entrenado: {codec.name} ({len(codec.dictionary)} bytes)")
+            return codec.name
+    
+    def _collect_dictionary_sample(self, data: bytes):
+        """Recoger muestras para entrenar el diccionario de zdict"""
+        if (self.compression_codec != DICTIONARY_CODEC or self._active_codec is not None
+                or self.dictionary_samples <= 0):
+            return
+        self._dictionary_samples.append(data[:DICTIONARY_SAMPLE_BYTES])
+        if len(self._dictionary_samples) >= self.dictionary_samples:
+            if self.train_compression_dictionary() is None:
+                self.logger.info("Muestras sin contenido común, se mantiene zlib sin diccionario")
+                self.dictionary_samples = 0
+    
+    def _compress_data(self, data: bytes) -> Tuple[bytes, str]:
         """
-        Comprimir datos si superan el umbral
+        Comprimir datos con el códec activo si superan el umbral
         
         Returns:
-            Tuple[bytes, bool]: (datos_finales, fue_comprimido)
+            Tuple[bytes, str]: (datos_finales, códec usado o "none")
         """
+        if not self.compress:
+            return data, "none"
+        
+        self._collect_dictionary_sample(data)
+        
         if len(data) >= self.compression_threshold:
             try:
-                compressed = gzip.compress(data)
+                codec = self._current_codec()
+                if codec.name == "none":
+                    return data, "none"
+                compressed = codec.compress(data)
                 if len(compressed) < len(data) * 0.9:  # Solo si reduce al menos 10%
                     self.compressions += 1
-                    return compressed, True
+                    self.bytes_before_compression += len(data)
+                    self.bytes_after_compression += len(compressed)
+                    return compressed, codec.name
             except Exception as e:
                 self.logger.warning(f"Error comprimiendo datos: {e}")
         
-        return data, False
+        return data, "none"
+    
+    def _decompress_data(self, data: Any, codec_name: str) -> bytes:
+        """Descomprimir datos con el códec registrado en la entrada"""
+        if codec_name == "none":
+            return bytes(data)
+        try:
+            return self._codec_for(codec_name).decompress(data)
+        except Exception as e:
+            self.logger.error(f"Error descomprimiendo datos ({codec_name}): {e}")
+            raise
+    
+    def _serialize(self, value: Any) -> Tuple[List[Any], str, str]:
+        """
+        Serializar valor para disco
+        
+        Los objetos que admiten buffers fuera de banda (protocolo 5) se escriben
+        en un formato enmarcado para poder reconstruirlos desde el mapeo sin copiar.
+        
+        Returns:
+            Tuple[List, str, str]: (fragmentos a escribir, códec, formato)
+        """
+        buffers = []
+        try:
+            data = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+            raw_buffers = [buffer.raw() for buffer in buffers]
+        except BufferError:
+            # Buffers no contiguos: serializar todo en banda
+            data = pickle.dumps(value, protocol=5)
+            raw_buffers = []
+        
+        if not raw_buffers:
+            final_data, codec_name = self._compress_data(data)
+            return [final_data], codec_name, PAYLOAD_PICKLE
+        
+        header = OOB_HEADER.pack(OOB_MAGIC, len(raw_buffers), len(data))
+        header += b"".join(OOB_LENGTH.pack(raw.nbytes) for raw in raw_buffers)
+        chunks = [header, data]
+        offset = len(header) + len(data)
+        for raw in raw_buffers:
+            padding = -offset % OOB_ALIGNMENT
+            if padding:
+                chunks.append(b"\0" * padding)
+                offset += padding
+            chunks.append(raw)
+            offset += raw.nbytes
+        
+        return chunks, "none", PAYLOAD_OUT_OF_BAND
+    
+    def _loads_out_of_band(self, view: memoryview) -> Any:
+        """Deserializar formato fuera de banda; los buffers son vistas sobre `view`"""
+        magic, buffer_count, stream_length = OOB_HEADER.unpack_from(view, 0)
+        if magic != OOB_MAGIC:
+            raise ValueError("Cabecera de payload fuera de banda inválida")
+        
+        offset = OOB_HEADER.size
+        lengths = [
+            OOB_LENGTH.unpack_from(view, offset + i * OOB_LENGTH.size)[0]
+            for i in range(buffer_count)
+        ]
+        offset += buffer_count * OOB_LENGTH.size
+        
+        stream = view[offset:offset + stream_length]
+        offset += stream_length
+        
+        buffers = []
+        for length in lengths:
+            offset += -offset % OOB_ALIGNMENT
+            buffers.append(view[offset:offset + length])
+            offset += length
+        
+        return pickle.loads(stream, buffers=buffers)
+    
+    def _deserialize(self, view: memoryview, entry: DiskCacheEntry) -> Any:
+        """Reconstruir valor desde el contenido verificado del archivo"""
+        if entry.payload_format == PAYLOAD_OUT_OF_BAND:
+            return self._loads_out_of_band(view)
+        
+        if entry.codec != "none":
+            data = self._codec_for(entry.codec).decompress_stream(view)
+            self.bytes_copied += len(data)
+            return pickle.loads(data)
+        
+        return pickle.loads(view)
+    
+    def _read_value(self, file_path: Path, entry: DiskCacheEntry) -> Any:
+        """
+        Leer, verificar y deserializar el archivo de una entrada
+        
+        Archivos grandes se mapean en memoria: el checksum y pickle trabajan sobre
+        un memoryview del mapeo y solo se copia la salida de la descompresión.
+        """
+        file_size = file_path.stat().st_size
+        self.bytes_read += file_size
+        
+        if file_size > 0 and file_size >= self.mmap_threshold:
+            return self._read_value_mmap(file_path, entry)
+        
+        with open(file_path, 'rb') as f:
+            data = f.read()
+        self.buffered_reads += 1
+        self.bytes_copied += len(data)
+        
+        if not self._verify_checksum(data, entry.checksum):
+            raise _ChecksumMismatch(entry.key)
+        return self._deserialize(memoryview(data), entry)
     
-    def _decompress_data(self, data: bytes, compressed: bool) -> bytes:
-        """Descomprimir datos si es necesario"""
-        if compressed:
+    def _read_value_mmap(self, file_path: Path, entry: DiskCacheEntry) -> Any:
+        """Lectura sin copia vía mmap"""
+        with open(file_path, 'rb') as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.mmap_reads += 1
+        view = memoryview(mapping)
+        
+        try:
+            if not self._verify_checksum(view, entry.checksum):
+                raise _ChecksumMismatch(entry.key)
+            return self._deserialize(view, entry)
+        finally:
+            # Con buffers fuera de banda el valor puede seguir referenciando el mapeo:
+            # en ese caso se libera cuando el valor deja de usarse
             try:
-                return gzip.decompress(data)
-            except Exception as e:
-                self.logger.error(f"Error descomprimiendo datos: {e}")
-                raise
-        return data
+                view.release()
+                mapping.close()
+            except BufferError:
+                pass
     
     def _make_room(self, required_bytes: int) -> bool:
         """Hacer espacio expulsando entradas antiguas"""
-        # Primero: limpiar expiradas
-        expired_count = self._cleanup_expired()
+        if self.current_size_bytes + required_bytes <= self.max_size_bytes:
+            return True
+        
+        # Primero: retirar solo las expiradas ya vencidas (heap, sin recorrer el índice)
+        self._remove_expired()
         
         if self.current_size_bytes + required_bytes <= self.max_size_bytes:
             return True
@@ -269,22 +827,16 @@ class DiskCache:
         if len(self._index) == 0:
             return required_bytes <= self.max_size_bytes
         
-        # Ordenar por última fecha de acceso (más antiguos primero)
-        entries_by_age = sorted(
-            self._index.items(),
-            key=lambda x: x[1].last_accessed
-        )
-        
+        # El índice está en orden de acceso: el primero es el menos reciente
         removed_count = 0
-        for key, entry in entries_by_age:
-            if self.current_size_bytes + required_bytes <= self.max_size_bytes:
-                break
-            
+        while self._index and self.current_size_bytes + required_bytes > self.max_size_bytes:
+            key = next(iter(self._index))
             try:
                 self._remove_entry(key)
                 removed_count += 1
             except Exception as e:
                 self.logger.warning(f"Error removiendo entrada {key}: {e}")
+                break
         
         if removed_count > 0:
             self.logger.debug(f"Removidas {removed_count} entradas para hacer espacio")
@@ -307,76 +859,143 @@ class DiskCache:
             # Actualizar estado
             self.current_size_bytes -= entry.size_bytes
             del self._index[key]
+            self._expiry.cancel(key)
+            self._dirty_access.discard(key)
+            self._journal({'op': 'del', 'key': key})
             self.deletes += 1
     
+    def _discard(self, key: str, entry: DiskCacheEntry):
+        """Remover una entrada inválida desde el camino de lectura"""
+        with self._exclusive():
+            self._sync()
+            # Otro proceso pudo reemplazarla mientras se leía sin lock
+            if self._index.get(key) is entry:
+                self._remove_entry(key)
+    
+    def _read_entry(self, key: str) -> Optional[Any]:
+        """Leer una clave actualizando estadísticas (requiere tener el lock)"""
+        if key not in self._index:
+            self.misses += 1
+            return None
+        
+        entry = self._index[key]
+        
+        # Verificar expiración
+        if entry.is_expired():
+            self._discard(key, entry)
+            self.misses += 1
+            return None
+        
+        try:
+            # Leer archivo
+            file_path = self.cache_dir / entry.file_path
+            if not file_path.exists():
+                self.logger.warning(f"Archivo de cache faltante: {entry.file_path}")
+                self._discard(key, entry)
+                self.misses += 1
+                return None
+            
+            # Leer, verificar integridad y deserializar
+            try:
+                value = self._read_value(file_path, entry)
+            except _ChecksumMismatch:
+                self.logger.warning(f"Checksum inválido para {key}, removiendo")
+                self._discard(key, entry)
+                self.misses += 1
+                return None
+            
+            # Actualizar estadísticas de acceso
+            entry.last_accessed = datetime.now()
+            entry.access_count += 1
+            self._index.move_to_end(key)
+            
+            self.hits += 1
+            self._dirty_access.add(key)
+            return value
+        
+        except Exception as e:
+            self.logger.error(f"Error leyendo cache {key}: {e}")
+            self._discard(key, entry)
+            self.misses += 1
+            return None
+    
     def get(self, key: str) -> Optional[Any]:
         """
         Obtener valor del cache en disco
         
         Args:
             key: Clave de búsqueda
-            
+        
         Returns:
             Optional[Any]: Valor si existe y no ha expirado
         """
         with self._lock:
-            if key not in self._index:
-                self.misses += 1
-                return None
+            self._sync()
+            value = self._read_entry(key)
             
-            entry = self._index[key]
+            # Volcar accesos al journal en lotes (solo claves modificadas)
+            if value is not None and self.hits % 10 == 0:  # Cada 10 hits
+                with self._exclusive():
+                    self._sync()
+                    self._flush_access_updates()
             
-            # Verificar expiración
-            if entry.is_expired():
-                self._remove_entry(key)
-                self.misses += 1
-                return None
+            return value
+    
+    def get_with_state(self, key: str) -> Tuple[Optional[Any], bool]:
+        """
+        Obtener valor indicando si ya pasó su TTL blando
+        
+        Args:
+            key: Clave de búsqueda
+        
+        Returns:
+            Tuple[Optional[Any], bool]: (valor o None, True si debe regenerarse en background)
+        """
+        with self._lock:
+            value = self.get(key)
+            if value is None:
+                return None, False
+            entry = self._index.get(key)
+            stale = entry is not None and entry.is_stale()
+            if stale:
+                self.stale_hits += 1
+            return value, stale
+    
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Obtener varias claves con una sola toma del lock
+        
+        Las lecturas se hacen en orden de ruta de archivo (localidad en disco)
+        y los accesos se vuelcan al journal una sola vez al final del lote.
+        
+        Args:
+            keys: Claves de búsqueda
+        
+        Returns:
+            Dict[str, Any]: Solo los aciertos; las claves ausentes son misses
+        """
+        found: Dict[str, Any] = {}
+        with self._lock:
+            self._sync()
+            ordered = sorted(
+                dict.fromkeys(keys),
+                key=lambda k: self._index[k].file_path if k in self._index else ""
+            )
+            for key in ordered:
+                value = self._read_entry(key)
+                if value is not None:
+                    found[key] = value
             
-            try:
-                # Leer archivo
-                file_path = self.cache_dir / entry.file_path
-                if not file_path.exists():
-                    self.logger.warning(f"Archivo de cache faltante: {entry.file_path}")
-                    self._remove_entry(key)
-                    self.misses += 1
-                    return None
-                
-                with open(file_path, 'rb') as f:
-                    data = f.read()
-                
-                # Verificar integridad
-                current_checksum = self._calculate_checksum(data)
-                if current_checksum != entry.checksum:
-                    self.logger.warning(f"Checksum inválido para {key}, removiendo")
-                    self._remove_entry(key)
-                    self.misses += 1
-                    return None
-                
-                # Descomprimir si es necesario
-                data = self._decompress_data(data, entry.compressed)
-                
-                # Deserializar
-                value = pickle.loads(data)
-                
-                # Actualizar estadísticas de acceso
-                entry.last_accessed = datetime.now()
-                entry.access_count += 1
-                
-                self.hits += 1
-                
-                # Guardar índice actualizado (de forma asíncrona en producción)
-                if self.hits % 10 == 0:  # Cada 10 hits
-                    self._save_index()
-                
-                return value
-                
-            except Exception as e:
-                self.logger.error(f"Error leyendo cache {key}: {e}")
-                self._remove_entry(key)
-                self.misses += 1
-                return None
+            if found:
+                with self._exclusive(), self._batched_journal():
+                    self._sync()
+                    self._flush_access_updates()
+            self.batch_gets += 1
+        
+        return found
     
-    def put(self, key: str, value: Any, ttl_hours: Optional[int] = None) -> bool:
+    def put(self, key: str, value: Any, ttl_hours: Optional[int] = None,
+            tags: Optional[Iterable[str]] = None, soft_ttl_hours: Optional[float] = None) -> bool:
         """
         Almacenar valor en cache de disco
         
@@ -384,100 +1003,197 @@ class DiskCache:
             key: Clave única
             value: Valor a almacenar
             ttl_hours: TTL personalizado en horas
-            
+            tags: Etiquetas de invalidación (se persisten con la entrada)
+            soft_ttl_hours: TTL blando; pasado este plazo get_with_state marca el
+                valor como vencido pero lo sigue sirviendo hasta ttl_hours
+        
         Returns:
             bool: True si se almacenó exitosamente
         """
-        with self._lock:
-            try:
-                # Serializar datos
-                data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
-                
-                # Comprimir si es necesario
-                final_data, compressed = self._compress_data(data)
-                
-                # Verificar tamaño
-                if len(final_data) > self.max_size_bytes * 0.1:  # Max 10% del cache
-                    self.logger.warning(f"Objeto demasiado grande para cache: {len(final_data)/1024/1024:.1f}MB")
-                    return False
-                
-                # Hacer espacio si es necesario
-                if not self._make_room(len(final_data)):
-                    self.logger.warning("No se pudo hacer espacio en cache de disco")
-                    return False
-                
-                # Generar ruta y checksum
-                file_path_str = self._generate_file_path(key, compressed)
-                file_path = self.cache_dir / file_path_str
-                checksum = self._calculate_checksum(final_data)
-                
-                # Crear directorio si no existe
-                file_path.parent.mkdir(parents=True, exist_ok=True)
-                
-                # Escribir archivo
-                with open(file_path, 'wb') as f:
-                    f.write(final_data)
-                
-                # Calcular TTL
-                ttl = timedelta(hours=ttl_hours) if ttl_hours else self.default_ttl
-                expires_at = datetime.now() + ttl if ttl.total_seconds() > 0 else None
-                
-                # Crear entrada
-                entry = DiskCacheEntry(
-                    key=key,
-                    created_at=datetime.now(),
-                    last_accessed=datetime.now(),
-                    expires_at=expires_at,
-                    file_path=file_path_str,
-                    size_bytes=len(final_data),
-                    compressed=compressed,
-                    access_count=0,
-                    checksum=checksum
-                )
-                
-                # Remover entrada anterior si existe
-                if key in self._index:
-                    self._remove_entry(key)
-                
-                # Agregar nueva entrada
-                self._index[key] = entry
-                self.current_size_bytes += len(final_data)
-                self.writes += 1
-                
-                # Guardar índice
-                self._save_index()
-                
-                self.logger.debug(f"Almacenado en cache: {key} ({len(final_data)/1024:.1f}KB, comprimido: {compressed})")
-                return True
-                
-            except Exception as e:
-                self.logger.error(f"Error almacenando en cache {key}: {e}")
+        with self._lock, self._exclusive():
+            self._sync()
+            stored = self._store(key, value, ttl_hours, tags, soft_ttl_hours)
+            if stored:
+                # El snapshot se compacta en background
+                self._maybe_checkpoint(self.journal_checkpoint_ops * 4)
+            return stored
+    
+    def put_many(self, items: Dict[str, Any], ttl_hours: Optional[int] = None,
+                 tags: Optional[Dict[str, Iterable[str]]] = None,
+                 soft_ttl_hours: Optional[float] = None) -> Dict[str, bool]:
+        """
+        Almacenar varios valores con una sola toma del lock
+        
+        Las mutaciones del índice se acumulan y se escriben en el journal
+        con un solo write al final del lote.
+        
+        Args:
+            items: Claves y valores a almacenar
+            ttl_hours: TTL común en horas
+            tags: Etiquetas de invalidación por clave
+            soft_ttl_hours: TTL blando común en horas
+        
+        Returns:
+            Dict[str, bool]: Resultado de almacenamiento por clave
+        """
+        tags = tags or {}
+        with self._lock, self._exclusive():
+            self._sync()
+            with self._batched_journal():
+                results = {
+                    key: self._store(key, value, ttl_hours, tags.get(key), soft_ttl_hours)
+                    for key, value in items.items()
+                }
+            if any(results.values()):
+                self._maybe_checkpoint(self.journal_checkpoint_ops * 4)
+            self.batch_puts += 1
+            return results
+    
+    def _store(self, key: str, value: Any, ttl_hours: Optional[int],
+               tags: Optional[Iterable[str]] = None, soft_ttl_hours: Optional[float] = None) -> bool:
+        """Serializar y escribir una entrada (requiere tener los locks de escritura)"""
+        try:
+            # Serializar (y comprimir si es necesario)
+            chunks, codec_name, payload_format = self._serialize(value)
+            compressed = codec_name != "none"
+            payload_size = sum(memoryview(chunk).nbytes for chunk in chunks)
+            
+            # Verificar tamaño
+            if payload_size > self.max_size_bytes * 0.1:  # Max 10% del cache
+                self.logger.warning(f"Objeto demasiado grande para cache: {payload_size/1024/1024:.1f}MB")
                 return False
+            
+            # Hacer espacio si es necesario
+            if not self._make_room(payload_size):
+                self.logger.warning("No se pudo hacer espacio en cache de disco")
+                return False
+            
+            # Remover entrada anterior antes de escribir: puede compartir ruta de archivo
+            if key in self._index:
+                self._remove_entry(key)
+            
+            # Generar ruta y checksum
+            file_path_str = self._generate_file_path(key, compressed)
+            file_path = self.cache_dir / file_path_str
+            checksum = self._calculate_checksum(*chunks)
+            
+            # Crear directorio si no existe
+            file_path.parent.mkdir(parents=True, exist_ok=True)
+            
+            # Escribir archivo nuevo y reemplazar: nunca truncar un archivo que pueda estar mapeado
+            temp_path = file_path.with_name(f"{file_path.name}.{os.getpid()}.tmp")
+            with open(temp_path, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+            os.replace(temp_path, file_path)
+            
+            # Calcular TTL
+            ttl = timedelta(hours=ttl_hours) if ttl_hours else self.default_ttl
+            expires_at = datetime.now() + ttl if ttl.total_seconds() > 0 else None
+            soft_expires_at = datetime.now() + timedelta(hours=soft_ttl_hours) if soft_ttl_hours else None
+            if soft_expires_at and expires_at and soft_expires_at >= expires_at:
+                soft_expires_at = None
+            
+            # Crear entrada
+            entry = DiskCacheEntry(
+                key=key,
+                created_at=datetime.now(),
+                last_accessed=datetime.now(),
+                expires_at=expires_at,
+                file_path=file_path_str,
+                size_bytes=payload_size,
+                compressed=compressed,
+                access_count=0,
+                checksum=checksum,
+                payload_format=payload_format,
+                codec=codec_name,
+                tags=sorted(set(tags or ())),
+                soft_expires_at=soft_expires_at
+            )
+            
+            # Agregar nueva entrada
+            self._index[key] = entry
+            self._expiry.schedule(key, expires_at)
+            self.current_size_bytes += payload_size
+            self.writes += 1
+            
+            # Registrar en el journal
+            self._journal({'op': 'put', 'entry': entry.to_dict()})
+            
+            self.logger.debug(f"Almacenado en cache: {key} ({payload_size/1024:.1f}KB, códec: {codec_name})")
+            return True
+        
+        except Exception as e:
+            self.logger.error(f"Error almacenando en cache {key}: {e}")
+            return False
     
     def delete(self, key: str) -> bool:
         """Eliminar entrada del cache"""
-        with self._lock:
+        with self._lock, self._exclusive():
+            self._sync()
             if key in self._index:
                 self._remove_entry(key)
-                self._save_index()
                 return True
             return False
     
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """
+        Eliminar las entradas que tengan alguna de las etiquetas
+        
+        Args:
+            tags: Etiquetas invalidadas
+        
+        Returns:
+            int: Número de entradas eliminadas
+        """
+        tags = set(tags)
+        with self._lock, self._exclusive():
+            self._sync()
+            stale = [key for key, entry in self._index.items() if tags.intersection(entry.tags)]
+            with self._batched_journal():
+                for key in stale:
+                    self._remove_entry(key)
+            return len(stale)
+    
+    def _remove_expired(self, limit: Optional[int] = None) -> int:
+        """Remover entradas vencidas según el heap de expiraciones (sin guardar índice)"""
+        removed = 0
+        for key in self._expiry.pop_due(limit=limit):
+            if key in self._index:
+                self._remove_entry(key)
+                removed += 1
+        return removed
+    
     def _cleanup_expired(self) -> int:
         """Limpiar entradas expiradas"""
-        expired_keys = []
-        for key, entry in self._index.items():
-            if entry.is_expired():
-                expired_keys.append(key)
+        removed = self._remove_expired()
         
-        for key in expired_keys:
-            self._remove_entry(key)
+        if removed:
+            self.logger.debug(f"Limpiadas {removed} entradas expiradas")
         
-        if expired_keys:
-            self._save_index()
-            self.logger.debug(f"Limpiadas {len(expired_keys)} entradas expiradas")
+        return removed
+    
+    def sweep_expired(self, max_items: int) -> int:
+        """
+        Retirar como máximo `max_items` entradas vencidas (usado por ExpirySweeper)
         
-        return len(expired_keys)
+        También compacta snapshot + journal cuando el journal supera el umbral,
+        manteniendo esa escritura O(entradas) fuera del camino de la petición.
+        
+        Returns:
+            int: Número de entradas removidas
+        """
+        with self._lock, self._exclusive():
+            self._sync()
+            removed = self._remove_expired(limit=max_items)
+            self._maybe_checkpoint(self.journal_checkpoint_ops)
+            return removed
+    
+    def checkpoint(self):
+        """Volcar accesos pendientes y escribir snapshot completo (p.ej. al cerrar)"""
+        with self._lock, self._exclusive():
+            self._sync()
+            self._save_index()
     
     def cleanup(self) -> Dict[str, int]:
         """
@@ -486,29 +1202,28 @@ class DiskCache:
         Returns:
             Dict con estadísticas de limpieza
         """
-        with self._lock:
+        with self._lock, self._exclusive():
+            self._sync()
             expired_count = self._cleanup_expired()
             
             # Verificar archivos huérfanos
             orphaned_count = 0
+            indexed_paths = {self.cache_dir / entry.file_path for entry in self._index.values()}
             for cache_subdir in ['responses', 'indices', 'temp']:
                 subdir_path = self.cache_dir / cache_subdir
                 if subdir_path.exists():
                     for file_path in subdir_path.glob('*'):
                         # Buscar si el archivo está en el índice
-                        found = False
-                        for entry in self._index.values():
-                            if self.cache_dir / entry.file_path == file_path:
-                                found = True
-                                break
-                        
-                        if not found:
+                        if file_path not in indexed_paths:
                             try:
                                 file_path.unlink()
                                 orphaned_count += 1
                             except Exception as e:
                                 self.logger.warning(f"Error removiendo archivo huérfano {file_path}: {e}")
             
+            # Consolidar el journal en un snapshot (tarea de mantenimiento en background)
+            self._maybe_checkpoint(1)
+            
             return {
                 'expired_removed': expired_count,
                 'orphaned_removed': orphaned_count,
@@ -529,6 +1244,7 @@ class DiskCache:
                     "hits": self.hits,
                     "misses": self.misses,
                     "hit_ratio": round(hit_ratio, 3),
+                    "stale_hits": self.stale_hits,
                     "writes": self.writes,
                     "deletes": self.deletes,
                     "compressions": self.compressions
@@ -542,20 +1258,82 @@ class DiskCache:
                 },
                 "config": {
                     "default_ttl_hours": self.default_ttl.total_seconds() / 3600,
+                    "compress": self.compress,
                     "compression_threshold_kb": self.compression_threshold / 1024,
+                    "compression_codec": self.compression_codec,
                     "auto_cleanup": self.auto_cleanup
                 },
+                "compression": {
+                    "active_codec": self._current_codec().name,
+                    "entries_by_codec": dict(Counter(entry.codec for entry in self._index.values())),
+                    "bytes_before": self.bytes_before_compression,
+                    "bytes_after": self.bytes_after_compression,
+                    "ratio": round(self.bytes_after_compression / self.bytes_before_compression, 3)
+                             if self.bytes_before_compression else 1.0,
+                    "pending_dictionary_samples": len(self._dictionary_samples)
+                },
+                "io": {
+                    "mmap_reads": self.mmap_reads,
+                    "buffered_reads": self.buffered_reads,
+                    "bytes_read": self.bytes_read,
+                    "bytes_copied": self.bytes_copied,
+                    "bytes_copied_per_hit": round(self.bytes_copied / self.hits, 1) if self.hits else 0.0,
+                    "mmap_threshold_kb": self.mmap_threshold / 1024,
+                    "batch_gets": self.batch_gets,
+                    "batch_puts": self.batch_puts
+                },
+                "multiprocess": {
+                    "enabled": self._process_lock is not None,
+                    "external_ops_applied": self.external_ops_applied,
+                    "index_reloads": self.index_reloads,
+                    "lock_acquisitions": self._process_lock.acquisitions if self._process_lock else 0
+                },
+                "persistence": {
+                    "journal_ops": self._journal_ops,
+                    "pending_access_updates": len(self._dirty_access),
+                    "checkpoints": self.checkpoints,
+                    "journal_checkpoint_ops": self.journal_checkpoint_ops
+                },
                 "uptime_hours": round(uptime.total_seconds() / 3600, 2)
             }
     
+    def contains(self, key: str) -> bool:
+        """Verificar si una clave existe y no ha expirado (sin leer el archivo)"""
+        with self._lock:
+            self._sync()
+            entry = self._index.get(key)
+            return entry is not None and not entry.is_expired()
+    
+    def get_keys(self, pattern: Optional[str] = None) -> List[str]:
+        """
+        Obtener lista de claves en el cache
+        
+        Args:
+            pattern: Patrón opcional para filtrar claves
+        
+        Returns:
+            Lista de claves que coinciden
+        """
+        with self._lock:
+            self._sync()
+            keys = list(self._index.keys())
+            
+            if pattern:
+                import fnmatch
+                keys = [key for key in keys if fnmatch.fnmatch(key, pattern)]
+            
+            return keys
+    
     def clear(self):
         """Limpiar todo el cache"""
-        with self._lock:
+        with self._lock, self._exclusive():
+            self._sync()
             cleared_count = len(self._index)
             
             # Remover todos los archivos
             for key in list(self._index.keys()):
                 self._remove_entry(key)
+            self._expiry.clear()
             
             self._save_index()
             self.logger.info(f"Cache de disco limpiado - {cleared_count} entradas removidas")
@@ -568,7 +1346,7 @@ def create_disk_cache(cache_dir: str = "data/cache", max_size_gb: int = 2) -> Di
     Args:
         cache_dir: Directorio para cache
         max_size_gb: Tamaño máximo en GB
-        
+    
     Returns:
         DiskCache: Instancia configurada
     """
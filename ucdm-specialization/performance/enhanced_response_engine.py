@@ -7,9 +7,10 @@ Integra el sistema de cacheo multi-nivel con el ResponseEngine existente
 import sys
 import json
 import random
-import hashlib
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Optional, Set, Tuple, Any
 from datetime import datetime
 import logging
 
@@ -19,28 +20,63 @@ from config.settings import *
 from performance.memory_cache import MemoryCache
 from performance.disk_cache import DiskCache
 from performance.index_cache import IndexCache
+from performance.single_flight import SingleFlight
+from performance.query_keys import QueryKeyBuilder, parse_query
+from performance.invalidation import InvalidationBus, index_tag, lesson_tag
+from performance.compiled_index import CompiledIndex, load_compiled_index
+
+# TTL de respuestas por nivel; con stale-while-revalidate son TTL blandos
+MEMORY_TTL_HOURS = 1
+DISK_TTL_HOURS = 24
+# TTL duro = TTL blando * factor: respaldo si la regeneración en background falla
+STALE_GRACE_FACTOR = 2
 
 class EnhancedUCDMResponseEngine:
     """Motor de respuestas UCDM optimizado con cacheo multi-nivel"""
     
-    def __init__(self, use_cache: bool = True):
+    def __init__(self, use_cache: bool = True, cache_dir: str = "data/cache",
+                 key_schema: str = "semantic", indices_dir: Optional[str] = None,
+                 stale_while_revalidate: bool = False, use_compiled_index: bool = True):
         self.use_cache = use_cache
+        self.use_compiled_index = use_compiled_index
+        self.stale_while_revalidate = stale_while_revalidate
+        self.key_builder = QueryKeyBuilder(key_schema)
+        self.indices_dir = Path(indices_dir) if indices_dir else INDICES_DIR
         
         # Sistema de cache
         if self.use_cache:
             self.memory_cache = MemoryCache(max_size_mb=50, default_ttl_hours=1)
-            self.disk_cache = DiskCache(cache_dir="data/cache", max_size_gb=2)
-            self.index_cache = IndexCache(indices_dir=str(INDICES_DIR))
+            self.disk_cache = DiskCache(cache_dir=cache_dir, max_size_gb=2)
+            self.index_cache = IndexCache(indices_dir=str(self.indices_dir))
+            
+            # Invalidación por etiquetas cuando se reescribe un índice
+            self.invalidation_bus = InvalidationBus(
+                str(self.indices_dir), state_file=str(Path(cache_dir) / "index_versions.json")
+            )
+            self.invalidation_bus.subscribe(self._on_index_changed)
         
         # Estado del motor
         self.lessons_index = {}
         self.concept_index = {}
         self.date_mapper = {}
+        self.compiled_index: Optional[CompiledIndex] = None
         self.templates = self.load_response_templates()
         
+        # Coalescencia de generaciones concurrentes por clave
+        self.single_flight = SingleFlight()
+        
+        # Regeneración en background de respuestas vencidas en blando
+        self._refresh_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix="response-refresh")
+        self._refreshing: Dict[str, Future] = {}
+        self._refresh_lock = threading.Lock()
+        self._shut_down = False
+        
         # Métricas
         self.cache_hits = 0
         self.cache_misses = 0
+        self.stale_serves = 0
+        self.background_refreshes = 0
+        self.refresh_errors = 0
         self.response_times = []
         
         self.setup_logging()
@@ -98,6 +134,23 @@ class EnhancedUCDMResponseEngine:
     def load_data(self) -> bool:
         """Cargar datos usando cache L3"""
         try:
+            if self.use_cache:
+                self.invalidation_bus.check()
+            
+            # Índice compilado y mapeado en memoria: sin json.load ni dicts por proceso
+            if self.use_compiled_index:
+                compiled = load_compiled_index(self.indices_dir / "ucdm_comprehensive_index.json")
+                if compiled is not None:
+                    previous, self.compiled_index = self.compiled_index, compiled
+                    self.lessons_index = compiled.lesson_details
+                    self.concept_index = compiled.concept_index
+                    self.date_mapper = compiled.date_mapping
+                    # Recarga (check_index_changes): liberar el mapeo anterior ya sustituido
+                    if previous is not None and previous is not compiled:
+                        previous.close()
+                    self.logger.info(f"Datos cargados desde índice compilado: {len(self.lessons_index)} lecciones")
+                    return True
+            
             if self.use_cache:
                 data = self.index_cache.get_index('ucdm_comprehensive_index')
                 if data:
@@ -108,7 +161,7 @@ class EnhancedUCDMResponseEngine:
                     return True
             
             # Fallback tradicional
-            index_file = INDICES_DIR / "ucdm_comprehensive_index.json"
+            index_file = self.indices_dir / "ucdm_comprehensive_index.json"
             if index_file.exists():
                 with open(index_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
@@ -122,35 +175,99 @@ class EnhancedUCDMResponseEngine:
             self.logger.error(f"Error cargando datos: {e}")
             return False
     
+    def check_index_changes(self) -> Dict[str, Set[str]]:
+        """
+        Revisar los índices y purgar las respuestas derivadas de lo que cambió
+        
+        Returns:
+            Dict[str, Set[str]]: Etiquetas invalidadas por índice modificado
+        """
+        if not self.use_cache:
+            return {}
+        changes = self.invalidation_bus.check()
+        if 'ucdm_comprehensive_index' in changes:
+            self.load_data()
+        return changes
+    
+    def _on_index_changed(self, tags: Set[str], index_name: str) -> int:
+        """Purgar los niveles de cache afectados por un índice modificado"""
+        if index_name:
+            for name in {index_name} | self.invalidation_bus.dependents(index_name):
+                self.index_cache.invalidate_index(name)
+        purged = self.memory_cache.invalidate_tags(tags)
+        purged += self.disk_cache.invalidate_tags(tags)
+        purged += self.index_cache.invalidate_tags(tags)
+        self.logger.info(f"Índice {index_name} modificado: {purged} respuestas invalidadas")
+        return purged
+    
+    def response_tags(self, result: Dict[str, Any]) -> List[str]:
+        """
+        Etiquetas de invalidación de una respuesta generada
+        
+        Una respuesta depende de la lección usada (lesson_number, también la
+        elegida al azar para consultas por concepto o generales) y, según el
+        tipo, del mapeo de fechas o del índice de conceptos. Sin lección en el
+        índice depende del índice completo.
+        """
+        lesson_num = result.get('lesson_number')
+        if lesson_num is None or str(lesson_num) not in self.lessons_index:
+            return [index_tag('ucdm_comprehensive_index')]
+        
+        tags = [lesson_tag(lesson_num)]
+        if result.get('query_type') == "daily_lesson":
+            tags.append(index_tag('ucdm_comprehensive_index', 'date_mapping'))
+        elif result.get('query_type') == "concept_based":
+            tags.append(index_tag('ucdm_comprehensive_index', 'concept_index'))
+        return tags
+    
     def process_query(self, query: str) -> Dict[str, Any]:
         """Procesar consulta con cache optimizado"""
         start_time = datetime.now()
         
         # Generar clave de cache
-        cache_key = f"response_{hashlib.md5(query.encode()).hexdigest()[:16]}"
+        cache_key = self.cache_key_for(query)
         
         # Verificar cache L1
         if self.use_cache:
-            cached = self.memory_cache.get(cache_key)
+            cached, stale = self.memory_cache.get_with_state(cache_key)
             if cached:
                 self.cache_hits += 1
-                cached['cache_hit'] = True
-                return cached
+                if stale:
+                    self._refresh_in_background(query, cache_key)
+                return dict(cached, query=query, cache_hit=True)
             
             # Verificar cache L2
-            cached = self.disk_cache.get(cache_key)
+            cached, stale = self.disk_cache.get_with_state(cache_key)
             if cached:
                 self.cache_hits += 1
-                self.memory_cache.put(cache_key, cached, ttl_hours=1)
-                cached['cache_hit'] = True
-                return cached
+                self.memory_cache.put(cache_key, cached, tags=self.response_tags(cached),
+                                      **self.ttl_args(MEMORY_TTL_HOURS))
+                if stale:
+                    self._refresh_in_background(query, cache_key)
+                return dict(cached, query=query, cache_hit=True)
         
-        # Generar nueva respuesta
+        # Generar nueva respuesta (una sola generación por clave en vuelo)
         self.cache_misses += 1
-        query_type, lesson_num = self._analyze_query(query)
-        response = self.generate_structured_response(query, query_type, lesson_num)
+        result = self.single_flight.do(cache_key, self._generate_and_store, query, cache_key)
+        
+        # Registrar tiempo
+        response_time = (datetime.now() - start_time).total_seconds() * 1000
+        self.response_times.append(response_time)
+        if len(self.response_times) > 100:
+            self.response_times = self.response_times[-100:]
+        
+        return result
+    
+    def cache_key_for(self, query: str, target_date: Optional[datetime] = None) -> str:
+        """Clave de cache canónica de una consulta (las consultas diarias dependen de la fecha)"""
+        return self.key_builder.key_for(query, target_date)
+    
+    def generate_result(self, query: str, target_date: Optional[datetime] = None) -> Dict[str, Any]:
+        """Generar el resultado de una consulta sin consultar ni escribir cache"""
+        query_type, lesson_num = self._analyze_query(query, target_date)
+        response, lesson_num = self.generate_structured_response(query, query_type, lesson_num)
         
-        result = {
+        return {
             'query': query,
             'query_type': query_type,
             'lesson_number': lesson_num,
@@ -158,47 +275,92 @@ class EnhancedUCDMResponseEngine:
             'generated_at': datetime.now().isoformat(),
             'cache_hit': False
         }
+    
+    def _generate_and_store(self, query: str, cache_key: str) -> Dict[str, Any]:
+        """Generar respuesta y almacenarla en los niveles de cache"""
+        result = self.generate_result(query)
         
         # Almacenar en cache
         if self.use_cache:
-            self.memory_cache.put(cache_key, result, ttl_hours=1)
-            self.disk_cache.put(cache_key, result, ttl_hours=24)
-        
-        # Registrar tiempo
-        response_time = (datetime.now() - start_time).total_seconds() * 1000
-        self.response_times.append(response_time)
-        if len(self.response_times) > 100:
-            self.response_times = self.response_times[-100:]
+            tags = self.response_tags(result)
+            self.memory_cache.put(cache_key, result, tags=tags, **self.ttl_args(MEMORY_TTL_HOURS))
+            self.disk_cache.put(cache_key, result, tags=tags, **self.ttl_args(DISK_TTL_HOURS))
         
         return result
     
-    def _analyze_query(self, query: str) -> Tuple[str, Optional[int]]:
-        """Analizar tipo de consulta"""
-        import re
-        query_lower = query.lower()
+    def ttl_args(self, ttl_hours: int) -> Dict[str, Any]:
+        """
+        TTL de escritura: blando + duro con stale-while-revalidate, solo duro sin él
         
-        # Lección específica
-        lesson_match = re.search(r'lecci[oó]n\s+(\d+)', query_lower)
-        if lesson_match:
-            return "lesson_specific", int(lesson_match.group(1))
+        Args:
+            ttl_hours: TTL nominal de la respuesta en horas
         
-        # Lección diaria
-        if any(phrase in query_lower for phrase in ['hoy', 'diaria', 'día']):
-            return "daily_lesson", self.get_lesson_for_date(datetime.now())
+        Returns:
+            Dict[str, Any]: Argumentos ttl_hours (y soft_ttl_hours) para put/put_many
+        """
+        if not self.stale_while_revalidate:
+            return {'ttl_hours': ttl_hours}
+        return {'ttl_hours': ttl_hours * STALE_GRACE_FACTOR, 'soft_ttl_hours': ttl_hours}
+    
+    def _refresh_in_background(self, query: str, cache_key: str):
+        """Servir el valor vencido ya y lanzar una única regeneración por clave"""
+        if not self.stale_while_revalidate:
+            return
+        self.stale_serves += 1
+        with self._refresh_lock:
+            if not self._shut_down and cache_key not in self._refreshing:
+                self._refreshing[cache_key] = self._refresh_pool.submit(self._refresh, query, cache_key)
+    
+    def _refresh(self, query: str, cache_key: str):
+        """Regenerar una respuesta vencida (hilo del pool de regeneración)"""
+        try:
+            self.single_flight.do(cache_key, self._generate_and_store, query, cache_key)
+            self.background_refreshes += 1
+        except Exception as e:
+            # El valor anterior sigue sirviéndose hasta su TTL duro
+            self.refresh_errors += 1
+            self.logger.warning(f"Error regenerando {cache_key} en background: {e}")
+        finally:
+            with self._refresh_lock:
+                self._refreshing.pop(cache_key, None)
+    
+    def wait_for_refreshes(self):
+        """Esperar a que terminen las regeneraciones en background en curso"""
+        with self._refresh_lock:
+            pending = list(self._refreshing.values())
+        wait(pending)
+    
+    def shutdown(self, wait: bool = True):
+        """
+        Detener el pool de regeneración y liberar el índice compilado
         
-        # Por concepto
-        if any(phrase in query_lower for phrase in ['sobre', 'acerca', 'explica']):
-            return "concept_based", None
+        Con wait=True espera a que terminen las regeneraciones en curso. Tras el
+        cierre los índices cargados desde el índice compilado dejan de ser legibles.
+        """
+        with self._refresh_lock:
+            self._shut_down = True
+        self._refresh_pool.shutdown(wait=wait)
+        if self.compiled_index is not None:
+            self.compiled_index.close()
+    
+    def _analyze_query(self, query: str, target_date: Optional[datetime] = None) -> Tuple[str, Optional[int]]:
+        """Analizar tipo de consulta (target_date resuelve "hoy"; por defecto la fecha actual)"""
+        query_type, lesson_num, _ = parse_query(query)
         
-        return "general", None
+        # Lección diaria
+        if query_type == "daily_lesson":
+            return query_type, self.get_lesson_for_date(target_date or datetime.now())
+        
+        return query_type, lesson_num
     
     def get_lesson_for_date(self, target_date: datetime) -> Optional[int]:
         """Obtener lección para fecha"""
         date_key = target_date.strftime("%m-%d")
         return self.date_mapper.get(date_key)
     
-    def generate_structured_response(self, query: str, query_type: str, lesson_num: Optional[int]) -> str:
-        """Generar respuesta estructurada"""
+    def generate_structured_response(self, query: str, query_type: str,
+                                     lesson_num: Optional[int]) -> Tuple[str, Optional[int]]:
+        """Generar respuesta estructurada (devuelve la respuesta y la lección usada)"""
         try:
             # Seleccionar lección
             if lesson_num and str(lesson_num) in self.lessons_index:
@@ -224,11 +386,11 @@ APLICACIÓN PRÁCTICA: {aplicacion}
 
 INTEGRACIÓN EXPERIENCIAL: {integracion}
 
-CIERRE MOTIVADOR: {cierre}"""
+CIERRE MOTIVADOR: {cierre}""", lesson_num
             
         except Exception as e:
             self.logger.error(f"Error generando respuesta: {e}")
-            return "Error generando respuesta. Por favor, intenta de nuevo."
+            return "Error generando respuesta. Por favor, intenta de nuevo.", lesson_num
     
     def _generate_hook(self, lesson_title: str) -> str:
         """Generar hook inicial"""
@@ -267,8 +429,17 @@ CIERRE MOTIVADOR: {cierre}"""
             "cache_performance": {
                 "hits": self.cache_hits,
                 "misses": self.cache_misses,
-                "hit_ratio": round(hit_ratio, 3)
-            }
+                "hit_ratio": round(hit_ratio, 3),
+                "coalesced_requests": self.single_flight.coalesced
+            },
+            "stale_while_revalidate": {
+                "enabled": self.stale_while_revalidate,
+                "stale_serves": self.stale_serves,
+                "background_refreshes": self.background_refreshes,
+                "refresh_errors": self.refresh_errors,
+                "refreshing": len(self._refreshing)
+            },
+            "compiled_index": self.compiled_index.get_stats() if self.compiled_index else None
         }
         
         if self.use_cache:
@@ -281,6 +452,13 @@ CIERRE MOTIVADOR: {cierre}"""
         return metrics
 
 
-def create_enhanced_engine(use_cache: bool = True) -> EnhancedUCDMResponseEngine:
+def create_enhanced_engine(use_cache: bool = True, cache_dir: str = "data/cache",
+                           key_schema: str = "semantic",
+                           indices_dir: Optional[str] = None,
+                           stale_while_revalidate: bool = False,
+                           use_compiled_index: bool = True) -> EnhancedUCDMResponseEngine:
     """Crear instancia del motor optimizado"""
-    return EnhancedUCDMResponseEngine(use_cache=use_cache)
\ No newline at end of file
+    return EnhancedUCDMResponseEngine(use_cache=use_cache, cache_dir=cache_dir,
+                                      key_schema=key_schema, indices_dir=indices_dir,
+                                      stale_while_revalidate=stale_while_revalidate,
+                                      use_compiled_index=use_compiled_index)
\ No newline at end of file
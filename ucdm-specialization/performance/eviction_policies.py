@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Eviction Policies - Políticas de admisión y expulsión para MemoryCache
+Implementa LRU, LFU con envejecimiento, ARC y W-TinyLFU con count-min sketch
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Union
+
+class EvictionPolicy:
+    """
+    Interfaz de política de expulsión
+    
+    El cache notifica cada evento y pide una víctima cuando necesita espacio.
+    Las notificaciones se hacen siempre bajo el lock del cache.
+    """
+    
+    name = "base"
+    
+    def on_insert(self, key: str):
+        """Nueva entrada almacenada"""
+    
+    def on_access(self, key: str):
+        """Hit sobre una entrada existente"""
+    
+    def on_miss(self, key: str):
+        """Consulta de una clave ausente"""
+    
+    def on_remove(self, key: str):
+        """Entrada eliminada explícitamente, reemplazada o expirada"""
+    
+    def on_evict(self, key: str):
+        """Entrada expulsada por la política para liberar espacio"""
+        self.on_remove(key)
+    
+    def victim(self) -> Optional[str]:
+        """Clave a expulsar a continuación"""
+        raise NotImplementedError
+    
+    def clear(self):
+        """Olvidar todo el estado"""
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtener estadísticas de la política"""
+        return {"policy": self.name}
+
+class LRUPolicy(EvictionPolicy):
+    """Least Recently Used (comportamiento original de MemoryCache)"""
+    
+    name = "lru"
+    
+    def __init__(self):
+        self._order: "OrderedDict[str, None]" = OrderedDict()
+    
+    def on_insert(self, key: str):
+        self._order[key] = None
+        self._order.move_to_end(key)
+    
+    def on_access(self, key: str):
+        if key in self._order:
+            self._order.move_to_end(key)
+    
+    def on_remove(self, key: str):
+        self._order.pop(key, None)
+    
+    def victim(self) -> Optional[str]:
+        return next(iter(self._order), None)
+    
+    def clear(self):
+        self._order.clear()
+
+class LFUPolicy(EvictionPolicy):
+    """
+    Least Frequently Used con envejecimiento
+    
+    Usa cubetas por frecuencia para victim() en O(1). Cada `aging_interval`
+    accesos todas las frecuencias se reducen a la mitad para que claves que
+    fueron populares en el pasado no ocupen el cache indefinidamente.
+    """
+    
+    name = "lfu"
+    
+    def __init__(self, aging_interval: int = 10000):
+        self.aging_interval = aging_interval
+        self._freq: Dict[str, int] = {}
+        self._buckets: Dict[int, "OrderedDict[str, None]"] = {}
+        self._min_freq = 0
+        self._ops = 0
+        self.agings = 0
+    
+    def _bucket_add(self, key: str, freq: int):
+        self._buckets.setdefault(freq, OrderedDict())[key] = None
+        if freq < self._min_freq or len(self._freq) == 1:
+            self._min_freq = freq
+    
+    def _bucket_remove(self, key: str, freq: int):
+        bucket = self._buckets.get(freq)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._buckets[freq]
+    
+    def _tick(self):
+        self._ops += 1
+        if self._ops >= self.aging_interval:
+            self._age()
+    
+    def _age(self):
+        """Reducir a la mitad todas las frecuencias"""
+        self._ops = 0
+        self.agings += 1
+        old_freq = self._freq
+        self._freq = {}
+        self._buckets = {}
+        self._min_freq = 0
+        for key, freq in old_freq.items():
+            new_freq = max(1, freq // 2)
+            self._freq[key] = new_freq
+            self._buckets.setdefault(new_freq, OrderedDict())[key] = None
+        if self._buckets:
+            self._min_freq = min(self._buckets)
+    
+    def on_insert(self, key: str):
+        if key in self._freq:
+            self._bucket_remove(key, self._freq[key])
+        self._freq[key] = 1
+        self._bucket_add(key, 1)
+        self._min_freq = 1
+        self._tick()
+    
+    def on_access(self, key: str):
+        freq = self._freq.get(key)
+        if freq is None:
+            return
+        self._bucket_remove(key, freq)
+        self._freq[key] = freq + 1
+        self._bucket_add(key, freq + 1)
+        if self._min_freq == freq and freq not in self._buckets:
+            self._min_freq = freq + 1
+        self._tick()
+    
+    def on_remove(self, key: str):
+        freq = self._freq.pop(key, None)
+        if freq is not None:
+            self._bucket_remove(key, freq)
+    
+    def victim(self) -> Optional[str]:
+        if not self._freq:
+            return None
+        bucket = self._buckets.get(self._min_freq)
+        if not bucket:
+            self._min_freq = min(self._buckets)
+            bucket = self._buckets[self._min_freq]
+        return next(iter(bucket))
+    
+    def clear(self):
+        self._freq.clear()
+        self._buckets.clear()
+        self._min_freq = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {"policy": self.name, "agings": self.agings, "tracked_keys": len(self._freq)}
+
+class ARCPolicy(EvictionPolicy):
+    """
+    Adaptive Replacement Cache
+    
+    Mantiene T1 (vistas una vez) y T2 (vistas varias veces) junto con sus
+    listas fantasma B1/B2. El objetivo `p` se adapta según los hits
+    fantasma. Como el cache se limita por bytes, la capacidad `c` se toma
+    como el número de entradas residentes en cada momento.
+    """
+    
+    name = "arc"
+    
+    def __init__(self):
+        self._t1: "OrderedDict[str, None]" = OrderedDict()
+        self._t2: "OrderedDict[str, None]" = OrderedDict()
+        self._b1: "OrderedDict[str, None]" = OrderedDict()
+        self._b2: "OrderedDict[str, None]" = OrderedDict()
+        self._p = 0.0
+        self.ghost_hits = 0
+    
+    def _capacity(self) -> int:
+        return max(1, len(self._t1) + len(self._t2))
+    
+    def on_insert(self, key: str):
+        self._t1.pop(key, None)
+        self._t2.pop(key, None)
+        
+        if key in self._b1:
+            # Hit fantasma en B1: favorecer recencia
+            self.ghost_hits += 1
+            delta = max(1.0, len(self._b2) / max(1, len(self._b1)))
+            self._p = min(float(self._capacity()), self._p + delta)
+            del self._b1[key]
+            self._t2[key] = None
+        elif key in self._b2:
+            # Hit fantasma en B2: favorecer frecuencia
+            self.ghost_hits += 1
+            delta = max(1.0, len(self._b1) / max(1, len(self._b2)))
+            self._p = max(0.0, self._p - delta)
+            del self._b2[key]
+            self._t2[key] = None
+        else:
+            self._t1[key] = None
+    
+    def on_access(self, key: str):
+        if key in self._t1:
+            del self._t1[key]
+            self._t2[key] = None
+        elif key in self._t2:
+            self._t2.move_to_end(key)
+    
+    def on_remove(self, key: str):
+        self._t1.pop(key, None)
+        self._t2.pop(key, None)
+    
+    def on_evict(self, key: str):
+        if key in self._t1:
+            del self._t1[key]
+            self._b1[key] = None
+        elif key in self._t2:
+            del self._t2[key]
+            self._b2[key] = None
+        
+        # Las listas fantasma no superan la capacidad actual
+        capacity = self._capacity()
+        while len(self._b1) > capacity:
+            self._b1.popitem(last=False)
+        while len(self._b2) > capacity:
+            self._b2.popitem(last=False)
+    
+    def victim(self) -> Optional[str]:
+        if self._t1 and (len(self._t1) > self._p or not self._t2):
+            return next(iter(self._t1))
+        if self._t2:
+            return next(iter(self._t2))
+        return None
+    
+    def clear(self):
+        for segment in (self._t1, self._t2, self._b1, self._b2):
+            segment.clear()
+        self._p = 0.0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "policy": self.name,
+            "target_p": round(self._p, 2),
+            "t1": len(self._t1),
+            "t2": len(self._t2),
+            "ghost_b1": len(self._b1),
+            "ghost_b2": len(self._b2),
+            "ghost_hits": self.ghost_hits
+        }
+
+class CountMinSketch:
+    """
+    Count-min sketch con reinicio periódico (frecuencia aproximada)
+    
+    Tras `sample_size` incrementos todos los contadores se dividen entre
+    dos, manteniendo la estimación de frecuencia reciente.
+    """
+    
+    def __init__(self, width: int = 4096, depth: int = 4, sample_size: Optional[int] = None):
+        self.width = width
+        self.depth = depth
+        self.sample_size = sample_size or width * 10
+        self._rows = [[0] * width for _ in range(depth)]
+        self._seeds = [0x9E3779B1 * (i + 1) for i in range(depth)]
+        self._additions = 0
+        self.resets = 0
+    
+    def _indexes(self, key: str):
+        base = hash(key) & 0xFFFFFFFFFFFFFFFF
+        indexes = []
+        for seed in self._seeds:
+            # Mezclar los bits altos: con ancho potencia de 2 el módulo solo vería los bajos
+            mixed = ((base ^ seed) * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+            indexes.append((mixed ^ (mixed >> 32)) % self.width)
+        return indexes
+    
+    def increment(self, key: str):
+        for row, index in zip(self._rows, self._indexes(key)):
+            if row[index] < 15:  # Contadores de 4 bits como en TinyLFU
+                row[index] += 1
+        self._additions += 1
+        if self._additions >= self.sample_size:
+            self._reset()
+    
+    def frequency(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self._rows, self._indexes(key)))
+    
+    def _reset(self):
+        self._additions //= 2
+        self.resets += 1
+        for row in self._rows:
+            for i in range(self.width):
+                row[i] >>= 1
+
+class WTinyLFUPolicy(EvictionPolicy):
+    """
+    Window TinyLFU
+    
+    Las entradas nuevas entran a una ventana LRU pequeña. Cuando hace falta
+    espacio, el candidato que sale de la ventana compite contra la víctima
+    del segmento principal (SLRU probation/protected) y sobrevive solo si
+    el sketch lo estima más frecuente. Así las consultas únicas de cola
+    larga no desplazan el conjunto caliente.
+    """
+    
+    name = "wtinylfu"
+    
+    def __init__(self, window_ratio: float = 0.01, protected_ratio: float = 0.8,
+                 sketch_width: int = 4096):
+        self.window_ratio = window_ratio
+        self.protected_ratio = protected_ratio
+        self.sketch = CountMinSketch(width=sketch_width)
+        self._window: "OrderedDict[str, None]" = OrderedDict()
+        self._probation: "OrderedDict[str, None]" = OrderedDict()
+        self._protected: "OrderedDict[str, None]" = OrderedDict()
+        self.admissions = 0
+        self.rejections = 0
+    
+    def _total(self) -> int:
+        return len(self._window) + len(self._probation) + len(self._protected)
+    
+    def on_miss(self, key: str):
+        self.sketch.increment(key)
+    
+    def on_insert(self, key: str):
+        self.on_remove(key)
+        self._window[key] = None
+    
+    def on_access(self, key: str):
+        self.sketch.increment(key)
+        if key in self._window:
+            self._window.move_to_end(key)
+        elif key in self._probation:
+            del self._probation[key]
+            self._protected[key] = None
+            # Mantener el segmento protegido dentro de su cuota
+            protected_target = max(1, int((len(self._probation) + len(self._protected)) * self.protected_ratio))
+            while len(self._protected) > protected_target:
+                demoted, _ = self._protected.popitem(last=False)
+                self._probation[demoted] = None
+        elif key in self._protected:
+            self._protected.move_to_end(key)
+    
+    def on_remove(self, key: str):
+        self._window.pop(key, None)
+        self._probation.pop(key, None)
+        self._protected.pop(key, None)
+    
+    def _main_victim(self) -> Optional[str]:
+        if self._probation:
+            return next(iter(self._probation))
+        if self._protected:
+            return next(iter(self._protected))
+        return None
+    
+    def victim(self) -> Optional[str]:
+        window_target = max(1, int(self._total() * self.window_ratio))
+        
+        # El exceso de la ventana pasa al final de probation; el último compite
+        candidate = None
+        while len(self._window) > window_target:
+            candidate, _ = self._window.popitem(last=False)
+            self._probation[candidate] = None
+        
+        main_victim = self._main_victim()
+        
+        if candidate is not None and main_victim is not None and main_victim != candidate:
+            # Filtro TinyLFU: el candidato solo desplaza a la víctima si es más frecuente
+            if self.sketch.frequency(candidate) > self.sketch.frequency(main_victim):
+                self.admissions += 1
+                return main_victim
+            
+            self.rejections += 1
+            return candidate
+        
+        if main_victim is not None:
+            return main_victim
+        return next(iter(self._window), None)
+    
+    def clear(self):
+        self._window.clear()
+        self._probation.clear()
+        self._protected.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "policy": self.name,
+            "window": len(self._window),
+            "probation": len(self._probation),
+            "protected": len(self._protected),
+            "admissions": self.admissions,
+            "rejections": self.rejections,
+            "sketch_resets": self.sketch.resets
+        }
+
+
+EVICTION_POLICIES = {
+    "lru": LRUPolicy,
+    "lfu": LFUPolicy,
+    "arc": ARCPolicy,
+    "wtinylfu": WTinyLFUPolicy,
+}
+
+
+def create_eviction_policy(policy: Union[str, EvictionPolicy, None] = "lru") -> EvictionPolicy:
+    """
+    Crear política de expulsión por nombre o devolver la instancia recibida
+    
+    Args:
+        policy: Nombre ("lru", "lfu", "arc", "wtinylfu") o instancia
+    
+    Returns:
+        EvictionPolicy: Política configurada
+    """
+    if isinstance(policy, EvictionPolicy):
+        return policy
+    if policy is None:
+        policy = "lru"
+    if policy not in EVICTION_POLICIES:
+        raise ValueError(f"Política de expulsión desconocida: {policy}")
+    return EVICTION_POLICIES[policy]()
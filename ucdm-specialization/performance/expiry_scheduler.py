@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Expiry Scheduler - Subsistema de expiración compartido por los caches
+Heap de expiraciones con borrado perezoso y barrendero en background con trabajo acotado
+"""
+
+import time
+import heapq
+import logging
+import threading
+from typing import Any, Optional, Dict, List, Tuple
+from datetime import datetime
+
+class ExpiryHeap:
+    """
+    Min-heap de expiraciones indexado por clave
+    
+    Reprogramar o cancelar una clave es O(1)/O(log n): los registros
+    obsoletos quedan en el heap y se descartan al extraerlos. Cuando los
+    obsoletos superan a los vigentes el heap se compacta.
+    
+    No es thread-safe: el cache propietario lo usa bajo su propio lock.
+    """
+    
+    def __init__(self):
+        self._heap: List[Tuple[datetime, str]] = []
+        self._deadlines: Dict[str, datetime] = {}
+    
+    def __len__(self) -> int:
+        return len(self._deadlines)
+    
+    def schedule(self, key: str, expires_at: Optional[datetime]):
+        """Programar (o reprogramar) la expiración de una clave"""
+        if expires_at is None:
+            self._deadlines.pop(key, None)
+            return
+        self._deadlines[key] = expires_at
+        heapq.heappush(self._heap, (expires_at, key))
+    
+    def cancel(self, key: str):
+        """Cancelar la expiración de una clave eliminada"""
+        self._deadlines.pop(key, None)
+    
+    def pop_due(self, now: Optional[datetime] = None, limit: Optional[int] = None) -> List[str]:
+        """
+        Extraer claves vencidas
+        
+        Args:
+            now: Instante de referencia (por defecto ahora)
+            limit: Máximo de claves a extraer (None = todas las vencidas)
+        
+        Returns:
+            Lista de claves vencidas, de la más antigua a la más reciente
+        """
+        now = now or datetime.now()
+        due = []
+        
+        while self._heap and self._heap[0][0] <= now:
+            if limit is not None and len(due) >= limit:
+                break
+            expires_at, key = heapq.heappop(self._heap)
+            # Ignorar registros obsoletos (clave reprogramada o cancelada)
+            if self._deadlines.get(key) == expires_at:
+                del self._deadlines[key]
+                due.append(key)
+        
+        self._maybe_compact()
+        return due
+    
+    def next_deadline(self) -> Optional[datetime]:
+        """Próxima expiración vigente"""
+        while self._heap:
+            expires_at, key = self._heap[0]
+            if self._deadlines.get(key) == expires_at:
+                return expires_at
+            heapq.heappop(self._heap)
+        return None
+    
+    def clear(self):
+        self._heap.clear()
+        self._deadlines.clear()
+    
+    def _maybe_compact(self):
+        """Reconstruir el heap si acumula demasiados registros obsoletos"""
+        if len(self._heap) > 2 * len(self._deadlines) + 64:
+            self._heap = [(expires_at, key) for key, expires_at in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+class ExpirySweeper:
+    """
+    Barrendero de expiraciones en background
+    
+    Los caches se registran y exponen `sweep_expired(max_items) -> int`.
+    En cada tick se retiran como máximo `max_per_tick` entradas por cache,
+    de modo que la expiración deja de ejecutarse en el camino de la
+    petición y nunca bloquea un cache durante mucho tiempo.
+    """
+    
+    def __init__(self, interval_seconds: float = 1.0, max_per_tick: int = 256):
+        """
+        Inicializar barrendero
+        
+        Args:
+            interval_seconds: Pausa entre ticks
+            max_per_tick: Máximo de entradas retiradas por cache y tick
+        """
+        self.interval_seconds = interval_seconds
+        self.max_per_tick = max_per_tick
+        
+        self._caches: List[Any] = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        
+        # Métricas
+        self.ticks = 0
+        self.removed = 0
+        self.last_tick_ms = 0.0
+        self.max_tick_ms = 0.0
+        
+        self.logger = self._setup_logging()
+    
+    def _setup_logging(self) -> logging.Logger:
+        """Configurar logging específico"""
+        logger = logging.getLogger(f"{__name__}.ExpirySweeper")
+        logger.setLevel(logging.INFO)
+        
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            )
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        
+        return logger
+    
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def register(self, cache: Any):
+        """Registrar un cache con método sweep_expired(max_items)"""
+        if not hasattr(cache, "sweep_expired"):
+            raise TypeError(f"{type(cache).__name__} no implementa sweep_expired")
+        with self._lock:
+            if cache not in self._caches:
+                self._caches.append(cache)
+    
+    def unregister(self, cache: Any):
+        with self._lock:
+            if cache in self._caches:
+                self._caches.remove(cache)
+    
+    def tick(self) -> int:
+        """
+        Ejecutar una ronda de barrido sobre todos los caches registrados
+        
+        Returns:
+            int: Entradas retiradas en esta ronda
+        """
+        with self._lock:
+            caches = list(self._caches)
+        
+        start_time = time.perf_counter()
+        removed = 0
+        
+        for cache in caches:
+            try:
+                removed += cache.sweep_expired(self.max_per_tick)
+            except Exception as e:
+                self.logger.error(f"Error barriendo {type(cache).__name__}: {e}")
+        
+        elapsed_ms = (time.perf_counter() - start_time) * 1000
+        self.ticks += 1
+        self.removed += removed
+        self.last_tick_ms = elapsed_ms
+        self.max_tick_ms = max(self.max_tick_ms, elapsed_ms)
+        
+        return removed
+    
+    def _run(self):
+        """Bucle del hilo en background"""
+        while not self._stop_event.wait(self.interval_seconds):
+            removed = self.tick()
+            if removed:
+                self.logger.debug(f"Barrido: {removed} entradas expiradas retiradas")
+    
+    def start(self):
+        """Iniciar hilo de barrido"""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="ExpirySweeper", daemon=True)
+        self._thread.start()
+        self.logger.info(f"ExpirySweeper iniciado - Intervalo: {self.interval_seconds}s, Máx/tick: {self.max_per_tick}")
+    
+    def stop(self, timeout: float = 5.0):
+        """Detener hilo de barrido"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtener estadísticas del barrendero"""
+        with self._lock:
+            registered = [type(cache).__name__ for cache in self._caches]
+        return {
+            "running": self.is_running,
+            "registered": registered,
+            "interval_seconds": self.interval_seconds,
+            "max_per_tick": self.max_per_tick,
+            "ticks": self.ticks,
+            "removed": self.removed,
+            "last_tick_ms": round(self.last_tick_ms, 3),
+            "max_tick_ms": round(self.max_tick_ms, 3)
+        }
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+File Lock - Lock consultivo entre procesos basado en fcntl.flock
+Permite que varios procesos compartan un mismo directorio de cache
+"""
+
+import os
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, Optional
+
+try:
+    import fcntl
+    HAS_FCNTL = True
+except ImportError:
+    HAS_FCNTL = False
+
+class InterProcessLock:
+    """
+    Lock consultivo (flock) sobre un archivo, reentrante dentro del proceso
+    
+    Cada instancia abre su propio descriptor, así que dos instancias del
+    mismo proceso también se excluyen entre sí. No es thread-safe: el
+    cache propietario lo usa siempre bajo su propio lock de hilos.
+    
+    Un lock compartido no se puede promover a exclusivo; pedir uno
+    compartido mientras se tiene el exclusivo simplemente lo anida.
+    """
+    
+    def __init__(self, path: Path):
+        if not HAS_FCNTL:
+            raise RuntimeError("fcntl no disponible en esta plataforma")
+        self.path = Path(path)
+        self._fd: Optional[int] = None
+        self._depth = 0
+        self._mode: Optional[int] = None
+        self.acquisitions = 0
+    
+    @property
+    def is_held(self) -> bool:
+        return self._depth > 0
+    
+    def _acquire(self, mode: int):
+        if self._depth == 0:
+            if self._fd is None:
+                self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, mode)
+            self._mode = mode
+            self.acquisitions += 1
+        elif mode == fcntl.LOCK_EX and self._mode == fcntl.LOCK_SH:
+            raise RuntimeError("No se puede promover un lock compartido a exclusivo")
+        self._depth += 1
+    
+    def _release(self):
+        self._depth -= 1
+        if self._depth == 0:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            self._mode = None
+    
+    @contextmanager
+    def exclusive(self) -> Iterator[None]:
+        """Mantener el lock exclusivo (escritores)"""
+        self._acquire(fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            self._release()
+    
+    @contextmanager
+    def shared(self) -> Iterator[None]:
+        """Mantener el lock compartido (lecturas que necesitan una vista consistente)"""
+        self._acquire(fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            self._release()
+    
+    def close(self):
+        """Cerrar el descriptor (libera el lock si estaba tomado)"""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            self._depth = 0
+            self._mode = None
@@ -4,15 +4,17 @@ Index Cache (L3) - Cache especializado para índices conceptuales y mapeos
 Implementa lazy loading y gestión inteligente de relaciones UCDM
 """
 
-import json
 import logging
 import threading
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Set, Tuple, Callable
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Callable
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 from collections import defaultdict, deque
 
+from .index_watcher import file_stamp
+from .index_registry import IndexRegistry, get_index_registry
+
 @dataclass
 class IndexDependency:
     """Dependencia entre índices"""
@@ -33,6 +35,7 @@ class IndexSegment:
     access_count: int = 0
     last_accessed: Optional[datetime] = None
     dependencies: List[str] = field(default_factory=list)
+    source_stamp: Optional[Tuple[int, int]] = None
     
     def touch(self):
         """Actualizar acceso"""
@@ -53,7 +56,7 @@ class IndexCache:
     
     def __init__(self, indices_dir: str = "data/indices", 
                  preload_popular: bool = True, dependency_tracking: bool = True,
-                 lazy_threshold: float = 0.1):
+                 lazy_threshold: float = 0.1, registry: Optional[IndexRegistry] = None):
         """
         Inicializar cache de índices
         
@@ -62,12 +65,17 @@ class IndexCache:
             preload_popular: Pre-cargar índices populares
             dependency_tracking: Habilitar tracking de dependencias
             lazy_threshold: Umbral para lazy loading (0.0-1.0)
+            registry: Registro compartido de índices (por defecto el del proceso para indices_dir)
         """
         self.indices_dir = Path(indices_dir)
         self.preload_popular = preload_popular
         self.dependency_tracking = dependency_tracking
         self.lazy_threshold = lazy_threshold
         
+        # Los datos parseados viven en el registro compartido; aquí solo referencias
+        self.registry = registry or get_index_registry(indices_dir)
+        self._owner = self.registry.register_owner(self)
+        
         # Estado interno
         self._loaded_segments: Dict[str, IndexSegment] = {}
         self._dependencies: Dict[str, IndexDependency] = {}
@@ -77,6 +85,7 @@ class IndexCache:
         # Cache de consultas frecuentes
         self._query_cache: Dict[str, Tuple[Any, datetime]] = {}
         self._query_cache_ttl = timedelta(minutes=30)
+        self._query_tags: Dict[str, Set[str]] = {}
         
         # Métricas
         self.lazy_loads = 0
@@ -84,6 +93,7 @@ class IndexCache:
         self.cache_hits = 0
         self.cache_misses = 0
         self.dependency_loads = 0
+        self.hot_reloads = 0
         self.created_at = datetime.now()
         
         # Logging
@@ -212,36 +222,112 @@ class IndexCache:
         if not force_reload and index_name in self._loaded_segments:
             return True
         
+        segment = self._read_segment(index_name)
+        if segment is None:
+            return False
+        
+        self._loaded_segments[index_name] = segment
+        self.lazy_loads += 1
+        
+        self.logger.debug(f"Índice cargado: {index_name} ({segment.size_bytes/1024:.1f}KB)")
+        return True
+    
+    def _read_segment(self, index_name: str) -> Optional[IndexSegment]:
+        """Obtener un índice del registro compartido sin tocar el estado del cache"""
         index_file = self.indices_dir / f"{index_name}.json"
         if not index_file.exists():
             self.logger.warning(f"Archivo de índice no encontrado: {index_file}")
-            return False
+            return None
         
-        try:
-            with open(index_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Calcular tamaño aproximado
-            size_bytes = index_file.stat().st_size
-            
-            # Crear segmento
-            segment = IndexSegment(
-                name=index_name,
-                data=data,
-                loaded_at=datetime.now(),
-                size_bytes=size_bytes,
-                dependencies=self._dependencies.get(index_name, IndexDependency(index_name)).dependent_on
-            )
-            
-            self._loaded_segments[index_name] = segment
-            self.lazy_loads += 1
-            
-            self.logger.debug(f"Índice cargado: {index_name} ({size_bytes/1024:.1f}KB)")
-            return True
+        shared = self.registry.acquire(index_name, self._owner)
+        if shared is None:
+            self.logger.error(f"Error cargando índice {index_name}")
+            return None
+        
+        return IndexSegment(
+            name=index_name,
+            data=shared.data,
+            loaded_at=shared.loaded_at,
+            size_bytes=shared.size_bytes,
+            dependencies=self._dependencies.get(index_name, IndexDependency(index_name)).dependent_on,
+            source_stamp=shared.stamp
+        )
+    
+    def _dependents_of(self, index_name: str) -> Set[str]:
+        """Índices que dependen (transitivamente) de index_name"""
+        found: Set[str] = set()
+        pending = [index_name]
+        while pending:
+            dependency = self._dependencies.get(pending.pop())
+            for name in dependency.dependents if dependency else []:
+                if name not in found:
+                    found.add(name)
+                    pending.append(name)
+        return found
+    
+    def hot_reload(self, index_names: Iterable[str]) -> List[str]:
+        """
+        Recargar en caliente índices reescritos en disco
+        
+        Los índices cargados se reparsean fuera del lock y el segmento se
+        sustituye de forma atómica; los lectores ven la versión anterior o la
+        nueva, nunca un estado intermedio. El cambio se propaga a los
+        dependientes: se revalidan contra su archivo y se purgan las consultas
+        derivadas de todos los afectados.
+        
+        Args:
+            index_names: Índices modificados en disco
             
-        except Exception as e:
-            self.logger.error(f"Error cargando índice {index_name}: {e}")
-            return False
+        Returns:
+            List[str]: Índices cuyo segmento se recargó
+        """
+        changed = set(index_names)
+        
+        with self._lock:
+            # Índices nuevos en el directorio
+            for index_name in changed:
+                if index_name not in self._dependencies and (self.indices_dir / f"{index_name}.json").exists():
+                    self._dependencies[index_name] = IndexDependency(
+                        index_name=index_name, load_priority=self._determine_priority(index_name)
+                    )
+                    self._build_dependency_graph()
+            
+            affected = set(changed)
+            for index_name in changed:
+                affected |= self._dependents_of(index_name)
+            
+            stale = [
+                name for name in affected
+                if name in self._loaded_segments
+                and self._loaded_segments[name].source_stamp != file_stamp(self.indices_dir / f"{name}.json")
+            ]
+        
+        # Parsear fuera del lock: las lecturas siguen sirviendo la versión anterior
+        fresh = {name: self._read_segment(name) for name in stale}
+        
+        reloaded = []
+        with self._lock:
+            for name, segment in fresh.items():
+                if segment is None:
+                    # Archivo eliminado: descartar; ilegible (a medio escribir): conservar el anterior
+                    if not (self.indices_dir / f"{name}.json").exists():
+                        self._loaded_segments.pop(name, None)
+                        self.registry.release(name, self._owner)
+                    continue
+                previous = self._loaded_segments.get(name)
+                if previous is not None:
+                    segment.access_count = previous.access_count
+                    segment.last_accessed = previous.last_accessed
+                self._loaded_segments[name] = segment
+                reloaded.append(name)
+            
+            for name in affected:
+                self._purge_queries(name)
+            self.hot_reloads += len(reloaded)
+        
+        if reloaded:
+            self.logger.info(f"Índices recargados en caliente: {', '.join(sorted(reloaded))}")
+        return reloaded
     
     def _ensure_dependencies_loaded(self, index_name: str) -> bool:
         """Asegurar que las dependencias estén cargadas"""
@@ -425,20 +511,85 @@ class IndexCache:
             
             return None
     
+    def get_cached_query(self, key: str) -> Optional[Any]:
+        """
+        Obtener resultado derivado almacenado en el cache de consultas
+        
+        Args:
+            key: Clave de la consulta
+            
+        Returns:
+            Optional[Any]: Resultado si existe y no ha expirado
+        """
+        with self._lock:
+            if key in self._query_cache:
+                cached_data, cached_at = self._query_cache[key]
+                if datetime.now() - cached_at <= self._query_cache_ttl:
+                    self.cache_hits += 1
+                    return cached_data
+                del self._query_cache[key]
+                self._query_tags.pop(key, None)
+            
+            self.cache_misses += 1
+            return None
+    
+    def put_cached_query(self, key: str, value: Any, tags: Optional[Iterable[str]] = None):
+        """
+        Almacenar resultado derivado de índices en el cache de consultas
+        
+        Args:
+            key: Clave de la consulta
+            value: Resultado a almacenar
+            tags: Etiquetas de invalidación
+        """
+        with self._lock:
+            self._query_cache[key] = (value, datetime.now())
+            if tags:
+                self._query_tags[key] = set(tags)
+            else:
+                self._query_tags.pop(key, None)
+    
+    def delete_cached_query(self, key: str) -> bool:
+        """Eliminar resultado del cache de consultas"""
+        with self._lock:
+            self._query_tags.pop(key, None)
+            return self._query_cache.pop(key, None) is not None
+    
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Eliminar del cache de consultas los resultados con alguna de las etiquetas"""
+        tags = set(tags)
+        with self._lock:
+            stale = [key for key, key_tags in self._query_tags.items() if tags & key_tags]
+            for key in stale:
+                del self._query_tags[key]
+                self._query_cache.pop(key, None)
+            return len(stale)
+    
+    def get_query_keys(self) -> List[str]:
+        """Obtener claves presentes en el cache de consultas"""
+        with self._lock:
+            return list(self._query_cache.keys())
+    
     def invalidate_index(self, index_name: str):
         """Invalidar índice específico"""
         with self._lock:
             if index_name in self._loaded_segments:
                 del self._loaded_segments[index_name]
+                self.registry.release(index_name, self._owner)
                 self.logger.debug(f"Índice invalidado: {index_name}")
             
             # Limpiar cache de consultas relacionadas
-            cache_keys_to_remove = [
-                key for key in self._query_cache.keys() 
-                if index_name in key
-            ]
-            for key in cache_keys_to_remove:
-                del self._query_cache[key]
+            self._purge_queries(index_name)
+    
+    def _purge_queries(self, index_name: str):
+        """Eliminar del cache de consultas las claves derivadas de un índice (requiere el lock)"""
+        cache_keys_to_remove = [
+            key for key in self._query_cache.keys() 
+            if index_name in key
+        ]
+        for key in cache_keys_to_remove:
+            del self._query_cache[key]
+            self._query_tags.pop(key, None)
     
     def reload_index(self, index_name: str) -> bool:
         """Recargar índice desde disco"""
@@ -510,6 +661,7 @@ class IndexCache:
             # Remover índices no usados
             for name in indices_to_remove:
                 del self._loaded_segments[name]
+                self.registry.release(name, self._owner)
             
             # Limpiar cache de consultas expirado
             now = datetime.now()
@@ -519,6 +671,7 @@ class IndexCache:
             ]
             for key in expired_queries:
                 del self._query_cache[key]
+                self._query_tags.pop(key, None)
             
             if indices_to_remove:
                 self.logger.debug(f"Limpiados {len(indices_to_remove)} índices no usados")
@@ -541,7 +694,8 @@ class IndexCache:
                     "hit_ratio": round(hit_ratio, 3),
                     "lazy_loads": self.lazy_loads,
                     "preloads": self.preloads,
-                    "dependency_loads": self.dependency_loads
+                    "dependency_loads": self.dependency_loads,
+                    "hot_reloads": self.hot_reloads
                 },
                 "indices": {
                     "discovered": len(self._dependencies),
@@ -554,6 +708,7 @@ class IndexCache:
                     "dependency_tracking": self.dependency_tracking,
                     "lazy_threshold": self.lazy_threshold
                 },
+                "shared_registry": self.registry.get_stats(),
                 "uptime_hours": round(uptime.total_seconds() / 3600, 2)
             }
 
@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+Index Integrity - Validación incremental de índices por hash de contenido
+Registra hash, esquema y huella de cada entrada; solo revalida lo que cambió
+"""
+
+import json
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .index_watcher import file_stamp
+
+# Cambiar al modificar las reglas: invalida los resultados persistidos
+INTEGRITY_RULES_VERSION = 1
+
+# Secciones obligatorias por índice
+REQUIRED_SECTIONS = {
+    "ucdm_comprehensive_index": ["metadata", "lesson_details", "concept_index", "date_mapping"],
+    "lesson_mapper": ["date_to_lesson", "lesson_to_date"],
+    "lesson_date_mapper": ["date_to_lesson", "lesson_to_date"],
+    "concepts_index": ["concept_index"],
+    "365_lessons_indexed": ["metadata", "lessons"],
+    "365_lessons_advanced": ["metadata", "lessons"],
+}
+
+# Secciones que no pueden estar vacías
+NON_EMPTY_SECTIONS = {
+    "ucdm_comprehensive_index": ["lesson_details", "concept_index"],
+    "lesson_mapper": ["date_to_lesson", "lesson_to_date"],
+    "lesson_date_mapper": ["date_to_lesson", "lesson_to_date"],
+    "concepts_index": ["concept_index"],
+}
+
+# (índice, sección) -> (tipo de cada entrada, la entrada no puede estar vacía)
+ENTRY_RULES: Dict[Tuple[str, str], Tuple[type, bool]] = {
+    ("ucdm_comprehensive_index", "lesson_details"): (dict, False),
+    ("ucdm_comprehensive_index", "concept_index"): (list, False),
+    ("ucdm_comprehensive_index", "date_mapping"): (int, False),
+    ("lesson_mapper", "date_to_lesson"): (int, False),
+    ("lesson_mapper", "lesson_to_date"): (str, False),
+    ("lesson_date_mapper", "date_to_lesson"): (int, False),
+    ("lesson_date_mapper", "lesson_to_date"): (str, False),
+    ("concepts_index", "concept_index"): (list, True),
+    ("concept_to_lessons_index", "concept_index"): (list, True),
+    ("365_lessons_indexed", "lessons"): (dict, False),
+    ("365_lessons_advanced", "lessons"): (dict, False),
+}
+
+# Errores de entradas incluidos en el resultado (el resto solo se cuenta)
+MAX_REPORTED_ERRORS = 20
+
+@dataclass
+class IntegrityCheck:
+    """Resultado de verificación de integridad"""
+    index_name: str
+    is_valid: bool
+    checksum: Optional[str] = None
+    structure_valid: bool = True
+    content_valid: bool = True
+    size_bytes: int = 0
+    errors: List[str] = field(default_factory=list)
+    checked_at: datetime = field(default_factory=datetime.now)
+    cached: bool = False  # Resultado reutilizado sin revalidar (contenido sin cambios)
+    validated_entries: int = 0
+    reused_entries: int = 0
+
+def _entry_digest(value: Any) -> str:
+    return hashlib.blake2b(
+        json.dumps(value, sort_keys=True, ensure_ascii=False, separators=(',', ':')).encode('utf-8'),
+        digest_size=8
+    ).hexdigest()
+
+class IndexIntegrityValidator:
+    """
+    Validador incremental de integridad de índices
+    
+    La primera validación de un archivo registra su firma (tamaño, mtime),
+    el hash sha256 del contenido, un resumen del esquema (tipo de cada
+    sección de primer nivel) y la huella de cada entrada de las secciones
+    objeto (p. ej. cada lección de lesson_details). Después:
+    
+    - Misma firma: se devuelve el resultado registrado sin leer el archivo.
+    - Mismo hash: se actualiza la firma sin parsear.
+    - Hash distinto: las reglas de estructura (por sección) se recalculan y
+      las reglas de entrada solo se aplican a las entradas nuevas o cuya
+      huella cambió; las demás conservan su resultado anterior.
+    
+    Detectar qué cambió exige recorrer el contenido una vez, pero el coste de
+    validación es proporcional a las entradas modificadas.
+    """
+    
+    def __init__(self, indices_dir: str = "data/indices", state_file: Optional[str] = None):
+        """
+        Inicializar validador
+        
+        Args:
+            indices_dir: Directorio de índices
+            state_file: JSON donde persistir hashes y resultados (None = solo en memoria)
+        """
+        self.indices_dir = Path(indices_dir)
+        self.state_file = Path(state_file) if state_file else None
+        
+        self._records: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.RLock()
+        
+        # Métricas
+        self.validations = 0
+        self.skipped_unchanged = 0
+        self.hash_unchanged = 0
+        self.full_validations = 0
+        self.incremental_validations = 0
+        self.entries_validated = 0
+        self.entries_reused = 0
+        
+        self.logger = self._setup_logging()
+        self._load_state()
+    
+    def _setup_logging(self) -> logging.Logger:
+        """Configurar logging específico"""
+        logger = logging.getLogger(f"{__name__}.IndexIntegrityValidator")
+        logger.setLevel(logging.INFO)
+        
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            )
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        
+        return logger
+    
+    def _load_state(self):
+        if self.state_file is None or not self.state_file.exists():
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Estado de integridad ilegible, se reconstruye: {e}")
+            return
+        if state.get("rules_version") == INTEGRITY_RULES_VERSION:
+            self._records = state.get("indices", {})
+    
+    def _save_state(self):
+        """Persistir registros (requiere el lock)"""
+        if self.state_file is None:
+            return
+        try:
+            self.state_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_file = self.state_file.with_suffix('.tmp')
+            with open(temp_file, 'w', encoding='utf-8') as f:
+                json.dump({"rules_version": INTEGRITY_RULES_VERSION, "indices": self._records},
+                          f, ensure_ascii=False, separators=(',', ':'))
+            temp_file.replace(self.state_file)
+        except OSError as e:
+            self.logger.warning(f"Error guardando estado de integridad: {e}")
+    
+    def validate(self, index_name: str, data: Optional[Any] = None) -> IntegrityCheck:
+        """
+        Validar un índice revalidando solo lo que cambió desde la última vez
+        
+        Args:
+            index_name: Nombre del índice
+            data: Datos ya parseados del archivo actual (evita parsearlo otra vez)
+        
+        Returns:
+            IntegrityCheck: Resultado de la validación
+        """
+        path = self.indices_dir / f"{index_name}.json"
+        result = IntegrityCheck(index_name=index_name, is_valid=False)
+        self.validations += 1
+        
+        stamp = file_stamp(path)
+        if stamp is None:
+            with self._lock:
+                if self._records.pop(index_name, None) is not None:
+                    self._save_state()
+            result.errors.append(f"Archivo no encontrado: {path}")
+            return result
+        result.size_bytes = stamp[0]
+        
+        with self._lock:
+            record = self._records.get(index_name)
+            if record is not None and record["stamp"] == list(stamp):
+                self.skipped_unchanged += 1
+                return self._from_record(record, result)
+        
+        try:
+            raw = path.read_bytes()
+        except OSError as e:
+            result.errors.append(f"Error de lectura: {e}")
+            return result
+        content_hash = hashlib.sha256(raw).hexdigest()
+        
+        if record is not None and record["hash"] == content_hash:
+            with self._lock:
+                record["stamp"] = list(stamp)
+                self.hash_unchanged += 1
+                self._save_state()
+            return self._from_record(record, result)
+        
+        try:
+            if data is None:
+                data = json.loads(raw)
+        except ValueError as e:
+            fresh = {"entries": {}, "errors": {}, "structure_valid": False, "content_valid": False,
+                     "messages": [f"JSON inválido: {e}"]}
+        else:
+            fresh = self._validate_changes(index_name, data, record, result)
+        
+        fresh.update(stamp=list(stamp), hash=content_hash, valid=fresh["structure_valid"] and fresh["content_valid"])
+        with self._lock:
+            self._records[index_name] = fresh
+            if record is None:
+                self.full_validations += 1
+            else:
+                self.incremental_validations += 1
+            self.entries_validated += result.validated_entries
+            self.entries_reused += result.reused_entries
+            self._save_state()
+        
+        result = self._from_record(fresh, result)
+        result.cached = False
+        if not result.is_valid:
+            self.logger.warning(f"Índice {index_name} falló validación: {result.errors[:3]}")
+        return result
+    
+    def _from_record(self, record: Dict[str, Any], result: IntegrityCheck) -> IntegrityCheck:
+        result.checksum = record["hash"]
+        result.is_valid = record["valid"]
+        result.structure_valid = record["structure_valid"]
+        result.content_valid = record["content_valid"]
+        result.errors = list(record["messages"])
+        result.cached = True
+        return result
+    
+    def _validate_changes(self, index_name: str, data: Any, record: Optional[Dict[str, Any]],
+                          result: IntegrityCheck) -> Dict[str, Any]:
+        """Aplicar reglas de estructura completas y reglas de entrada solo a lo modificado"""
+        previous_entries = record.get("entries", {}) if record else {}
+        previous_errors = record.get("errors", {}) if record else {}
+        
+        if isinstance(data, dict):
+            sections = data
+        elif isinstance(data, list):
+            sections = {"": data}
+        else:
+            sections = {}
+        
+        structure_errors, content_errors = self._check_sections(index_name, data, sections)
+        
+        entries: Dict[str, Dict[str, str]] = {}
+        errors: Dict[str, Dict[str, str]] = {}
+        for section, value in sections.items():
+            items = value.items() if isinstance(value, dict) else [("", value)]
+            old_digests = previous_entries.get(section, {})
+            old_errors = previous_errors.get(section, {})
+            rule = ENTRY_RULES.get((index_name, section)) if isinstance(value, dict) else None
+            
+            digests: Dict[str, str] = {}
+            section_errors: Dict[str, str] = {}
+            for key, item in items:
+                digest = digests[key] = _entry_digest(item)
+                if old_digests.get(key) == digest:
+                    result.reused_entries += 1
+                    if key in old_errors:
+                        section_errors[key] = old_errors[key]
+                    continue
+                result.validated_entries += 1
+                error = self._check_entry(rule, item)
+                if error:
+                    section_errors[key] = error
+            
+            entries[section] = digests
+            if section_errors:
+                errors[section] = section_errors
+        
+        entry_errors = [
+            f"{section}[{key}]: {error}"
+            for section, section_errors in errors.items()
+            for key, error in section_errors.items()
+        ]
+        messages = structure_errors + content_errors + entry_errors[:MAX_REPORTED_ERRORS]
+        if len(entry_errors) > MAX_REPORTED_ERRORS:
+            messages.append(f"... y {len(entry_errors) - MAX_REPORTED_ERRORS} entradas inválidas más")
+        
+        return {
+            "schema": {section: type(value).__name__ for section, value in sections.items()},
+            "entries": entries,
+            "errors": errors,
+            "structure_valid": not structure_errors,
+            "content_valid": not content_errors and not entry_errors,
+            "messages": messages
+        }
+    
+    def _check_sections(self, index_name: str, data: Any, sections: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+        """Reglas por sección: presencia, tipo y no vacías (coste proporcional al número de secciones)"""
+        required = REQUIRED_SECTIONS.get(index_name)
+        if required is None:
+            # Validación genérica: debe ser dict o list no vacío
+            if isinstance(data, (dict, list)) and len(data) > 0:
+                return [], []
+            return ["Se esperaba un objeto o lista no vacíos"], []
+        if not isinstance(data, dict):
+            return ["Se esperaba un objeto JSON"], []
+        
+        structure_errors = [f"Falta la sección {section}" for section in required if section not in sections]
+        structure_errors += [
+            f"La sección {section} debería ser un objeto"
+            for (name, section) in ENTRY_RULES
+            if name == index_name and section in sections and not isinstance(sections[section], dict)
+        ]
+        content_errors = [
+            f"Sección vacía: {section}"
+            for section in NON_EMPTY_SECTIONS.get(index_name, [])
+            if section in sections and not sections[section]
+        ]
+        return structure_errors, content_errors
+    
+    def _check_entry(self, rule: Optional[Tuple[type, bool]], value: Any) -> Optional[str]:
+        if rule is None:
+            return None
+        expected, non_empty = rule
+        if not isinstance(value, expected):
+            return f"se esperaba {expected.__name__}, hay {type(value).__name__}"
+        if non_empty and not value:
+            return "entrada vacía"
+        return None
+    
+    def get_record(self, index_name: str) -> Optional[Dict[str, Any]]:
+        """Hash, esquema y resultado registrados para un índice"""
+        with self._lock:
+            record = self._records.get(index_name)
+            if record is None:
+                return None
+            return {
+                "hash": record["hash"],
+                "stamp": tuple(record["stamp"]),
+                "schema": dict(record.get("schema", {})),
+                "valid": record["valid"],
+                "entries": sum(len(digests) for digests in record["entries"].values()),
+                "invalid_entries": sum(len(errors) for errors in record["errors"].values())
+            }
+    
+    def forget(self, index_name: str):
+        """Olvidar lo registrado de un índice: la próxima validación será completa"""
+        with self._lock:
+            if self._records.pop(index_name, None) is not None:
+                self._save_state()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas del validador"""
+        with self._lock:
+            checked = self.entries_validated + self.entries_reused
+            return {
+                "tracked_indices": len(self._records),
+                "validations": self.validations,
+                "skipped_unchanged": self.skipped_unchanged,
+                "hash_unchanged": self.hash_unchanged,
+                "full_validations": self.full_validations,
+                "incremental_validations": self.incremental_validations,
+                "entries_validated": self.entries_validated,
+                "entries_reused": self.entries_reused,
+                "reuse_ratio": round(self.entries_reused / checked, 3) if checked else 0.0
+            }
@@ -0,0 +1,353 @@
+#!/usr/bin/env python3
+"""
+Index Registry - Registro de índices compartido por proceso
+Una sola copia parseada de cada índice para IndexCache, LazyIndexLoader y PredictivePreloader
+"""
+
+import json
+import logging
+import threading
+import weakref
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from .eviction_policies import EvictionPolicy, create_eviction_policy
+from .index_watcher import file_stamp
+
+class ReadOnlyDict(dict):
+    """dict de un índice compartido: cualquier mutación lanza TypeError"""
+    
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Índice compartido de solo lectura: copia los datos antes de modificarlos")
+    
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    
+    def __reduce__(self):
+        # Las copias (pickle, copy, deepcopy) son dicts normales y mutables
+        return dict, (dict(self),)
+    
+    def __copy__(self):
+        return dict(self)
+
+class ReadOnlyList(list):
+    """list de un índice compartido: cualquier mutación lanza TypeError"""
+    
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("Índice compartido de solo lectura: copia los datos antes de modificarlos")
+    
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = extend = insert = pop = remove = clear = sort = reverse = _readonly
+    
+    def __reduce__(self):
+        return list, (list(self),)
+    
+    def __copy__(self):
+        return list(self)
+
+def freeze(value: Any) -> Any:
+    """Convertir recursivamente dicts y listas de JSON en sus versiones de solo lectura"""
+    if isinstance(value, dict):
+        return ReadOnlyDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return ReadOnlyList(freeze(item) for item in value)
+    return value
+
+@dataclass
+class SharedIndex:
+    """Índice parseado compartido por todos los componentes del proceso"""
+    name: str
+    data: Any
+    stamp: Optional[Tuple[int, int]]
+    size_bytes: int
+    loaded_at: datetime = field(default_factory=datetime.now)
+    last_accessed: Optional[datetime] = None
+    access_count: int = 0
+    holders: Set[str] = field(default_factory=set)
+    
+    @property
+    def ref_count(self) -> int:
+        return len(self.holders)
+
+class IndexRegistry:
+    """
+    Registro de índices parseados compartido por proceso
+    
+    Cada índice se parsea una vez y se entrega como vista de solo lectura a
+    todos los componentes que lo piden. Los componentes adquieren el índice
+    con acquire() y lo sueltan con release(); un índice sin referencias sigue
+    en memoria hasta que la política de expulsión (una sola para todo el
+    proceso) lo elige para respetar el presupuesto de memoria. Las firmas
+    (tamaño, mtime) de los archivos permiten revalidar al adquirir y recargar
+    en caliente una sola vez para todos los componentes.
+    """
+    
+    def __init__(self, indices_dir: str = "data/indices", max_memory_mb: int = 256,
+                 eviction_policy: Union[str, EvictionPolicy, None] = "lru"):
+        """
+        Inicializar registro
+        
+        Args:
+            indices_dir: Directorio de índices
+            max_memory_mb: Presupuesto para índices sin referencias (tamaño en disco como estimación)
+            eviction_policy: Política de expulsión de índices sin referencias
+        """
+        self.indices_dir = Path(indices_dir)
+        self.max_memory_bytes = max_memory_mb * 1024 * 1024
+        self.policy = create_eviction_policy(eviction_policy)
+        
+        self._entries: Dict[str, SharedIndex] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.RLock()
+        self._owner_seq = 0
+        
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.loads = 0
+        self.load_errors = 0
+        self.reloads = 0
+        self.evictions = 0
+        
+        self.logger = self._setup_logging()
+    
+    def _setup_logging(self) -> logging.Logger:
+        """Configurar logging específico"""
+        logger = logging.getLogger(f"{__name__}.IndexRegistry")
+        logger.setLevel(logging.INFO)
+        
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            )
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        
+        return logger
+    
+    @property
+    def memory_bytes(self) -> int:
+        return sum(entry.size_bytes for entry in self._entries.values())
+    
+    def register_owner(self, owner: Any) -> str:
+        """
+        Identificador de un componente consumidor
+        
+        Cuando el componente se libera se sueltan todas sus referencias.
+        """
+        with self._lock:
+            self._owner_seq += 1
+            token = f"{type(owner).__name__}#{self._owner_seq}"
+        weakref.finalize(owner, self.release_all, token)
+        return token
+    
+    def _parse(self, index_name: str) -> Optional[SharedIndex]:
+        """Leer y parsear un índice (fuera del lock del registro)"""
+        index_file = self.indices_dir / f"{index_name}.json"
+        stamp = file_stamp(index_file)
+        if stamp is None:
+            return None
+        with open(index_file, 'r', encoding='utf-8') as f:
+            data = freeze(json.load(f))
+        return SharedIndex(name=index_name, data=data, stamp=stamp, size_bytes=stamp[0])
+    
+    def _install(self, entry: SharedIndex):
+        """Sustituir la versión registrada conservando referencias y uso (requiere el lock)"""
+        previous = self._entries.get(entry.name)
+        if previous is not None:
+            entry.holders = previous.holders
+            entry.access_count = previous.access_count
+            entry.last_accessed = previous.last_accessed
+            self.policy.on_remove(entry.name)
+        self._entries[entry.name] = entry
+        if not entry.holders:
+            self.policy.on_insert(entry.name)
+    
+    def _drop(self, index_name: str):
+        """Olvidar un índice cuyo archivo desapareció (requiere el lock)"""
+        if self._entries.pop(index_name, None) is not None:
+            self.policy.on_remove(index_name)
+    
+    def _current(self, index_name: str, count: bool = True) -> Tuple[bool, Optional[SharedIndex]]:
+        """
+        Revalidar la firma del archivo y parsear una sola vez si cambió
+        
+        Returns:
+            Tuple: (legible, versión vigente o None si el archivo no existe). Si
+            el archivo es ilegible se devuelve la versión registrada.
+        """
+        path = self.indices_dir / f"{index_name}.json"
+        stamp = file_stamp(path)
+        with self._lock:
+            entry = self._entries.get(index_name)
+            if stamp is None:
+                self._drop(index_name)
+                if count:
+                    self.misses += 1
+                return True, None
+            if entry is not None and entry.stamp == stamp:
+                if count:
+                    self.hits += 1
+                return True, entry
+            load_lock = self._load_locks.setdefault(index_name, threading.Lock())
+        
+        with load_lock:
+            # Otro componente pudo parsearlo mientras se esperaba
+            with self._lock:
+                entry = self._entries.get(index_name)
+                if entry is not None and entry.stamp == file_stamp(path):
+                    if count:
+                        self.hits += 1
+                    return True, entry
+            
+            try:
+                fresh = self._parse(index_name)
+            except Exception as e:
+                self.load_errors += 1
+                self.logger.warning(f"No se pudo leer el índice {index_name}: {e}")
+                return False, entry
+            
+            with self._lock:
+                if count:
+                    self.misses += 1
+                if fresh is None:
+                    self._drop(index_name)
+                    return True, None
+                if index_name in self._entries:
+                    self.reloads += 1
+                self.loads += 1
+                self._install(fresh)
+                return True, fresh
+    
+    def acquire(self, index_name: str, owner: str) -> Optional[SharedIndex]:
+        """
+        Obtener un índice y registrar la referencia del componente
+        
+        Si el archivo cambió desde el último parseo se vuelve a parsear una vez
+        para todos. Un archivo ilegible (p. ej. a medio escribir) devuelve None
+        y se conserva la versión registrada.
+        
+        Args:
+            index_name: Nombre del índice
+            owner: Identificador obtenido con register_owner
+        
+        Returns:
+            Optional[SharedIndex]: Índice compartido, o None si no existe o no se pudo leer
+        """
+        readable, entry = self._current(index_name)
+        if not readable or entry is None:
+            return None
+        with self._lock:
+            if self._entries.get(index_name) is not entry:
+                # Expulsado o sustituido entre medias: esta versión sigue siendo la leída
+                self._install(entry)
+            if not entry.holders:
+                self.policy.on_remove(index_name)
+            entry.holders.add(owner)
+            entry.access_count += 1
+            entry.last_accessed = datetime.now()
+            self._evict()
+        return entry
+    
+    def release(self, index_name: str, owner: str):
+        """Soltar la referencia de un componente; sin referencias el índice pasa a ser expulsable"""
+        with self._lock:
+            entry = self._entries.get(index_name)
+            if entry is None or owner not in entry.holders:
+                return
+            entry.holders.discard(owner)
+            if not entry.holders:
+                self.policy.on_insert(index_name)
+                self._evict()
+    
+    def release_all(self, owner: str):
+        """Soltar todas las referencias de un componente"""
+        with self._lock:
+            for index_name in [name for name, entry in self._entries.items() if owner in entry.holders]:
+                self.release(index_name, owner)
+    
+    def _evict(self):
+        """Expulsar índices sin referencias hasta respetar el presupuesto (requiere el lock)"""
+        while self.memory_bytes > self.max_memory_bytes:
+            victim = self.policy.victim()
+            entry = self._entries.get(victim) if victim is not None else None
+            if entry is None or entry.holders:
+                break
+            del self._entries[victim]
+            self.policy.on_evict(victim)
+            self.evictions += 1
+            self.logger.debug(f"Índice expulsado del registro: {victim}")
+    
+    def refresh(self, index_names: Iterable[str]) -> Dict[str, Optional[SharedIndex]]:
+        """
+        Revalidar índices contra su archivo (recarga en caliente)
+        
+        El primer componente que lo pide reparsea; los demás reciben la misma versión.
+        
+        Returns:
+            Dict[str, Optional[SharedIndex]]: Versión vigente por índice; None si el
+            archivo se eliminó. Los índices ilegibles se omiten.
+        """
+        current: Dict[str, Optional[SharedIndex]] = {}
+        for index_name in index_names:
+            readable, entry = self._current(index_name, count=False)
+            if readable:
+                current[index_name] = entry
+        with self._lock:
+            self._evict()
+        return current
+    
+    def get_holders(self, index_name: str) -> List[str]:
+        """Componentes que mantienen una referencia al índice"""
+        with self._lock:
+            entry = self._entries.get(index_name)
+            return sorted(entry.holders) if entry else []
+    
+    def is_loaded(self, index_name: str) -> bool:
+        return index_name in self._entries
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Estadísticas del registro compartido"""
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "indices_dir": str(self.indices_dir),
+                "loaded": len(self._entries),
+                "referenced": sum(1 for entry in self._entries.values() if entry.holders),
+                "memory_kb": round(self.memory_bytes / 1024, 1),
+                "max_memory_mb": round(self.max_memory_bytes / (1024 * 1024), 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / total, 3) if total else 0.0,
+                "loads": self.loads,
+                "load_errors": self.load_errors,
+                "reloads": self.reloads,
+                "evictions": self.evictions,
+                "eviction": self.policy.get_stats(),
+                "ref_counts": {name: entry.ref_count for name, entry in self._entries.items()}
+            }
+
+# Un registro por directorio de índices y proceso
+_registries: Dict[Path, IndexRegistry] = {}
+_registries_lock = threading.Lock()
+
+
+def get_index_registry(indices_dir: str = "data/indices") -> IndexRegistry:
+    """
+    Registro compartido del proceso para un directorio de índices
+    
+    Args:
+        indices_dir: Directorio de índices
+    
+    Returns:
+        IndexRegistry: La misma instancia para todas las llamadas con el mismo directorio
+    """
+    key = Path(indices_dir).resolve()
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = _registries[key] = IndexRegistry(str(indices_dir))
+        return registry
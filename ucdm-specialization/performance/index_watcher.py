@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+Index Watcher - Detección de índices reescritos y recarga en caliente
+Vigila data/indices (eventos del sistema de archivos o sondeo de mtime) y recarga fuera del camino de la petición
+"""
+
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    HAS_WATCHDOG = True
+except ImportError:
+    HAS_WATCHDOG = False
+
+def file_stamp(path: Path) -> Optional[Tuple[int, int]]:
+    """Firma barata de un archivo: (tamaño, mtime en ns); None si no existe"""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+if HAS_WATCHDOG:
+    class _WakeOnChange(FileSystemEventHandler):
+        """Despierta al vigilante cuando cambia un *.json del directorio"""
+        
+        def __init__(self, wake: threading.Event):
+            super().__init__()
+            self._wake = wake
+        
+        def on_any_event(self, event):
+            paths = [getattr(event, "src_path", ""), getattr(event, "dest_path", "")]
+            if any(str(path).endswith(".json") for path in paths):
+                self._wake.set()
+
+class IndexWatcher:
+    """
+    Vigilante de archivos de índices con recarga en caliente
+    
+    Cada ronda compara (tamaño, mtime) de los *.json con la última firma
+    vista y entrega los índices modificados a los destinos registrados
+    (IndexCache, LazyIndexLoader), que los reparsean en este hilo y
+    sustituyen el segmento de forma atómica propagando el cambio a sus
+    dependientes. Con watchdog instalado los eventos del sistema de
+    archivos adelantan la ronda; sin él se sondea cada poll_interval.
+    """
+    
+    def __init__(self, indices_dir: str = "data/indices", poll_interval: float = 2.0,
+                 debounce_seconds: float = 0.2, use_events: bool = True):
+        """
+        Inicializar vigilante
+        
+        Args:
+            indices_dir: Directorio de índices vigilado
+            poll_interval: Segundos entre rondas de sondeo
+            debounce_seconds: Espera tras un evento para agrupar escrituras en ráfaga
+            use_events: Usar eventos de watchdog si está instalado
+        """
+        self.indices_dir = Path(indices_dir)
+        self.poll_interval = poll_interval
+        self.debounce_seconds = debounce_seconds
+        self.use_events = use_events and HAS_WATCHDOG
+        
+        self._stamps: Dict[str, Tuple[int, int]] = {}
+        self._targets: List[Any] = []
+        self._subscribers: List[Callable[[List[str]], Any]] = []
+        self._lock = threading.Lock()
+        self._scan_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._observer = None
+        
+        # Métricas
+        self.scans = 0
+        self.changes_detected = 0
+        self.reloads = 0
+        self.reload_errors = 0
+        self.last_scan_ms = 0.0
+        
+        self.logger = self._setup_logging()
+        
+        # Las firmas actuales son la línea base: solo se recarga lo que cambie después
+        self._stamps = self._take_stamps()
+    
+    def _setup_logging(self) -> logging.Logger:
+        """Configurar logging específico"""
+        logger = logging.getLogger(f"{__name__}.IndexWatcher")
+        logger.setLevel(logging.INFO)
+        
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            )
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        
+        return logger
+    
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+    
+    def _take_stamps(self) -> Dict[str, Tuple[int, int]]:
+        """Firmas actuales de los *.json del directorio"""
+        if not self.indices_dir.exists():
+            return {}
+        stamps = {}
+        for path in self.indices_dir.glob("*.json"):
+            stamp = file_stamp(path)
+            if stamp is not None:
+                stamps[path.stem] = stamp
+        return stamps
+    
+    def watch(self, target: Any):
+        """Registrar un destino con método hot_reload(index_names) -> List[str]"""
+        if not hasattr(target, "hot_reload"):
+            raise TypeError(f"{type(target).__name__} no implementa hot_reload")
+        with self._lock:
+            if target not in self._targets:
+                self._targets.append(target)
+    
+    def subscribe(self, callback: Callable[[List[str]], Any]):
+        """Registrar callback que recibe los nombres de índices modificados tras recargarlos"""
+        with self._lock:
+            self._subscribers.append(callback)
+    
+    def scan(self) -> List[str]:
+        """
+        Ejecutar una ronda: detectar índices modificados y recargarlos
+        
+        Returns:
+            List[str]: Índices modificados, creados o eliminados desde la ronda anterior
+        """
+        with self._scan_lock:
+            start_time = time.perf_counter()
+            current = self._take_stamps()
+            changed = sorted(
+                name for name in set(current) | set(self._stamps)
+                if current.get(name) != self._stamps.get(name)
+            )
+            self._stamps = current
+            self.scans += 1
+            
+            if changed:
+                self.changes_detected += len(changed)
+                self.logger.info(f"Índices modificados en disco: {', '.join(changed)}")
+                self._dispatch(changed)
+            
+            self.last_scan_ms = (time.perf_counter() - start_time) * 1000
+            return changed
+    
+    def _dispatch(self, changed: List[str]):
+        with self._lock:
+            targets = list(self._targets)
+            subscribers = list(self._subscribers)
+        
+        for target in targets:
+            try:
+                self.reloads += len(target.hot_reload(changed))
+            except Exception as e:
+                self.reload_errors += 1
+                self.logger.error(f"Error recargando índices en {type(target).__name__}: {e}")
+        
+        for callback in subscribers:
+            try:
+                callback(changed)
+            except Exception as e:
+                self.logger.error(f"Error en suscriptor del vigilante de índices: {e}")
+    
+    def _run(self):
+        """Bucle del hilo en background"""
+        while not self._stop_event.is_set():
+            woke = self._wake_event.wait(self.poll_interval)
+            if self._stop_event.is_set():
+                break
+            if woke:
+                # Agrupar la ráfaga de eventos de una misma reescritura
+                self._stop_event.wait(self.debounce_seconds)
+                self._wake_event.clear()
+            self.scan()
+    
+    def start(self):
+        """Iniciar vigilancia en background"""
+        if self.is_running:
+            return
+        self._stop_event.clear()
+        
+        if self.use_events and self.indices_dir.exists():
+            try:
+                self._observer = Observer()
+                self._observer.schedule(_WakeOnChange(self._wake_event), str(self.indices_dir))
+                self._observer.start()
+            except Exception as e:
+                self.logger.warning(f"Eventos de archivos no disponibles, se usa sondeo: {e}")
+                self._observer = None
+        
+        self._thread = threading.Thread(target=self._run, name="IndexWatcher", daemon=True)
+        self._thread.start()
+        mode = "eventos" if self._observer is not None else "sondeo"
+        self.logger.info(f"IndexWatcher iniciado - Dir: {self.indices_dir}, Modo: {mode}, Intervalo: {self.poll_interval}s")
+    
+    def stop(self, timeout: float = 5.0):
+        """Detener vigilancia"""
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout)
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+        self._wake_event.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtener estadísticas del vigilante"""
+        with self._lock:
+            targets = [type(target).__name__ for target in self._targets]
+        return {
+            "running": self.is_running,
+            "mode": "events" if self._observer is not None else "polling",
+            "targets": targets,
+            "tracked_files": len(self._stamps),
+            "poll_interval": self.poll_interval,
+            "scans": self.scans,
+            "changes_detected": self.changes_detected,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+            "last_scan_ms": round(self.last_scan_ms, 3)
+        }
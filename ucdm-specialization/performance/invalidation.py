@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+"""
+Invalidation - Invalidación por etiquetas ligada a las versiones de los índices
+Detecta cambios de contenido en data/indices y purga solo las entradas derivadas de lo que cambió
+"""
+
+import json
+import hashlib
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+# Sección de cada índice cuyas entradas están indexadas por número de lección ("" = raíz)
+LESSON_SECTIONS = {
+    "ucdm_comprehensive_index": "lesson_details",
+    "365_lessons_indexed": "",
+    "365_lessons_advanced": "",
+}
+
+# Mismo grafo que IndexCache._build_dependency_graph: índice -> índices de los que depende
+INDEX_DEPENDENCIES = {
+    "ucdm_comprehensive_index": [],
+    "lesson_mapper": ["ucdm_comprehensive_index"],
+    "lesson_date_mapper": ["lesson_mapper"],
+    "concepts_index": ["ucdm_comprehensive_index"],
+    "concept_to_lessons_index": ["concepts_index"],
+    "365_lessons_indexed": ["lesson_mapper"],
+    "365_lessons_advanced": ["365_lessons_indexed"],
+}
+
+def lesson_tag(lesson_number: Any) -> str:
+    """Etiqueta de entradas derivadas de una lección"""
+    return f"lesson:{lesson_number}"
+
+def index_tag(index_name: str, section: Optional[str] = None) -> str:
+    """Etiqueta de entradas derivadas de un índice completo o de una de sus secciones"""
+    return f"index:{index_name}/{section}" if section else f"index:{index_name}"
+
+def _digest(value: Any) -> str:
+    return hashlib.sha1(json.dumps(value, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()[:16]
+
+class InvalidationBus:
+    """
+    Bus de invalidación dirigido por el contenido de los índices
+    
+    Guarda por índice el hash del archivo, el de cada sección de primer nivel
+    y el de cada lección. Cuando el hash de un archivo cambia calcula las
+    etiquetas afectadas (lecciones modificadas o añadidas, secciones
+    modificadas, el índice y sus dependientes en el grafo) y las publica a
+    los suscriptores, que purgan exactamente esas entradas.
+    
+    Las versiones se persisten, así que un índice reescrito mientras el
+    proceso estaba detenido se detecta en el siguiente check().
+    """
+    
+    def __init__(self, indices_dir: str = "data/indices", state_file: Optional[str] = None,
+                 dependencies: Optional[Dict[str, List[str]]] = None):
+        """
+        Inicializar bus
+        
+        Args:
+            indices_dir: Directorio de índices vigilado
+            state_file: JSON donde persistir las versiones (None = solo en memoria)
+            dependencies: Grafo índice -> dependencias (por defecto INDEX_DEPENDENCIES)
+        """
+        self.indices_dir = Path(indices_dir)
+        self.state_file = Path(state_file) if state_file else None
+        self.dependencies = dependencies if dependencies is not None else INDEX_DEPENDENCIES
+        
+        self._versions: Dict[str, Dict[str, Any]] = {}
+        self._subscribers: List[Callable[[Set[str], str], Any]] = []
+        self._lock = threading.RLock()
+        
+        # Métricas
+        self.checks = 0
+        self.changes_detected = 0
+        self.tags_published = 0
+        self.entries_purged = 0
+        
+        self.logger = self._setup_logging()
+        self._load_state()
+    
+    def _setup_logging(self) -> logging.Logger:
+        """Configurar logging específico"""
+        logger = logging.getLogger(f"{__name__}.InvalidationBus")
+        logger.setLevel(logging.INFO)
+        
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            )
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        
+        return logger
+    
+    def _load_state(self):
+        if self.state_file is None or not self.state_file.exists():
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                self._versions = json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Estado de versiones ilegible, se reconstruye: {e}")
+            self._versions = {}
+    
+    def _save_state(self):
+        if self.state_file is None:
+            return
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = self.state_file.with_suffix('.tmp')
+        with open(temp_file, 'w', encoding='utf-8') as f:
+            json.dump(self._versions, f, ensure_ascii=False, separators=(',', ':'))
+        temp_file.replace(self.state_file)
+    
+    def subscribe(self, callback: Callable[[Set[str], str], Any]):
+        """
+        Registrar suscriptor
+        
+        Args:
+            callback: Recibe (etiquetas, nombre del índice); puede devolver el
+                número de entradas purgadas
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+    
+    def dependents(self, index_name: str) -> Set[str]:
+        """Índices que dependen (transitivamente) de index_name"""
+        found: Set[str] = set()
+        pending = [index_name]
+        while pending:
+            current = pending.pop()
+            for name, deps in self.dependencies.items():
+                if current in deps and name not in found:
+                    found.add(name)
+                    pending.append(name)
+        return found
+    
+    def _fingerprint(self, index_name: str, raw: bytes) -> Dict[str, Any]:
+        """Hash del archivo, de cada sección y de cada lección"""
+        version = {"hash": hashlib.sha256(raw).hexdigest(), "sections": {}, "lessons": {}}
+        try:
+            data = json.loads(raw)
+        except ValueError:
+            return version
+        if not isinstance(data, dict):
+            return version
+        
+        lesson_section = LESSON_SECTIONS.get(index_name)
+        if lesson_section is not None:
+            lessons = data if lesson_section == "" else data.get(lesson_section, {})
+            if isinstance(lessons, dict):
+                version["lessons"] = {str(k): _digest(v) for k, v in lessons.items()}
+        
+        if lesson_section != "":
+            version["sections"] = {
+                section: _digest(value) for section, value in data.items()
+                if section != lesson_section
+            }
+        return version
+    
+    def _changed_tags(self, index_name: str, old: Dict[str, Any], new: Dict[str, Any]) -> Set[str]:
+        """Etiquetas afectadas por el paso de la versión old a new"""
+        tags = {index_tag(index_name)}
+        tags.update(index_tag(name) for name in self.dependents(index_name))
+        
+        old_lessons, new_lessons = old.get("lessons", {}), new.get("lessons", {})
+        for lesson in set(old_lessons) | set(new_lessons):
+            if old_lessons.get(lesson) != new_lessons.get(lesson):
+                tags.add(lesson_tag(lesson))
+        
+        old_sections, new_sections = old.get("sections", {}), new.get("sections", {})
+        for section in set(old_sections) | set(new_sections):
+            if old_sections.get(section) != new_sections.get(section):
+                tags.add(index_tag(index_name, section))
+        
+        return tags
+    
+    def check(self, index_names: Optional[Iterable[str]] = None) -> Dict[str, Set[str]]:
+        """
+        Comparar los índices con su última versión conocida y publicar los cambios
+        
+        La primera vez que se ve un índice solo se registra su versión.
+        
+        Args:
+            index_names: Índices a revisar (por defecto todos los *.json del directorio)
+        
+        Returns:
+            Dict[str, Set[str]]: Etiquetas publicadas por índice modificado
+        """
+        with self._lock:
+            self.checks += 1
+            if index_names is None:
+                paths = sorted(self.indices_dir.glob("*.json")) if self.indices_dir.exists() else []
+            else:
+                paths = [self.indices_dir / f"{name}.json" for name in index_names]
+            
+            changes: Dict[str, Set[str]] = {}
+            dirty = False
+            for path in paths:
+                index_name = path.stem
+                previous = self._versions.get(index_name)
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                
+                # Camino rápido: mismo tamaño y mtime que la última versión vista
+                stamp = [stat.st_size, stat.st_mtime_ns]
+                if previous is not None and previous.get("stamp") == stamp:
+                    continue
+                
+                version = self._fingerprint(index_name, path.read_bytes())
+                version["stamp"] = stamp
+                self._versions[index_name] = version
+                dirty = True
+                
+                if previous is None or previous.get("hash") == version["hash"]:
+                    continue
+                
+                changes[index_name] = self._changed_tags(index_name, previous, version)
+            
+            if dirty:
+                self._save_state()
+        
+        for index_name, tags in changes.items():
+            self.publish(tags, index_name)
+        return changes
+    
+    def notify_index_changed(self, index_name: str) -> Set[str]:
+        """Revisar un índice recién reescrito (llamar desde el proceso que lo escribe)"""
+        return self.check([index_name]).get(index_name, set())
+    
+    def publish(self, tags: Set[str], index_name: str = "") -> int:
+        """
+        Enviar etiquetas a los suscriptores
+        
+        Returns:
+            int: Entradas purgadas según lo informado por los suscriptores
+        """
+        self.changes_detected += 1
+        self.tags_published += len(tags)
+        self.logger.info(f"Índice modificado: {index_name or '?'} - {len(tags)} etiquetas a invalidar")
+        
+        purged = 0
+        for callback in list(self._subscribers):
+            try:
+                purged += callback(tags, index_name) or 0
+            except Exception as e:
+                self.logger.error(f"Error en suscriptor de invalidación: {e}")
+        self.entries_purged += purged
+        return purged
+    
+    def get_version(self, index_name: str) -> Optional[str]:
+        """Hash de contenido conocido para un índice"""
+        version = self._versions.get(index_name)
+        return version["hash"] if version else None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Métricas del bus"""
+        return {
+            "tracked_indices": len(self._versions),
+            "subscribers": len(self._subscribers),
+            "checks": self.checks,
+            "changes_detected": self.changes_detected,
+            "tags_published": self.tags_published,
+            "entries_purged": self.entries_purged
+        }
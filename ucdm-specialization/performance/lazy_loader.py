@@ -4,16 +4,20 @@ Lazy Index Loader - Sistema de carga perezosa con análisis de dependencias
 Optimiza la carga de índices basándose en patrones de uso y dependencias
 """
 
-import json
+import heapq
 import logging
 import threading
 from pathlib import Path
 from typing import Dict, List, Set, Optional, Callable, Any, Tuple
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
-from collections import defaultdict, deque
+from collections import defaultdict
+from concurrent.futures import Future, ThreadPoolExecutor
 import asyncio
 
+from .index_watcher import file_stamp
+from .index_registry import IndexRegistry, SharedIndex, get_index_registry
+
 @dataclass
 class LoadRequest:
     """Solicitud de carga de índice"""
@@ -23,6 +27,8 @@ class LoadRequest:
     requester: str
     callback: Optional[Callable] = None
     dependencies_resolved: bool = False
+    future: Optional[Future] = None
+    completion_claimed: bool = False
 
 @dataclass
 class LoadStats:
@@ -49,7 +55,8 @@ class LazyIndexLoader:
     """
     
     def __init__(self, indices_dir: str = "data/indices", 
-                 auto_preload: bool = True, dependency_analysis: bool = True):
+                 auto_preload: bool = True, dependency_analysis: bool = True,
+                 registry: Optional[IndexRegistry] = None, max_workers: int = 4):
         """
         Inicializar lazy loader
         
@@ -57,14 +64,26 @@ class LazyIndexLoader:
             indices_dir: Directorio de índices
             auto_preload: Pre-cargar índices críticos automáticamente
             dependency_analysis: Habilitar análisis de dependencias
+            registry: Registro compartido de índices (por defecto el del proceso para indices_dir)
+            max_workers: Hilos que leen y parsean archivos de índices en paralelo
         """
         self.indices_dir = Path(indices_dir)
         self.auto_preload = auto_preload
         self.dependency_analysis = dependency_analysis
         
+        # Los datos parseados viven en el registro compartido; aquí solo referencias
+        self.registry = registry or get_index_registry(indices_dir)
+        self._owner = self.registry.register_owner(self)
+        
         # Estado interno
         self._loaded_indices: Dict[str, Any] = {}
-        self._load_queue: deque[LoadRequest] = deque()
+        self._loaded_stamps: Dict[str, Optional[Tuple[int, int]]] = {}
+        # Cola de prioridades: (-prioridad, orden de llegada, solicitud)
+        self._load_queue: List[Tuple[int, int, LoadRequest]] = []
+        self._queue_seq = 0
+        self._inflight: Dict[str, Future] = {}
+        self.max_workers = max_workers
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="index-load")
         self._dependency_graph: Dict[str, Set[str]] = defaultdict(set)
         self._reverse_dependencies: Dict[str, Set[str]] = defaultdict(set)
         self._load_stats: Dict[str, LoadStats] = {}
@@ -75,6 +94,9 @@ class LazyIndexLoader:
         self._preload_threshold = 5  # Cargar automáticamente si se usa >5 veces/hora
         self._dependency_depth_limit = 3  # Máximo nivel de dependencias a resolver
         
+        # Métricas de recarga en caliente
+        self.hot_reloads = 0
+        
         # Logging
         self.logger = self._setup_logging()
         
@@ -162,18 +184,19 @@ class LazyIndexLoader:
         """Pre-cargar índices críticos automáticamente"""
         critical_indices = ['ucdm_comprehensive_index', 'lesson_mapper', 'concepts_index']
         
-        for index_name in critical_indices:
-            if index_name in self._load_stats:
-                try:
-                    self._load_index_sync(index_name, preload=True)
-                except Exception as e:
-                    self.logger.warning(f"Error pre-cargando {index_name}: {e}")
+        try:
+            self.load_many([name for name in critical_indices if name in self._load_stats], preload=True)
+        except Exception as e:
+            self.logger.warning(f"Error pre-cargando índices críticos: {e}")
     
     async def load_index_async(self, index_name: str, requester: str = "default",
                               callback: Optional[Callable] = None) -> Optional[Any]:
         """
         Cargar índice de forma asíncrona
         
+        La lectura y el parseo se hacen en el pool de hilos; el event loop solo
+        espera. Las solicitudes pendientes se despachan por prioridad.
+        
         Args:
             index_name: Nombre del índice
             requester: Identificador del solicitante
@@ -191,17 +214,31 @@ class LazyIndexLoader:
             # Crear solicitud de carga
             request = LoadRequest(
                 index_name=index_name,
-                priority=self._calculate_load_priority(index_name),
+                priority=self._calculate_load_priority(index_name) if index_name in self._load_stats else 0,
                 requested_at=datetime.now(),
                 requester=requester,
-                callback=callback
+                callback=callback,
+                future=Future()
             )
             
             # Agregar a cola de carga
             self._add_to_load_queue(request)
-            
-            # Procesar cola
-            return await self._process_load_queue()
+        
+        # Procesar cola
+        self._process_load_queue()
+        data = await asyncio.wrap_future(request.future)
+        
+        # Ejecutar callback si existe
+        if request.callback:
+            try:
+                if asyncio.iscoroutinefunction(request.callback):
+                    await request.callback(request.index_name, data)
+                else:
+                    request.callback(request.index_name, data)
+            except Exception as e:
+                self.logger.warning(f"Error en callback para {request.index_name}: {e}")
+        
+        return data
     
     def load_index_sync(self, index_name: str, requester: str = "default") -> Optional[Any]:
         """Cargar índice de forma síncrona"""
@@ -217,42 +254,135 @@ class LazyIndexLoader:
         )
     
     def _load_index_sync(self, index_name: str, preload: bool = False) -> Optional[Any]:
-        """Carga síncrona interna"""
+        """Carga síncrona interna (con sus dependencias)"""
         if index_name in self._loaded_indices and not preload:
             return self._loaded_indices[index_name]
         
-        start_time = datetime.now()
+        return self.load_many([index_name], preload=preload).get(index_name)
+    
+    def _dependency_levels(self, index_names: List[str]) -> List[List[str]]:
+        """
+        Orden topológico por niveles de los índices pedidos y sus dependencias
         
-        try:
-            # Resolver dependencias primero
+        Nivel 0 = sin dependencias; cada índice queda en un nivel posterior al
+        de todas sus dependencias. Dentro de un nivel, mayor prioridad primero.
+        """
+        closure: List[str] = []
+        for index_name in index_names:
             if self.dependency_analysis:
-                dependencies = self._get_dependencies(index_name)
-                for dep in dependencies:
-                    if dep not in self._loaded_indices:
-                        self._load_index_sync(dep, preload=False)
-            
-            # Cargar archivo
-            index_file = self.indices_dir / f"{index_name}.json"
-            if not index_file.exists():
-                self.logger.warning(f"Archivo de índice no encontrado: {index_file}")
-                return None
-            
-            with open(index_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Almacenar en memoria
-            self._loaded_indices[index_name] = data
-            
-            # Actualizar estadísticas
-            load_time = (datetime.now() - start_time).total_seconds() * 1000
+                closure.extend(dep for dep in self._get_dependencies(index_name) if dep not in closure)
+            if index_name not in closure:
+                closure.append(index_name)
+        
+        levels: Dict[str, int] = {}
+        
+        def level_of(name: str, path: Set[str]) -> int:
+            if name not in levels:
+                deps = [
+                    dep for dep in self._dependency_graph.get(name, set())
+                    if dep in closure and dep not in path
+                ] if self.dependency_analysis else []
+                levels[name] = 1 + max((level_of(dep, path | {name}) for dep in deps), default=-1)
+            return levels[name]
+        
+        grouped: Dict[int, List[str]] = defaultdict(list)
+        for name in closure:
+            grouped[level_of(name, set())].append(name)
+        
+        return [
+            sorted(grouped[level], key=lambda name: -self._calculate_load_priority(name)
+                   if name in self._load_stats else 0)
+            for level in sorted(grouped)
+        ]
+    
+    def _fetch(self, index_name: str) -> Tuple[Optional[SharedIndex], float]:
+        """Leer y parsear un índice (en un hilo del pool)"""
+        start_time = datetime.now()
+        index_file = self.indices_dir / f"{index_name}.json"
+        if not index_file.exists():
+            self.logger.warning(f"Archivo de índice no encontrado: {index_file}")
+            return None, 0.0
+        
+        shared = self.registry.acquire(index_name, self._owner)
+        return shared, (datetime.now() - start_time).total_seconds() * 1000
+    
+    def _start_loads(self, index_names: List[str]) -> Tuple[List[List[str]], Dict[str, Future]]:
+        """
+        Lanzar en el pool la lectura de los índices y sus dependencias
+        
+        Los archivos no dependen entre sí para parsearse, así que todos los
+        niveles se lanzan a la vez; las cargas ya en curso se reutilizan.
+        """
+        levels = self._dependency_levels(index_names)
+        futures: Dict[str, Future] = {}
+        with self._lock:
+            for level in levels:
+                for name in level:
+                    if name in self._loaded_indices:
+                        continue
+                    future = self._inflight.get(name)
+                    if future is None:
+                        future = self._inflight[name] = self._executor.submit(self._fetch, name)
+                        future.add_done_callback(lambda _, name=name: self._inflight.pop(name, None))
+                    futures[name] = future
+        return levels, futures
+    
+    def _install(self, index_name: str, fetched: Tuple[Optional[SharedIndex], float], preload: bool):
+        """Publicar un índice leído; se llama en orden topológico"""
+        shared, load_time = fetched
+        if shared is None:
+            return
+        
+        with self._lock:
+            if index_name in self._loaded_indices and self._loaded_stamps.get(index_name) == shared.stamp:
+                return
+            # Referencia a la copia compartida
+            self._loaded_indices[index_name] = shared.data
+            self._loaded_stamps[index_name] = shared.stamp
             self._update_load_stats(index_name, load_time, preload)
+        
+        self.logger.debug(f"Índice {'pre-' if preload else ''}cargado: {index_name} ({load_time:.1f}ms)")
+    
+    def load_many(self, index_names: List[str], preload: bool = False) -> Dict[str, Optional[Any]]:
+        """
+        Cargar varios índices y sus dependencias en paralelo
+        
+        Las lecturas corren a la vez en el pool; cada índice se publica después
+        de sus dependencias, así que un lector nunca ve un dependiente cargado
+        sin las suyas.
+        
+        Args:
+            index_names: Índices a cargar
+            preload: Es una pre-carga (no cuenta en estadísticas de uso)
             
-            self.logger.debug(f"Índice {'pre-' if preload else ''}cargado: {index_name} ({load_time:.1f}ms)")
-            return data
-            
-        except Exception as e:
-            self.logger.error(f"Error cargando índice {index_name}: {e}")
-            return None
+        Returns:
+            Dict[str, Optional[Any]]: Datos por índice pedido (None si no se pudo cargar)
+        """
+        levels, futures = self._start_loads(index_names)
+        for level in levels:
+            for name in level:
+                if name in futures:
+                    try:
+                        self._install(name, futures[name].result(), preload)
+                    except Exception as e:
+                        self.logger.error(f"Error cargando índice {name}: {e}")
+        
+        with self._lock:
+            return {name: self._loaded_indices.get(name) for name in index_names}
+    
+    async def load_many_async(self, index_names: List[str], preload: bool = False) -> Dict[str, Optional[Any]]:
+        """Versión asíncrona de load_many: el event loop no se bloquea esperando lecturas"""
+        levels, futures = self._start_loads(index_names)
+        for level in levels:
+            for name in level:
+                if name in futures:
+                    try:
+                        self._install(name, await asyncio.wrap_future(futures[name]), preload)
+                    except Exception as e:
+                        self.logger.error(f"Error cargando índice {name}: {e}")
+        
+        with self._lock:
+            return {name: self._loaded_indices.get(name) for name in index_names}
     
     def _calculate_load_priority(self, index_name: str) -> int:
         """Calcular prioridad de carga"""
@@ -268,40 +398,62 @@ class LazyIndexLoader:
         return base_priority + frequency_bonus + dependents_bonus
     
     def _add_to_load_queue(self, request: LoadRequest):
-        """Agregar solicitud a cola ordenada por prioridad"""
-        # Insertar manteniendo orden de prioridad (mayor prioridad primero)
-        inserted = False
-        for i, existing_request in enumerate(self._load_queue):
-            if request.priority > existing_request.priority:
-                self._load_queue.insert(i, request)
-                inserted = True
-                break
-        
-        if not inserted:
-            self._load_queue.append(request)
+        """Agregar solicitud a la cola de prioridades (mayor prioridad primero, FIFO en empate)"""
+        self._queue_seq += 1
+        heapq.heappush(self._load_queue, (-request.priority, self._queue_seq, request))
     
-    async def _process_load_queue(self) -> Optional[Any]:
-        """Procesar cola de carga de forma asíncrona"""
-        if not self._load_queue:
-            return None
-        
-        # Procesar solicitud de mayor prioridad
-        request = self._load_queue.popleft()
-        
-        # Cargar índice
-        data = self._load_index_sync(request.index_name)
+    def _process_load_queue(self) -> List[LoadRequest]:
+        """
+        Despachar al pool las solicitudes pendientes en orden de prioridad
         
-        # Ejecutar callback si existe
-        if request.callback:
-            try:
-                if asyncio.iscoroutinefunction(request.callback):
-                    await request.callback(request.index_name, data)
-                else:
-                    request.callback(request.index_name, data)
-            except Exception as e:
-                self.logger.warning(f"Error en callback para {request.index_name}: {e}")
+        Cada solicitud recibe un future que se resuelve con sus datos una vez
+        publicados el índice y sus dependencias.
         
-        return data
+        Returns:
+            List[LoadRequest]: Solicitudes despachadas
+        """
+        dispatched = []
+        with self._lock:
+            while self._load_queue:
+                _, _, request = heapq.heappop(self._load_queue)
+                if request.future is None:
+                    request.future = Future()
+                dispatched.append(request)
+        
+        for request in dispatched:
+            levels, futures = self._start_loads([request.index_name])
+            self._complete_when_loaded(request, levels, futures)
+        return dispatched
+    
+    def _complete_when_loaded(self, request: LoadRequest, levels: List[List[str]], futures: Dict[str, Future]):
+        """Publicar en orden topológico y resolver el future de la solicitud cuando terminen sus lecturas"""
+        pending = list(futures.values())
+        
+        def finish(_=None):
+            if any(not future.done() for future in pending):
+                return
+            # Varias lecturas pueden terminar a la vez: solo un hilo publica y resuelve
+            with self._lock:
+                if request.completion_claimed:
+                    return
+                request.completion_claimed = True
+            for level in levels:
+                for name in level:
+                    if name in futures:
+                        try:
+                            self._install(name, futures[name].result(), preload=False)
+                        except Exception as e:
+                            self.logger.error(f"Error cargando índice {name}: {e}")
+            request.dependencies_resolved = True
+            with self._lock:
+                data = self._loaded_indices.get(request.index_name)
+            if request.future.set_running_or_notify_cancel():  # False si el solicitante canceló
+                request.future.set_result(data)
+        
+        if not pending:
+            finish()
+        for future in pending:
+            future.add_done_callback(finish)
     
     def _get_dependencies(self, index_name: str, visited: Optional[Set[str]] = None) -> List[str]:
         """Obtener lista de dependencias en orden de carga"""
@@ -328,6 +480,79 @@ class LazyIndexLoader:
         
         return dependencies
     
+    def _dependents_of(self, index_name: str) -> Set[str]:
+        """Índices que dependen (transitivamente) de index_name"""
+        found: Set[str] = set()
+        pending = [index_name]
+        while pending:
+            for name in self._reverse_dependencies.get(pending.pop(), set()):
+                if name not in found:
+                    found.add(name)
+                    pending.append(name)
+        return found
+    
+    def hot_reload(self, index_names: List[str]) -> List[str]:
+        """
+        Recargar en caliente índices reescritos en disco
+        
+        Se revalidan los índices modificados y sus dependientes cargados; los
+        que cambiaron se reparsean fuera del lock y se sustituyen de forma
+        atómica. Los no cargados se cargarán frescos en su próximo uso.
+        
+        Args:
+            index_names: Índices modificados en disco
+            
+        Returns:
+            List[str]: Índices recargados
+        """
+        with self._lock:
+            # Índices nuevos en el directorio
+            new_indices = [
+                name for name in index_names
+                if name not in self._load_stats and (self.indices_dir / f"{name}.json").exists()
+            ]
+            for index_name in new_indices:
+                self._load_stats[index_name] = LoadStats(
+                    index_name=index_name,
+                    dependency_level=self._calculate_dependency_level(index_name)
+                )
+            if new_indices and self.dependency_analysis:
+                self._build_dependency_graph()
+            
+            affected = set(index_names)
+            for index_name in index_names:
+                affected |= self._dependents_of(index_name)
+            
+            stale = [
+                name for name in affected
+                if name in self._loaded_indices
+                and self._loaded_stamps.get(name) != file_stamp(self.indices_dir / f"{name}.json")
+            ]
+        
+        # Parsear fuera del lock (una vez en el registro para todos los componentes);
+        # un archivo a medio escribir se omite y se conserva la versión anterior
+        start_time = datetime.now()
+        fresh = self.registry.refresh(stale)
+        for index_name in fresh:
+            self._update_load_stats(index_name, (datetime.now() - start_time).total_seconds() * 1000, preload=True)
+        
+        reloaded = []
+        with self._lock:
+            for index_name, shared in fresh.items():
+                if shared is None:
+                    self._loaded_indices.pop(index_name, None)
+                    self._loaded_stamps.pop(index_name, None)
+                    self.registry.release(index_name, self._owner)
+                    continue
+                self._loaded_indices[index_name] = shared.data
+                self._loaded_stamps[index_name] = shared.stamp
+                reloaded.append(index_name)
+            self.hot_reloads += len(reloaded)
+        
+        if reloaded:
+            self.logger.info(f"Índices recargados en caliente: {', '.join(sorted(reloaded))}")
+        return reloaded
+    
     def _record_access(self, index_name: str, requester: str):
         """Registrar acceso para análisis de patrones"""
         now = datetime.now()
@@ -428,6 +653,8 @@ class LazyIndexLoader:
             # Descargar índices
             for index_name in indices_to_unload:
                 del self._loaded_indices[index_name]
+                self._loaded_stamps.pop(index_name, None)
+                self.registry.release(index_name, self._owner)
                 unloaded.append(index_name)
         
         if unloaded:
@@ -459,7 +686,8 @@ class LazyIndexLoader:
                     "indices_available": total_available,
                     "load_efficiency": round(total_loaded / total_available, 2) if total_available > 0 else 0,
                     "avg_load_time_ms": round(avg_load_time, 2),
-                    "total_loads": total_loads
+                    "total_loads": total_loads,
+                    "hot_reloads": self.hot_reloads
                 },
                 "most_used_indices": [
                     {
@@ -470,11 +698,18 @@ class LazyIndexLoader:
                     }
                     for name, stats in most_used
                 ],
+                "shared_registry": self.registry.get_stats(),
                 "dependency_graph_size": len(self._dependency_graph),
                 "queue_size": len(self._load_queue),
+                "in_flight_loads": len(self._inflight),
+                "load_workers": self.max_workers,
                 "preload_candidates": self.predict_preload_candidates()
             }
     
+    def shutdown(self, wait: bool = True):
+        """Detener el pool de lectura de índices"""
+        self._executor.shutdown(wait=wait)
+    
     def is_loaded(self, index_name: str) -> bool:
         """Verificar si un índice está cargado"""
         return index_name in self._loaded_indices
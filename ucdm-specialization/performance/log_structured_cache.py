@@ -0,0 +1,897 @@
+#!/usr/bin/env python3
+"""
+Log-Structured Disk Cache (L2) - Cache en disco con segmentos append-only
+Cada put es un único append secuencial; el índice de offsets vive en memoria
+y se reconstruye desde los footers de los segmentos al arrancar
+"""
+
+import os
+import gzip
+import json
+import zlib
+import pickle
+import struct
+import logging
+import threading
+from pathlib import Path
+from collections import OrderedDict
+from typing import Any, Optional, Dict, Iterable, List, Set, Tuple
+from datetime import datetime, timedelta
+from dataclasses import dataclass, field
+
+from .expiry_scheduler import ExpiryHeap
+from .async_cache import AsyncCacheMixin
+
+# Registro: magic, flags, len(clave), len(payload), created_at, expires_at (0 = sin TTL)
+RECORD_MAGIC = b"UCR1"
+RECORD_PREFIX = struct.Struct("<4sBHIdd")
+RECORD_CRC = struct.Struct("<I")
+RECORD_HEADER_SIZE = RECORD_PREFIX.size + RECORD_CRC.size
+
+# Con FLAG_META, entre la clave y el payload va un bloque JSON de metadatos precedido de su longitud
+RECORD_META_LEN = struct.Struct("<I")
+
+# Trailer de segmento sellado: magic, offset del footer, crc32 del footer
+FOOTER_MAGIC = b"UCF1"
+SEGMENT_TRAILER = struct.Struct("<4sQI")
+
+FLAG_COMPRESSED = 0x01
+FLAG_TOMBSTONE = 0x02
+FLAG_META = 0x04
+
+SEGMENT_PREFIX = "segment_"
+SEGMENT_SUFFIX = ".log"
+
+@dataclass
+class LogEntry:
+    """Posición de un registro vivo dentro de los segmentos"""
+    key: str
+    segment_id: int
+    offset: int
+    record_bytes: int
+    size_bytes: int
+    compressed: bool
+    created_at: datetime
+    expires_at: Optional[datetime]
+    last_accessed: datetime
+    access_count: int = 0
+    tags: List[str] = field(default_factory=list)
+    soft_expires_at: Optional[datetime] = None
+    
+    def is_expired(self) -> bool:
+        """Verificar si la entrada ha expirado"""
+        if self.expires_at is None:
+            return False
+        return datetime.now() > self.expires_at
+    
+    def is_stale(self) -> bool:
+        """Pasó el TTL blando: se sirve, pero conviene regenerarla"""
+        if self.soft_expires_at is None:
+            return False
+        return datetime.now() > self.soft_expires_at
+
+class LogStructuredDiskCache(AsyncCacheMixin):
+    """
+    Cache en disco L2 sobre segmentos append-only
+    
+    Características:
+    - Un put = un append secuencial (cabecera + checksum + payload)
+    - Borrados y expulsiones se registran como tombstones
+    - Etiquetas de invalidación y TTL blando guardados en el propio registro,
+      con un índice etiqueta -> claves en memoria
+    - Al llenarse, el segmento se sella con un footer que lista sus registros
+    - Arranque rápido leyendo footers; el segmento activo se escanea y se
+      trunca en el primer registro incompleto o corrupto (recuperación ante caídas)
+    - Compactación incremental de segmentos con muchos registros muertos
+    - Misma interfaz pública que DiskCache (incluida la asíncrona)
+    - Thread-safe
+    """
+    
+    def __init__(self, cache_dir: str = "data/cache", max_size_gb: int = 2,
+                 default_ttl_hours: int = 24, compression_threshold_kb: int = 1,
+                 max_segment_mb: float = 32, compaction_threshold: float = 0.5,
+                 sync_writes: bool = False, compress: bool = True):
+        """
+        Inicializar cache log-structured
+        
+        Args:
+            cache_dir: Directorio base para cache
+            max_size_gb: Tamaño máximo de datos vivos en gigabytes
+            default_ttl_hours: TTL por defecto en horas
+            compression_threshold_kb: Umbral para compresión en KB
+            max_segment_mb: Tamaño a partir del cual se sella el segmento activo
+            compaction_threshold: Fracción de bytes muertos que dispara compactación
+            sync_writes: fsync tras cada append (más durable, más lento)
+            compress: Comprimir registros nuevos (False = guardar siempre sin comprimir)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.segments_dir = self.cache_dir / "segments"
+        self.max_size_bytes = max_size_gb * 1024 * 1024 * 1024
+        self.default_ttl = timedelta(hours=default_ttl_hours)
+        self.compression_threshold = compression_threshold_kb * 1024
+        self.compress = compress
+        self.max_segment_bytes = max_segment_mb * 1024 * 1024
+        self.compaction_threshold = compaction_threshold
+        self.sync_writes = sync_writes
+        
+        # Estado interno (el índice mantiene orden de acceso: primero el menos reciente)
+        self._index: "OrderedDict[str, LogEntry]" = OrderedDict()
+        self._expiry = ExpiryHeap()
+        self._tag_index: Dict[str, Set[str]] = {}
+        self._lock = threading.RLock()
+        self.current_size_bytes = 0
+        
+        # Segmentos: bytes escritos y bytes vivos por segmento
+        self._segment_bytes: Dict[int, int] = {}
+        self._segment_live: Dict[int, int] = {}
+        self._readers: Dict[int, Any] = {}
+        self._active_id = 0
+        self._active_file = None
+        self._active_size = 0
+        self._active_records: List[list] = []
+        
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.deletes = 0
+        self.compressions = 0
+        self.stale_hits = 0
+        self.compactions = 0
+        self.bytes_reclaimed = 0
+        self.recovered_truncations = 0
+        self.created_at = datetime.now()
+        
+        # Logging
+        self.logger = self._setup_logging()
+        
+        # Inicialización
+        self._initialize_cache_dir()
+        self._recover()
+        
+        self.logger.info(
+            f"LogStructuredDiskCache inicializado - Dir: {cache_dir}, "
+            f"{len(self._segment_bytes)} segmentos, {len(self._index)} entradas"
+        )
+    
+    def _setup_logging(self) -> logging.Logger:
+        """Configurar logging específico"""
+        logger = logging.getLogger(f"{__name__}.LogStructuredDiskCache")
+        logger.setLevel(logging.INFO)
+        
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            )
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        
+        return logger
+    
+    def _initialize_cache_dir(self):
+        """Crear estructura de directorios"""
+        try:
+            self.segments_dir.mkdir(parents=True, exist_ok=True)
+        except Exception as e:
+            self.logger.error(f"Error creando directorio de cache: {e}")
+            raise
+    
+    def _segment_path(self, segment_id: int) -> Path:
+        return self.segments_dir / f"{SEGMENT_PREFIX}{segment_id:06d}{SEGMENT_SUFFIX}"
+    
+    def _recover(self):
+        """Reconstruir índice desde footers (o escaneo) de todos los segmentos"""
+        segment_ids = sorted(
+            int(path.stem[len(SEGMENT_PREFIX):])
+            for path in self.segments_dir.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}")
+        )
+        
+        for position, segment_id in enumerate(segment_ids):
+            records = self._read_footer(segment_id)
+            sealed = records is not None
+            if not sealed:
+                records = self._scan_segment(segment_id)
+            
+            self._segment_bytes[segment_id] = 0
+            self._segment_live[segment_id] = 0
+            for record in records:
+                self._apply_record(segment_id, *record)
+            
+            if not sealed:
+                # El último segmento sin sellar sigue siendo el activo; los anteriores se sellan
+                self._open_active(segment_id, records)
+                if position < len(segment_ids) - 1:
+                    self._seal_active()
+        
+        if self._active_file is None:
+            self._open_active((segment_ids[-1] + 1) if segment_ids else 1)
+        
+        if self.recovered_truncations:
+            self.logger.warning(f"Recuperación: {self.recovered_truncations} segmentos truncados")
+    
+    def _read_footer(self, segment_id: int) -> Optional[List[list]]:
+        """Leer footer de un segmento sellado (None si no está sellado o es inválido)"""
+        path = self._segment_path(segment_id)
+        try:
+            file_size = path.stat().st_size
+            if file_size < SEGMENT_TRAILER.size:
+                return None
+            
+            with open(path, 'rb') as f:
+                f.seek(file_size - SEGMENT_TRAILER.size)
+                magic, footer_offset, footer_crc = SEGMENT_TRAILER.unpack(f.read(SEGMENT_TRAILER.size))
+                if magic != FOOTER_MAGIC or footer_offset > file_size - SEGMENT_TRAILER.size:
+                    return None
+                
+                f.seek(footer_offset)
+                footer = f.read(file_size - SEGMENT_TRAILER.size - footer_offset)
+            
+            if zlib.crc32(footer) != footer_crc:
+                return None
+            return json.loads(footer.decode('utf-8'))
+        
+        except Exception as e:
+            self.logger.warning(f"Footer inválido en segmento {segment_id}: {e}")
+            return None
+    
+    def _scan_segment(self, segment_id: int) -> List[list]:
+        """
+        Escanear registros de un segmento sin sellar
+        
+        Trunca el archivo en el primer registro incompleto o con checksum inválido.
+        """
+        path = self._segment_path(segment_id)
+        records = []
+        offset = 0
+        
+        with open(path, 'r+b') as f:
+            file_size = path.stat().st_size
+            
+            while offset + RECORD_HEADER_SIZE <= file_size:
+                header = f.read(RECORD_HEADER_SIZE)
+                magic, flags, key_len, payload_len, created_ts, expires_ts = RECORD_PREFIX.unpack(
+                    header[:RECORD_PREFIX.size]
+                )
+                if magic != RECORD_MAGIC:
+                    break
+                
+                body = f.read(key_len)
+                meta = b""
+                if flags & FLAG_META:
+                    meta = f.read(RECORD_META_LEN.size)
+                    if len(meta) < RECORD_META_LEN.size:
+                        break
+                    meta_len = RECORD_META_LEN.size + RECORD_META_LEN.unpack(meta)[0]
+                    meta += f.read(meta_len - RECORD_META_LEN.size)
+                    if len(meta) < meta_len:
+                        break
+                body += meta + f.read(payload_len)
+                if len(body) < key_len + len(meta) + payload_len:
+                    break
+                
+                (stored_crc,) = RECORD_CRC.unpack(header[RECORD_PREFIX.size:])
+                if zlib.crc32(body, zlib.crc32(header[:RECORD_PREFIX.size])) != stored_crc:
+                    break
+                
+                record_bytes = RECORD_HEADER_SIZE + len(body)
+                key = body[:key_len].decode('utf-8')
+                records.append([key, offset, record_bytes, payload_len, flags, created_ts, expires_ts,
+                                *self._decode_meta(meta)])
+                offset += record_bytes
+            
+            if offset < file_size:
+                f.truncate(offset)
+                self.recovered_truncations += 1
+                self.logger.warning(
+                    f"Segmento {segment_id}: descartados {file_size - offset} bytes tras el último registro válido"
+                )
+        
+        return records
+    
+    def _encode_meta(self, tags: List[str], soft_expires_ts: float) -> bytes:
+        """Bloque de metadatos de un registro (vacío si no hay nada que guardar)"""
+        if not tags and not soft_expires_ts:
+            return b""
+        blob = json.dumps({"tags": tags, "soft": soft_expires_ts}, separators=(',', ':')).encode('utf-8')
+        return RECORD_META_LEN.pack(len(blob)) + blob
+    
+    def _decode_meta(self, meta: bytes) -> List[Any]:
+        """Campos extra del footer a partir del bloque de metadatos: [tags, soft_expires_ts]"""
+        if not meta:
+            return [[], 0.0]
+        data = json.loads(meta[RECORD_META_LEN.size:].decode('utf-8'))
+        return [data.get("tags", []), data.get("soft", 0.0)]
+    
+    def _apply_record(self, segment_id: int, key: str, offset: int, record_bytes: int,
+                      payload_bytes: int, flags: int, created_ts: float, expires_ts: float,
+                      tags: Optional[List[str]] = None, soft_expires_ts: float = 0.0):
+        """Aplicar un registro (put o tombstone) al índice en memoria"""
+        self._segment_bytes[segment_id] = self._segment_bytes.get(segment_id, 0) + record_bytes
+        self._segment_live.setdefault(segment_id, 0)
+        
+        previous = self._index.pop(key, None)
+        if previous is not None:
+            self._segment_live[previous.segment_id] -= previous.record_bytes
+            self.current_size_bytes -= previous.size_bytes
+            self._expiry.cancel(key)
+            self._untag(previous)
+        
+        if flags & FLAG_TOMBSTONE:
+            return
+        
+        created_at = datetime.fromtimestamp(created_ts)
+        expires_at = datetime.fromtimestamp(expires_ts) if expires_ts else None
+        self._index[key] = LogEntry(
+            key=key,
+            segment_id=segment_id,
+            offset=offset,
+            record_bytes=record_bytes,
+            size_bytes=payload_bytes,
+            compressed=bool(flags & FLAG_COMPRESSED),
+            created_at=created_at,
+            expires_at=expires_at,
+            last_accessed=created_at,
+            tags=list(tags or []),
+            soft_expires_at=datetime.fromtimestamp(soft_expires_ts) if soft_expires_ts else None
+        )
+        self._segment_live[segment_id] += record_bytes
+        self.current_size_bytes += payload_bytes
+        self._expiry.schedule(key, expires_at)
+        for tag in self._index[key].tags:
+            self._tag_index.setdefault(tag, set()).add(key)
+    
+    def _untag(self, entry: LogEntry):
+        """Quitar una entrada del índice de etiquetas"""
+        for tag in entry.tags:
+            keys = self._tag_index.get(tag)
+            if keys is not None:
+                keys.discard(entry.key)
+                if not keys:
+                    del self._tag_index[tag]
+    
+    def _open_active(self, segment_id: int, records: Optional[List[list]] = None):
+        """Abrir segmento activo para append"""
+        path = self._segment_path(segment_id)
+        self._active_id = segment_id
+        self._active_file = open(path, 'ab')
+        self._active_size = path.stat().st_size
+        self._active_records = list(records or [])
+        self._segment_bytes.setdefault(segment_id, 0)
+        self._segment_live.setdefault(segment_id, 0)
+    
+    def _seal_active(self):
+        """Escribir footer + trailer en el segmento activo y cerrarlo"""
+        footer = json.dumps(self._active_records, separators=(',', ':')).encode('utf-8')
+        trailer = SEGMENT_TRAILER.pack(FOOTER_MAGIC, self._active_size, zlib.crc32(footer))
+        
+        self._active_file.write(footer + trailer)
+        self._sync_active(force=True)
+        self._active_file.close()
+        self._active_file = None
+        self._active_records = []
+    
+    def _rotate(self):
+        """Sellar el segmento activo y abrir uno nuevo"""
+        next_id = self._active_id + 1
+        self._seal_active()
+        self._open_active(next_id)
+        self.logger.debug(f"Segmento {next_id - 1} sellado, nuevo segmento activo {next_id}")
+    
+    def _sync_active(self, force: bool = False):
+        """Vaciar buffers del segmento activo (fsync si se pide durabilidad)"""
+        self._active_file.flush()
+        if force or self.sync_writes:
+            os.fsync(self._active_file.fileno())
+    
+    def _append(self, key: str, flags: int, payload: bytes, created_ts: float, expires_ts: float,
+                tags: Optional[List[str]] = None, soft_expires_ts: float = 0.0) -> Tuple[int, int, int]:
+        """
+        Añadir un registro al segmento activo
+        
+        Returns:
+            Tuple[int, int, int]: (segmento, offset, bytes del registro)
+        """
+        key_bytes = key.encode('utf-8')
+        meta = self._encode_meta(tags or [], soft_expires_ts)
+        flags = flags | FLAG_META if meta else flags & ~FLAG_META
+        prefix = RECORD_PREFIX.pack(RECORD_MAGIC, flags, len(key_bytes), len(payload), created_ts, expires_ts)
+        body = key_bytes + meta + payload
+        crc = zlib.crc32(body, zlib.crc32(prefix))
+        record = prefix + RECORD_CRC.pack(crc) + body
+        
+        segment_id = self._active_id
+        offset = self._active_size
+        self._active_file.write(record)
+        self._sync_active()
+        self._active_size += len(record)
+        self._active_records.append([key, offset, len(record), len(payload), flags, created_ts, expires_ts,
+                                     list(tags or []), soft_expires_ts])
+        
+        if self._active_size >= self.max_segment_bytes:
+            self._rotate()
+        
+        return segment_id, offset, len(record)
+    
+    def _reader(self, segment_id: int):
+        """Handle de lectura (cacheado) para un segmento"""
+        reader = self._readers.get(segment_id)
+        if reader is None:
+            reader = open(self._segment_path(segment_id), 'rb')
+            self._readers[segment_id] = reader
+        return reader
+    
+    def _read_payload(self, entry: LogEntry) -> bytes:
+        """Leer y verificar el payload de un registro"""
+        reader = self._reader(entry.segment_id)
+        reader.seek(entry.offset)
+        record = reader.read(entry.record_bytes)
+        
+        if len(record) != entry.record_bytes or record[:4] != RECORD_MAGIC:
+            raise IOError(f"Registro truncado en segmento {entry.segment_id}")
+        
+        prefix = record[:RECORD_PREFIX.size]
+        (stored_crc,) = RECORD_CRC.unpack(record[RECORD_PREFIX.size:RECORD_HEADER_SIZE])
+        if zlib.crc32(record[RECORD_HEADER_SIZE:], zlib.crc32(prefix)) != stored_crc:
+            raise IOError(f"Checksum inválido para {entry.key}")
+        
+        return record[-entry.size_bytes:] if entry.size_bytes else b""
+    
+    def _drop_segment(self, segment_id: int):
+        """Eliminar un segmento del disco y del estado"""
+        reader = self._readers.pop(segment_id, None)
+        if reader is not None:
+            reader.close()
+        try:
+            self._segment_path(segment_id).unlink()
+        except FileNotFoundError:
+            pass
+        self._segment_bytes.pop(segment_id, None)
+        self._segment_live.pop(segment_id, None)
+    
+    def _dead_ratio(self, segment_id: int) -> float:
+        total = self._segment_bytes.get(segment_id, 0)
+        if total == 0:
+            return 1.0
+        return 1.0 - self._segment_live.get(segment_id, 0) / total
+    
+    def _compaction_candidates(self) -> List[int]:
+        """Segmentos sellados con suficientes bytes muertos, del más muerto al menos"""
+        candidates = [
+            segment_id for segment_id in self._segment_bytes
+            if segment_id != self._active_id and self._dead_ratio(segment_id) >= self.compaction_threshold
+        ]
+        candidates.sort(key=self._dead_ratio, reverse=True)
+        return candidates
+    
+    def compact_segment(self, segment_id: int) -> int:
+        """
+        Reescribir los registros vivos de un segmento sellado en el activo y borrarlo
+        
+        Args:
+            segment_id: Segmento a compactar
+        
+        Returns:
+            int: Bytes recuperados en disco
+        """
+        with self._lock:
+            if segment_id == self._active_id or segment_id not in self._segment_bytes:
+                return 0
+            
+            segment_size = self._segment_path(segment_id).stat().st_size
+            live_entries = [entry for entry in self._index.values() if entry.segment_id == segment_id]
+            
+            # Tombstones solo importan si quedan segmentos más antiguos con la clave
+            tombstones = []
+            if any(other < segment_id for other in self._segment_bytes):
+                for record in self._read_footer(segment_id) or []:
+                    if record[4] & FLAG_TOMBSTONE and record[0] not in self._index:
+                        tombstones.append(record)
+            
+            rewritten = 0
+            for entry in live_entries:
+                payload = self._read_payload(entry)
+                flags = FLAG_COMPRESSED if entry.compressed else 0
+                expires_ts = entry.expires_at.timestamp() if entry.expires_at else 0.0
+                soft_expires_ts = entry.soft_expires_at.timestamp() if entry.soft_expires_at else 0.0
+                new_segment, offset, record_bytes = self._append(
+                    entry.key, flags, payload, entry.created_at.timestamp(), expires_ts,
+                    entry.tags, soft_expires_ts
+                )
+                self._segment_live[segment_id] -= entry.record_bytes
+                self._segment_bytes[new_segment] = self._segment_bytes.get(new_segment, 0) + record_bytes
+                self._segment_live[new_segment] = self._segment_live.get(new_segment, 0) + record_bytes
+                entry.segment_id = new_segment
+                entry.offset = offset
+                entry.record_bytes = record_bytes
+                rewritten += record_bytes
+            
+            for key, _, _, _, flags, created_ts, expires_ts, *_ in tombstones:
+                new_segment, _, record_bytes = self._append(key, flags, b"", created_ts, expires_ts)
+                self._segment_bytes[new_segment] = self._segment_bytes.get(new_segment, 0) + record_bytes
+                rewritten += record_bytes
+            
+            # Los registros copiados deben ser durables antes de borrar el original
+            self._sync_active(force=True)
+            self._drop_segment(segment_id)
+            
+            reclaimed = max(0, segment_size - rewritten)
+            self.compactions += 1
+            self.bytes_reclaimed += reclaimed
+            self.logger.debug(f"Segmento {segment_id} compactado - {reclaimed/1024:.1f}KB recuperados")
+            return reclaimed
+    
+    def compact(self, max_segments: Optional[int] = None) -> int:
+        """
+        Compactar segmentos con muchos registros muertos
+        
+        Args:
+            max_segments: Máximo de segmentos a compactar (None = todos los candidatos)
+        
+        Returns:
+            int: Segmentos compactados
+        """
+        with self._lock:
+            candidates = self._compaction_candidates()
+            if max_segments is not None:
+                candidates = candidates[:max_segments]
+            
+            for segment_id in candidates:
+                self.compact_segment(segment_id)
+            
+            return len(candidates)
+    
+    def _compress_data(self, data: bytes) -> Tuple[bytes, bool]:
+        """
+        Comprimir datos si superan el umbral
+        
+        Returns:
+            Tuple[bytes, bool]: (datos_finales, fue_comprimido)
+        """
+        if self.compress and len(data) >= self.compression_threshold:
+            try:
+                compressed = gzip.compress(data)
+                if len(compressed) < len(data) * 0.9:  # Solo si reduce al menos 10%
+                    self.compressions += 1
+                    return compressed, True
+            except Exception as e:
+                self.logger.warning(f"Error comprimiendo datos: {e}")
+        
+        return data, False
+    
+    def _make_room(self, required_bytes: int) -> bool:
+        """Hacer espacio expulsando entradas antiguas"""
+        if self.current_size_bytes + required_bytes <= self.max_size_bytes:
+            return True
+        
+        # Primero: retirar solo las expiradas ya vencidas
+        self._remove_expired()
+        
+        if self.current_size_bytes + required_bytes <= self.max_size_bytes:
+            return True
+        
+        if len(self._index) == 0:
+            return required_bytes <= self.max_size_bytes
+        
+        # El índice está en orden de acceso: el primero es el menos reciente
+        removed_count = 0
+        while self._index and self.current_size_bytes + required_bytes > self.max_size_bytes:
+            self._remove_entry(next(iter(self._index)))
+            removed_count += 1
+        
+        if removed_count > 0:
+            self.logger.debug(f"Removidas {removed_count} entradas para hacer espacio")
+        
+        return self.current_size_bytes + required_bytes <= self.max_size_bytes
+    
+    def _remove_entry(self, key: str):
+        """Registrar tombstone y retirar la entrada del índice"""
+        entry = self._index.get(key)
+        if entry is None:
+            return
+        
+        now_ts = datetime.now().timestamp()
+        segment_id, offset, record_bytes = self._append(key, FLAG_TOMBSTONE, b"", now_ts, 0.0)
+        self._apply_record(segment_id, key, offset, record_bytes, 0, FLAG_TOMBSTONE, now_ts, 0.0)
+        self.deletes += 1
+    
+    def _remove_expired(self, limit: Optional[int] = None) -> int:
+        """Remover entradas vencidas según el heap de expiraciones"""
+        removed = 0
+        for key in self._expiry.pop_due(limit=limit):
+            if key in self._index:
+                self._remove_entry(key)
+                removed += 1
+        return removed
+    
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Obtener valor del cache en disco
+        
+        Args:
+            key: Clave de búsqueda
+        
+        Returns:
+            Optional[Any]: Valor si existe y no ha expirado
+        """
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            if entry.is_expired():
+                self._remove_entry(key)
+                self.misses += 1
+                return None
+            
+            try:
+                data = self._read_payload(entry)
+                if entry.compressed:
+                    data = gzip.decompress(data)
+                value = pickle.loads(data)
+            except Exception as e:
+                self.logger.error(f"Error leyendo cache {key}: {e}")
+                self._remove_entry(key)
+                self.misses += 1
+                return None
+            
+            entry.last_accessed = datetime.now()
+            entry.access_count += 1
+            self._index.move_to_end(key)
+            
+            self.hits += 1
+            return value
+    
+    def get_with_state(self, key: str) -> Tuple[Optional[Any], bool]:
+        """
+        Obtener valor indicando si ya pasó su TTL blando
+        
+        Args:
+            key: Clave de búsqueda
+        
+        Returns:
+            Tuple[Optional[Any], bool]: (valor o None, True si debe regenerarse en background)
+        """
+        with self._lock:
+            value = self.get(key)
+            if value is None:
+                return None, False
+            entry = self._index.get(key)
+            stale = entry is not None and entry.is_stale()
+            if stale:
+                self.stale_hits += 1
+            return value, stale
+    
+    def put(self, key: str, value: Any, ttl_hours: Optional[int] = None,
+            tags: Optional[Iterable[str]] = None, soft_ttl_hours: Optional[float] = None) -> bool:
+        """
+        Almacenar valor con un único append al segmento activo
+        
+        Args:
+            key: Clave única
+            value: Valor a almacenar
+            ttl_hours: TTL personalizado en horas
+            tags: Etiquetas de invalidación (se guardan en el propio registro)
+            soft_ttl_hours: TTL blando; pasado este plazo get_with_state marca el
+                valor como vencido pero lo sigue sirviendo hasta ttl_hours
+        
+        Returns:
+            bool: True si se almacenó exitosamente
+        """
+        with self._lock:
+            try:
+                data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                final_data, compressed = self._compress_data(data)
+                
+                if len(final_data) > self.max_size_bytes * 0.1:  # Max 10% del cache
+                    self.logger.warning(f"Objeto demasiado grande para cache: {len(final_data)/1024/1024:.1f}MB")
+                    return False
+                
+                if not self._make_room(len(final_data)):
+                    self.logger.warning("No se pudo hacer espacio en cache de disco")
+                    return False
+                
+                ttl = timedelta(hours=ttl_hours) if ttl_hours else self.default_ttl
+                now = datetime.now()
+                expires_ts = (now + ttl).timestamp() if ttl.total_seconds() > 0 else 0.0
+                soft_expires_ts = (now + timedelta(hours=soft_ttl_hours)).timestamp() if soft_ttl_hours else 0.0
+                if expires_ts and soft_expires_ts >= expires_ts:
+                    soft_expires_ts = 0.0
+                flags = FLAG_COMPRESSED if compressed else 0
+                entry_tags = sorted(set(tags or ()))
+                
+                segment_id, offset, record_bytes = self._append(key, flags, final_data, now.timestamp(),
+                                                                expires_ts, entry_tags, soft_expires_ts)
+                self._apply_record(segment_id, key, offset, record_bytes, len(final_data),
+                                   flags, now.timestamp(), expires_ts, entry_tags, soft_expires_ts)
+                self.writes += 1
+                
+                self.logger.debug(f"Almacenado en cache: {key} ({len(final_data)/1024:.1f}KB, comprimido: {compressed})")
+                return True
+            
+            except Exception as e:
+                self.logger.error(f"Error almacenando en cache {key}: {e}")
+                return False
+    
+    def delete(self, key: str) -> bool:
+        """Eliminar entrada del cache"""
+        with self._lock:
+            if key in self._index:
+                self._remove_entry(key)
+                return True
+            return False
+    
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """
+        Eliminar las entradas que tengan alguna de las etiquetas
+        
+        Args:
+            tags: Etiquetas invalidadas
+        
+        Returns:
+            int: Número de entradas eliminadas
+        """
+        with self._lock:
+            stale = set()
+            for tag in set(tags):
+                stale.update(self._tag_index.get(tag, ()))
+            for key in stale:
+                self._remove_entry(key)
+            return len(stale)
+    
+    def contains(self, key: str) -> bool:
+        """Verificar si una clave existe y no ha expirado (sin leer el segmento)"""
+        with self._lock:
+            entry = self._index.get(key)
+            return entry is not None and not entry.is_expired()
+    
+    def get_keys(self, pattern: Optional[str] = None) -> List[str]:
+        """
+        Obtener lista de claves en el cache
+        
+        Args:
+            pattern: Patrón opcional para filtrar claves
+        
+        Returns:
+            Lista de claves que coinciden
+        """
+        with self._lock:
+            keys = list(self._index.keys())
+            
+            if pattern:
+                import fnmatch
+                keys = [key for key in keys if fnmatch.fnmatch(key, pattern)]
+            
+            return keys
+    
+    def sweep_expired(self, max_items: int) -> int:
+        """
+        Retirar vencidas y compactar como máximo un segmento (usado por ExpirySweeper)
+        
+        Returns:
+            int: Número de entradas removidas
+        """
+        with self._lock:
+            removed = self._remove_expired(limit=max_items)
+            self.compact(max_segments=1)
+            return removed
+    
+    def cleanup(self) -> Dict[str, int]:
+        """
+        Limpieza completa: expiradas y compactación de todos los candidatos
+        
+        Returns:
+            Dict con estadísticas de limpieza
+        """
+        with self._lock:
+            expired_count = self._remove_expired()
+            reclaimed_before = self.bytes_reclaimed
+            compacted = self.compact()
+            
+            return {
+                'expired_removed': expired_count,
+                'segments_compacted': compacted,
+                'bytes_reclaimed': self.bytes_reclaimed - reclaimed_before,
+                'total_entries': len(self._index),
+                'total_size_mb': round(self.current_size_bytes / 1024 / 1024, 2)
+            }
+    
+    def clear(self):
+        """Limpiar todo el cache (borra todos los segmentos)"""
+        with self._lock:
+            cleared_count = len(self._index)
+            
+            self._active_file.close()
+            self._active_file = None
+            for segment_id in list(self._segment_bytes):
+                self._drop_segment(segment_id)
+            
+            self._index.clear()
+            self._expiry.clear()
+            self._tag_index.clear()
+            self.current_size_bytes = 0
+            self._open_active(self._active_id + 1)
+            
+            self.logger.info(f"Cache de disco limpiado - {cleared_count} entradas removidas")
+    
+    def checkpoint(self):
+        """Forzar a disco el segmento activo (p.ej. al cerrar)"""
+        with self._lock:
+            self._sync_active(force=True)
+    
+    def close(self):
+        """Cerrar archivos abiertos (el segmento activo se recupera por escaneo)"""
+        with self._lock:
+            for reader in self._readers.values():
+                reader.close()
+            self._readers.clear()
+            if self._active_file is not None:
+                self._sync_active(force=True)
+                self._active_file.close()
+                self._active_file = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtener estadísticas del cache"""
+        with self._lock:
+            total_requests = self.hits + self.misses
+            hit_ratio = self.hits / total_requests if total_requests > 0 else 0.0
+            disk_bytes = sum(self._segment_bytes.values())
+            live_bytes = sum(self._segment_live.values())
+            
+            uptime = datetime.now() - self.created_at
+            
+            return {
+                "performance": {
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "hit_ratio": round(hit_ratio, 3),
+                    "stale_hits": self.stale_hits,
+                    "writes": self.writes,
+                    "deletes": self.deletes,
+                    "compressions": self.compressions
+                },
+                "storage": {
+                    "current_size_mb": round(self.current_size_bytes / 1024 / 1024, 2),
+                    "max_size_gb": round(self.max_size_bytes / 1024 / 1024 / 1024, 2),
+                    "usage_percent": round((self.current_size_bytes / self.max_size_bytes) * 100, 1),
+                    "entry_count": len(self._index),
+                    "tag_count": len(self._tag_index),
+                    "cache_dir": str(self.cache_dir)
+                },
+                "segments": {
+                    "count": len(self._segment_bytes),
+                    "active_segment": self._active_id,
+                    "disk_mb": round(disk_bytes / 1024 / 1024, 2),
+                    "dead_ratio": round(1.0 - live_bytes / disk_bytes, 3) if disk_bytes else 0.0,
+                    "compactions": self.compactions,
+                    "bytes_reclaimed": self.bytes_reclaimed,
+                    "recovered_truncations": self.recovered_truncations
+                },
+                "config": {
+                    "default_ttl_hours": self.default_ttl.total_seconds() / 3600,
+                    "compress": self.compress,
+                    "compression_threshold_kb": self.compression_threshold / 1024,
+                    "max_segment_mb": self.max_segment_bytes / 1024 / 1024,
+                    "compaction_threshold": self.compaction_threshold,
+                    "sync_writes": self.sync_writes
+                },
+                "uptime_hours": round(uptime.total_seconds() / 3600, 2)
+            }
+
+
+def create_log_structured_disk_cache(cache_dir: str = "data/cache", max_size_gb: int = 2,
+                                     max_segment_mb: float = 32) -> LogStructuredDiskCache:
+    """
+    Crear instancia de LogStructuredDiskCache con configuración
+    
+    Args:
+        cache_dir: Directorio para cache
+        max_size_gb: Tamaño máximo en GB
+        max_segment_mb: Tamaño de segmento en MB
+    
+    Returns:
+        LogStructuredDiskCache: Instancia configurada
+    """
+    return LogStructuredDiskCache(cache_dir=cache_dir, max_size_gb=max_size_gb,
+                                  max_segment_mb=max_segment_mb)
@@ -5,15 +5,17 @@ Implementa cache de alta velocidad para respuestas frecuentes y templates
 """
 
 import time
-import sys
-import pickle
 import logging
 import threading
 from collections import OrderedDict
-from typing import Any, Optional, Dict, List, Tuple
+from typing import Any, Optional, Dict, Iterable, List, Tuple, Union
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 
+from .cache_sizer import CacheSizer, create_sizer
+from .eviction_policies import EvictionPolicy, create_eviction_policy
+from .expiry_scheduler import ExpiryHeap
+
 @dataclass 
 class CacheEntry:
     """Entrada del cache en memoria"""
@@ -23,6 +25,8 @@ class CacheEntry:
     access_count: int
     ttl_expires: Optional[datetime]
     size_bytes: int
+    tags: Tuple[str, ...] = ()
+    soft_expires: Optional[datetime] = None
     
     def is_expired(self) -> bool:
         """Verificar si la entrada ha expirado"""
@@ -30,25 +34,51 @@ class CacheEntry:
             return False
         return datetime.now() > self.ttl_expires
     
+    def is_stale(self) -> bool:
+        """Verificar si pasó el TTL blando (se sirve pero conviene regenerar)"""
+        if self.soft_expires is None:
+            return False
+        return datetime.now() > self.soft_expires
+    
     def touch(self):
         """Actualizar último acceso"""
         self.last_accessed = datetime.now()
         self.access_count += 1
 
+class SharedByteBudget:
+    """Presupuesto de bytes compartido entre varias instancias de MemoryCache"""
+    
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self._lock = threading.Lock()
+    
+    def fits(self, required_bytes: int) -> bool:
+        """Verificar si hay espacio para los bytes requeridos"""
+        return self.used_bytes + required_bytes <= self.max_bytes
+    
+    def add(self, delta_bytes: int):
+        """Registrar bytes asignados (positivo) o liberados (negativo)"""
+        with self._lock:
+            self.used_bytes += delta_bytes
+
 class MemoryCache:
     """
     Cache en memoria L1 con estrategia LRU (Least Recently Used)
     
     Características:
     - Límite de memoria configurable
-    - TTL por entrada
-    - Estrategia de expulsión LRU
+    - TTL por entrada con heap de expiraciones (O(log n))
+    - Estrategia de expulsión configurable (LRU, LFU, ARC, W-TinyLFU)
     - Métricas detalladas
-    - Thread-safe
+    - Thread-safe, con aget/aput/adelete para uso desde código async
     """
     
     def __init__(self, max_size_mb: int = 50, default_ttl_hours: int = 1, 
-                 cleanup_threshold: float = 0.8):
+                 cleanup_threshold: float = 0.8,
+                 sizer: Union[str, CacheSizer, None] = "sampling",
+                 budget: Optional[SharedByteBudget] = None,
+                 eviction_policy: Union[str, EvictionPolicy, None] = "lru"):
         """
         Inicializar cache en memoria
         
@@ -56,18 +86,28 @@ class MemoryCache:
             max_size_mb: Tamaño máximo en megabytes
             default_ttl_hours: TTL por defecto en horas
             cleanup_threshold: Umbral para limpieza automática (0.0-1.0)
+            sizer: Estimador de tamaño ("pickle", "structural", "sampling") o instancia
+            budget: Presupuesto compartido opcional (p.ej. entre shards)
+            eviction_policy: Política de expulsión ("lru", "lfu", "arc", "wtinylfu") o instancia
         """
         self.max_size_bytes = max_size_mb * 1024 * 1024
         self.default_ttl = timedelta(hours=default_ttl_hours)
         self.cleanup_threshold = cleanup_threshold
+        self.sizer = create_sizer(sizer)
+        self.budget = budget
+        self.policy = create_eviction_policy(eviction_policy)
         
         # Almacenamiento thread-safe
         self._cache: OrderedDict[str, CacheEntry] = OrderedDict()
         self._lock = threading.RLock()
         
+        # Heap de expiraciones compartido con el barrendero en background
+        self._expiry = ExpiryHeap()
+        
         # Métricas
         self.hits = 0
         self.misses = 0
+        self.stale_hits = 0
         self.evictions = 0
         self.current_size_bytes = 0
         self.created_at = datetime.now()
@@ -102,16 +142,11 @@ class MemoryCache:
         Returns:
             int: Tamaño en bytes
         """
-        try:
-            # Usar pickle para estimación del tamaño
-            return len(pickle.dumps(obj, protocol=pickle.HIGHEST_PROTOCOL))
-        except (pickle.PickleError, TypeError):
-            # Fallback para objetos no serializables
-            return sys.getsizeof(obj)
+        return self.sizer.size_of(obj)
     
     def _make_room(self, required_bytes: int) -> bool:
         """
-        Hacer espacio expulsando entradas según estrategia LRU
+        Hacer espacio expulsando entradas según la política configurada
         
         Args:
             required_bytes: Bytes necesarios
@@ -120,45 +155,112 @@ class MemoryCache:
             bool: True si se liberó suficiente espacio
         """
         initial_size = self.current_size_bytes
-        removed_count = 0
         
-        # Primero: remover entradas expiradas
-        expired_keys = []
-        for key, entry in self._cache.items():
-            if entry.is_expired():
-                expired_keys.append(key)
-        
-        for key in expired_keys:
-            self._remove_entry(key)
-            removed_count += 1
+        # Primero: remover entradas expiradas (solo las vencidas del heap)
+        removed_count = self._remove_expired()
         
         # Segundo: verificar si ya hay suficiente espacio
-        if self.current_size_bytes + required_bytes <= self.max_size_bytes:
+        if self._has_room(required_bytes):
             if removed_count > 0:
                 self.logger.debug(f"Liberado espacio removiendo {removed_count} entradas expiradas")
             return True
         
-        # Tercero: expulsar entradas LRU hasta tener espacio
-        while (self.current_size_bytes + required_bytes > self.max_size_bytes and 
-               len(self._cache) > 0):
-            # OrderedDict mantiene orden de inserción/acceso
-            # El primer elemento es el menos usado recientemente
-            lru_key = next(iter(self._cache))
-            self._remove_entry(lru_key)
+        # Tercero: expulsar víctimas de la política hasta tener espacio
+        while not self._has_room(required_bytes) and len(self._cache) > 0:
+            victim_key = self.policy.victim()
+            if victim_key is None or victim_key not in self._cache:
+                # Política desincronizada: caer a orden de inserción
+                victim_key = next(iter(self._cache))
+            self._remove_entry(victim_key, evicted=True)
             self.evictions += 1
             removed_count += 1
         
         space_freed = initial_size - self.current_size_bytes
         self.logger.debug(f"Liberados {space_freed/1024:.1f}KB removiendo {removed_count} entradas")
         
+        return self._has_room(required_bytes)
+    
+    def _has_room(self, required_bytes: int) -> bool:
+        """Verificar espacio contra el presupuesto propio o compartido"""
+        if self.budget is not None:
+            return self.budget.fits(required_bytes)
         return self.current_size_bytes + required_bytes <= self.max_size_bytes
     
-    def _remove_entry(self, key: str):
+    def _account(self, delta_bytes: int):
+        """Actualizar tamaño actual y presupuesto compartido"""
+        self.current_size_bytes += delta_bytes
+        if self.budget is not None:
+            self.budget.add(delta_bytes)
+    
+    def make_room(self, required_bytes: int) -> bool:
+        """
+        Expulsar entradas hasta que quepan los bytes requeridos
+        
+        Args:
+            required_bytes: Bytes necesarios
+            
+        Returns:
+            bool: True si hay suficiente espacio
+        """
+        with self._lock:
+            return self._make_room(required_bytes)
+    
+    def _remove_entry(self, key: str, evicted: bool = False):
         """Remover entrada del cache"""
         if key in self._cache:
             entry = self._cache[key]
-            self.current_size_bytes -= entry.size_bytes
+            self._account(-entry.size_bytes)
             del self._cache[key]
+            self._expiry.cancel(key)
+            if evicted:
+                self.policy.on_evict(key)
+            else:
+                self.policy.on_remove(key)
+    
+    def _remove_expired(self, limit: Optional[int] = None) -> int:
+        """
+        Remover entradas vencidas usando el heap de expiraciones
+        
+        Args:
+            limit: Máximo de entradas a remover (None = todas las vencidas)
+        
+        Returns:
+            int: Número de entradas removidas
+        """
+        removed = 0
+        for key in self._expiry.pop_due(limit=limit):
+            if key in self._cache:
+                self._remove_entry(key)
+                removed += 1
+        return removed
+    
+    def _lookup(self, key: str) -> Optional[Any]:
+        """Buscar una clave actualizando estadísticas (requiere tener el lock)"""
+        entry = self._lookup_entry(key)
+        return entry.value if entry is not None else None
+    
+    def _lookup_entry(self, key: str) -> Optional[CacheEntry]:
+        """Buscar la entrada vigente de una clave (requiere tener el lock)"""
+        if key not in self._cache:
+            self.misses += 1
+            self.policy.on_miss(key)
+            return None
+        
+        entry = self._cache[key]
+        
+        # Verificar expiración
+        if entry.is_expired():
+            self._remove_entry(key)
+            self.misses += 1
+            self.policy.on_miss(key)
+            return None
+        
+        # Actualizar acceso y notificar a la política de expulsión
+        entry.touch()
+        self.policy.on_access(key)
+        
+        self.hits += 1
+        return entry
     
     def get(self, key: str) -> Optional[Any]:
         """
@@ -171,26 +273,49 @@ class MemoryCache:
             Optional[Any]: Valor si existe y no ha expirado, None en caso contrario
         """
         with self._lock:
-            if key not in self._cache:
-                self.misses += 1
-                return None
-            
-            entry = self._cache[key]
-            
-            # Verificar expiración
-            if entry.is_expired():
-                self._remove_entry(key)
-                self.misses += 1
-                return None
+            return self._lookup(key)
+    
+    def get_with_state(self, key: str) -> Tuple[Optional[Any], bool]:
+        """
+        Obtener valor indicando si ya pasó su TTL blando
+        
+        Args:
+            key: Clave de búsqueda
             
-            # Actualizar acceso y reordenar (LRU)
-            entry.touch()
-            self._cache.move_to_end(key)  # Mover al final (más reciente)
+        Returns:
+            Tuple[Optional[Any], bool]: (valor o None, True si el valor está vencido
+            en blando y debe regenerarse en background)
+        """
+        with self._lock:
+            entry = self._lookup_entry(key)
+            if entry is None:
+                return None, False
+            stale = entry.is_stale()
+            if stale:
+                self.stale_hits += 1
+            return entry.value, stale
+    
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """
+        Obtener varias claves con una sola toma del lock
+        
+        Args:
+            keys: Claves de búsqueda
             
-            self.hits += 1
-            return entry.value
+        Returns:
+            Dict[str, Any]: Solo los aciertos; las claves ausentes son misses
+        """
+        found = {}
+        with self._lock:
+            for key in keys:
+                value = self._lookup(key)
+                if value is not None:
+                    found[key] = value
+        return found
     
-    def put(self, key: str, value: Any, ttl_hours: Optional[int] = None) -> bool:
+    def put(self, key: str, value: Any, ttl_hours: Optional[int] = None,
+            size_hint: Optional[int] = None, tags: Optional[Iterable[str]] = None,
+            soft_ttl_hours: Optional[float] = None) -> bool:
         """
         Almacenar valor en cache
         
@@ -198,51 +323,100 @@ class MemoryCache:
             key: Clave única
             value: Valor a almacenar
             ttl_hours: TTL personalizado en horas (usa default si es None)
+            size_hint: Tamaño conocido en bytes (evita estimarlo)
+            tags: Etiquetas de invalidación (p.ej. "lesson:12")
+            soft_ttl_hours: TTL blando; pasado este plazo get_with_state marca el
+                valor como vencido pero lo sigue sirviendo hasta ttl_hours
             
         Returns:
             bool: True si se almacenó exitosamente
         """
+        # Estimar tamaño fuera del lock
+        size_bytes = size_hint if size_hint is not None else self._calculate_size(value)
+        
         with self._lock:
-            try:
-                # Calcular tamaño y TTL
-                size_bytes = self._calculate_size(value)
-                ttl = timedelta(hours=ttl_hours) if ttl_hours else self.default_ttl
-                expires_at = datetime.now() + ttl if ttl.total_seconds() > 0 else None
-                
-                # Verificar si el objeto es demasiado grande
-                if size_bytes > self.max_size_bytes * 0.5:  # No más del 50% del cache
-                    self.logger.warning(f"Objeto demasiado grande para cache: {size_bytes/1024:.1f}KB")
-                    return False
-                
-                # Hacer espacio si es necesario
-                if not self._make_room(size_bytes):
-                    self.logger.warning("No se pudo hacer espacio en cache")
-                    return False
-                
-                # Crear entrada
-                entry = CacheEntry(
-                    value=value,
-                    created_at=datetime.now(),
-                    last_accessed=datetime.now(),
-                    access_count=0,
-                    ttl_expires=expires_at,
-                    size_bytes=size_bytes
-                )
-                
-                # Remover entrada existente si existe
-                if key in self._cache:
-                    self._remove_entry(key)
-                
-                # Almacenar nueva entrada
-                self._cache[key] = entry
-                self.current_size_bytes += size_bytes
-                
-                self.logger.debug(f"Almacenado en cache: {key} ({size_bytes/1024:.1f}KB)")
-                return True
-                
-            except Exception as e:
-                self.logger.error(f"Error almacenando en cache {key}: {e}")
+            return self._store(key, value, size_bytes, ttl_hours, tuple(tags or ()), soft_ttl_hours)
+    
+    def put_many(self, items: Dict[str, Any], ttl_hours: Optional[int] = None,
+                 size_hints: Optional[Dict[str, int]] = None,
+                 tags: Optional[Dict[str, Iterable[str]]] = None,
+                 soft_ttl_hours: Optional[float] = None) -> Dict[str, bool]:
+        """
+        Almacenar varios valores con una sola toma del lock
+        
+        Args:
+            items: Claves y valores a almacenar
+            ttl_hours: TTL común en horas (usa default si es None)
+            size_hints: Tamaños conocidos en bytes por clave (evita estimarlos)
+            tags: Etiquetas de invalidación por clave
+            soft_ttl_hours: TTL blando común en horas
+            
+        Returns:
+            Dict[str, bool]: Resultado de almacenamiento por clave
+        """
+        # Estimar tamaños fuera del lock
+        size_hints = size_hints or {}
+        tags = tags or {}
+        sized = [
+            (key, value, size_hints[key] if key in size_hints else self._calculate_size(value))
+            for key, value in items.items()
+        ]
+        
+        with self._lock:
+            return {
+                key: self._store(key, value, size_bytes, ttl_hours, tuple(tags.get(key, ())), soft_ttl_hours)
+                for key, value, size_bytes in sized
+            }
+    
+    def _store(self, key: str, value: Any, size_bytes: int, ttl_hours: Optional[int],
+               tags: Tuple[str, ...] = (), soft_ttl_hours: Optional[float] = None) -> bool:
+        """Insertar o reemplazar una entrada (requiere tener el lock)"""
+        try:
+            # Calcular TTL (el blando nunca supera al duro)
+            ttl = timedelta(hours=ttl_hours) if ttl_hours else self.default_ttl
+            expires_at = datetime.now() + ttl if ttl.total_seconds() > 0 else None
+            soft_expires = datetime.now() + timedelta(hours=soft_ttl_hours) if soft_ttl_hours else None
+            if soft_expires and expires_at and soft_expires >= expires_at:
+                soft_expires = None
+            
+            # Verificar si el objeto es demasiado grande
+            if size_bytes > self.max_size_bytes * 0.5:  # No más del 50% del cache
+                self.logger.warning(f"Objeto demasiado grande para cache: {size_bytes/1024:.1f}KB")
                 return False
+            
+            # Hacer espacio si es necesario
+            if not self._make_room(size_bytes):
+                self.logger.warning("No se pudo hacer espacio en cache")
+                return False
+            
+            # Crear entrada
+            entry = CacheEntry(
+                value=value,
+                created_at=datetime.now(),
+                last_accessed=datetime.now(),
+                access_count=0,
+                ttl_expires=expires_at,
+                size_bytes=size_bytes,
+                tags=tags,
+                soft_expires=soft_expires
+            )
+            
+            # Remover entrada existente si existe
+            if key in self._cache:
+                self._remove_entry(key)
+            
+            # Almacenar nueva entrada
+            self._cache[key] = entry
+            self._account(size_bytes)
+            self.policy.on_insert(key)
+            self._expiry.schedule(key, expires_at)
+            
+            self.logger.debug(f"Almacenado en cache: {key} ({size_bytes/1024:.1f}KB)")
+            return True
+            
+        except Exception as e:
+            self.logger.error(f"Error almacenando en cache {key}: {e}")
+            return False
     
     def delete(self, key: str) -> bool:
         """
@@ -261,12 +435,45 @@ class MemoryCache:
                 return True
             return False
     
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """
+        Eliminar las entradas que tengan alguna de las etiquetas
+        
+        Args:
+            tags: Etiquetas invalidadas
+            
+        Returns:
+            int: Número de entradas eliminadas
+        """
+        tags = set(tags)
+        with self._lock:
+            stale = [key for key, entry in self._cache.items() if tags.intersection(entry.tags)]
+            for key in stale:
+                self._remove_entry(key)
+            return len(stale)
+    
+    async def aget(self, key: str) -> Optional[Any]:
+        """Versión asíncrona de get (operación en memoria: no sale del event loop)"""
+        return self.get(key)
+    
+    async def aput(self, key: str, value: Any, ttl_hours: Optional[int] = None,
+                   size_hint: Optional[int] = None, tags: Optional[Iterable[str]] = None,
+                   soft_ttl_hours: Optional[float] = None) -> bool:
+        """Versión asíncrona de put"""
+        return self.put(key, value, ttl_hours, size_hint=size_hint, tags=tags, soft_ttl_hours=soft_ttl_hours)
+    
+    async def adelete(self, key: str) -> bool:
+        """Versión asíncrona de delete"""
+        return self.delete(key)
+    
     def clear(self):
         """Limpiar todo el cache"""
         with self._lock:
             cleared_count = len(self._cache)
             self._cache.clear()
-            self.current_size_bytes = 0
+            self._account(-self.current_size_bytes)
+            self._expiry.clear()
+            self.policy.clear()
             self.logger.info(f"Cache limpiado - {cleared_count} entradas removidas")
     
     def cleanup_expired(self) -> int:
@@ -277,18 +484,22 @@ class MemoryCache:
             int: Número de entradas removidas
         """
         with self._lock:
-            expired_keys = []
-            for key, entry in self._cache.items():
-                if entry.is_expired():
-                    expired_keys.append(key)
+            removed = self._remove_expired()
             
-            for key in expired_keys:
-                self._remove_entry(key)
-            
-            if expired_keys:
-                self.logger.debug(f"Limpiadas {len(expired_keys)} entradas expiradas")
+            if removed:
+                self.logger.debug(f"Limpiadas {removed} entradas expiradas")
             
-            return len(expired_keys)
+            return removed
+    
+    def sweep_expired(self, max_items: int) -> int:
+        """
+        Retirar como máximo `max_items` entradas vencidas (usado por ExpirySweeper)
+        
+        Returns:
+            int: Número de entradas removidas
+        """
+        with self._lock:
+            return self._remove_expired(limit=max_items)
     
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -320,6 +531,7 @@ class MemoryCache:
                     "hits": self.hits,
                     "misses": self.misses,
                     "hit_ratio": round(hit_ratio, 3),
+                    "stale_hits": self.stale_hits,
                     "evictions": self.evictions
                 },
                 "memory": {
@@ -339,6 +551,8 @@ class MemoryCache:
                     "default_ttl_hours": self.default_ttl.total_seconds() / 3600,
                     "cleanup_threshold": self.cleanup_threshold
                 },
+                "sizing": self.sizer.get_stats(),
+                "eviction": self.policy.get_stats(),
                 "uptime_hours": round(uptime.total_seconds() / 3600, 2)
             }
     
@@ -5,17 +5,20 @@ Predice qué índices cargar basándose en patrones y valida su integridad
 """
 
 import json
-import hashlib
+import heapq
 import logging
 import threading
 import asyncio
 from pathlib import Path
-from typing import Dict, List, Set, Optional, Tuple, Any
+from typing import Dict, List, Optional, Tuple, Any
 from datetime import datetime, timedelta
 from dataclasses import dataclass, field
 from collections import defaultdict
 import statistics
 
+from .index_registry import IndexRegistry, get_index_registry
+from .index_integrity import IndexIntegrityValidator, IntegrityCheck
+
 @dataclass
 class PredictionPattern:
     """Patrón de predicción para pre-carga"""
@@ -26,18 +29,43 @@ class PredictionPattern:
     success_rate: float = 0.0  # Tasa de éxito histórica
     usage_count: int = 0  # Veces que se ha usado
     last_used: Optional[datetime] = None
+    learned: bool = False  # Aprendido de secuencias de acceso reales (no por defecto)
+    preloads: int = 0  # Pre-cargas emitidas por el patrón
+    useful_preloads: int = 0  # Pre-cargas accedidas antes de descartarse
+    wasted_preloads: int = 0  # Pre-cargas descartadas sin acceso
+    observed: int = 0  # Veces que se observó la transición trigger -> predicho
+    last_observed: Optional[datetime] = None
+    
+    @property
+    def precision(self) -> float:
+        """Fracción de pre-cargas resueltas que se usaron"""
+        resolved = self.useful_preloads + self.wasted_preloads
+        return self.useful_preloads / resolved if resolved else 0.0
+    
+    @property
+    def recall(self) -> float:
+        """Fracción de las transiciones observadas que llegaron pre-cargadas"""
+        return min(1.0, self.useful_preloads / self.observed) if self.observed else 0.0
 
 @dataclass
-class IntegrityCheck:
-    """Resultado de verificación de integridad"""
+class PreloadRecord:
+    """Pre-carga pendiente de saber si se usa antes de descartarse"""
     index_name: str
-    is_valid: bool
-    checksum: Optional[str] = None
-    structure_valid: bool = True
-    content_valid: bool = True
-    size_bytes: int = 0
-    errors: List[str] = field(default_factory=list)
-    checked_at: datetime = field(default_factory=datetime.now)
+    pattern_name: str
+    size_bytes: int
+    accesses_left: int  # Accesos a otros índices antes de darla por desperdiciada
+    issued_at: datetime = field(default_factory=datetime.now)
+
+@dataclass
+class PreloadTask:
+    """Pre-carga encolada para el pool de workers"""
+    index_name: str
+    confidence: float
+    pattern_name: str
+    trigger: str
+    access_seq: int  # Acceso que la originó (para caducarla por ventana)
+    queued_at: datetime = field(default_factory=datetime.now)
+    cancelled: bool = False
 
 class PredictivePreloader:
     """
@@ -45,14 +73,20 @@ class PredictivePreloader:
     
     Características:
     - Análisis de patrones de uso secuencial
-    - Predicción basada en machine learning simple
-    - Validación automática de integridad
-    - Pre-carga asíncrona en background
-    - Métricas de precisión de predicciones
+    - Modelo de Markov de primer orden aprendido online de los accesos reales
+      (los patrones por defecto solo cubren el arranque en frío)
+    - Validación de integridad incremental: solo se revalida lo que cambió en cada archivo
+    - Pre-carga en un pool acotado de hilos: cola con prioridad por confianza,
+      cancelación de predicciones que dejan de ser relevantes y contrapresión
+      por memoria; el camino de la petición solo encola
+    - Métricas de precisión y recall por patrón y bytes útiles vs. desperdiciados
     """
     
     def __init__(self, indices_dir: str = "data/indices", 
-                 prediction_enabled: bool = True, integrity_checks: bool = True):
+                 prediction_enabled: bool = True, integrity_checks: bool = True,
+                 registry: Optional[IndexRegistry] = None, max_preload_workers: int = 2,
+                 max_preload_queue: int = 16, memory_high_watermark: float = 0.9,
+                 integrity_validator: Optional[IndexIntegrityValidator] = None):
         """
         Inicializar preloader predictivo
         
@@ -60,23 +94,74 @@ class PredictivePreloader:
             indices_dir: Directorio de índices
             prediction_enabled: Habilitar predicción automática
             integrity_checks: Habilitar verificaciones de integridad
+            registry: Registro compartido de índices (por defecto el del proceso para indices_dir)
+            max_preload_workers: Hilos que leen y parsean índices pre-cargados
+            max_preload_queue: Pre-cargas pendientes como máximo (se descartan las de menor confianza)
+            memory_high_watermark: Fracción del presupuesto del registro a partir de la cual no se pre-carga
+            integrity_validator: Validador incremental (por defecto uno con estado en data/cache)
         """
         self.indices_dir = Path(indices_dir)
         self.prediction_enabled = prediction_enabled
         self.integrity_checks = integrity_checks
+        self.max_preload_workers = max(1, max_preload_workers)
+        self.max_preload_queue = max(1, max_preload_queue)
+        self.memory_high_watermark = memory_high_watermark
+        self.integrity = integrity_validator or IndexIntegrityValidator(
+            indices_dir, state_file=str(self.indices_dir.parent / "cache" / "index_integrity.json")
+        )
+        
+        # Los datos parseados viven en el registro compartido; aquí solo referencias
+        self.registry = registry or get_index_registry(indices_dir)
+        self._owner = self.registry.register_owner(self)
         
         # Estado interno
         self._loaded_indices: Dict[str, Any] = {}
+        self._loaded_sizes: Dict[str, int] = {}
         self._access_sequences: List[Tuple[str, datetime]] = []
         self._prediction_patterns: Dict[str, PredictionPattern] = {}
         self._integrity_results: Dict[str, IntegrityCheck] = {}
-        self._background_tasks: Set[asyncio.Task] = set()
         self._lock = threading.RLock()
         
+        # Pool de pre-carga: heap de (-confianza, seq, tarea) servido por hilos propios
+        self._preload_queue: List[Tuple[float, int, PreloadTask]] = []
+        self._queued_preloads: Dict[str, PreloadTask] = {}
+        self._running_preloads: Dict[str, PreloadTask] = {}
+        self._queue_cond = threading.Condition(self._lock)
+        self._queue_seq = 0
+        self._access_count = 0
+        self._workers: List[threading.Thread] = []
+        self._stopping = False
+        
+        # Guardado del modelo fuera del camino de las peticiones
+        self._save_lock = threading.Lock()
+        self._saver: Optional[threading.Thread] = None
+        
+        # Modelo aprendido: índice -> {siguiente índice: peso con decaimiento}
+        self._transitions: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._outstanding_preloads: Dict[str, PreloadRecord] = {}
+        
         # Configuración de predicción
         self._sequence_window = 5  # Ventana de secuencia para análisis
         self._min_pattern_confidence = 0.3  # Confianza mínima para usar patrón
         self._max_preload_candidates = 3  # Máximo índices a pre-cargar por predicción
+        self._session_gap = timedelta(minutes=30)  # Accesos más separados no forman transición
+        self._transition_decay = 0.9  # Peso que conservan las demás salidas de un índice en cada observación
+        self._min_transition_weight = 0.05  # Por debajo se olvida la transición
+        self._stale_after = timedelta(days=7)  # Sin observar en este plazo el peso se reduce a la mitad
+        self._preload_window = self._sequence_window  # Accesos tras los que una pre-carga sin usar se descarta
+        self._save_every = 50  # Transiciones aprendidas entre guardados del modelo
+        self._worker_idle_timeout = 30.0  # Segundos sin trabajo tras los que un worker termina
+        
+        # Métricas de pre-carga
+        self.preloads_issued = 0
+        self.useful_preloads = 0
+        self.wasted_preloads = 0
+        self.useful_bytes = 0
+        self.wasted_bytes = 0
+        self.preloads_cancelled = 0
+        self.preloads_rejected = 0
+        self.preloads_skipped_memory = 0
+        self._unsaved_transitions = 0
         
         # Logging
         self.logger = self._setup_logging()
@@ -154,39 +239,71 @@ class PredictivePreloader:
                         confidence=pattern_data['confidence'],
                         success_rate=pattern_data.get('success_rate', 0.0),
                         usage_count=pattern_data.get('usage_count', 0),
-                        last_used=datetime.fromisoformat(pattern_data['last_used']) if pattern_data.get('last_used') else None
+                        last_used=datetime.fromisoformat(pattern_data['last_used']) if pattern_data.get('last_used') else None,
+                        learned=pattern_data.get('learned', False),
+                        preloads=pattern_data.get('preloads', 0),
+                        useful_preloads=pattern_data.get('useful_preloads', 0),
+                        wasted_preloads=pattern_data.get('wasted_preloads', 0),
+                        observed=pattern_data.get('observed', 0),
+                        last_observed=datetime.fromisoformat(pattern_data['last_observed']) if pattern_data.get('last_observed') else None
                     )
                     self._prediction_patterns[pattern.pattern_name] = pattern
                 
+                for source, targets in data.get('transitions', {}).items():
+                    self._transitions[source] = {target: float(weight) for target, weight in targets.items()}
+                
+                self._access_sequences = [
+                    (index_name, datetime.fromisoformat(timestamp))
+                    for index_name, timestamp in data.get('access_sequence', [])
+                ]
+                
                 self.logger.debug(f"Cargados {len(self._prediction_patterns)} patrones guardados")
             
             except Exception as e:
                 self.logger.warning(f"Error cargando patrones: {e}")
     
     def _save_patterns(self):
-        """Guardar patrones actualizados"""
+        """
+        Guardar patrones, modelo de transiciones y secuencia reciente
+        
+        La instantánea se toma bajo el lock; el archivo se escribe fuera de él
+        para no bloquear a record_index_access ni a los workers.
+        """
         patterns_file = self.indices_dir.parent / "cache" / "prediction_patterns.json"
         patterns_file.parent.mkdir(parents=True, exist_ok=True)
         
         try:
-            patterns_data = {
-                'patterns': [
-                    {
-                        'pattern_name': pattern.pattern_name,
-                        'triggers': pattern.triggers,
-                        'predicted_indices': pattern.predicted_indices,
-                        'confidence': pattern.confidence,
-                        'success_rate': pattern.success_rate,
-                        'usage_count': pattern.usage_count,
-                        'last_used': pattern.last_used.isoformat() if pattern.last_used else None
+            # Un guardado a la vez: el último en escribir lleva la instantánea más reciente
+            with self._save_lock:
+                with self._lock:
+                    self._decay_stale_patterns()
+                    self._unsaved_transitions = 0
+                    patterns_data = {
+                        'patterns': [
+                            {
+                                'pattern_name': pattern.pattern_name,
+                                'triggers': pattern.triggers,
+                                'predicted_indices': pattern.predicted_indices,
+                                'confidence': pattern.confidence,
+                                'success_rate': pattern.success_rate,
+                                'usage_count': pattern.usage_count,
+                                'last_used': pattern.last_used.isoformat() if pattern.last_used else None,
+                                'learned': pattern.learned,
+                                'preloads': pattern.preloads,
+                                'useful_preloads': pattern.useful_preloads,
+                                'wasted_preloads': pattern.wasted_preloads,
+                                'observed': pattern.observed,
+                                'last_observed': pattern.last_observed.isoformat() if pattern.last_observed else None
+                            }
+                            for pattern in list(self._prediction_patterns.values())
+                        ],
+                        'transitions': {source: dict(targets) for source, targets in self._transitions.items() if targets},
+                        'access_sequence': [[index_name, ts.isoformat()] for index_name, ts in self._access_sequences],
+                        'last_updated': datetime.now().isoformat()
                     }
-                    for pattern in self._prediction_patterns.values()
-                ],
-                'last_updated': datetime.now().isoformat()
-            }
-            
-            with open(patterns_file, 'w', encoding='utf-8') as f:
-                json.dump(patterns_data, f, indent=2, ensure_ascii=False)
+                
+                with open(patterns_file, 'w', encoding='utf-8') as f:
+                    json.dump(patterns_data, f, indent=2, ensure_ascii=False)
             
         except Exception as e:
             self.logger.warning(f"Error guardando patrones: {e}")
@@ -194,202 +311,481 @@ class PredictivePreloader:
     async def validate_index_integrity(self, index_name: str, 
                                      data: Optional[Any] = None) -> IntegrityCheck:
         """
-        Validar integridad de un índice
+        Validar integridad de un índice sin bloquear el event loop
         
         Args:
             index_name: Nombre del índice
             data: Datos del índice (opcional, se cargarán si no se proporcionan)
-            
+        
         Returns:
             IntegrityCheck: Resultado de la validación
         """
-        result = IntegrityCheck(index_name=index_name, is_valid=False)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.check_index_integrity, index_name, data)
+    
+    def check_index_integrity(self, index_name: str, data: Optional[Any] = None) -> IntegrityCheck:
+        """
+        Validar integridad de un índice (bloqueante)
         
-        try:
-            # Cargar datos si no se proporcionaron
-            if data is None:
-                index_file = self.indices_dir / f"{index_name}.json"
-                if not index_file.exists():
-                    result.errors.append(f"Archivo no encontrado: {index_file}")
-                    return result
-                
-                result.size_bytes = index_file.stat().st_size
-                
-                with open(index_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    data = json.loads(content)
-                
-                # Calcular checksum
-                result.checksum = hashlib.md5(content.encode('utf-8')).hexdigest()
-            
-            # Validar estructura según tipo de índice
-            result.structure_valid = await self._validate_structure(index_name, data)
-            
-            # Validar contenido
-            result.content_valid = await self._validate_content(index_name, data)
-            
-            # Resultado final
-            result.is_valid = result.structure_valid and result.content_valid
-            
-            if result.is_valid:
-                self.logger.debug(f"Índice {index_name} validado correctamente")
-            else:
-                self.logger.warning(f"Índice {index_name} falló validación: {result.errors}")
-            
-        except json.JSONDecodeError as e:
-            result.errors.append(f"JSON inválido: {e}")
-        except Exception as e:
-            result.errors.append(f"Error de validación: {e}")
+        Si el archivo no cambió desde la última validación se reutiliza el
+        resultado; si cambió, solo se revalidan las entradas modificadas.
         
-        # Guardar resultado
-        self._integrity_results[index_name] = result
-        return result
-    
-    async def _validate_structure(self, index_name: str, data: Any) -> bool:
-        """Validar estructura específica del índice"""
-        try:
-            # Validaciones específicas por tipo de índice UCDM
-            if index_name == "ucdm_comprehensive_index":
-                required_keys = ["metadata", "lesson_details", "concept_index", "date_mapping"]
-                return all(key in data for key in required_keys)
-            
-            elif index_name in ["lesson_mapper", "lesson_date_mapper"]:
-                required_keys = ["date_to_lesson", "lesson_to_date"]
-                return all(key in data for key in required_keys)
-            
-            elif index_name == "concepts_index":
-                required_keys = ["concept_index"]
-                return all(key in data for key in required_keys)
-            
-            elif index_name in ["365_lessons_indexed", "365_lessons_advanced"]:
-                required_keys = ["metadata", "lessons"]
-                return all(key in data for key in required_keys)
-            
-            else:
-                # Validación genérica: debe ser dict o list no vacío
-                return isinstance(data, (dict, list)) and len(data) > 0
+        Args:
+            index_name: Nombre del índice
+            data: Datos ya parseados del archivo (opcional, evita parsearlo otra vez)
         
-        except Exception:
-            return False
-    
-    async def _validate_content(self, index_name: str, data: Any) -> bool:
-        """Validar contenido específico del índice"""
-        try:
-            # Validaciones de contenido específicas
-            if index_name == "ucdm_comprehensive_index":
-                # Verificar que hay lecciones y conceptos
-                lesson_details = data.get("lesson_details", {})
-                concept_index = data.get("concept_index", {})
-                return len(lesson_details) > 0 and len(concept_index) > 0
-            
-            elif index_name in ["lesson_mapper", "lesson_date_mapper"]:
-                # Verificar mapeos bidireccionales consistentes
-                date_to_lesson = data.get("date_to_lesson", {})
-                lesson_to_date = data.get("lesson_to_date", {})
-                return len(date_to_lesson) > 0 and len(lesson_to_date) > 0
-            
-            elif index_name == "concepts_index":
-                # Verificar que hay conceptos con lecciones asociadas
-                concept_index = data.get("concept_index", {})
-                return len(concept_index) > 0 and any(
-                    isinstance(lessons, list) and len(lessons) > 0 
-                    for lessons in concept_index.values()
-                )
-            
-            else:
-                # Validación genérica: contenido no vacío
-                return True
+        Returns:
+            IntegrityCheck: Resultado de la validación
+        """
+        result = self.integrity.validate(index_name, data)
         
-        except Exception:
-            return False
+        if result.is_valid:
+            self.logger.debug(
+                f"Índice {index_name} validado ({'sin cambios' if result.cached else f'{result.validated_entries} entradas revalidadas'})"
+            )
+        
+        # Guardar resultado
+        with self._lock:
+            self._integrity_results[index_name] = result
+        return result
     
     def record_index_access(self, index_name: str):
-        """Registrar acceso a índice para análisis de patrones"""
+        """
+        Registrar acceso a índice: resuelve pre-cargas pendientes, entrena el
+        modelo de transiciones y encola las predicciones en el pool de pre-carga
+        
+        Solo trabaja en memoria (no lee archivos ni necesita event loop).
+        """
         with self._lock:
+            self._access_count += 1
             now = datetime.now()
+            previous = self._access_sequences[-1] if self._access_sequences else None
             self._access_sequences.append((index_name, now))
             
             # Mantener solo últimas 100 entradas
             if len(self._access_sequences) > 100:
                 self._access_sequences = self._access_sequences[-100:]
             
-            # Analizar patrones y predecir si está habilitado
+            self._resolve_preloads(index_name)
+            
+            # Transición aprendida solo entre accesos de la misma sesión
+            if previous and previous[0] != index_name and now - previous[1] <= self._session_gap:
+                self._learn_transition(previous[0], index_name, now)
+            
+            self._cancel_irrelevant_preloads(index_name)
+            
+            # Predecir y encolar si está habilitado
             if self.prediction_enabled:
-                asyncio.create_task(self._analyze_and_predict(index_name))
+                try:
+                    self._enqueue_preloads(self._find_matching_patterns(index_name), index_name)
+                except Exception as e:
+                    self.logger.warning(f"Error en análisis predictivo: {e}")
     
-    async def _analyze_and_predict(self, trigger_index: str):
-        """Analizar acceso actual y predecir próximos índices"""
-        try:
-            predictions = self._find_matching_patterns(trigger_index)
-            
-            if predictions:
-                # Crear tarea de pre-carga en background
-                preload_task = asyncio.create_task(
-                    self._preload_predicted_indices(predictions)
-                )
-                self._background_tasks.add(preload_task)
-                preload_task.add_done_callback(self._background_tasks.discard)
+    def _learn_transition(self, source: str, target: str, now: datetime):
+        """Actualizar el modelo de Markov con la transición source -> target (requiere el lock)"""
+        outgoing = self._transitions[source]
+        for name in list(outgoing):
+            outgoing[name] *= self._transition_decay
+            if outgoing[name] < self._min_transition_weight:
+                del outgoing[name]
+                self._prediction_patterns.pop(f"{source}->{name}", None)
+        outgoing[target] = outgoing.get(target, 0.0) + 1.0
         
-        except Exception as e:
-            self.logger.warning(f"Error en análisis predictivo: {e}")
+        pattern_name = f"{source}->{target}"
+        pattern = self._prediction_patterns.get(pattern_name)
+        if pattern is None:
+            pattern = PredictionPattern(
+                pattern_name=pattern_name,
+                triggers=[source],
+                predicted_indices=[target],
+                confidence=0.0,
+                learned=True
+            )
+            self._prediction_patterns[pattern_name] = pattern
+        pattern.observed += 1
+        pattern.last_observed = now
+        self._refresh_confidences(source)
+        
+        self._unsaved_transitions += 1
+        if self._unsaved_transitions >= self._save_every:
+            self._schedule_save()
     
-    def _find_matching_patterns(self, trigger_index: str) -> List[Tuple[str, float]]:
-        """Encontrar patrones que coincidan con el trigger"""
+    def _schedule_save(self):
+        """Guardar el modelo en un hilo aparte: la petición que lo dispara no escribe a disco (requiere el lock)"""
+        if self._stopping or (self._saver is not None and self._saver.is_alive()):
+            return
+        self._saver = threading.Thread(target=self._save_patterns, name="PredictivePreloader-save", daemon=True)
+        self._saver.start()
+    
+    def _refresh_confidences(self, source: str):
+        """Confianza de los patrones aprendidos = probabilidad de transición desde source"""
+        outgoing = self._transitions.get(source, {})
+        total = sum(outgoing.values())
+        for target, weight in outgoing.items():
+            pattern = self._prediction_patterns.get(f"{source}->{target}")
+            if pattern is not None:
+                pattern.confidence = weight / total if total else 0.0
+    
+    def predict_next(self, index_name: str) -> List[Tuple[str, float]]:
+        """
+        Probabilidades aprendidas del siguiente índice
+        
+        Args:
+            index_name: Índice recién accedido
+        
+        Returns:
+            List[Tuple[str, float]]: (índice, probabilidad) de mayor a menor
+        """
+        with self._lock:
+            outgoing = self._transitions.get(index_name, {})
+            total = sum(outgoing.values())
+            if not total:
+                return []
+            return sorted(
+                ((target, weight / total) for target, weight in outgoing.items()),
+                key=lambda x: x[1],
+                reverse=True
+            )
+    
+    def _resolve_preloads(self, accessed: str):
+        """Marcar como útil la pre-carga accedida y descartar las que agotaron su ventana (requiere el lock)"""
+        record = self._outstanding_preloads.pop(accessed, None)
+        if record is not None:
+            self.useful_preloads += 1
+            self.useful_bytes += record.size_bytes
+            pattern = self._prediction_patterns.get(record.pattern_name)
+            if pattern is not None:
+                pattern.useful_preloads += 1
+                pattern.success_rate = pattern.precision
+        
+        for index_name, record in list(self._outstanding_preloads.items()):
+            record.accesses_left -= 1
+            if record.accesses_left > 0:
+                continue
+            del self._outstanding_preloads[index_name]
+            self.wasted_preloads += 1
+            self.wasted_bytes += record.size_bytes
+            pattern = self._prediction_patterns.get(record.pattern_name)
+            if pattern is not None:
+                pattern.wasted_preloads += 1
+                pattern.success_rate = pattern.precision
+            self._unload_index(index_name)
+    
+    def _unload_index(self, index_name: str):
+        """Soltar un índice pre-cargado para que el registro pueda expulsarlo"""
+        self._loaded_indices.pop(index_name, None)
+        self._loaded_sizes.pop(index_name, None)
+        self.registry.release(index_name, self._owner)
+    
+    def _decay_stale_patterns(self, now: Optional[datetime] = None) -> int:
+        """
+        Reducir el peso de las transiciones no observadas recientemente
+        
+        El peso se divide a la mitad por cada periodo _stale_after sin
+        observarse; las que caen bajo el mínimo se olvidan (requiere el lock).
+        
+        Returns:
+            int: Patrones aprendidos eliminados
+        """
+        now = now or datetime.now()
+        removed = 0
+        touched = set()
+        for pattern_name, pattern in list(self._prediction_patterns.items()):
+            if not pattern.learned or pattern.last_observed is None:
+                continue
+            idle = now - pattern.last_observed
+            if idle <= self._stale_after:
+                continue
+            source, target = pattern.triggers[0], pattern.predicted_indices[0]
+            outgoing = self._transitions.get(source, {})
+            weight = outgoing.get(target, 0.0) * 0.5 ** (idle / self._stale_after)
+            touched.add(source)
+            if weight < self._min_transition_weight:
+                outgoing.pop(target, None)
+                del self._prediction_patterns[pattern_name]
+                removed += 1
+            else:
+                outgoing[target] = weight
+                pattern.last_observed = now  # El decaimiento ya aplicado no se repite
+        for source in touched:
+            self._refresh_confidences(source)
+        return removed
+    
+    def _find_matching_patterns(self, trigger_index: str) -> List[Tuple[str, float, str]]:
+        """
+        Encontrar predicciones para el trigger
+        
+        Con historial se usa el modelo aprendido (probabilidad de transición,
+        promediada con la precisión medida cuando hay pre-cargas suficientes);
+        sin historial, los patrones por defecto.
+        
+        Returns:
+            List[Tuple[str, float, str]]: (índice, confianza, patrón que lo predice)
+        """
         matching_predictions = []
         
-        for pattern in self._prediction_patterns.values():
-            if trigger_index in pattern.triggers:
+        for predicted_index, probability in self.predict_next(trigger_index):
+            pattern_name = f"{trigger_index}->{predicted_index}"
+            pattern = self._prediction_patterns.get(pattern_name)
+            confidence = probability
+            if pattern is not None and pattern.preloads >= 3:
+                confidence = (probability + pattern.precision) / 2
+            if confidence >= self._min_pattern_confidence:
+                matching_predictions.append((predicted_index, confidence, pattern_name))
+        
+        if self._transitions.get(trigger_index):
+            matching_predictions.sort(key=lambda x: x[1], reverse=True)
+            return matching_predictions[:self._max_preload_candidates]
+        
+        for pattern in list(self._prediction_patterns.values()):
+            if not pattern.learned and trigger_index in pattern.triggers:
                 # Calcular confianza ajustada basada en historial
                 adjusted_confidence = pattern.confidence
-                if pattern.usage_count > 0:
-                    # Ponderar con tasa de éxito histórica
+                if pattern.useful_preloads + pattern.wasted_preloads > 0:
+                    # Ponderar con tasa de éxito medida
                     adjusted_confidence = (pattern.confidence + pattern.success_rate) / 2
                 
                 if adjusted_confidence >= self._min_pattern_confidence:
                     for predicted_index in pattern.predicted_indices:
-                        matching_predictions.append((predicted_index, adjusted_confidence))
+                        matching_predictions.append((predicted_index, adjusted_confidence, pattern.pattern_name))
         
         # Ordenar por confianza y limitar candidatos
         matching_predictions.sort(key=lambda x: x[1], reverse=True)
         return matching_predictions[:self._max_preload_candidates]
     
-    async def _preload_predicted_indices(self, predictions: List[Tuple[str, float]]):
-        """Pre-cargar índices predichos"""
-        for index_name, confidence in predictions:
-            try:
-                # Verificar si ya está cargado
-                if index_name in self._loaded_indices:
+    def enqueue_preloads(self, predictions: List[Tuple[str, float, str]], trigger: str = "") -> int:
+        """
+        Encolar pre-cargas para el pool de workers
+        
+        Args:
+            predictions: Tuplas (índice, confianza, patrón) como las de _find_matching_patterns
+            trigger: Índice cuyo acceso originó la predicción
+        
+        Returns:
+            int: Pre-cargas encoladas
+        """
+        with self._lock:
+            return self._enqueue_preloads(predictions, trigger)
+    
+    def _enqueue_preloads(self, predictions: List[Tuple[str, float, str]], trigger: str) -> int:
+        """Encolar por confianza con cola acotada (requiere el lock)"""
+        if self._stopping:
+            return 0
+        
+        queued = 0
+        for index_name, confidence, pattern_name in predictions:
+            if (index_name in self._loaded_indices or index_name in self._outstanding_preloads
+                    or index_name in self._running_preloads):
+                continue
+            
+            existing = self._queued_preloads.pop(index_name, None)
+            if existing is not None:
+                if existing.confidence >= confidence:
+                    self._queued_preloads[index_name] = existing
                     continue
-                
-                # Validar integridad antes de cargar
-                if self.integrity_checks:
-                    integrity = await self.validate_index_integrity(index_name)
-                    if not integrity.is_valid:
-                        self.logger.warning(f"Índice {index_name} falló validación, saltando pre-carga")
-                        continue
-                
-                # Pre-cargar índice
-                await self._load_index_async(index_name)
-                self.logger.debug(f"Pre-cargado índice {index_name} (confianza: {confidence:.2f})")
-                
+                existing.cancelled = True  # Se reencola con la nueva prioridad
+            elif len(self._queued_preloads) >= self.max_preload_queue:
+                # Cola llena: solo entra si supera a la pre-carga menos confiable
+                weakest = min(self._queued_preloads.values(), key=lambda t: t.confidence)
+                if weakest.confidence >= confidence:
+                    self.preloads_rejected += 1
+                    continue
+                self._cancel_preload(weakest)
+            
+            task = PreloadTask(
+                index_name=index_name,
+                confidence=confidence,
+                pattern_name=pattern_name,
+                trigger=trigger,
+                access_seq=self._access_count
+            )
+            self._queued_preloads[index_name] = task
+            self._queue_seq += 1
+            heapq.heappush(self._preload_queue, (-confidence, self._queue_seq, task))
+            queued += 1
+        
+        if queued:
+            # Las canceladas se retiran del heap al desencolarlas; compactar si se acumulan
+            if len(self._preload_queue) > 2 * self.max_preload_queue:
+                self._preload_queue = [entry for entry in self._preload_queue if not entry[2].cancelled]
+                heapq.heapify(self._preload_queue)
+            self._ensure_workers()
+            self._queue_cond.notify(queued)
+        return queued
+    
+    def _cancel_preload(self, task: PreloadTask):
+        """Cancelar una pre-carga encolada (requiere el lock)"""
+        task.cancelled = True
+        if self._queued_preloads.get(task.index_name) is task:
+            del self._queued_preloads[task.index_name]
+        self.preloads_cancelled += 1
+    
+    def _cancel_irrelevant_preloads(self, accessed: str):
+        """
+        Cancelar pre-cargas que dejaron de tener sentido (requiere el lock)
+        
+        El índice recién accedido ya lo carga el camino de la petición, y una
+        predicción que lleva _preload_window accesos esperando ya no es del
+        contexto actual. Una pre-carga en curso del índice accedido se
+        descarta al terminar.
+        """
+        for task in list(self._queued_preloads.values()):
+            if task.index_name == accessed or self._access_count - task.access_seq >= self._preload_window:
+                self._cancel_preload(task)
+        running = self._running_preloads.get(accessed)
+        if running is not None and not running.cancelled:
+            running.cancelled = True
+            self.preloads_cancelled += 1
+    
+    def _ensure_workers(self):
+        """Arrancar workers hasta max_preload_workers (requiere el lock)"""
+        self._workers = [worker for worker in self._workers if worker.is_alive()]
+        while len(self._workers) < self.max_preload_workers:
+            worker = threading.Thread(
+                target=self._preload_worker,
+                name=f"PredictivePreloader-{len(self._workers)}",
+                daemon=True
+            )
+            self._workers.append(worker)
+            worker.start()
+    
+    def _next_preload(self) -> Optional[PreloadTask]:
+        """Esperar la siguiente pre-carga; None si hay que parar o no hubo trabajo en _worker_idle_timeout"""
+        with self._queue_cond:
+            while not self._stopping:
+                while self._preload_queue and self._preload_queue[0][2].cancelled:
+                    heapq.heappop(self._preload_queue)
+                if self._preload_queue:
+                    task = heapq.heappop(self._preload_queue)[2]
+                    del self._queued_preloads[task.index_name]
+                    self._running_preloads[task.index_name] = task
+                    return task
+                if not self._queue_cond.wait(self._worker_idle_timeout):
+                    # Worker ocioso: termina para no retener el preloader; se rearranca al encolar
+                    self._workers = [w for w in self._workers if w is not threading.current_thread()]
+                    return None
+            return None
+    
+    def _preload_worker(self):
+        """Bucle de un worker del pool de pre-carga"""
+        while True:
+            task = self._next_preload()
+            if task is None:
+                return
+            try:
+                self._run_preload(task)
             except Exception as e:
-                self.logger.warning(f"Error pre-cargando {index_name}: {e}")
+                self.logger.warning(f"Error pre-cargando {task.index_name}: {e}")
+            finally:
+                with self._queue_cond:
+                    if self._running_preloads.get(task.index_name) is task:
+                        del self._running_preloads[task.index_name]
+                    self._queue_cond.notify_all()
+    
+    def _memory_tight(self, index_name: str) -> bool:
+        """Contrapresión: el índice no cabe bajo la marca de agua del presupuesto del registro"""
+        if self.registry.is_loaded(index_name):
+            return False
+        try:
+            size_bytes = (self.indices_dir / f"{index_name}.json").stat().st_size
+        except OSError:
+            return False
+        budget = self.registry.max_memory_bytes * self.memory_high_watermark
+        return self.registry.memory_bytes + size_bytes > budget
+    
+    def _run_preload(self, task: PreloadTask):
+        """Leer, validar y registrar una pre-carga (en un worker, fuera del lock)"""
+        index_name = task.index_name
+        if task.cancelled:
+            return
+        if self._memory_tight(index_name):
+            with self._lock:
+                self.preloads_skipped_memory += 1
+            self.logger.debug(f"Memoria al límite, pre-carga de {index_name} omitida")
+            return
+        
+        shared = self.registry.acquire(index_name, self._owner)
+        if shared is None:
+            return
+        
+        # Validar sobre los datos ya parseados (sin segunda lectura del archivo)
+        if self.integrity_checks:
+            integrity = self.check_index_integrity(index_name, shared.data)
+            if not integrity.is_valid:
+                self.logger.warning(f"Índice {index_name} falló validación, descartando pre-carga")
+                with self._lock:
+                    if index_name not in self._loaded_indices:
+                        self.registry.release(index_name, self._owner)
+                return
+        
+        with self._lock:
+            if index_name in self._loaded_indices:
+                return
+            if task.cancelled or self._stopping:
+                self.registry.release(index_name, self._owner)
+                return
+            self._loaded_indices[index_name] = shared.data
+            self._loaded_sizes[index_name] = shared.size_bytes
+            self._outstanding_preloads[index_name] = PreloadRecord(
+                index_name=index_name,
+                pattern_name=task.pattern_name,
+                size_bytes=shared.size_bytes,
+                accesses_left=self._preload_window
+            )
+            self.preloads_issued += 1
+            pattern = self._prediction_patterns.get(task.pattern_name)
+            if pattern is not None:
+                pattern.usage_count += 1
+                pattern.preloads += 1
+                pattern.last_used = datetime.now()
+        self.logger.debug(f"Pre-cargado índice {index_name} (confianza: {task.confidence:.2f}, patrón: {task.pattern_name})")
+    
+    def wait_for_preloads(self, timeout: Optional[float] = None) -> bool:
+        """
+        Esperar a que el pool vacíe la cola y termine las pre-cargas en curso
+        
+        Returns:
+            bool: False si se agotó el timeout
+        """
+        with self._queue_cond:
+            return self._queue_cond.wait_for(
+                lambda: not self._queued_preloads and not self._running_preloads, timeout
+            )
     
+    def shutdown(self, wait: bool = True, timeout: float = 5.0):
+        """Detener el pool de pre-carga (cancela lo encolado, no acepta más trabajo) y guardar el modelo"""
+        with self._queue_cond:
+            self._stopping = True
+            for task in list(self._queued_preloads.values()):
+                self._cancel_preload(task)
+            self._preload_queue.clear()
+            workers = list(self._workers)
+            self._workers = []
+            saver = self._saver
+            self._queue_cond.notify_all()
+        if wait:
+            for worker in workers:
+                if worker is not threading.current_thread():
+                    worker.join(timeout)
+            if saver is not None:
+                saver.join(timeout)
+        
+        # Persistir lo aprendido para el siguiente arranque
+        self._save_patterns()
+
     async def _load_index_async(self, index_name: str) -> Optional[Any]:
         """Cargar índice de forma asíncrona"""
         if index_name in self._loaded_indices:
             return self._loaded_indices[index_name]
         
         try:
-            index_file = self.indices_dir / f"{index_name}.json"
-            if not index_file.exists():
+            shared = self.registry.acquire(index_name, self._owner)
+            if shared is None:
                 return None
             
-            with open(index_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            self._loaded_indices[index_name] = data
-            return data
+            self._loaded_indices[index_name] = shared.data
+            self._loaded_sizes[index_name] = shared.size_bytes
+            return shared.data
         
         except Exception as e:
             self.logger.error(f"Error cargando índice {index_name}: {e}")
@@ -407,23 +803,52 @@ class PredictivePreloader:
             
             # Patrones más exitosos
             top_patterns = sorted(
-                [(name, pattern.success_rate, pattern.usage_count) 
-                 for name, pattern in self._prediction_patterns.items()],
-                key=lambda x: x[1],
+                self._prediction_patterns.values(),
+                key=lambda p: (p.success_rate, p.observed),
                 reverse=True
             )[:5]
             
+            resolved = self.useful_preloads + self.wasted_preloads
+            
             return {
                 "prediction_summary": {
                     "total_patterns": total_patterns,
                     "active_patterns": active_patterns,
                     "avg_success_rate": round(avg_success_rate, 3),
                     "total_predictions_made": sum(p.usage_count for p in self._prediction_patterns.values()),
-                    "background_tasks_active": len(self._background_tasks)
+                    "learned_patterns": sum(1 for p in self._prediction_patterns.values() if p.learned),
+                    "learned_transitions": sum(len(targets) for targets in self._transitions.values()),
+                },
+                "preload_pool": {
+                    "workers": sum(1 for worker in self._workers if worker.is_alive()),
+                    "max_workers": self.max_preload_workers,
+                    "queued": len(self._queued_preloads),
+                    "running": len(self._running_preloads),
+                    "max_queue": self.max_preload_queue,
+                    "cancelled": self.preloads_cancelled,
+                    "rejected_queue_full": self.preloads_rejected,
+                    "skipped_memory": self.preloads_skipped_memory
+                },
+                "preload_efficiency": {
+                    "preloads_issued": self.preloads_issued,
+                    "useful_preloads": self.useful_preloads,
+                    "wasted_preloads": self.wasted_preloads,
+                    "outstanding_preloads": len(self._outstanding_preloads),
+                    "precision": round(self.useful_preloads / resolved, 3) if resolved else 0.0,
+                    "useful_kb": round(self.useful_bytes / 1024, 1),
+                    "wasted_kb": round(self.wasted_bytes / 1024, 1)
                 },
                 "top_patterns": [
-                    {"name": name, "success_rate": rate, "usage_count": count}
-                    for name, rate, count in top_patterns
+                    {
+                        "name": pattern.pattern_name,
+                        "learned": pattern.learned,
+                        "success_rate": round(pattern.success_rate, 3),
+                        "usage_count": pattern.usage_count,
+                        "precision": round(pattern.precision, 3),
+                        "recall": round(pattern.recall, 3),
+                        "observed": pattern.observed
+                    }
+                    for pattern in top_patterns
                 ],
                 "recent_access_sequence": [
                     {"index": idx, "timestamp": ts.isoformat()}
@@ -456,6 +881,7 @@ class PredictivePreloader:
                     "integrity_rate": round(valid_indices / total_checked, 3) if total_checked > 0 else 0,
                     "total_errors": len(all_errors)
                 },
+                "incremental": self.integrity.get_stats(),
                 "most_common_errors": [
                     {"error": error, "count": count}
                     for error, count in most_common_errors
@@ -465,24 +891,18 @@ class PredictivePreloader:
                         "index": result.index_name,
                         "valid": result.is_valid,
                         "checked_at": result.checked_at.isoformat(),
-                        "errors": len(result.errors)
+                        "errors": len(result.errors),
+                        "cached": result.cached,
+                        "validated_entries": result.validated_entries
                     }
                     for result in list(self._integrity_results.values())[-10:]
                 ]
             }
     
     async def cleanup_background_tasks(self):
-        """Limpiar tareas en background"""
-        # Cancelar tareas pendientes
-        for task in self._background_tasks:
-            if not task.done():
-                task.cancel()
-        
-        # Esperar a que terminen
-        if self._background_tasks:
-            await asyncio.gather(*self._background_tasks, return_exceptions=True)
-        
-        self._background_tasks.clear()
+        """Detener el pool de pre-carga y persistir lo aprendido sin bloquear el event loop"""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self.shutdown)
         self.logger.debug("Tareas en background limpiadas")
 
 
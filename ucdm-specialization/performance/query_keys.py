@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Query Keys - Canonicalización de consultas y esquemas de claves de cache
+Consultas equivalentes ("Lección 1", "lección 1 ", "Explícame la Lección 1") comparten entrada
+"""
+
+import re
+import hashlib
+import unicodedata
+from datetime import datetime
+from typing import Optional, Tuple
+
+# Esquemas de clave disponibles, de menos a más agresivo
+KEY_SCHEMAS = ("raw", "normalized", "semantic")
+
+KEY_PREFIX = "response_"
+
+# Clasificación del motor original: subcadenas sobre el texto en minúsculas. Se
+# conservan los acentos porque las reglas distinguen "día" de "dia" ("media")
+_LESSON_PATTERN = re.compile(r'lecci[oó]n\s+(\d+)')
+_DAILY_PHRASES = ('hoy', 'diaria', 'día')
+_CONCEPT_PHRASES = ('sobre', 'acerca', 'explica')
+
+# Extracción del concepto (sobre el texto normalizado, solo para la clave)
+_CONCEPT_PATTERN = re.compile(r'\b(?:sobre|acerca de|acerca|explicame|explica)\s+(.+)$')
+_CONCEPT_SUFFIX = re.compile(
+    r'\s+(?:en|segun|del|de)\s+(?:el\s+)?(?:ucdm|un curso de milagros|curso de milagros|curso)$'
+)
+_LEADING_CONTRACTION = re.compile(r'^(?:del|al|de)\s+')
+_LEADING_ARTICLE = re.compile(r'^(?:el|la|los|las|lo|un|una)\s+')
+_PUNCTUATION = re.compile(r'[^\w\s-]')
+
+def normalize_query(query: str) -> str:
+    """
+    Forma canónica del texto de una consulta
+    
+    Minúsculas, sin acentos ni signos de puntuación y con espacios colapsados.
+    
+    Args:
+        query: Consulta tal como llega del usuario
+    
+    Returns:
+        str: Texto normalizado
+    """
+    decomposed = unicodedata.normalize("NFKD", query.lower())
+    without_accents = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(_PUNCTUATION.sub(" ", without_accents).split())
+
+def _classification_text(query: str) -> str:
+    """Minúsculas en forma Unicode compuesta y espacios colapsados (acentos y signos intactos)"""
+    return " ".join(unicodedata.normalize("NFC", query.lower()).split())
+
+def parse_query(query: str) -> Tuple[str, Optional[int], Optional[str]]:
+    """
+    Analizar la intención de una consulta
+    
+    Args:
+        query: Consulta (normalizada o no)
+    
+    Returns:
+        Tuple: (query_type, lesson_num, concept). Para "daily_lesson" la lección
+        depende de la fecha y se resuelve fuera de aquí. query_type sigue las
+        mismas reglas que el motor original; concept puede ser None si la
+        consulta es por concepto pero no tiene la forma "sobre/acerca de X".
+    """
+    text = _classification_text(query)
+    
+    # Lección específica
+    lesson_match = _LESSON_PATTERN.search(text)
+    if lesson_match:
+        return "lesson_specific", int(lesson_match.group(1)), None
+    
+    # Lección diaria
+    if any(phrase in text for phrase in _DAILY_PHRASES):
+        return "daily_lesson", None, None
+    
+    # Por concepto
+    if any(phrase in text for phrase in _CONCEPT_PHRASES):
+        return "concept_based", None, _extract_concept(normalize_query(query))
+    
+    return "general", None, None
+
+def _extract_concept(text: str) -> Optional[str]:
+    """Concepto de una consulta normalizada ("acerca del amor" y "sobre el amor" -> "amor")"""
+    concept_match = _CONCEPT_PATTERN.search(text)
+    if not concept_match:
+        return None
+    concept = _CONCEPT_SUFFIX.sub("", concept_match.group(1))
+    concept = _LEADING_CONTRACTION.sub("", concept)
+    concept = _LEADING_ARTICLE.sub("", concept).strip()
+    return concept or None
+
+class QueryKeyBuilder:
+    """
+    Constructor de claves de cache de respuestas según un esquema
+    
+    - raw: md5 del texto exacto (comportamiento original)
+    - normalized: md5 del texto normalizado
+    - semantic: intención analizada; claves legibles por lección, día y concepto
+      (response_lesson_1, response_daily_2024-05-01, response_concept_perdon)
+    
+    En todos los esquemas las consultas diarias incluyen la fecha.
+    """
+    
+    def __init__(self, schema: str = "semantic"):
+        if schema not in KEY_SCHEMAS:
+            raise ValueError(f"Esquema de clave desconocido: {schema}")
+        self.schema = schema
+    
+    @staticmethod
+    def _digest(text: str) -> str:
+        return hashlib.md5(text.encode()).hexdigest()[:16]
+    
+    def key_for(self, query: str, target_date: Optional[datetime] = None,
+                parsed: Optional[Tuple[str, Optional[int], Optional[str]]] = None) -> str:
+        """
+        Clave de cache de una consulta
+        
+        Args:
+            query: Consulta original
+            target_date: Fecha que resuelve "hoy" (por defecto la actual)
+            parsed: Resultado de parse_query si ya se calculó
+        
+        Returns:
+            str: Clave con prefijo "response_"
+        """
+        query_type, lesson_num, concept = parsed or parse_query(query)
+        day = (target_date or datetime.now()).strftime('%Y-%m-%d')
+        
+        if self.schema == "semantic":
+            if query_type == "lesson_specific":
+                return f"{KEY_PREFIX}lesson_{lesson_num}"
+            if query_type == "daily_lesson":
+                return f"{KEY_PREFIX}daily_{day}"
+            if query_type == "concept_based" and concept:
+                return f"{KEY_PREFIX}concept_{concept.replace(' ', '-')}"
+            return f"{KEY_PREFIX}{self._digest(normalize_query(query))}"
+        
+        text = query if self.schema == "raw" else normalize_query(query)
+        if query_type == "daily_lesson":
+            text = f"{text}@{day}"
+        return f"{KEY_PREFIX}{self._digest(text)}"
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Sharded Memory Cache (L1) - Cache en memoria segmentado por hash de clave
+Reduce la contención del lock global repartiendo las claves en segmentos LRU independientes
+"""
+
+import logging
+import threading
+from typing import Any, Optional, Dict, Iterable, List, Tuple, Union
+from datetime import datetime
+
+from .cache_sizer import CacheSizer, create_sizer
+from .memory_cache import MemoryCache, SharedByteBudget
+
+class ShardedMemoryCache:
+    """
+    Cache en memoria L1 dividido en N segmentos LRU
+    
+    Características:
+    - Un lock por segmento: lecturas de claves distintas no se serializan
+    - Presupuesto de bytes global compartido entre segmentos
+    - Expulsión rotativa entre segmentos cuando el presupuesto global se agota
+    - Misma interfaz pública que MemoryCache y estadísticas agregadas
+    """
+    
+    def __init__(self, max_size_mb: int = 50, default_ttl_hours: int = 1,
+                 cleanup_threshold: float = 0.8, shards: int = 16,
+                 sizer: Union[str, CacheSizer, None] = "sampling",
+                 eviction_policy: str = "lru"):
+        """
+        Inicializar cache segmentado
+        
+        Args:
+            max_size_mb: Tamaño máximo global en megabytes
+            default_ttl_hours: TTL por defecto en horas
+            cleanup_threshold: Umbral para limpieza automática (0.0-1.0)
+            shards: Número de segmentos independientes
+            sizer: Estimador de tamaño compartido por los segmentos
+            eviction_policy: Nombre de la política; cada segmento tiene su instancia
+        """
+        if shards < 1:
+            raise ValueError("El número de shards debe ser al menos 1")
+        
+        self.max_size_bytes = max_size_mb * 1024 * 1024
+        self.cleanup_threshold = cleanup_threshold
+        self.sizer = create_sizer(sizer)
+        self.budget = SharedByteBudget(self.max_size_bytes)
+        
+        self._shards: List[MemoryCache] = [
+            MemoryCache(
+                max_size_mb=max_size_mb,
+                default_ttl_hours=default_ttl_hours,
+                cleanup_threshold=cleanup_threshold,
+                sizer=self.sizer,
+                budget=self.budget,
+                eviction_policy=eviction_policy
+            )
+            for _ in range(shards)
+        ]
+        self._evict_cursor = 0
+        self._sweep_cursor = 0
+        self._cursor_lock = threading.Lock()
+        self.created_at = datetime.now()
+        
+        self.logger = self._setup_logging()
+        self.logger.info(f"ShardedMemoryCache inicializado - {shards} shards, Límite: {max_size_mb}MB")
+    
+    def _setup_logging(self) -> logging.Logger:
+        """Configurar logging específico"""
+        logger = logging.getLogger(f"{__name__}.ShardedMemoryCache")
+        logger.setLevel(logging.INFO)
+        
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            )
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        
+        return logger
+    
+    @property
+    def shard_count(self) -> int:
+        return len(self._shards)
+    
+    @property
+    def current_size_bytes(self) -> int:
+        return self.budget.used_bytes
+    
+    @property
+    def hits(self) -> int:
+        return sum(shard.hits for shard in self._shards)
+    
+    @property
+    def misses(self) -> int:
+        return sum(shard.misses for shard in self._shards)
+    
+    @property
+    def evictions(self) -> int:
+        return sum(shard.evictions for shard in self._shards)
+    
+    def _shard_for(self, key: str) -> int:
+        """Índice del segmento responsable de la clave"""
+        return hash(key) % len(self._shards)
+    
+    def _rebalance(self, required_bytes: int):
+        """Liberar espacio global expulsando de segmentos en rotación"""
+        with self._cursor_lock:
+            start = self._evict_cursor
+            self._evict_cursor = (self._evict_cursor + 1) % len(self._shards)
+        
+        for offset in range(len(self._shards)):
+            shard = self._shards[(start + offset) % len(self._shards)]
+            if shard.make_room(required_bytes):
+                return
+    
+    def get(self, key: str) -> Optional[Any]:
+        """Obtener valor del segmento correspondiente"""
+        return self._shards[self._shard_for(key)].get(key)
+    
+    def get_with_state(self, key: str) -> Tuple[Optional[Any], bool]:
+        """Obtener valor y si ya pasó su TTL blando"""
+        return self._shards[self._shard_for(key)].get_with_state(key)
+    
+    def put(self, key: str, value: Any, ttl_hours: Optional[int] = None,
+            size_hint: Optional[int] = None, tags: Optional[Iterable[str]] = None,
+            soft_ttl_hours: Optional[float] = None) -> bool:
+        """
+        Almacenar valor en el segmento correspondiente
+        
+        Args:
+            key: Clave única
+            value: Valor a almacenar
+            ttl_hours: TTL personalizado en horas
+            size_hint: Tamaño conocido en bytes (evita estimarlo)
+            tags: Etiquetas de invalidación
+            soft_ttl_hours: TTL blando en horas
+        
+        Returns:
+            bool: True si se almacenó exitosamente
+        """
+        size_bytes = size_hint if size_hint is not None else self.sizer.size_of(value)
+        
+        if size_bytes <= self.max_size_bytes * 0.5 and not self.budget.fits(size_bytes):
+            self._rebalance(size_bytes)
+        
+        return self._shards[self._shard_for(key)].put(
+            key, value, ttl_hours, size_hint=size_bytes, tags=tags, soft_ttl_hours=soft_ttl_hours
+        )
+    
+    def _group_by_shard(self, keys: Iterable[str]) -> Dict[int, List[str]]:
+        """Agrupar claves por segmento responsable"""
+        groups: Dict[int, List[str]] = {}
+        for key in keys:
+            groups.setdefault(self._shard_for(key), []).append(key)
+        return groups
+    
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        """Obtener varias claves: una toma de lock por segmento involucrado"""
+        found: Dict[str, Any] = {}
+        for shard_index, shard_keys in self._group_by_shard(keys).items():
+            found.update(self._shards[shard_index].get_many(shard_keys))
+        return found
+    
+    def put_many(self, items: Dict[str, Any], ttl_hours: Optional[int] = None,
+                 tags: Optional[Dict[str, Iterable[str]]] = None,
+                 soft_ttl_hours: Optional[float] = None) -> Dict[str, bool]:
+        """
+        Almacenar varios valores agrupados por segmento
+        
+        Args:
+            items: Claves y valores a almacenar
+            ttl_hours: TTL común en horas
+            tags: Etiquetas de invalidación por clave
+            soft_ttl_hours: TTL blando común en horas
+        
+        Returns:
+            Dict[str, bool]: Resultado de almacenamiento por clave
+        """
+        sizes = {key: self.sizer.size_of(value) for key, value in items.items()}
+        admissible = sum(size for size in sizes.values() if size <= self.max_size_bytes * 0.5)
+        
+        if admissible and not self.budget.fits(admissible):
+            self._rebalance(admissible)
+        
+        results: Dict[str, bool] = {}
+        for shard_index, shard_keys in self._group_by_shard(items).items():
+            results.update(self._shards[shard_index].put_many(
+                {key: items[key] for key in shard_keys}, ttl_hours,
+                size_hints={key: sizes[key] for key in shard_keys}, tags=tags,
+                soft_ttl_hours=soft_ttl_hours
+            ))
+        return results
+    
+    def delete(self, key: str) -> bool:
+        """Eliminar entrada específica"""
+        return self._shards[self._shard_for(key)].delete(key)
+    
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """Eliminar en todos los segmentos las entradas con alguna de las etiquetas"""
+        tags = set(tags)
+        return sum(shard.invalidate_tags(tags) for shard in self._shards)
+    
+    async def aget(self, key: str) -> Optional[Any]:
+        """Versión asíncrona de get (operación en memoria: no sale del event loop)"""
+        return self.get(key)
+    
+    async def aput(self, key: str, value: Any, ttl_hours: Optional[int] = None,
+                   size_hint: Optional[int] = None, tags: Optional[Iterable[str]] = None,
+                   soft_ttl_hours: Optional[float] = None) -> bool:
+        """Versión asíncrona de put"""
+        return self.put(key, value, ttl_hours, size_hint=size_hint, tags=tags, soft_ttl_hours=soft_ttl_hours)
+    
+    async def adelete(self, key: str) -> bool:
+        """Versión asíncrona de delete"""
+        return self.delete(key)
+    
+    def contains(self, key: str) -> bool:
+        """Verificar si una clave existe (sin afectar LRU)"""
+        return self._shards[self._shard_for(key)].contains(key)
+    
+    def clear(self):
+        """Limpiar todos los segmentos"""
+        for shard in self._shards:
+            shard.clear()
+    
+    def cleanup_expired(self) -> int:
+        """Limpiar entradas expiradas de todos los segmentos"""
+        return sum(shard.cleanup_expired() for shard in self._shards)
+    
+    def sweep_expired(self, max_items: int) -> int:
+        """Retirar como máximo `max_items` entradas vencidas repartidas entre segmentos"""
+        with self._cursor_lock:
+            start = self._sweep_cursor
+            self._sweep_cursor = (self._sweep_cursor + 1) % len(self._shards)
+        
+        removed = 0
+        for offset in range(len(self._shards)):
+            if removed >= max_items:
+                break
+            shard = self._shards[(start + offset) % len(self._shards)]
+            removed += shard.sweep_expired(max_items - removed)
+        return removed
+    
+    def should_cleanup(self) -> bool:
+        """Verificar si se debe ejecutar limpieza automática"""
+        return self.current_size_bytes / self.max_size_bytes >= self.cleanup_threshold
+    
+    def get_keys(self, pattern: Optional[str] = None) -> List[str]:
+        """Obtener claves de todos los segmentos"""
+        keys = []
+        for shard in self._shards:
+            keys.extend(shard.get_keys(pattern))
+        return keys
+    
+    def get_top_entries(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Obtener entradas más accedidas de todos los segmentos"""
+        entries = []
+        for shard in self._shards:
+            entries.extend(shard.get_top_entries(limit))
+        entries.sort(key=lambda x: x["access_count"], reverse=True)
+        return entries[:limit]
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        Obtener estadísticas agregadas de todos los segmentos
+        
+        Returns:
+            Dict con el mismo formato que MemoryCache.get_stats más detalle por shard
+        """
+        shard_stats = [shard.get_stats() for shard in self._shards]
+        
+        hits = sum(stats["performance"]["hits"] for stats in shard_stats)
+        misses = sum(stats["performance"]["misses"] for stats in shard_stats)
+        total_requests = hits + misses
+        entry_counts = [stats["memory"]["entry_count"] for stats in shard_stats]
+        entry_count = sum(entry_counts)
+        
+        def weighted_avg(section: str, field: str) -> float:
+            if entry_count == 0:
+                return 0.0
+            return sum(
+                stats[section][field] * stats["memory"]["entry_count"] for stats in shard_stats
+            ) / entry_count
+        
+        uptime = datetime.now() - self.created_at
+        
+        return {
+            "performance": {
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": round(hits / total_requests, 3) if total_requests > 0 else 0.0,
+                "stale_hits": sum(stats["performance"]["stale_hits"] for stats in shard_stats),
+                "evictions": sum(stats["performance"]["evictions"] for stats in shard_stats)
+            },
+            "memory": {
+                "current_size_mb": round(self.current_size_bytes / 1024 / 1024, 2),
+                "max_size_mb": round(self.max_size_bytes / 1024 / 1024, 2),
+                "usage_percent": round((self.current_size_bytes / self.max_size_bytes) * 100, 1),
+                "entry_count": entry_count
+            },
+            "entries": {
+                "avg_age_seconds": round(weighted_avg("entries", "avg_age_seconds"), 1),
+                "avg_access_count": round(weighted_avg("entries", "avg_access_count"), 1),
+                "oldest_entry_age": max(stats["entries"]["oldest_entry_age"] for stats in shard_stats),
+                "most_accessed_count": max(stats["entries"]["most_accessed_count"] for stats in shard_stats)
+            },
+            "config": shard_stats[0]["config"],
+            "sizing": self.sizer.get_stats(),
+            "sharding": {
+                "shards": len(self._shards),
+                "entries_per_shard": entry_counts,
+                "max_shard_entries": max(entry_counts),
+                "min_shard_entries": min(entry_counts)
+            },
+            "uptime_hours": round(uptime.total_seconds() / 3600, 2)
+        }
+
+
+def create_sharded_memory_cache(max_size_mb: int = 50, ttl_hours: int = 1,
+                                shards: int = 16) -> ShardedMemoryCache:
+    """
+    Crear instancia de ShardedMemoryCache con configuración
+    
+    Args:
+        max_size_mb: Tamaño máximo global en MB
+        ttl_hours: TTL por defecto en horas
+        shards: Número de segmentos
+    
+    Returns:
+        ShardedMemoryCache: Instancia configurada
+    """
+    return ShardedMemoryCache(max_size_mb=max_size_mb, default_ttl_hours=ttl_hours, shards=shards)
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+Single Flight - Coalescencia de solicitudes concurrentes por clave
+Garantiza que una sola ejecución del loader atienda a todos los solicitantes simultáneos
+"""
+
+import asyncio
+import threading
+from typing import Any, Callable, Dict, Optional, Awaitable
+
+class _Call:
+    """Ejecución en curso compartida entre solicitantes"""
+    
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+class SingleFlight:
+    """
+    Coalescencia de llamadas concurrentes basada en threads
+    
+    Características:
+    - Un único "líder" ejecuta la función por clave
+    - Los demás threads esperan y comparten resultado o excepción
+    - Métricas de ejecuciones y solicitudes coalescidas
+    """
+    
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        
+        # Métricas
+        self.executions = 0
+        self.coalesced = 0
+    
+    def do(self, key: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Ejecutar func una sola vez para todos los solicitantes concurrentes de key
+        
+        Args:
+            key: Clave que identifica el trabajo
+            func: Función a ejecutar
+        
+        Returns:
+            Any: Resultado compartido de la ejecución
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                self.coalesced += 1
+                is_leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+                is_leader = True
+        
+        if not is_leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+        
+        try:
+            call.result = func(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+    
+    def in_flight(self) -> int:
+        """Número de claves con ejecución en curso"""
+        with self._lock:
+            return len(self._calls)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtener métricas de coalescencia"""
+        with self._lock:
+            total = self.executions + self.coalesced
+            return {
+                "executions": self.executions,
+                "coalesced_requests": self.coalesced,
+                "in_flight": len(self._calls),
+                "coalesce_ratio": round(self.coalesced / total, 3) if total > 0 else 0.0
+            }
+
+class AsyncSingleFlight:
+    """
+    Coalescencia de corrutinas concurrentes dentro de un event loop
+    
+    La carga corre en su propia tarea, creada por el primer solicitante, y
+    todos (el primero incluido) la esperan a través de asyncio.shield: cancelar
+    a un solicitante no cancela la carga ni a los demás.
+    """
+    
+    def __init__(self):
+        self._tasks: Dict[str, asyncio.Task] = {}
+        
+        # Métricas
+        self.executions = 0
+        self.coalesced = 0
+    
+    async def do(self, key: str, coro_func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Ejecutar coro_func una sola vez para todos los solicitantes concurrentes de key
+        
+        Args:
+            key: Clave que identifica el trabajo
+            coro_func: Función sin argumentos que retorna una corrutina
+        
+        Returns:
+            Any: Resultado compartido de la ejecución
+        """
+        task = self._tasks.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(coro_func())
+            self._tasks[key] = task
+            self.executions += 1
+            task.add_done_callback(lambda done, key=key: self._finish(key, done))
+        
+        return await asyncio.shield(task)
+    
+    def _finish(self, key: str, task: asyncio.Task):
+        """Retirar la tarea terminada de las claves en vuelo"""
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        # Marcar la excepción como recuperada aunque ya no quede nadie esperando
+        if not task.cancelled():
+            task.exception()
+    
+    def in_flight(self) -> int:
+        """Número de claves con ejecución en curso"""
+        return len(self._tasks)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtener métricas de coalescencia"""
+        total = self.executions + self.coalesced
+        return {
+            "executions": self.executions,
+            "coalesced_requests": self.coalesced,
+            "in_flight": len(self._tasks),
+            "coalesce_ratio": round(self.coalesced / total, 3) if total > 0 else 0.0
+        }
@@ -0,0 +1,617 @@
+#!/usr/bin/env python3
+"""
+SQLite Disk Cache (L2) - Cache en disco sobre una única base SQLite
+Entradas como BLOBs con columnas indexadas de expiración y último acceso
+"""
+
+import time
+import zlib
+import pickle
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Any, Optional, Dict, Iterable, List, Iterator, Tuple
+from datetime import datetime, timedelta
+
+from .compression_codecs import CompressionCodec, create_codec
+from .async_cache import AsyncCacheMixin
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    codec TEXT NOT NULL,
+    size_bytes INTEGER NOT NULL,
+    checksum INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_accessed REAL NOT NULL,
+    expires_at REAL,
+    access_count INTEGER NOT NULL DEFAULT 0,
+    soft_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS idx_entries_expires_at ON entries(expires_at) WHERE expires_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_entries_last_accessed ON entries(last_accessed);
+
+CREATE TABLE IF NOT EXISTS entry_tags (
+    key TEXT NOT NULL,
+    tag TEXT NOT NULL,
+    PRIMARY KEY (key, tag)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_entry_tags_tag ON entry_tags(tag);
+
+CREATE TABLE IF NOT EXISTS cache_meta (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO cache_meta (name, value) VALUES ('total_bytes', 0);
+
+CREATE TRIGGER IF NOT EXISTS entries_size_insert AFTER INSERT ON entries BEGIN
+    UPDATE cache_meta SET value = value + NEW.size_bytes WHERE name = 'total_bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS entries_size_delete AFTER DELETE ON entries BEGIN
+    UPDATE cache_meta SET value = value - OLD.size_bytes WHERE name = 'total_bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS entries_size_update AFTER UPDATE OF size_bytes ON entries BEGIN
+    UPDATE cache_meta SET value = value + NEW.size_bytes - OLD.size_bytes WHERE name = 'total_bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS entries_tags_delete AFTER DELETE ON entries BEGIN
+    DELETE FROM entry_tags WHERE key = OLD.key;
+END;
+"""
+
+# Filas expulsadas por consulta al hacer espacio
+EVICTION_BATCH = 64
+
+class SQLiteDiskCache(AsyncCacheMixin):
+    """
+    Cache en disco L2 sobre SQLite (modo WAL)
+    
+    Características:
+    - Una base de datos en vez de un archivo por clave: arranque sin recorrer archivos
+    - Expulsión LRU con `ORDER BY last_accessed LIMIT k` sobre un índice
+    - Expiración con `expires_at <= ahora` sobre un índice parcial
+    - Tamaño total mantenido por triggers en la misma transacción
+    - Etiquetas de invalidación en la tabla entry_tags (se borran con la entrada)
+    - TTL blando por entrada (columna soft_expires_at) para stale-while-revalidate
+    - WAL: los lectores no bloquean a los escritores (también entre procesos)
+    - Accesos acumulados en memoria y volcados en lotes (las lecturas no escriben)
+    - Misma interfaz pública que DiskCache (incluida la asíncrona)
+    - Thread-safe
+    """
+    
+    def __init__(self, cache_dir: str = "data/cache", max_size_gb: int = 2,
+                 default_ttl_hours: int = 24, compression_threshold_kb: int = 1,
+                 compression_codec: str = "zlib-6", access_flush_every: int = 32,
+                 busy_timeout_ms: int = 5000, compress: bool = True):
+        """
+        Inicializar cache SQLite
+        
+        Args:
+            cache_dir: Directorio donde se crea cache.sqlite3
+            max_size_gb: Tamaño máximo de payloads en gigabytes
+            default_ttl_hours: TTL por defecto en horas
+            compression_threshold_kb: Umbral para compresión en KB
+            compression_codec: Códec para payloads grandes ("none", "gzip", "zlib-1/6/9", "lzma")
+            access_flush_every: Hits acumulados antes de volcar last_accessed/access_count
+            busy_timeout_ms: Espera máxima por el lock de escritura de otro proceso
+            compress: Comprimir payloads nuevos (False = guardar siempre sin comprimir)
+        """
+        self.cache_dir = Path(cache_dir)
+        self.db_path = self.cache_dir / "cache.sqlite3"
+        self.max_size_bytes = max_size_gb * 1024 * 1024 * 1024
+        self.default_ttl = timedelta(hours=default_ttl_hours)
+        self.compression_threshold = compression_threshold_kb * 1024
+        self.compress = compress
+        self.codec: CompressionCodec = create_codec(compression_codec)
+        self.access_flush_every = access_flush_every
+        self.busy_timeout_ms = busy_timeout_ms
+        
+        self._lock = threading.RLock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._codecs: Dict[str, CompressionCodec] = {self.codec.name: self.codec}
+        
+        # Accesos pendientes de volcar: clave -> (último acceso, hits acumulados)
+        self._pending_access: Dict[str, Tuple[float, int]] = {}
+        
+        # Métricas
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.deletes = 0
+        self.evictions = 0
+        self.stale_hits = 0
+        self.compressions = 0
+        self.access_flushes = 0
+        self.created_at = datetime.now()
+        
+        # Logging
+        self.logger = self._setup_logging()
+        
+        # Inicialización
+        self._initialize_database()
+        
+        self.logger.info(f"SQLiteDiskCache inicializado - DB: {self.db_path}, Límite: {max_size_gb}GB")
+    
+    def _setup_logging(self) -> logging.Logger:
+        """Configurar logging específico"""
+        logger = logging.getLogger(f"{__name__}.SQLiteDiskCache")
+        logger.setLevel(logging.INFO)
+        
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            )
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        
+        return logger
+    
+    def _initialize_database(self):
+        """Abrir conexión, configurar WAL y crear esquema"""
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            
+            # Autocommit: las transacciones de escritura se abren explícitamente
+            self._conn = sqlite3.connect(str(self.db_path), isolation_level=None,
+                                         check_same_thread=False)
+            self._conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+            # auto_vacuum solo tiene efecto antes de crear tablas
+            self._conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            self._conn.execute("PRAGMA journal_mode = WAL")
+            self._conn.execute("PRAGMA synchronous = NORMAL")
+            
+            self._conn.executescript("BEGIN IMMEDIATE;" + SCHEMA + "COMMIT;")
+            
+            # Bases creadas antes del TTL blando (en transacción: otro proceso puede migrar a la vez)
+            with self._write_transaction() as conn:
+                columns = {row[1] for row in conn.execute("PRAGMA table_info(entries)")}
+                if "soft_expires_at" not in columns:
+                    conn.execute("ALTER TABLE entries ADD COLUMN soft_expires_at REAL")
+        
+        except Exception as e:
+            self.logger.error(f"Error inicializando base de datos de cache: {e}")
+            raise
+    
+    @contextmanager
+    def _write_transaction(self) -> Iterator[sqlite3.Connection]:
+        """Transacción de escritura (BEGIN IMMEDIATE evita deadlocks al promover locks)"""
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._conn
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        else:
+            self._conn.execute("COMMIT")
+    
+    @property
+    def current_size_bytes(self) -> int:
+        """Bytes de payload almacenados (mantenido por triggers, visible entre procesos)"""
+        with self._lock:
+            row = self._conn.execute("SELECT value FROM cache_meta WHERE name = 'total_bytes'").fetchone()
+            return row[0] if row else 0
+    
+    def _codec_for(self, name: str) -> CompressionCodec:
+        """Obtener códec por nombre (entradas escritas con otra configuración)"""
+        codec = self._codecs.get(name)
+        if codec is None:
+            codec = create_codec(name)
+            self._codecs[name] = codec
+        return codec
+    
+    def _compress_data(self, data: bytes) -> Tuple[bytes, str]:
+        """
+        Comprimir datos si superan el umbral
+        
+        Returns:
+            Tuple[bytes, str]: (datos_finales, códec usado o "none")
+        """
+        if self.compress and len(data) >= self.compression_threshold and self.codec.name != "none":
+            try:
+                compressed = self.codec.compress(data)
+                if len(compressed) < len(data) * 0.9:  # Solo si reduce al menos 10%
+                    self.compressions += 1
+                    return compressed, self.codec.name
+            except Exception as e:
+                self.logger.warning(f"Error comprimiendo datos: {e}")
+        
+        return data, "none"
+    
+    def _flush_access_updates(self):
+        """Volcar en un lote los accesos acumulados desde el último volcado"""
+        if not self._pending_access:
+            return
+        
+        with self._write_transaction():
+            self._apply_pending_access()
+    
+    def _apply_pending_access(self):
+        """Escribir los accesos acumulados (dentro de una transacción de escritura)"""
+        if not self._pending_access:
+            return
+        
+        updates = [(last_accessed, hits, key) for key, (last_accessed, hits) in self._pending_access.items()]
+        self._pending_access.clear()
+        self._conn.executemany(
+            "UPDATE entries SET last_accessed = ?, access_count = access_count + ? WHERE key = ?",
+            updates
+        )
+        self.access_flushes += 1
+    
+    def _remove_expired(self, limit: Optional[int] = None) -> int:
+        """Remover entradas vencidas usando el índice de expires_at (dentro de una transacción)"""
+        now = time.time()
+        if limit is None:
+            cursor = self._conn.execute(
+                "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,)
+            )
+        else:
+            cursor = self._conn.execute(
+                "DELETE FROM entries WHERE key IN ("
+                "SELECT key FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ? "
+                "ORDER BY expires_at LIMIT ?)",
+                (now, limit)
+            )
+        return cursor.rowcount
+    
+    def _make_room(self, required_bytes: int) -> bool:
+        """Hacer espacio expulsando entradas (dentro de una transacción de escritura)"""
+        if self.current_size_bytes + required_bytes <= self.max_size_bytes:
+            return True
+        
+        # Primero: retirar solo las expiradas ya vencidas
+        self._remove_expired()
+        
+        # Segundo: expulsar las menos recientes por lotes sobre el índice de last_accessed
+        # (con los hits pendientes ya volcados, o los recientes parecerían antiguos)
+        self._apply_pending_access()
+        removed_count = 0
+        while self.current_size_bytes + required_bytes > self.max_size_bytes:
+            victims = self._conn.execute(
+                "SELECT key FROM entries ORDER BY last_accessed LIMIT ?", (EVICTION_BATCH,)
+            ).fetchall()
+            if not victims:
+                break
+            
+            for (key,) in victims:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._pending_access.pop(key, None)
+                removed_count += 1
+                if self.current_size_bytes + required_bytes <= self.max_size_bytes:
+                    break
+        
+        if removed_count > 0:
+            self.evictions += removed_count
+            self.logger.debug(f"Removidas {removed_count} entradas para hacer espacio")
+        
+        return self.current_size_bytes + required_bytes <= self.max_size_bytes
+    
+    def get(self, key: str) -> Optional[Any]:
+        """
+        Obtener valor del cache
+        
+        Args:
+            key: Clave de búsqueda
+        
+        Returns:
+            Optional[Any]: Valor si existe y no ha expirado
+        """
+        return self._read(key)[0]
+    
+    def get_with_state(self, key: str) -> Tuple[Optional[Any], bool]:
+        """
+        Obtener valor indicando si ya pasó su TTL blando
+        
+        Args:
+            key: Clave de búsqueda
+        
+        Returns:
+            Tuple[Optional[Any], bool]: (valor o None, True si debe regenerarse en background)
+        """
+        with self._lock:
+            value, soft_expires_at = self._read(key)
+            stale = value is not None and soft_expires_at is not None and soft_expires_at <= time.time()
+            if stale:
+                self.stale_hits += 1
+            return value, stale
+    
+    def _read(self, key: str) -> Tuple[Optional[Any], Optional[float]]:
+        """Leer una entrada: (valor o None, soft_expires_at)"""
+        with self._lock:
+            try:
+                row = self._conn.execute(
+                    "SELECT value, codec, checksum, expires_at, soft_expires_at FROM entries WHERE key = ?",
+                    (key,)
+                ).fetchone()
+                if row is None:
+                    self.misses += 1
+                    return None, None
+                
+                data, codec_name, checksum, expires_at, soft_expires_at = row
+                
+                if expires_at is not None and expires_at <= time.time():
+                    self._delete_key(key)
+                    self.misses += 1
+                    return None, None
+                
+                if zlib.crc32(data) != checksum:
+                    self.logger.warning(f"Checksum inválido para {key}, removiendo")
+                    self._delete_key(key)
+                    self.misses += 1
+                    return None, None
+                
+                if codec_name != "none":
+                    data = self._codec_for(codec_name).decompress(data)
+                value = pickle.loads(data)
+                
+                # Acumular acceso; se vuelca en lote cada `access_flush_every` hits
+                _, pending_hits = self._pending_access.get(key, (0.0, 0))
+                self._pending_access[key] = (time.time(), pending_hits + 1)
+                self.hits += 1
+                if self.hits % self.access_flush_every == 0:
+                    self._flush_access_updates()
+                
+                return value, soft_expires_at
+            
+            except Exception as e:
+                self.logger.error(f"Error leyendo cache {key}: {e}")
+                self.misses += 1
+                return None, None
+    
+    def put(self, key: str, value: Any, ttl_hours: Optional[int] = None,
+            tags: Optional[Iterable[str]] = None, soft_ttl_hours: Optional[float] = None) -> bool:
+        """
+        Almacenar valor en una única transacción (espacio + upsert)
+        
+        Args:
+            key: Clave única
+            value: Valor a almacenar
+            ttl_hours: TTL personalizado en horas
+            tags: Etiquetas de invalidación (filas de entry_tags en la misma transacción)
+            soft_ttl_hours: TTL blando; pasado este plazo get_with_state marca el
+                valor como vencido pero lo sigue sirviendo hasta ttl_hours
+        
+        Returns:
+            bool: True si se almacenó exitosamente
+        """
+        with self._lock:
+            try:
+                data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                final_data, codec_name = self._compress_data(data)
+                
+                if len(final_data) > self.max_size_bytes * 0.1:  # Max 10% del cache
+                    self.logger.warning(f"Objeto demasiado grande para cache: {len(final_data)/1024/1024:.1f}MB")
+                    return False
+                
+                ttl = timedelta(hours=ttl_hours) if ttl_hours else self.default_ttl
+                now = time.time()
+                expires_at = now + ttl.total_seconds() if ttl.total_seconds() > 0 else None
+                soft_expires_at = now + soft_ttl_hours * 3600 if soft_ttl_hours else None
+                if soft_expires_at and expires_at and soft_expires_at >= expires_at:
+                    soft_expires_at = None
+                
+                with self._write_transaction() as conn:
+                    # La entrada anterior no cuenta para el espacio necesario
+                    conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                    if not self._make_room(len(final_data)):
+                        raise MemoryError("No se pudo hacer espacio en cache de disco")
+                    conn.execute(
+                        "INSERT INTO entries (key, value, codec, size_bytes, checksum, created_at, "
+                        "last_accessed, expires_at, access_count, soft_expires_at) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, 0, ?)",
+                        (key, final_data, codec_name, len(final_data), zlib.crc32(final_data),
+                         now, now, expires_at, soft_expires_at)
+                    )
+                    conn.executemany(
+                        "INSERT INTO entry_tags (key, tag) VALUES (?, ?)",
+                        [(key, tag) for tag in sorted(set(tags or ()))]
+                    )
+                
+                self._pending_access.pop(key, None)
+                self.writes += 1
+                
+                self.logger.debug(f"Almacenado en cache: {key} ({len(final_data)/1024:.1f}KB, códec: {codec_name})")
+                return True
+            
+            except MemoryError as e:
+                self.logger.warning(str(e))
+                return False
+            except Exception as e:
+                self.logger.error(f"Error almacenando en cache {key}: {e}")
+                return False
+    
+    def _delete_key(self, key: str) -> bool:
+        """Eliminar fila de una clave"""
+        self._pending_access.pop(key, None)
+        with self._write_transaction() as conn:
+            deleted = conn.execute("DELETE FROM entries WHERE key = ?", (key,)).rowcount > 0
+        if deleted:
+            self.deletes += 1
+        return deleted
+    
+    def delete(self, key: str) -> bool:
+        """Eliminar entrada del cache"""
+        with self._lock:
+            return self._delete_key(key)
+    
+    def invalidate_tags(self, tags: Iterable[str]) -> int:
+        """
+        Eliminar las entradas que tengan alguna de las etiquetas
+        
+        Args:
+            tags: Etiquetas invalidadas
+        
+        Returns:
+            int: Número de entradas eliminadas
+        """
+        tags = sorted(set(tags))
+        if not tags:
+            return 0
+        
+        placeholders = ",".join("?" * len(tags))
+        with self._lock:
+            with self._write_transaction() as conn:
+                stale = [key for (key,) in conn.execute(
+                    f"SELECT DISTINCT key FROM entry_tags WHERE tag IN ({placeholders})", tags
+                )]
+                conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in stale])
+            for key in stale:
+                self._pending_access.pop(key, None)
+            self.deletes += len(stale)
+            return len(stale)
+    
+    def contains(self, key: str) -> bool:
+        """Verificar si una clave existe y no ha expirado (sin leer el BLOB)"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM entries WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+                (key, time.time())
+            ).fetchone()
+            return row is not None
+    
+    def get_keys(self, pattern: Optional[str] = None) -> List[str]:
+        """
+        Obtener lista de claves en el cache
+        
+        Args:
+            pattern: Patrón opcional para filtrar claves (sintaxis fnmatch/GLOB)
+        
+        Returns:
+            Lista de claves que coinciden
+        """
+        with self._lock:
+            if pattern:
+                rows = self._conn.execute("SELECT key FROM entries WHERE key GLOB ?", (pattern,))
+            else:
+                rows = self._conn.execute("SELECT key FROM entries")
+            return [key for (key,) in rows]
+    
+    def sweep_expired(self, max_items: int) -> int:
+        """
+        Retirar como máximo `max_items` entradas vencidas y volcar accesos (usado por ExpirySweeper)
+        
+        Returns:
+            int: Número de entradas removidas
+        """
+        with self._lock:
+            self._flush_access_updates()
+            with self._write_transaction():
+                removed = self._remove_expired(limit=max_items)
+            self.deletes += removed
+            return removed
+    
+    def cleanup(self) -> Dict[str, int]:
+        """
+        Limpieza completa: expiradas, páginas libres y checkpoint del WAL
+        
+        Returns:
+            Dict con estadísticas de limpieza
+        """
+        with self._lock:
+            self._flush_access_updates()
+            with self._write_transaction():
+                expired_count = self._remove_expired()
+            self.deletes += expired_count
+            
+            freed_pages = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+            self._conn.execute("PRAGMA incremental_vacuum")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            
+            return {
+                'expired_removed': expired_count,
+                'pages_reclaimed': freed_pages,
+                'total_entries': self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0],
+                'total_size_mb': round(self.current_size_bytes / 1024 / 1024, 2)
+            }
+    
+    def clear(self):
+        """Limpiar todo el cache"""
+        with self._lock:
+            self._pending_access.clear()
+            with self._write_transaction() as conn:
+                cleared_count = conn.execute("DELETE FROM entries").rowcount
+            self._conn.execute("PRAGMA incremental_vacuum")
+            self.logger.info(f"Cache de disco limpiado - {cleared_count} entradas removidas")
+    
+    def checkpoint(self):
+        """Volcar accesos pendientes y el WAL a la base (p.ej. al cerrar)"""
+        with self._lock:
+            self._flush_access_updates()
+            self._conn.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    
+    def close(self):
+        """Cerrar la conexión"""
+        with self._lock:
+            if self._conn is not None:
+                self._flush_access_updates()
+                self._conn.close()
+                self._conn = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtener estadísticas del cache"""
+        with self._lock:
+            total_requests = self.hits + self.misses
+            hit_ratio = self.hits / total_requests if total_requests > 0 else 0.0
+            current_size_bytes = self.current_size_bytes
+            
+            entry_count = self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+            page_size = self._conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+            freelist_count = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+            journal_mode = self._conn.execute("PRAGMA journal_mode").fetchone()[0]
+            
+            uptime = datetime.now() - self.created_at
+            
+            return {
+                "performance": {
+                    "hits": self.hits,
+                    "misses": self.misses,
+                    "hit_ratio": round(hit_ratio, 3),
+                    "stale_hits": self.stale_hits,
+                    "writes": self.writes,
+                    "deletes": self.deletes,
+                    "evictions": self.evictions,
+                    "compressions": self.compressions
+                },
+                "storage": {
+                    "current_size_mb": round(current_size_bytes / 1024 / 1024, 2),
+                    "max_size_gb": round(self.max_size_bytes / 1024 / 1024 / 1024, 2),
+                    "usage_percent": round((current_size_bytes / self.max_size_bytes) * 100, 1),
+                    "entry_count": entry_count,
+                    "cache_dir": str(self.cache_dir)
+                },
+                "sqlite": {
+                    "db_path": str(self.db_path),
+                    "sqlite_version": sqlite3.sqlite_version,
+                    "journal_mode": journal_mode,
+                    "file_mb": round(page_size * page_count / 1024 / 1024, 2),
+                    "free_pages": freelist_count,
+                    "pending_access_updates": len(self._pending_access),
+                    "access_flushes": self.access_flushes
+                },
+                "config": {
+                    "default_ttl_hours": self.default_ttl.total_seconds() / 3600,
+                    "compress": self.compress,
+                    "compression_threshold_kb": self.compression_threshold / 1024,
+                    "compression_codec": self.codec.name,
+                    "access_flush_every": self.access_flush_every
+                },
+                "uptime_hours": round(uptime.total_seconds() / 3600, 2)
+            }
+
+
+def create_sqlite_disk_cache(cache_dir: str = "data/cache", max_size_gb: int = 2) -> SQLiteDiskCache:
+    """
+    Crear instancia de SQLiteDiskCache con configuración
+    
+    Args:
+        cache_dir: Directorio para la base de datos
+        max_size_gb: Tamaño máximo en GB
+    
+    Returns:
+        SQLiteDiskCache: Instancia configurada
+    """
+    return SQLiteDiskCache(cache_dir=cache_dir, max_size_gb=max_size_gb)
@@ -5,8 +5,10 @@ Casos edge, stress testing y performance monitoring
 
 from .edge_case_generator import EdgeCaseGenerator
 from .stress_test_runner import StressTestRunner
+from .cache_policy_benchmark import CachePolicyBenchmark
 
 __all__ = [
     'EdgeCaseGenerator',
-    'StressTestRunner'
+    'StressTestRunner',
+    'CachePolicyBenchmark'
 ]
\ No newline at end of file
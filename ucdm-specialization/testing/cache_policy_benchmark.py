@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+Cache Policy Benchmark - Comparación de políticas de expulsión sobre trazas de consultas
+Reproduce una traza (real o sintética) contra MemoryCache con cada política y compara hit ratios
+(también compara esquemas de clave: raw, normalized, semantic)
+"""
+
+import sys
+import json
+import time
+import random
+import logging
+from pathlib import Path
+from datetime import datetime
+from typing import Callable, List, Dict, Any, Optional
+
+sys.path.append(str(Path(__file__).parent.parent))
+from performance.memory_cache import MemoryCache
+from performance.eviction_policies import EVICTION_POLICIES
+from performance.query_keys import KEY_SCHEMAS, QueryKeyBuilder
+
+class CachePolicyBenchmark:
+    """
+    Benchmark de hit ratio por política de expulsión
+    
+    La traza sintética imita el tráfico UCDM: unas pocas consultas muy
+    calientes (lección de hoy, "perdón", "amor"), lecciones con popularidad
+    tipo Zipf y una cola larga de consultas libres que se ven una sola vez.
+    """
+    
+    HOT_QUERIES = [
+        "¿Cuál es la lección de hoy?",
+        "Háblame sobre el perdón en UCDM",
+        "Háblame sobre el amor en UCDM",
+    ]
+    
+    # Formas en que los usuarios escriben la misma consulta
+    LESSON_PHRASINGS = [
+        "Explícame la Lección {n}",
+        "Lección {n}",
+        "lección {n} ",
+        "explicame la leccion {n}",
+        "Háblame sobre la Lección {n} del UCDM",
+    ]
+    HOT_PHRASINGS = {
+        "¿Cuál es la lección de hoy?": ["¿Cuál es la lección de hoy?", "cual es la leccion de hoy", "Lección de hoy"],
+        "Háblame sobre el perdón en UCDM": ["Háblame sobre el perdón en UCDM", "hablame sobre el perdon",
+                                           "Háblame sobre el perdón según Un Curso de Milagros"],
+        "Háblame sobre el amor en UCDM": ["Háblame sobre el amor en UCDM", "Háblame sobre el amor"],
+    }
+    
+    def __init__(self, seed: Optional[int] = 42):
+        """
+        Inicializar benchmark
+        
+        Args:
+            seed: Semilla para reproducibilidad de la traza sintética
+        """
+        self._random = random.Random(seed)
+        self.logger = self._setup_logging()
+    
+    def _setup_logging(self) -> logging.Logger:
+        """Configurar logging"""
+        logger = logging.getLogger(f"{__name__}.CachePolicyBenchmark")
+        logger.setLevel(logging.INFO)
+        
+        if not logger.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter(
+                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+            )
+            handler.setFormatter(formatter)
+            logger.addHandler(handler)
+        
+        return logger
+    
+    def generate_trace(self, length: int = 20000, hot_ratio: float = 0.3,
+                       tail_ratio: float = 0.4, zipf_s: float = 1.1,
+                       phrasing_variants: bool = False) -> List[str]:
+        """
+        Generar traza sintética de consultas
+        
+        Args:
+            length: Número de consultas
+            hot_ratio: Fracción de consultas al conjunto caliente
+            tail_ratio: Fracción de consultas libres únicas (cola larga)
+            zipf_s: Exponente de la distribución Zipf sobre lecciones
+            phrasing_variants: Escribir cada consulta con variantes de redacción
+        
+        Returns:
+            List[str]: Consultas en orden de llegada
+        """
+        weights = [1.0 / (rank ** zipf_s) for rank in range(1, 366)]
+        lessons = list(range(1, 366))
+        self._random.shuffle(lessons)
+        
+        trace = []
+        for i in range(length):
+            roll = self._random.random()
+            if roll < hot_ratio:
+                query = self._random.choice(self.HOT_QUERIES)
+                if phrasing_variants:
+                    query = self._random.choice(self.HOT_PHRASINGS[query])
+                trace.append(query)
+            elif roll < hot_ratio + tail_ratio:
+                trace.append(f"Consulta libre #{i}: {self._random.getrandbits(32):08x}")
+            else:
+                lesson = self._random.choices(lessons, weights=weights)[0]
+                phrasing = self._random.choice(self.LESSON_PHRASINGS) if phrasing_variants else self.LESSON_PHRASINGS[0]
+                trace.append(phrasing.format(n=lesson))
+        
+        return trace
+    
+    def load_trace(self, path: str) -> List[str]:
+        """
+        Cargar traza desde archivo
+        
+        Acepta texto plano (una consulta por línea) o JSONL con campo "query".
+        """
+        trace = []
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                if line.startswith('{'):
+                    try:
+                        trace.append(json.loads(line)["query"])
+                        continue
+                    except (json.JSONDecodeError, KeyError):
+                        pass
+                trace.append(line)
+        return trace
+    
+    def replay(self, trace: List[str], policy: str, capacity_entries: int = 200,
+               entry_size_bytes: int = 4096, key_func: Optional[Callable[[str], str]] = None) -> Dict[str, Any]:
+        """
+        Reproducir traza contra MemoryCache con una política
+        
+        Args:
+            trace: Consultas a reproducir
+            policy: Nombre de la política de expulsión
+            capacity_entries: Capacidad del cache expresada en entradas
+            entry_size_bytes: Tamaño asignado a cada respuesta
+            key_func: Transformación consulta -> clave de cache (por defecto la consulta)
+        
+        Returns:
+            Dict con hits, misses, hit ratio y tiempo por operación
+        """
+        max_size_mb = max(1, (capacity_entries * entry_size_bytes) // (1024 * 1024) + 1)
+        cache = MemoryCache(max_size_mb=max_size_mb, default_ttl_hours=24,
+                            sizer="structural", eviction_policy=policy)
+        # Ajustar presupuesto exacto a la capacidad pedida
+        cache.max_size_bytes = capacity_entries * entry_size_bytes
+        
+        start_time = time.perf_counter()
+        for query in trace:
+            key = key_func(query) if key_func else query
+            if cache.get(key) is None:
+                cache.put(key, query, size_hint=entry_size_bytes)
+        elapsed = time.perf_counter() - start_time
+        
+        stats = cache.get_stats()
+        return {
+            "policy": policy,
+            "hits": stats["performance"]["hits"],
+            "misses": stats["performance"]["misses"],
+            "hit_ratio": stats["performance"]["hit_ratio"],
+            "evictions": stats["performance"]["evictions"],
+            "us_per_op": round(elapsed / max(1, len(trace)) * 1e6, 2),
+            "policy_stats": stats["eviction"]
+        }
+    
+    def compare(self, trace: Optional[List[str]] = None, policies: Optional[List[str]] = None,
+                capacity_entries: int = 200) -> List[Dict[str, Any]]:
+        """
+        Comparar hit ratio de varias políticas sobre la misma traza
+        
+        Returns:
+            Lista de resultados ordenada por hit ratio descendente
+        """
+        trace = trace if trace is not None else self.generate_trace()
+        policies = policies or list(EVICTION_POLICIES.keys())
+        
+        results = [self.replay(trace, policy, capacity_entries) for policy in policies]
+        results.sort(key=lambda x: x["hit_ratio"], reverse=True)
+        
+        for result in results:
+            self.logger.info(
+                f"{result['policy']:>9}: hit ratio {result['hit_ratio']:.3f} "
+                f"({result['us_per_op']}µs/op)"
+            )
+        
+        return results
+
+    
+    def compare_key_schemas(self, trace: Optional[List[str]] = None, schemas: Optional[List[str]] = None,
+                            capacity_entries: int = 200, policy: str = "lru") -> List[Dict[str, Any]]:
+        """
+        Comparar hit ratio de los esquemas de clave sobre la misma traza
+        
+        Args:
+            trace: Consultas (por defecto traza sintética con variantes de redacción)
+            schemas: Esquemas a comparar (por defecto todos)
+            capacity_entries: Capacidad del cache en entradas
+            policy: Política de expulsión usada en todas las corridas
+        
+        Returns:
+            Lista ordenada por hit ratio con claves distintas y multiplicador de
+            capacidad efectiva respecto al esquema "raw"
+        """
+        trace = trace if trace is not None else self.generate_trace(phrasing_variants=True)
+        schemas = schemas or list(KEY_SCHEMAS)
+        fixed_date = datetime.now()
+        
+        results = []
+        for schema in schemas:
+            builder = QueryKeyBuilder(schema)
+            keys = {query: builder.key_for(query, fixed_date) for query in set(trace)}
+            result = self.replay(trace, policy, capacity_entries, key_func=keys.__getitem__)
+            result["schema"] = schema
+            result["distinct_keys"] = len(set(keys.values()))
+            results.append(result)
+        
+        raw_keys = len(set(trace))
+        for result in results:
+            result["capacity_multiplier"] = round(raw_keys / result["distinct_keys"], 2) if result["distinct_keys"] else 0.0
+            del result["policy_stats"]
+        
+        results.sort(key=lambda x: x["hit_ratio"], reverse=True)
+        for result in results:
+            self.logger.info(
+                f"{result['schema']:>10}: hit ratio {result['hit_ratio']:.3f}, "
+                f"{result['distinct_keys']} claves (x{result['capacity_multiplier']})"
+            )
+        
+        return results
+
+def main():
+    """Ejecutar benchmark desde línea de comandos"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Benchmark de políticas de expulsión de MemoryCache")
+    parser.add_argument('--trace', help='Archivo de traza (texto o JSONL con campo "query")')
+    parser.add_argument('--length', type=int, default=20000, help='Longitud de la traza sintética')
+    parser.add_argument('--capacity', type=int, default=200, help='Capacidad del cache en entradas')
+    parser.add_argument('--policies', nargs='*', help='Políticas a comparar')
+    parser.add_argument('--key-schemas', action='store_true',
+                        help='Comparar esquemas de clave en lugar de políticas')
+    
+    args = parser.parse_args()
+    
+    benchmark = CachePolicyBenchmark()
+    if args.key_schemas:
+        trace = benchmark.load_trace(args.trace) if args.trace else \
+            benchmark.generate_trace(args.length, phrasing_variants=True)
+        results = benchmark.compare_key_schemas(trace, capacity_entries=args.capacity)
+        print(json.dumps(results, indent=2, ensure_ascii=False))
+        return 0
+    
+    trace = benchmark.load_trace(args.trace) if args.trace else benchmark.generate_trace(args.length)
+    results = benchmark.compare(trace, args.policies, args.capacity)
+    
+    print(json.dumps(results, indent=2, ensure_ascii=False))
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,2548 @@
+#!/usr/bin/env python3
+"""
+Tests para el sistema de cacheo multi-nivel UCDM
+"""
+
+import re
+import os
+import sys
+import json
+import time
+import heapq
+import hashlib
+import pickle
+import asyncio
+import unittest
+import tempfile
+import threading
+from pathlib import Path
+from datetime import datetime, timedelta
+from concurrent.futures import Future
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from performance.cache_manager import CacheManager, CacheConfig
+from performance.single_flight import SingleFlight, AsyncSingleFlight
+from performance.memory_cache import MemoryCache
+from performance.sharded_memory_cache import ShardedMemoryCache
+from performance.cache_sizer import PickleSizer, StructuralSizer, SamplingSizer, create_sizer
+from performance.eviction_policies import (
+    EVICTION_POLICIES, LFUPolicy, ARCPolicy, WTinyLFUPolicy, create_eviction_policy
+)
+from testing.cache_policy_benchmark import CachePolicyBenchmark
+from performance.expiry_scheduler import ExpiryHeap, ExpirySweeper
+from performance.disk_cache import DiskCache, DiskCacheEntry
+from performance.compression_codecs import create_codec, train_dictionary
+from performance.file_lock import HAS_FCNTL
+from performance.async_cache import AsyncCacheExecutor
+from performance.log_structured_cache import LogStructuredDiskCache
+from performance.sqlite_cache import SQLiteDiskCache
+from performance.enhanced_response_engine import EnhancedUCDMResponseEngine
+from performance.cache_warmer import CacheWarmer, DAILY_QUERY
+from performance.query_keys import QueryKeyBuilder, normalize_query, parse_query
+from performance.invalidation import InvalidationBus, index_tag, lesson_tag
+from performance.index_cache import IndexCache
+from performance.lazy_loader import LazyIndexLoader
+from performance.index_watcher import IndexWatcher
+from performance.compiled_index import CompiledIndex, compile_index, compiled_path_for, load_compiled_index
+from performance.index_registry import IndexRegistry, get_index_registry
+from performance.predictive_preloader import PredictivePreloader
+from performance.index_integrity import IndexIntegrityValidator
+
+
+def run_async(coro):
+    """Ejecutar corrutina en un loop nuevo"""
+    return asyncio.run(coro)
+
+class CacheTestCase(unittest.TestCase):
+    """Base con directorios temporales para cache e índices"""
+    
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.tmp_path = Path(self._tmp.name)
+        self.cache_dir = self.tmp_path / "cache"
+        self.indices_dir = self.tmp_path / "indices"
+        self.indices_dir.mkdir()
+        
+        # Índice mínimo con estructura UCDM
+        comprehensive = {
+            "metadata": {"version": 1},
+            "lesson_details": {"1": {"title": "Lección 1"}},
+            "concept_index": {"amor": [1]},
+            "date_mapping": {"01-01": 1}
+        }
+        with open(self.indices_dir / "ucdm_comprehensive_index.json", 'w', encoding='utf-8') as f:
+            json.dump(comprehensive, f)
+    
+    def tearDown(self):
+        self._tmp.cleanup()
+    
+    def make_config(self, **overrides) -> CacheConfig:
+        """Crear configuración apuntando a directorios temporales"""
+        params = {
+            "disk_path": str(self.cache_dir),
+            "index_dir": str(self.indices_dir),
+            "index_preload_popular": False,
+            "background_cleanup": False
+        }
+        params.update(overrides)
+        return CacheConfig(**params)
+
+class TestCacheManagerMultiLevel(CacheTestCase):
+    """Tests del motor multi-nivel de CacheManager"""
+    
+    def test_repeated_get_or_load_hits_l1(self):
+        """La segunda consulta no debe ejecutar el loader"""
+        calls = []
+        
+        def loader():
+            calls.append(1)
+            return {"response": "Lección 1"}
+        
+        async def scenario():
+            manager = CacheManager(self.make_config())
+            await manager.initialize()
+            first = await manager.get_or_load("response_leccion_1", loader)
+            second = await manager.get_or_load("response_leccion_1", loader)
+            await manager.shutdown()
+            return manager, first, second
+        
+        manager, first, second = run_async(scenario())
+        
+        self.assertEqual(first, second)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(manager.metrics.l1_hits, 1)
+        self.assertEqual(manager.metrics.l2_writes, 1)
+    
+    def test_l2_hit_promotes_to_l1(self):
+        """Un hit en L2 debe promover la entrada a L1"""
+        async def scenario():
+            manager = CacheManager(self.make_config())
+            await manager.initialize()
+            await manager.get_or_load("response_x", lambda: "valor")
+            manager.l1_cache.clear()
+            value = await manager.get_or_load("response_x", lambda: "otro")
+            return manager, value
+        
+        manager, value = run_async(scenario())
+        
+        self.assertEqual(value, "valor")
+        self.assertEqual(manager.metrics.l2_hits, 1)
+        self.assertEqual(manager.metrics.promotions, 1)
+        self.assertTrue(manager.l1_cache.contains("response_x"))
+
+    def test_disk_compression_flag_reaches_every_engine(self):
+        """disk_compression=False desactiva la compresión en todos los motores de L2"""
+        payload = {"response": "amor " * 2000}
+        for engine in ("files", "log", "sqlite"):
+            async def scenario():
+                manager = CacheManager(self.make_config(disk_engine=engine, disk_compression=False,
+                                                        disk_path=str(self.cache_dir / engine)))
+                await manager.initialize()
+                await manager.get_or_load("response_big", lambda: payload)
+                await manager.shutdown()
+                return manager
+            
+            manager = run_async(scenario())
+            self.assertFalse(manager.l2_cache.compress)
+            self.assertEqual(manager.l2_cache.compressions, 0)
+    
+    def test_write_back_defers_l2_until_flush(self):
+        """En modo write-back L2 solo se escribe al hacer flush"""
+        async def scenario():
+            manager = CacheManager(self.make_config(write_policy="write_back"))
+            await manager.initialize()
+            await manager.get_or_load("response_wb", lambda: "diferido")
+            before = manager.l2_cache.contains("response_wb")
+            await manager.shutdown()
+            after = manager.l2_cache.contains("response_wb")
+            return before, after
+        
+        before, after = run_async(scenario())
+        
+        self.assertFalse(before)
+        self.assertTrue(after)
+    
+    def test_admission_policy_rejects_level(self):
+        """La política de admisión impide escribir en el nivel"""
+        async def scenario():
+            manager = CacheManager(self.make_config())
+            await manager.initialize()
+            manager.set_admission_policy("l2", lambda key, data: not key.startswith("temp_"))
+            await manager.get_or_load("temp_key", lambda: "efímero")
+            return manager
+        
+        manager = run_async(scenario())
+        
+        self.assertTrue(manager.l1_cache.contains("temp_key"))
+        self.assertFalse(manager.l2_cache.contains("temp_key"))
+        self.assertEqual(manager.metrics.admission_rejections, 1)
+    
+    def test_l3_serves_index_keys(self):
+        """Las claves index_<nombre> se resuelven desde IndexCache"""
+        async def scenario():
+            manager = CacheManager(self.make_config())
+            await manager.initialize()
+            return await manager.get_or_load("index_ucdm_comprehensive_index", lambda: None)
+        
+        data = run_async(scenario())
+        
+        self.assertIn("lesson_details", data)
+    
+    def test_invalidate_pattern_across_levels(self):
+        """invalidate_pattern elimina claves en L1 y L2"""
+        async def scenario():
+            manager = CacheManager(self.make_config())
+            await manager.initialize()
+            await manager.get_or_load("response_a", lambda: "a")
+            await manager.get_or_load("response_b", lambda: "b")
+            return manager, manager.invalidate_pattern("response_*")
+        
+        manager, count = run_async(scenario())
+        
+        self.assertEqual(count, 4)
+        self.assertFalse(manager.l1_cache.contains("response_a"))
+        self.assertFalse(manager.l2_cache.contains("response_b"))
+
+class TestSingleFlight(CacheTestCase):
+    """Tests de coalescencia de solicitudes concurrentes"""
+    
+    def test_threads_share_one_execution(self):
+        """Threads concurrentes para la misma clave ejecutan la función una vez"""
+        flight = SingleFlight()
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+        results = []
+        
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "resultado"
+        
+        def worker():
+            results.append(flight.do("hoy", slow))
+        
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        threads[0].start()
+        started.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        deadline = time.time() + 5
+        while flight.get_stats()["coalesced_requests"] < 7 and time.time() < deadline:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join(5)
+        
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ["resultado"] * 8)
+        self.assertEqual(flight.coalesced, 7)
+    
+    def test_threads_share_exception(self):
+        """Los seguidores reciben la misma excepción que el líder"""
+        flight = SingleFlight()
+        
+        def failing():
+            raise ValueError("fallo de generación")
+        
+        with self.assertRaises(ValueError):
+            flight.do("clave", failing)
+        self.assertEqual(flight.in_flight(), 0)
+    
+    def test_get_or_load_coalesces_concurrent_callers(self):
+        """Corrutinas concurrentes en get_or_load comparten una carga"""
+        calls = []
+        
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "lección de hoy"
+        
+        async def scenario():
+            manager = CacheManager(self.make_config())
+            await manager.initialize()
+            results = await asyncio.gather(*[
+                manager.get_or_load("response_hoy", loader) for _ in range(10)
+            ])
+            return manager, results
+        
+        manager, results = run_async(scenario())
+        
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(set(results), {"lección de hoy"})
+        self.assertEqual(manager.get_performance_report()["single_flight"]["coalesced_requests"], 9)
+    
+    def test_get_or_load_propagates_loader_exception(self):
+        """Un error del loader se comparte sin reintentos por seguidor"""
+        calls = []
+        
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.02)
+            raise RuntimeError("índice corrupto")
+        
+        async def scenario():
+            manager = CacheManager(self.make_config())
+            await manager.initialize()
+            return await asyncio.gather(*[
+                manager.get_or_load("response_err", loader) for _ in range(3)
+            ], return_exceptions=True)
+        
+        results = run_async(scenario())
+        
+        self.assertEqual(len(calls), 1)
+        self.assertTrue(all(isinstance(r, RuntimeError) for r in results))
+    
+    def test_cancelled_leader_does_not_cancel_followers(self):
+        """Cancelar al primer solicitante no cancela la carga compartida"""
+        calls = []
+        
+        async def loader():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return "resultado"
+        
+        async def scenario():
+            flight = AsyncSingleFlight()
+            leader = asyncio.ensure_future(flight.do("clave", loader))
+            await asyncio.sleep(0)
+            follower = asyncio.ensure_future(flight.do("clave", loader))
+            await asyncio.sleep(0.01)
+            leader.cancel()
+            result = await follower
+            return flight, leader, follower, result
+        
+        flight, leader, follower, result = run_async(scenario())
+        
+        self.assertEqual(result, "resultado")
+        self.assertTrue(leader.cancelled())
+        self.assertFalse(follower.cancelled())
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(flight.in_flight(), 0)
+
+class TestCacheSizer(unittest.TestCase):
+    """Tests de estimadores de tamaño para MemoryCache"""
+    
+    def setUp(self):
+        self.payload = {
+            "query": "Explícame la Lección 1",
+            "query_type": "lesson_specific",
+            "lesson_number": 1,
+            "response": "🌟 HOOK INICIAL: ¿Y si te dijera que la paz ya está en ti? " * 50,
+            "cache_hit": False
+        }
+    
+    def test_structural_estimate_close_to_pickle(self):
+        """La estimación estructural se mantiene cerca del tamaño real"""
+        actual = PickleSizer().size_of(self.payload)
+        estimate = StructuralSizer().size_of(self.payload)
+        
+        self.assertLess(abs(estimate - actual) / actual, 0.5)
+    
+    def test_structural_handles_cycles(self):
+        """Estructuras cíclicas no provocan recursión infinita"""
+        cyclic = {"nombre": "perdón"}
+        cyclic["self"] = cyclic
+        
+        self.assertGreater(StructuralSizer().size_of(cyclic), 0)
+    
+    def test_sampling_sizer_calibrates(self):
+        """El modo sampling mide con pickle periódicamente y ajusta la corrección"""
+        sizer = SamplingSizer(sample_every=4)
+        for _ in range(7):
+            sizer.size_of(self.payload)
+        
+        stats = sizer.get_stats()
+        self.assertEqual(stats["samples"], 2)
+        self.assertEqual(sizer.size_of(self.payload), int(StructuralSizer().size_of(self.payload) * sizer.correction))
+    
+    def test_put_uses_size_hint(self):
+        """Un size_hint evita la estimación y se usa para el presupuesto"""
+        cache = MemoryCache(max_size_mb=1, sizer="pickle")
+        cache.put("response_1", self.payload, size_hint=1234)
+        
+        self.assertEqual(cache.current_size_bytes, 1234)
+        self.assertEqual(cache.get_stats()["sizing"]["sizer"], "pickle")
+    
+    def test_budget_respected_with_estimates(self):
+        """El presupuesto max_size_mb se respeta con tamaños estimados"""
+        cache = MemoryCache(max_size_mb=1, sizer="structural")
+        for i in range(200):
+            cache.put(f"response_{i}", {"response": "x" * 20000, "n": i})
+        
+        self.assertLessEqual(cache.current_size_bytes, cache.max_size_bytes)
+        self.assertGreater(cache.evictions, 0)
+    
+    def test_unknown_sizer_rejected(self):
+        """Un nombre de estimador desconocido produce ValueError"""
+        with self.assertRaises(ValueError):
+            create_sizer("xxhash")
+
+class TestShardedMemoryCache(CacheTestCase):
+    """Tests del cache en memoria segmentado"""
+    
+    def test_keys_spread_across_shards(self):
+        """Las claves se distribuyen entre varios segmentos"""
+        cache = ShardedMemoryCache(max_size_mb=5, shards=4, sizer="structural")
+        for i in range(100):
+            cache.put(f"response_{i}", {"n": i})
+        
+        stats = cache.get_stats()
+        self.assertEqual(stats["memory"]["entry_count"], 100)
+        self.assertGreater(stats["sharding"]["min_shard_entries"], 0)
+        self.assertEqual(cache.get("response_42"), {"n": 42})
+    
+    def test_global_budget_shared_between_shards(self):
+        """El presupuesto global se respeta expulsando de cualquier segmento"""
+        cache = ShardedMemoryCache(max_size_mb=1, shards=8, sizer="structural")
+        for i in range(100):
+            self.assertTrue(cache.put(f"response_{i}", "x", size_hint=50 * 1024))
+        
+        self.assertLessEqual(cache.current_size_bytes, cache.max_size_bytes)
+        self.assertEqual(cache.current_size_bytes,
+                         sum(shard.current_size_bytes for shard in cache._shards))
+        self.assertGreater(cache.evictions, 0)
+    
+    def test_concurrent_readers(self):
+        """16 threads leyendo y escribiendo no corrompen el estado"""
+        cache = ShardedMemoryCache(max_size_mb=5, shards=16, sizer="structural")
+        for i in range(64):
+            cache.put(f"response_{i}", i)
+        errors = []
+        
+        def reader(offset):
+            try:
+                for i in range(2000):
+                    key = f"response_{(i + offset) % 64}"
+                    if cache.get(key) is None:
+                        cache.put(key, (i + offset) % 64)
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=reader, args=(n,)) for n in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(10)
+        
+        self.assertEqual(errors, [])
+        self.assertEqual(cache.get_stats()["performance"]["hits"], 16 * 2000)
+    
+    def test_cache_manager_selects_sharded_l1(self):
+        """CacheConfig.memory_shards > 1 selecciona el cache segmentado"""
+        async def scenario():
+            manager = CacheManager(self.make_config(memory_shards=4))
+            await manager.initialize()
+            await manager.get_or_load("response_s", lambda: "segmentado")
+            return manager
+        
+        manager = run_async(scenario())
+        
+        self.assertIsInstance(manager.l1_cache, ShardedMemoryCache)
+        self.assertTrue(manager.l1_cache.contains("response_s"))
+
+class TestEvictionPolicies(unittest.TestCase):
+    """Tests de políticas de expulsión y heap de expiraciones"""
+    
+    def make_cache(self, policy, capacity: int = 10) -> MemoryCache:
+        cache = MemoryCache(max_size_mb=1, sizer="structural", eviction_policy=policy)
+        cache.max_size_bytes = capacity * 100
+        return cache
+    
+    def test_every_policy_respects_budget(self):
+        """Ninguna política debe superar el presupuesto de bytes"""
+        for name in EVICTION_POLICIES:
+            cache = self.make_cache(name)
+            for i in range(200):
+                key = f"k{i % 37}" if i % 3 else f"unique_{i}"
+                if cache.get(key) is None:
+                    cache.put(key, i, size_hint=100)
+                self.assertLessEqual(cache.current_size_bytes, cache.max_size_bytes, name)
+            self.assertEqual(len(cache.get_keys()), 10, name)
+    
+    def test_wtinylfu_keeps_hot_set_against_scan(self):
+        """Un barrido de claves únicas no debe desplazar las claves calientes"""
+        cache = self.make_cache("wtinylfu", capacity=20)
+        hot = [f"hot_{i}" for i in range(5)]
+        for _ in range(10):
+            for key in hot:
+                if cache.get(key) is None:
+                    cache.put(key, key, size_hint=100)
+        
+        for i in range(500):
+            key = f"scan_{i}"
+            if cache.get(key) is None:
+                cache.put(key, key, size_hint=100)
+        
+        for key in hot:
+            self.assertTrue(cache.contains(key), key)
+        self.assertGreater(cache.policy.rejections, 0)
+    
+    def test_lru_loses_hot_set_against_scan(self):
+        """Referencia: LRU sí pierde el conjunto caliente en el mismo barrido"""
+        cache = self.make_cache("lru", capacity=20)
+        for _ in range(10):
+            for i in range(5):
+                if cache.get(f"hot_{i}") is None:
+                    cache.put(f"hot_{i}", i, size_hint=100)
+        for i in range(500):
+            cache.put(f"scan_{i}", i, size_hint=100)
+        
+        self.assertFalse(cache.contains("hot_0"))
+    
+    def test_lfu_evicts_least_frequent_and_ages(self):
+        """LFU expulsa la clave menos usada y envejece las frecuencias"""
+        policy = LFUPolicy(aging_interval=5)
+        cache = self.make_cache(policy, capacity=2)
+        cache.put("frecuente", 1, size_hint=100)
+        cache.put("rara", 2, size_hint=100)
+        for _ in range(3):
+            cache.get("frecuente")
+        cache.put("nueva", 3, size_hint=100)
+        
+        self.assertTrue(cache.contains("frecuente"))
+        self.assertFalse(cache.contains("rara"))
+        self.assertGreaterEqual(policy.agings, 1)
+    
+    def test_arc_records_ghost_hits(self):
+        """Reinsertar una clave expulsada recientemente cuenta como hit fantasma"""
+        policy = ARCPolicy()
+        cache = self.make_cache(policy, capacity=3)
+        for key in ("a", "b", "c", "d"):
+            cache.put(key, key, size_hint=100)
+        self.assertFalse(cache.contains("a"))
+        
+        cache.put("a", "a", size_hint=100)
+        
+        self.assertEqual(policy.ghost_hits, 1)
+        self.assertGreater(policy.get_stats()["t2"], 0)
+    
+    def test_expiry_heap_cleanup(self):
+        """cleanup_expired retira solo entradas vencidas y descarta registros obsoletos"""
+        cache = MemoryCache(max_size_mb=1, sizer="structural")
+        cache.put("corta", 1, ttl_hours=1e-6)
+        cache.put("larga", 2, ttl_hours=1)
+        cache.put("reemplazada", 3, ttl_hours=1e-6)
+        cache.put("reemplazada", 4, ttl_hours=1)
+        time.sleep(0.02)
+        
+        self.assertEqual(cache.cleanup_expired(), 1)
+        self.assertEqual(sorted(cache.get_keys()), ["larga", "reemplazada"])
+    
+    def test_unknown_policy_rejected(self):
+        with self.assertRaises(ValueError):
+            create_eviction_policy("mru")
+        self.assertIsInstance(create_eviction_policy("wtinylfu"), WTinyLFUPolicy)
+    
+    def test_benchmark_reports_every_policy(self):
+        """El benchmark reproduce la traza con cada política"""
+        benchmark = CachePolicyBenchmark(seed=1)
+        trace = benchmark.generate_trace(length=2000)
+        results = benchmark.compare(trace, capacity_entries=50)
+        
+        self.assertEqual({r["policy"] for r in results}, set(EVICTION_POLICIES))
+        for result in results:
+            self.assertEqual(result["hits"] + result["misses"], len(trace))
+        by_policy = {r["policy"]: r["hit_ratio"] for r in results}
+        self.assertGreaterEqual(by_policy["wtinylfu"], by_policy["lru"])
+
+class TestExpiryScheduler(CacheTestCase):
+    """Tests del subsistema de expiración compartido"""
+    
+    def test_heap_skips_rescheduled_and_cancelled(self):
+        """Solo se extraen las expiraciones vigentes, respetando el límite"""
+        heap = ExpiryHeap()
+        past = datetime.now() - timedelta(seconds=1)
+        future = datetime.now() + timedelta(hours=1)
+        for i in range(5):
+            heap.schedule(f"k{i}", past)
+        heap.schedule("k1", future)
+        heap.cancel("k2")
+        
+        self.assertEqual(heap.pop_due(limit=2), ["k0", "k3"])
+        self.assertEqual(heap.pop_due(), ["k4"])
+        self.assertEqual(len(heap), 1)
+        self.assertEqual(heap.next_deadline(), future)
+    
+    def test_sweeper_bounds_work_per_tick(self):
+        """Cada tick retira como máximo max_per_tick entradas por cache"""
+        cache = MemoryCache(max_size_mb=1, sizer="structural")
+        for i in range(10):
+            cache.put(f"k{i}", i, ttl_hours=1e-6)
+        time.sleep(0.02)
+        
+        sweeper = ExpirySweeper(max_per_tick=4)
+        sweeper.register(cache)
+        
+        self.assertEqual(sweeper.tick(), 4)
+        self.assertEqual(sweeper.tick(), 4)
+        self.assertEqual(sweeper.tick(), 2)
+        self.assertEqual(cache.get_keys(), [])
+        self.assertEqual(sweeper.get_stats()["removed"], 10)
+    
+    def test_sweeper_thread_expires_disk_entries(self):
+        """El hilo en background retira entradas vencidas de DiskCache"""
+        disk = DiskCache(cache_dir=str(self.cache_dir))
+        disk.put("response_vieja", "x", ttl_hours=1e-6)
+        disk.put("response_nueva", "y")
+        
+        sweeper = ExpirySweeper(interval_seconds=0.01)
+        sweeper.register(disk)
+        sweeper.start()
+        deadline = time.time() + 5
+        while disk.get_keys("response_vieja") and time.time() < deadline:
+            time.sleep(0.01)
+        sweeper.stop()
+        
+        self.assertFalse(sweeper.is_running)
+        self.assertEqual(disk.get_keys(), ["response_nueva"])
+    
+    def test_register_requires_sweep_expired(self):
+        with self.assertRaises(TypeError):
+            ExpirySweeper().register(object())
+    
+    def test_disk_cache_evicts_least_recently_accessed(self):
+        """La expulsión de DiskCache sigue el orden de acceso sin ordenar el índice"""
+        disk = DiskCache(cache_dir=str(self.cache_dir), compression_threshold_kb=1024)
+        for key in ("response_a", "response_b", "response_c"):
+            disk.put(key, "x" * 100)
+        disk.get("response_a")
+        entry_size = disk.current_size_bytes // 3
+        disk.max_size_bytes = entry_size * 3
+        
+        disk._make_room(entry_size)
+        
+        self.assertEqual(disk.get_keys(), ["response_c", "response_a"])
+    
+    def test_disk_cache_reload_restores_expiry(self):
+        """Al recargar el índice las expiraciones vuelven a programarse"""
+        disk = DiskCache(cache_dir=str(self.cache_dir))
+        disk.put("response_vieja", "x", ttl_hours=1e-6)
+        disk.put("response_nueva", "y")
+        time.sleep(0.02)
+        
+        reloaded = DiskCache(cache_dir=str(self.cache_dir))
+        
+        self.assertEqual(reloaded.sweep_expired(10), 1)
+        self.assertEqual(reloaded.get_keys(), ["response_nueva"])
+    
+    def test_cache_manager_runs_sweeper(self):
+        """CacheManager registra L1/L2 y detiene el barrendero al cerrar"""
+        async def scenario():
+            manager = CacheManager(self.make_config(background_cleanup=True,
+                                                    expiry_sweep_interval_seconds=0.01))
+            await manager.initialize()
+            running = manager.expiry_sweeper.is_running
+            report = manager.get_performance_report()
+            await manager.shutdown()
+            return manager, running, report
+        
+        manager, running, report = run_async(scenario())
+        
+        self.assertTrue(running)
+        self.assertFalse(manager.expiry_sweeper.is_running)
+        self.assertEqual(report["expiry"]["registered"], ["MemoryCache", "DiskCache"])
+
+class TestLogStructuredDiskCache(CacheTestCase):
+    """Tests del motor de disco con segmentos append-only"""
+    
+    def make_cache(self, **kwargs) -> LogStructuredDiskCache:
+        params = {"cache_dir": str(self.cache_dir), "max_segment_mb": 0.01}
+        params.update(kwargs)
+        return LogStructuredDiskCache(**params)
+    
+    def test_put_get_delete_roundtrip(self):
+        cache = self.make_cache()
+        payload = {"response": "El perdón es la llave de la felicidad " * 100}
+        
+        self.assertTrue(cache.put("response_perdon", payload))
+        self.assertEqual(cache.get("response_perdon"), payload)
+        self.assertTrue(cache.delete("response_perdon"))
+        self.assertIsNone(cache.get("response_perdon"))
+        self.assertGreater(cache.get_stats()["performance"]["compressions"], 0)
+    
+    def test_index_rebuilt_from_segments_on_restart(self):
+        """Footers de segmentos sellados + escaneo del activo reconstruyen el índice"""
+        cache = self.make_cache()
+        for i in range(120):
+            cache.put(f"response_{i % 40}", {"i": i, "texto": "x" * 80})
+        cache.delete("response_0")
+        self.assertGreaterEqual(cache.get_stats()["segments"]["count"], 2)
+        cache.close()
+        
+        reopened = self.make_cache()
+        
+        self.assertEqual(len(reopened.get_keys()), 39)
+        self.assertIsNone(reopened.get("response_0"))
+        self.assertEqual(reopened.get("response_1"), {"i": 81, "texto": "x" * 80})
+    
+    def test_recovery_truncates_torn_write(self):
+        """Un registro incompleto al final del segmento activo se descarta"""
+        cache = self.make_cache(max_segment_mb=1)
+        cache.put("response_ok", "válido")
+        active_path = cache._segment_path(cache._active_id)
+        cache.close()
+        with open(active_path, 'ab') as f:
+            f.write(b"UCR1\x00\x05")  # Cabecera cortada por una caída
+        
+        recovered = self.make_cache(max_segment_mb=1)
+        
+        self.assertEqual(recovered.recovered_truncations, 1)
+        self.assertEqual(recovered.get("response_ok"), "válido")
+        self.assertTrue(recovered.put("response_nuevo", 1))
+        self.assertEqual(recovered.get("response_nuevo"), 1)
+    
+    def test_corrupted_record_is_dropped(self):
+        """Un checksum inválido convierte la lectura en miss"""
+        cache = self.make_cache(max_segment_mb=1)
+        cache.put("response_a", "a" * 50)
+        entry = cache._index["response_a"]
+        with open(cache._segment_path(entry.segment_id), 'r+b') as f:
+            f.seek(entry.offset + entry.record_bytes - 1)
+            f.write(b"!")
+        
+        self.assertIsNone(cache.get("response_a"))
+        self.assertFalse(cache.contains("response_a"))
+    
+    def test_compaction_reclaims_dead_segments(self):
+        """Sobrescrituras repetidas dejan segmentos muertos que la compactación elimina"""
+        cache = self.make_cache()
+        for i in range(300):
+            cache.put(f"response_{i % 10}", {"i": i, "texto": "y" * 80})
+        segments_before = cache.get_stats()["segments"]["count"]
+        
+        result = cache.cleanup()
+        
+        self.assertGreater(result["segments_compacted"], 0)
+        self.assertLess(cache.get_stats()["segments"]["count"], segments_before)
+        # Los tamaños de registro movidos siguen cuadrando con los bytes vivos por segmento
+        self.assertEqual(sum(entry.record_bytes for entry in cache._index.values()),
+                         sum(cache._segment_live.values()))
+        for i in range(10):
+            self.assertEqual(cache.get(f"response_{i}")["i"], 290 + i)
+        cache.close()
+        self.assertEqual(len(self.make_cache().get_keys()), 10)
+    
+    def test_evicts_least_recently_used(self):
+        cache = self.make_cache(max_segment_mb=1, compression_threshold_kb=1024)
+        for key in ("response_a", "response_b", "response_c"):
+            cache.put(key, "z" * 100)
+        cache.get("response_a")
+        entry_size = cache.current_size_bytes // 3
+        cache.max_size_bytes = entry_size * 3
+        
+        cache._make_room(entry_size)
+        cache.close()
+        
+        self.assertEqual(self.make_cache(max_segment_mb=1).get_keys(), ["response_a", "response_c"])
+    
+    def test_tags_survive_compaction_and_restart(self):
+        """Las etiquetas viajan en el registro: footers, escaneo y compactación las conservan"""
+        cache = self.make_cache()
+        for i in range(200):
+            cache.put(f"response_lesson_{i % 20}", {"i": i, "texto": "t" * 80}, tags=[lesson_tag(i % 20)])
+        cache.put("response_general", "sin etiqueta")
+        self.assertGreater(cache.cleanup()["segments_compacted"], 0)
+        cache.close()
+        
+        reopened = self.make_cache()
+        
+        self.assertEqual(reopened.invalidate_tags({lesson_tag(3), lesson_tag(7), "lesson:99"}), 2)
+        self.assertIsNone(reopened.get("response_lesson_3"))
+        self.assertEqual(reopened.get("response_lesson_4")["i"], 184)
+        self.assertEqual(reopened.get("response_general"), "sin etiqueta")
+        reopened.put("response_lesson_4", "sin etiquetas ya")
+        self.assertEqual(reopened.invalidate_tags({lesson_tag(4)}), 0)
+        reopened.close()
+        self.assertEqual(len(self.make_cache().get_keys()), 19)
+    
+    def test_cache_manager_selects_log_engine(self):
+        async def scenario():
+            manager = CacheManager(self.make_config(disk_engine="log"))
+            await manager.initialize()
+            await manager.get_or_load("response_log", lambda: "segmentos")
+            return manager
+        
+        manager = run_async(scenario())
+        
+        self.assertIsInstance(manager.l2_cache, LogStructuredDiskCache)
+        self.assertEqual(manager.l2_cache.get("response_log"), "segmentos")
+
+class TestDiskCacheJournal(CacheTestCase):
+    """Tests de la persistencia snapshot + journal del índice de DiskCache"""
+    
+    def make_cache(self, **kwargs) -> DiskCache:
+        return DiskCache(cache_dir=str(self.cache_dir), **kwargs)
+    
+    def test_put_appends_to_journal_without_snapshot(self):
+        """Cada put añade una línea al journal en vez de reescribir el snapshot"""
+        cache = self.make_cache()
+        checkpoints = cache.checkpoints
+        for i in range(20):
+            cache.put(f"response_{i}", {"i": i})
+        
+        with open(cache.journal_file, 'r', encoding='utf-8') as f:
+            lines = f.readlines()
+        self.assertEqual(len(lines), 20)
+        self.assertEqual(cache.checkpoints, checkpoints)
+        self.assertEqual(cache.get_stats()["persistence"]["journal_ops"], 20)
+    
+    def test_reload_replays_snapshot_and_journal(self):
+        cache = self.make_cache()
+        for i in range(5):
+            cache.put(f"response_{i}", i)
+        cache.checkpoint()
+        cache.put("response_5", 5)
+        cache.delete("response_0")
+        
+        reloaded = self.make_cache()
+        
+        self.assertEqual(sorted(reloaded.get_keys()), [f"response_{i}" for i in range(1, 6)])
+        self.assertEqual(reloaded.get("response_5"), 5)
+        # El journal reproducido se consolida en un snapshot nuevo
+        self.assertFalse(reloaded.journal_file.exists())
+    
+    def test_torn_journal_line_is_ignored(self):
+        cache = self.make_cache()
+        cache.put("response_ok", "ok")
+        with open(cache.journal_file, 'a', encoding='utf-8') as f:
+            f.write('{"op":"put","entry":{"key":"response_cortad')
+        
+        reloaded = self.make_cache()
+        
+        self.assertEqual(reloaded.get_keys(), ["response_ok"])
+        self.assertEqual(reloaded.get("response_ok"), "ok")
+    
+    def test_overwrite_keeps_new_value(self):
+        """Reescribir una clave no debe borrar el archivo recién escrito"""
+        cache = self.make_cache()
+        cache.put("response_a", 1)
+        cache.put("response_a", 2)
+        
+        self.assertEqual(cache.get("response_a"), 2)
+        self.assertEqual(self.make_cache().get("response_a"), 2)
+    
+    def test_sweeper_checkpoints_after_threshold(self):
+        cache = self.make_cache(journal_checkpoint_ops=10)
+        for i in range(12):
+            cache.put(f"response_{i}", i)
+        checkpoints = cache.checkpoints
+        
+        cache.sweep_expired(10)
+        
+        self.assertEqual(cache.checkpoints, checkpoints + 1)
+        self.assertEqual(cache.get_stats()["persistence"]["journal_ops"], 0)
+    
+    def test_access_counts_survive_restart(self):
+        cache = self.make_cache()
+        cache.put("response_popular", "x")
+        for _ in range(10):
+            cache.get("response_popular")
+        
+        reloaded = self.make_cache()
+        
+        self.assertEqual(reloaded._index["response_popular"].access_count, 10)
+
+class TestDiskCacheZeroCopyReads(CacheTestCase):
+    """Tests de lecturas vía mmap, checksums CRC32 y buffers fuera de banda"""
+    
+    def make_cache(self, **kwargs) -> DiskCache:
+        params = {"cache_dir": str(self.cache_dir), "mmap_threshold_kb": 16}
+        params.update(kwargs)
+        return DiskCache(**params)
+    
+    def test_large_uncompressed_value_is_read_without_copies(self):
+        cache = self.make_cache(compression_threshold_kb=2 ** 20)
+        value = [f"párrafo {i} " * 10 for i in range(500)]
+        cache.put("response_large", value)
+        
+        self.assertEqual(cache.get("response_large"), value)
+        
+        io_stats = cache.get_stats()["io"]
+        self.assertEqual(io_stats["mmap_reads"], 1)
+        self.assertEqual(io_stats["bytes_copied"], 0)
+        self.assertGreater(io_stats["bytes_read"], 16 * 1024)
+    
+    def test_compressed_value_streams_from_mapping(self):
+        cache = self.make_cache(compression_threshold_kb=1)
+        value = {"text": "".join(f"{i:08x}" for i in range(20000))}
+        cache.put("response_compressed", value)
+        
+        self.assertEqual(cache.get("response_compressed"), value)
+        
+        io_stats = cache.get_stats()["io"]
+        self.assertEqual(io_stats["mmap_reads"], 1)
+        # Solo se copia la salida de la descompresión
+        self.assertGreater(io_stats["bytes_copied"], io_stats["bytes_read"])
+    
+    def test_small_value_uses_buffered_read(self):
+        cache = self.make_cache()
+        cache.put("response_small", "hola")
+        
+        self.assertEqual(cache.get("response_small"), "hola")
+        self.assertEqual(cache.get_stats()["io"]["buffered_reads"], 1)
+        self.assertTrue(cache._index["response_small"].checksum.startswith("crc32:"))
+    
+    def test_out_of_band_buffers_are_views_over_mapping(self):
+        import pickle
+        cache = self.make_cache()
+        payload = bytes(range(256)) * 200
+        cache.put("response_buffer", {"embedding": pickle.PickleBuffer(bytearray(payload))})
+        
+        self.assertEqual(cache._index["response_buffer"].payload_format, "pickle5-oob")
+        value = cache.get("response_buffer")
+        # El buffer se reconstruye como vista sobre el archivo mapeado, sin copias
+        self.assertIsInstance(value["embedding"], memoryview)
+        self.assertEqual(bytes(value["embedding"]), payload)
+        self.assertEqual(cache.get_stats()["io"]["bytes_copied"], 0)
+        
+        value = self.make_cache().get("response_buffer")
+        self.assertEqual(bytes(value["embedding"]), payload)
+    
+    def test_corrupted_file_is_a_miss(self):
+        cache = self.make_cache()
+        cache.put("response_bad", "x" * 50000)
+        file_path = cache.cache_dir / cache._index["response_bad"].file_path
+        with open(file_path, 'r+b') as f:
+            f.seek(100)
+            f.write(b"CORRUPTO")
+        
+        self.assertIsNone(cache.get("response_bad"))
+        self.assertNotIn("response_bad", cache.get_keys())
+    
+    def test_legacy_md5_checksum_is_accepted(self):
+        import hashlib
+        cache = self.make_cache()
+        cache.put("response_legacy", "antiguo")
+        entry = cache._index["response_legacy"]
+        with open(cache.cache_dir / entry.file_path, 'rb') as f:
+            entry.checksum = hashlib.md5(f.read()).hexdigest()
+        
+        self.assertEqual(cache.get("response_legacy"), "antiguo")
+
+def structured_response(i: int) -> str:
+    """Respuesta con la plantilla compartida HOOK / APLICACIÓN / INTEGRACIÓN / CIERRE"""
+    return (
+        f"HOOK INICIAL: PREGUNTA PROFUNDA Y CONEXIÓN\n\n¿Qué pasaría si la lección {i} fuera verdad hoy?\n"
+        "APLICACIÓN PRÁCTICA: PASOS CONCRETOS PARA LA VIDA DIARIA\n\n"
+        "• Dedica cinco minutos al despertar a repetir la idea de la lección\n"
+        "• Observa sin juzgar cada pensamiento de ataque que surja durante el día\n"
+        f"• Aplica la idea a la situación {i * 7 % 13} antes de dormir\n"
+        "INTEGRACIÓN EXPERIENCIAL: CONEXIÓN VIVA Y REFLEXIVA\n\n"
+        f"**Conexión personal con twist**: Recuerda el momento {i} en que elegiste la paz.\n"
+        "CIERRE MOTIVADOR: COMPROMISO Y ESPERANZA\n\n"
+        "Hoy elijo ver con los ojos del amor y recordar que soy como Dios me creó.\n"
+    )
+
+class TestCompressionCodecs(CacheTestCase):
+    """Tests del registro de códecs y su uso en DiskCache"""
+    
+    def test_codecs_round_trip(self):
+        data = structured_response(1).encode() * 20
+        for name in ["none", "gzip", "zlib-1", "zlib-6", "zlib-9", "lzma"]:
+            codec = create_codec(name)
+            compressed = codec.compress(data)
+            self.assertEqual(codec.decompress(compressed), data, name)
+            self.assertEqual(bytes(codec.decompress_stream(memoryview(compressed))), data, name)
+        
+        with self.assertRaises(ValueError):
+            create_codec("brotli")
+    
+    def test_trained_dictionary_beats_plain_zlib_on_small_responses(self):
+        samples = [structured_response(i).encode() for i in range(40)]
+        dictionary = train_dictionary(samples)
+        self.assertIn("APLICACIÓN PRÁCTICA".encode(), dictionary)
+        
+        zdict = create_codec("zdict", dictionary)
+        plain = create_codec("zlib-6")
+        payload = structured_response(99).encode()
+        
+        self.assertLess(len(zdict.compress(payload)), len(plain.compress(payload)) * 0.7)
+        self.assertEqual(zdict.decompress(zdict.compress(payload)), payload)
+    
+    def test_disk_cache_records_codec_per_entry(self):
+        cache = DiskCache(cache_dir=str(self.cache_dir), compression_codec="lzma")
+        cache.put("response_lzma", structured_response(1) * 5)
+        
+        self.assertEqual(cache._index["response_lzma"].codec, "lzma")
+        
+        # Cambiar de códec no impide leer entradas anteriores
+        reloaded = DiskCache(cache_dir=str(self.cache_dir), compression_codec="zlib-9")
+        reloaded.put("response_zlib", structured_response(2) * 5)
+        self.assertEqual(reloaded.get("response_lzma"), structured_response(1) * 5)
+        self.assertEqual(reloaded._index["response_zlib"].codec, "zlib-9")
+    
+    def test_disk_cache_trains_dictionary_from_responses(self):
+        cache = DiskCache(cache_dir=str(self.cache_dir), dictionary_samples=8,
+                          compression_threshold_kb=0)
+        for i in range(8):
+            cache.put(f"response_{i}", structured_response(i))
+        
+        active = cache.get_stats()["compression"]["active_codec"]
+        self.assertTrue(active.startswith("zdict-"))
+        
+        cache.put("response_new", structured_response(100))
+        self.assertEqual(cache._index["response_new"].codec, active)
+        
+        # El diccionario persiste y se recarga para leer las entradas
+        reloaded = DiskCache(cache_dir=str(self.cache_dir), dictionary_samples=8)
+        self.assertEqual(reloaded.get("response_new"), structured_response(100))
+        self.assertEqual(reloaded.get("response_0"), structured_response(0))
+    
+    def test_legacy_gzip_entries_are_readable(self):
+        import gzip
+        import pickle
+        cache = DiskCache(cache_dir=str(self.cache_dir))
+        cache.put("response_legacy", "placeholder")
+        entry = cache._index["response_legacy"]
+        data = gzip.compress(pickle.dumps("contenido antiguo"))
+        with open(cache.cache_dir / entry.file_path, 'wb') as f:
+            f.write(data)
+        
+        legacy = entry.to_dict()
+        del legacy["codec"]
+        legacy.update(compressed=True, checksum=cache._calculate_checksum(data))
+        cache._index["response_legacy"] = DiskCacheEntry.from_dict(legacy)
+        
+        self.assertEqual(cache.get("response_legacy"), "contenido antiguo")
+
+class TestSQLiteDiskCache(CacheTestCase):
+    """Tests del backend L2 sobre SQLite"""
+    
+    def make_cache(self, **kwargs) -> SQLiteDiskCache:
+        return SQLiteDiskCache(cache_dir=str(self.cache_dir), **kwargs)
+    
+    def test_put_get_overwrite_tracks_size(self):
+        cache = self.make_cache()
+        payload = {"response": "El perdón es la llave de la felicidad " * 100}
+        
+        self.assertTrue(cache.put("response_perdon", payload))
+        self.assertEqual(cache.get("response_perdon"), payload)
+        self.assertTrue(cache.put("response_perdon", "corto"))
+        
+        self.assertEqual(cache.get("response_perdon"), "corto")
+        self.assertEqual(cache.current_size_bytes, len(pickle.dumps("corto", protocol=pickle.HIGHEST_PROTOCOL)))
+        self.assertTrue(cache.delete("response_perdon"))
+        self.assertEqual(cache.current_size_bytes, 0)
+    
+    def test_expired_entries_removed_by_sweep(self):
+        cache = self.make_cache()
+        cache.put("response_old", "x", ttl_hours=1e-6)
+        cache.put("response_new", "y")
+        time.sleep(0.02)
+        
+        self.assertFalse(cache.contains("response_old"))
+        self.assertEqual(cache.sweep_expired(10), 1)
+        self.assertEqual(cache.get_keys(), ["response_new"])
+    
+    def test_eviction_uses_last_accessed_order(self):
+        cache = self.make_cache(compression_threshold_kb=2 ** 20, access_flush_every=1)
+        entry_size = len(pickle.dumps("x" * 1000, protocol=pickle.HIGHEST_PROTOCOL))
+        for key in ["response_a", "response_b", "response_c"]:
+            cache.put(key, "x" * 1000)
+            time.sleep(0.002)
+        cache.get("response_a")
+        cache.max_size_bytes = entry_size * 3
+        
+        # put rechaza objetos > 10% del cache: pedir espacio directamente
+        with cache._write_transaction():
+            self.assertTrue(cache._make_room(entry_size))
+        
+        self.assertEqual(sorted(cache.get_keys()), ["response_a", "response_c"])
+        self.assertEqual(cache.get_stats()["performance"]["evictions"], 1)
+    
+    def test_eviction_sees_buffered_hits(self):
+        cache = self.make_cache(compression_threshold_kb=2 ** 20, access_flush_every=32)
+        entry_size = len(pickle.dumps("x" * 1000, protocol=pickle.HIGHEST_PROTOCOL))
+        for key in ["response_a", "response_b", "response_c"]:
+            cache.put(key, "x" * 1000)
+            time.sleep(0.002)
+        cache.get("response_a")
+        self.assertIn("response_a", cache._pending_access)
+        cache.max_size_bytes = entry_size * 3
+        
+        with cache._write_transaction():
+            self.assertTrue(cache._make_room(entry_size))
+        
+        self.assertEqual(sorted(cache.get_keys()), ["response_a", "response_c"])
+    
+    def test_reopen_keeps_entries_and_access_counts(self):
+        cache = self.make_cache()
+        cache.put("response_popular", "valor")
+        for _ in range(5):
+            cache.get("response_popular")
+        cache.close()
+        
+        reopened = self.make_cache()
+        
+        self.assertEqual(reopened.get_keys("response_*"), ["response_popular"])
+        count = reopened._conn.execute(
+            "SELECT access_count FROM entries WHERE key = ?", ("response_popular",)
+        ).fetchone()[0]
+        self.assertEqual(count, 5)
+    
+    def test_corrupted_blob_is_a_miss(self):
+        cache = self.make_cache()
+        cache.put("response_bad", "valor")
+        cache._conn.execute("UPDATE entries SET value = ? WHERE key = ?", (b"basura", "response_bad"))
+        
+        self.assertIsNone(cache.get("response_bad"))
+        self.assertEqual(cache.get_keys(), [])
+    
+    def test_tags_persist_and_follow_entry_deletes(self):
+        cache = self.make_cache()
+        cache.put("response_lesson_1", "uno", tags=[lesson_tag(1), index_tag("lesson_mapper")])
+        cache.put("response_lesson_2", "dos", tags=[lesson_tag(2)])
+        cache.put("response_general", "x")
+        cache.put("response_lesson_2", "dos sin etiquetas")
+        cache.close()
+        
+        reopened = self.make_cache()
+        
+        self.assertEqual(reopened.invalidate_tags({lesson_tag(2)}), 0)
+        self.assertEqual(reopened.invalidate_tags({index_tag("lesson_mapper"), lesson_tag(1)}), 1)
+        self.assertEqual(sorted(reopened.get_keys()), ["response_general", "response_lesson_2"])
+        self.assertEqual(reopened._conn.execute("SELECT COUNT(*) FROM entry_tags").fetchone()[0], 0)
+    
+    def test_cache_manager_selects_sqlite_engine(self):
+        async def scenario():
+            manager = CacheManager(self.make_config(disk_engine="sqlite"))
+            await manager.initialize()
+            await manager.get_or_load("response_sqlite", lambda: "fila")
+            return manager
+        
+        manager = run_async(scenario())
+        
+        self.assertIsInstance(manager.l2_cache, SQLiteDiskCache)
+        self.assertEqual(manager.l2_cache.get("response_sqlite"), "fila")
+
+class TestAsyncCacheAPI(CacheTestCase):
+    """Tests de aget/aput/adelete y del ejecutor de I/O"""
+    
+    def test_disk_cache_async_roundtrip_runs_off_loop(self):
+        cache = DiskCache(cache_dir=str(self.cache_dir))
+        threads = []
+        original_get = cache.get
+        
+        def recording_get(key):
+            threads.append(threading.current_thread().name)
+            return original_get(key)
+        cache.get = recording_get
+        
+        async def scenario():
+            self.assertTrue(await cache.aput("response_async", {"texto": "paz"}))
+            value = await cache.aget("response_async")
+            deleted = await cache.adelete("response_async")
+            return value, deleted, await cache.aget("response_async")
+        
+        value, deleted, after = run_async(scenario())
+        
+        self.assertEqual(value, {"texto": "paz"})
+        self.assertTrue(deleted)
+        self.assertIsNone(after)
+        self.assertTrue(all(name.startswith("cache-io") for name in threads))
+    
+    def test_concurrent_writes_are_batched_and_coalesced(self):
+        executor = AsyncCacheExecutor(max_workers=2)
+        cache = SQLiteDiskCache(cache_dir=str(self.cache_dir))
+        cache.attach_executor(executor)
+        
+        async def scenario():
+            writes = [cache.aput(f"response_{i}", i) for i in range(50)]
+            writes += [cache.aput("response_0", "último")]
+            return await asyncio.gather(*writes)
+        
+        results = run_async(scenario())
+        stats = executor.get_stats()
+        
+        self.assertTrue(all(results))
+        self.assertEqual(len(cache.get_keys()), 50)
+        self.assertEqual(cache.get("response_0"), "último")
+        self.assertLess(stats["write_batches"], 5)
+        self.assertEqual(stats["coalesced_writes"], 1)
+        executor.shutdown()
+    
+    def test_many_reads_in_flight_keep_loop_responsive(self):
+        cache = DiskCache(cache_dir=str(self.cache_dir))
+        cache.attach_executor(AsyncCacheExecutor(max_workers=4))
+        for i in range(20):
+            cache.put(f"response_{i}", "texto " * 2000)
+        
+        async def scenario():
+            ticks = 0
+            done = asyncio.Event()
+            
+            async def heartbeat():
+                nonlocal ticks
+                while not done.is_set():
+                    ticks += 1
+                    await asyncio.sleep(0)
+            
+            beat = asyncio.create_task(heartbeat())
+            values = await asyncio.gather(*(cache.aget(f"response_{i % 20}") for i in range(300)))
+            done.set()
+            await beat
+            return values, ticks
+        
+        values, ticks = run_async(scenario())
+        
+        self.assertTrue(all(value is not None for value in values))
+        self.assertGreater(ticks, 10)
+        self.assertEqual(cache.async_executor.get_stats()["completed"], 300)
+    
+    def test_memory_cache_native_async(self):
+        cache = MemoryCache(max_size_mb=1)
+        
+        async def scenario():
+            await cache.aput("response_l1", "rápido")
+            value = await cache.aget("response_l1")
+            return value, await cache.adelete("response_l1")
+        
+        self.assertEqual(run_async(scenario()), ("rápido", True))
+    
+    def test_batched_writes_keep_tags_and_soft_ttl(self):
+        disk = DiskCache(cache_dir=str(self.cache_dir / "files"))
+        sqlite_cache = SQLiteDiskCache(cache_dir=str(self.cache_dir / "sqlite"))
+        memory = MemoryCache(max_size_mb=1)
+        
+        async def scenario():
+            await asyncio.gather(
+                disk.aput("response_lesson_1", "uno", ttl_hours=1, tags=[lesson_tag(1)],
+                          soft_ttl_hours=TestStaleWhileRevalidate.SOFT_TTL_HOURS),
+                disk.aput("response_lesson_2", "dos", ttl_hours=1, tags=[lesson_tag(2)]),
+                disk.aput("response_general", "x", ttl_hours=1),
+                sqlite_cache.aput("response_lesson_1", "uno", tags=[lesson_tag(1)]),
+                memory.aput("response_lesson_1", "uno", tags=[lesson_tag(1)], soft_ttl_hours=1)
+            )
+        
+        run_async(scenario())
+        time.sleep(0.01)
+        
+        self.assertEqual(disk.async_executor.get_stats()["write_batches"], 1)
+        self.assertEqual(disk.get_with_state("response_lesson_1"), ("uno", True))
+        self.assertEqual(disk.get_with_state("response_lesson_2"), ("dos", False))
+        self.assertEqual(disk.invalidate_tags({lesson_tag(1), lesson_tag(2)}), 2)
+        self.assertEqual(disk.get_keys(), ["response_general"])
+        self.assertEqual(sqlite_cache.invalidate_tags({lesson_tag(1)}), 1)
+        self.assertEqual(memory.invalidate_tags({lesson_tag(1)}), 1)
+    
+    def test_cache_manager_reports_io_queue(self):
+        async def scenario():
+            manager = CacheManager(self.make_config())
+            await manager.initialize()
+            await manager.get_or_load("response_io", lambda: "valor", cache_level="l2")
+            value = await manager.get_or_load("response_io", lambda: "otro", cache_level="l2")
+            report = manager.get_performance_report()
+            await manager.shutdown()
+            return value, report
+        
+        value, report = run_async(scenario())
+        
+        self.assertEqual(value, "valor")
+        self.assertGreaterEqual(report["io"]["submitted"], 2)
+        self.assertEqual(report["io"]["queue_depth"], 0)
+
+class TestBulkOperations(CacheTestCase):
+    """Tests de get_many/put_many en los niveles de cache"""
+    
+    def test_memory_cache_bulk_roundtrip(self):
+        cache = MemoryCache(max_size_mb=1)
+        results = cache.put_many({f"response_{i}": f"texto {i}" for i in range(20)})
+        
+        found = cache.get_many([f"response_{i}" for i in range(25)])
+        
+        self.assertTrue(all(results.values()))
+        self.assertEqual(len(found), 20)
+        self.assertEqual(found["response_3"], "texto 3")
+        self.assertNotIn("response_22", found)
+        self.assertEqual((cache.hits, cache.misses), (20, 5))
+    
+    def test_sharded_cache_bulk_roundtrip(self):
+        cache = ShardedMemoryCache(max_size_mb=1, shards=4)
+        cache.put_many({f"response_{i}": i for i in range(40)})
+        
+        found = cache.get_many([f"response_{i}" for i in range(40)] + ["ausente"])
+        
+        self.assertEqual(found, {f"response_{i}": i for i in range(40)})
+        self.assertEqual(cache.misses, 1)
+    
+    def test_disk_put_many_writes_journal_once(self):
+        cache = DiskCache(cache_dir=str(self.cache_dir), compression_codec="zlib-6")
+        journal_writes = []
+        original_write = cache._write_journal
+        cache._write_journal = lambda lines: (journal_writes.append(len(lines)), original_write(lines))
+        
+        results = cache.put_many({f"response_{i}": {"texto": "x" * i} for i in range(30)})
+        
+        self.assertTrue(all(results.values()))
+        self.assertEqual(journal_writes, [30])
+        reopened = DiskCache(cache_dir=str(self.cache_dir), compression_codec="zlib-6")
+        self.assertEqual(len(reopened.get_keys()), 30)
+        self.assertEqual(reopened.get("response_7"), {"texto": "x" * 7})
+    
+    def test_disk_get_many_reports_hits_and_flushes_access_once(self):
+        cache = DiskCache(cache_dir=str(self.cache_dir))
+        cache.put_many({f"response_{i}": i for i in range(12)})
+        journal_ops = cache._journal_ops
+        
+        found = cache.get_many([f"response_{i}" for i in range(15)])
+        
+        self.assertEqual(found, {f"response_{i}": i for i in range(12)})
+        self.assertEqual((cache.hits, cache.misses), (12, 3))
+        self.assertEqual(cache._journal_ops - journal_ops, 12)
+        self.assertFalse(cache._dirty_access)
+        self.assertEqual(cache.get_stats()["io"]["batch_gets"], 1)
+    
+    def test_cache_manager_bulk_across_levels(self):
+        async def scenario():
+            manager = CacheManager(self.make_config())
+            await manager.initialize()
+            stored = await manager.put_many({f"response_{i}": f"valor {i}" for i in range(10)},
+                                            cache_level="l2")
+            manager.l1_cache.put("response_0", "valor 0")
+            
+            found = await manager.get_many([f"response_{i}" for i in range(12)])
+            promoted = manager.l1_cache.get_many([f"response_{i}" for i in range(10)])
+            report = manager.get_performance_report()
+            await manager.shutdown()
+            return stored, found, promoted, report
+        
+        stored, found, promoted, report = run_async(scenario())
+        
+        self.assertTrue(all(stored.values()))
+        self.assertEqual(len(found), 10)
+        self.assertEqual(len(promoted), 10)
+        self.assertEqual(report["detailed_stats"]["l1"]["hits"], 1)
+        self.assertEqual(report["detailed_stats"]["l2"]["hits"], 9)
+        self.assertEqual(report["detailed_stats"]["l2"]["misses"], 2)
+        self.assertEqual(report["engine"]["promotions"], 9)
+    
+    def test_write_back_flush_uses_single_batch(self):
+        async def scenario():
+            manager = CacheManager(self.make_config(write_policy="write_back",
+                                                    write_back_batch_size=1000))
+            await manager.initialize()
+            await manager.put_many({f"response_{i}": i for i in range(25)})
+            pending_hits = await manager.get_many(["response_3"], cache_level="l2")
+            written = await manager.flush()
+            batches = manager.l2_cache.get_stats()["io"]["batch_puts"]
+            await manager.shutdown()
+            return pending_hits, written, batches
+        
+        pending_hits, written, batches = run_async(scenario())
+        
+        self.assertEqual(pending_hits, {"response_3": 3})
+        self.assertEqual(written, 25)
+        self.assertEqual(batches, 1)
+
+class TestCacheWarmer(CacheTestCase):
+    """Tests del precalentamiento de respuestas"""
+    
+    def setUp(self):
+        super().setUp()
+        self.engine = EnhancedUCDMResponseEngine(use_cache=True, cache_dir=str(self.cache_dir))
+        today = datetime.now().strftime("%m-%d")
+        self.engine.lessons_index = {"1": {"title": "Nada de lo que veo significa nada"},
+                                     "2": {"title": "Le he dado a todo el significado que tiene"}}
+        self.engine.date_mapper = {today: 2, "02-29": 1}
+        self.engine.concept_index = {"titulo_perdón.": ["1"], "titulo_perdón": ["2"]}
+    
+    def test_build_jobs_enumerates_canonical_queries(self):
+        jobs = CacheWarmer(self.engine, workers=0).build_jobs()
+        kinds = [job.kind for job in jobs]
+        
+        self.assertEqual(kinds.count("lesson"), 2)
+        self.assertEqual(kinds.count("daily"), 2)
+        self.assertEqual(kinds.count("concept"), 1)  # Mismo concepto tras normalizar
+        self.assertIn("Háblame sobre perdón en UCDM", [job.query for job in jobs])
+        daily = [job for job in jobs if job.kind == "daily"]
+        self.assertTrue(all(job.ttl_hours >= 1 for job in daily))
+        self.assertTrue(any(job.target_date.endswith("T00:00:00") and job.target_date[5:10] == "02-29"
+                            for job in daily))
+    
+    def test_pool_workers_use_engine_indices(self):
+        from performance import cache_warmer
+        engine = EnhancedUCDMResponseEngine(use_cache=True, cache_dir=str(self.cache_dir),
+                                            indices_dir=str(self.indices_dir), use_compiled_index=False)
+        initargs = CacheWarmer(engine, workers=2)._worker_initargs()
+        self.assertEqual(initargs, (str(self.indices_dir), False))
+        
+        cache_warmer._init_worker(*initargs)
+        self.addCleanup(setattr, cache_warmer, "_worker_engine", None)
+        self.assertEqual(cache_warmer._worker_engine.indices_dir, self.indices_dir)
+        self.assertIsNone(cache_warmer._worker_engine.compiled_index)
+        self.assertEqual(cache_warmer._worker_engine.lessons_index, {"1": {"title": "Lección 1"}})
+    
+    def test_run_makes_first_queries_hits(self):
+        summary = CacheWarmer(self.engine, workers=0).run()
+        
+        self.assertEqual(summary["generated"], summary["total_jobs"])
+        self.assertEqual(summary["stored_disk"], summary["total_jobs"])
+        # El 29 de febrero todavía no es válido hoy: solo va a disco
+        self.assertEqual(summary["stored_memory"], summary["total_jobs"] - 1)
+        
+        daily = self.engine.process_query(DAILY_QUERY)
+        self.assertTrue(daily["cache_hit"])
+        self.assertEqual(daily["lesson_number"], 2)
+        self.assertTrue(self.engine.process_query("Explícame la Lección 1")["cache_hit"])
+    
+    def test_run_writes_soft_ttl_like_the_engine(self):
+        self.engine.stale_while_revalidate = True
+        CacheWarmer(self.engine, workers=0).run()
+        key = self.engine.cache_key_for("Explícame la Lección 1")
+        
+        disk_entry = self.engine.disk_cache._index[key]
+        self.assertIsNotNone(disk_entry.soft_expires_at)
+        self.assertGreater(disk_entry.expires_at - disk_entry.soft_expires_at, timedelta(hours=23))
+        self.assertIsNotNone(self.engine.memory_cache._cache[key].soft_expires)
+        
+        self.engine.stale_while_revalidate = False
+        self.engine.disk_cache.clear()
+        CacheWarmer(self.engine, workers=0).run(resume=False)
+        self.assertIsNone(self.engine.disk_cache._index[key].soft_expires_at)
+    
+    def test_daily_key_changes_with_date(self):
+        tomorrow = datetime.now() + timedelta(days=1)
+        
+        self.assertNotEqual(self.engine.cache_key_for(DAILY_QUERY),
+                            self.engine.cache_key_for(DAILY_QUERY, tomorrow))
+        self.assertEqual(self.engine.cache_key_for("Explícame la Lección 1"),
+                         self.engine.cache_key_for("Explícame la Lección 1", tomorrow))
+    
+    def test_interrupted_run_resumes(self):
+        calls = []
+        
+        def interrupt(progress):
+            calls.append(progress)
+            if len(calls) == 2:
+                raise KeyboardInterrupt
+        
+        warmer = CacheWarmer(self.engine, workers=0, chunk_size=2, progress_callback=interrupt)
+        with self.assertRaises(KeyboardInterrupt):
+            warmer.run()
+        
+        warmer.progress_callback = None
+        summary = warmer.run()
+        
+        self.assertEqual(summary["resumed"], 4)
+        self.assertEqual(summary["generated"], summary["total_jobs"] - 4)
+        self.assertEqual(warmer.run()["resumed"], 0)  # Una ejecución terminada no se reanuda
+    
+    def test_process_pool_generation(self):
+        summary = CacheWarmer(self.engine, workers=2, chunk_size=2).run()
+        
+        self.assertEqual(summary["stored_disk"], summary["total_jobs"])
+        self.assertTrue(self.engine.process_query("Explícame la Lección 2")["cache_hit"])
+    
+    def test_seconds_until_rollover(self):
+        now = datetime(2024, 5, 1, 23, 0)
+        
+        self.assertEqual(CacheWarmer.seconds_until_rollover(30, now=now), 30 * 60)
+        self.assertEqual(CacheWarmer.seconds_until_rollover(30, now=datetime(2024, 5, 1, 23, 45)),
+                         (24 * 60 - 15) * 60)
+
+class TestQueryKeys(CacheTestCase):
+    """Tests de canonicalización de consultas y esquemas de clave"""
+    
+    def test_normalize_query(self):
+        self.assertEqual(normalize_query("  ¿Cuál es la  LECCIÓN de hoy? "), "cual es la leccion de hoy")
+    
+    def test_parse_query_intents(self):
+        self.assertEqual(parse_query("Explícame la Lección 12"), ("lesson_specific", 12, None))
+        self.assertEqual(parse_query("¿Cuál es la lección de hoy?"), ("daily_lesson", None, None))
+        self.assertEqual(parse_query("Háblame sobre el perdón según Un Curso de Milagros"),
+                         ("concept_based", None, "perdon"))
+        self.assertEqual(parse_query("Háblame sobre perdón en UCDM")[2], "perdon")
+        self.assertEqual(parse_query("Hola")[0], "general")
+    
+    def test_parse_query_keeps_original_classification(self):
+        def original_query_type(query):
+            query_lower = query.lower()
+            if re.search(r'lecci[oó]n\s+(\d+)', query_lower):
+                return "lesson_specific"
+            if any(p in query_lower for p in ['hoy', 'diaria', 'día']):
+                return "daily_lesson"
+            if any(p in query_lower for p in ['sobre', 'acerca', 'explica']):
+                return "concept_based"
+            return "general"
+        
+        phrasings = [
+            "Lección 5", "Explícame la Lección 12", "leccion 3", "¿Cuál es la lección de hoy?",
+            "lecciones de estos días", "Dame la práctica diariamente", "La práctica diaria",
+            "Necesito una explicación del perdón", "Háblame sobre el amor", "Háblame acerca del amor",
+            "Explícame el milagro", "¿Qué es la paz?", "El día de hoy", "Media hora de práctica", "Hola",
+        ]
+        for query in phrasings:
+            with self.subTest(query=query):
+                self.assertEqual(parse_query(query)[0], original_query_type(query))
+    
+    def test_concept_contractions_share_semantic_key(self):
+        semantic = QueryKeyBuilder("semantic")
+        
+        self.assertEqual(semantic.key_for("Háblame acerca del amor"), semantic.key_for("Háblame sobre el amor"))
+        self.assertEqual(parse_query("Cuéntame acerca de la paz")[2], "paz")
+    
+    def test_equivalent_queries_share_semantic_key(self):
+        semantic = QueryKeyBuilder("semantic")
+        raw = QueryKeyBuilder("raw")
+        variants = ["Lección 1", "lección 1 ", "Explícame la Lección 1"]
+        
+        self.assertEqual({semantic.key_for(q) for q in variants}, {"response_lesson_1"})
+        self.assertEqual(len({raw.key_for(q) for q in variants}), 3)
+        self.assertEqual(QueryKeyBuilder("normalized").key_for("Lección 1"),
+                         QueryKeyBuilder("normalized").key_for("leccion 1 "))
+        self.assertEqual(semantic.key_for("hablame sobre el perdon"),
+                         semantic.key_for("Háblame sobre el perdón en UCDM"))
+        with self.assertRaises(ValueError):
+            QueryKeyBuilder("md5")
+    
+    def test_engine_serves_variants_from_one_entry(self):
+        engine = EnhancedUCDMResponseEngine(use_cache=True, cache_dir=str(self.cache_dir))
+        engine.lessons_index = {"1": {"title": "Nada de lo que veo significa nada"}}
+        
+        first = engine.process_query("Explícame la Lección 1")
+        second = engine.process_query("lección 1 ")
+        
+        self.assertFalse(first["cache_hit"])
+        self.assertTrue(second["cache_hit"])
+        self.assertEqual(second["query"], "lección 1 ")
+        self.assertEqual(second["response"], first["response"])
+    
+    def test_key_schema_comparison_report(self):
+        benchmark = CachePolicyBenchmark()
+        trace = benchmark.generate_trace(length=3000, phrasing_variants=True)
+        results = {r["schema"]: r for r in benchmark.compare_key_schemas(trace, capacity_entries=100)}
+        
+        self.assertGreater(results["semantic"]["hit_ratio"], results["raw"]["hit_ratio"])
+        self.assertLess(results["semantic"]["distinct_keys"], results["normalized"]["distinct_keys"])
+        self.assertEqual(results["raw"]["capacity_multiplier"], 1.0)
+
+class TestTagInvalidation(CacheTestCase):
+    """Tests de invalidación por etiquetas ligada a versiones de índices"""
+    
+    def write_index(self, lessons):
+        comprehensive = {
+            "metadata": {"version": 1},
+            "lesson_details": {number: {"title": title} for number, title in lessons.items()},
+            "concept_index": {"amor": [1]},
+            "date_mapping": {"01-01": 1}
+        }
+        with open(self.indices_dir / "ucdm_comprehensive_index.json", 'w', encoding='utf-8') as f:
+            json.dump(comprehensive, f)
+    
+    def test_bus_publishes_only_changed_lessons(self):
+        self.write_index({"1": "Lección 1", "2": "Lección 2"})
+        bus = InvalidationBus(str(self.indices_dir))
+        published = []
+        bus.subscribe(lambda tags, index_name: published.append((index_name, tags)))
+        
+        self.assertEqual(bus.check(), {})  # Primera vez: solo registra
+        self.write_index({"1": "Lección 1", "2": "Lección 2 revisada"})
+        changes = bus.check()
+        
+        tags = changes["ucdm_comprehensive_index"]
+        self.assertIn(lesson_tag(2), tags)
+        self.assertNotIn(lesson_tag(1), tags)
+        self.assertNotIn(index_tag("ucdm_comprehensive_index", "date_mapping"), tags)
+        # Dependientes transitivos del índice modificado
+        self.assertIn(index_tag("365_lessons_advanced"), tags)
+        self.assertEqual(published, [("ucdm_comprehensive_index", tags)])
+        self.assertEqual(bus.check(), {})
+    
+    def test_versions_persist_across_restarts(self):
+        state_file = str(self.cache_dir / "index_versions.json")
+        InvalidationBus(str(self.indices_dir), state_file=state_file).check()
+        self.write_index({"1": "Lección 1 nueva"})
+        
+        changes = InvalidationBus(str(self.indices_dir), state_file=state_file).check()
+        self.assertIn(lesson_tag(1), changes["ucdm_comprehensive_index"])
+    
+    def test_disk_tags_survive_reopen(self):
+        cache = DiskCache(cache_dir=str(self.cache_dir))
+        cache.put("response_lesson_1", {"n": 1}, tags=[lesson_tag(1)])
+        cache.put_many({"response_lesson_2": {"n": 2}, "response_x": {}},
+                       tags={"response_lesson_2": [lesson_tag(2)]})
+        
+        reopened = DiskCache(cache_dir=str(self.cache_dir))
+        self.assertEqual(reopened.invalidate_tags({lesson_tag(2), "lesson:99"}), 1)
+        self.assertIsNone(reopened.get("response_lesson_2"))
+        self.assertEqual(reopened.get("response_lesson_1"), {"n": 1})
+        self.assertEqual(reopened.get("response_x"), {})
+    
+    def test_engine_purges_responses_of_rewritten_lesson(self):
+        self.write_index({"1": "Lección 1", "2": "Lección 2"})
+        engine = EnhancedUCDMResponseEngine(use_cache=True, cache_dir=str(self.cache_dir),
+                                            indices_dir=str(self.indices_dir))
+        self.assertTrue(engine.load_data())
+        engine.process_query("Lección 1")
+        engine.process_query("Lección 2")
+        
+        self.write_index({"1": "Lección 1", "2": "Lección 2 revisada"})
+        engine.check_index_changes()
+        
+        self.assertTrue(engine.process_query("Lección 1")["cache_hit"])
+        self.assertIsNone(engine.disk_cache.get("response_lesson_2"))
+        self.assertFalse(engine.process_query("Lección 2")["cache_hit"])
+        self.assertEqual(engine.lessons_index["2"]["title"], "Lección 2 revisada")
+    
+    def test_concept_response_is_tagged_with_the_lesson_used(self):
+        self.write_index({"1": "Lección 1"})
+        engine = EnhancedUCDMResponseEngine(use_cache=True, cache_dir=str(self.cache_dir),
+                                            indices_dir=str(self.indices_dir))
+        self.assertTrue(engine.load_data())
+        result = engine.process_query("Háblame sobre el amor")
+        
+        self.assertEqual(result["lesson_number"], 1)
+        self.assertEqual(engine.response_tags(result),
+                         [lesson_tag(1), index_tag("ucdm_comprehensive_index", "concept_index")])
+        
+        self.write_index({"1": "Lección 1 revisada"})
+        engine.check_index_changes()
+        self.assertFalse(engine.process_query("Háblame sobre el amor")["cache_hit"])
+    
+    def test_manager_bus_purges_all_levels(self):
+        async def scenario():
+            manager = CacheManager(self.make_config(write_policy="write_back"))
+            await manager.initialize()
+            bus = InvalidationBus(str(self.indices_dir))
+            manager.attach_invalidation_bus(bus)
+            bus.check()
+            
+            await manager.get_or_load("response_lesson_1", lambda: "uno", tags=[lesson_tag(1)])
+            await manager.put_many({"response_general": "x"}, tags={"response_general": ["index:otro"]})
+            self.write_index({"1": "Lección 1 nueva"})
+            await manager._cleanup_expired()
+            return manager
+        
+        manager = run_async(scenario())
+        
+        self.assertFalse(manager.l1_cache.contains("response_lesson_1"))
+        self.assertIsNone(manager.l2_cache.get("response_lesson_1"))
+        self.assertEqual(manager.l2_cache.get("response_general"), "x")
+        self.assertEqual(manager.get_performance_report()["invalidation"]["changes_detected"], 1)
+    
+    def test_manager_invalidates_tags_in_every_l2_engine(self):
+        for engine in ("files", "log", "sqlite"):
+            async def scenario():
+                manager = CacheManager(self.make_config(disk_engine=engine,
+                                                        disk_path=str(self.cache_dir / engine)))
+                await manager.initialize()
+                await manager.get_or_load("response_lesson_1", lambda: "uno", tags=[lesson_tag(1)])
+                await manager.put_many({"response_lesson_2": "dos", "response_general": "x"},
+                                       tags={"response_lesson_2": [lesson_tag(2)]})
+                invalidated = manager.invalidate_tags({lesson_tag(1), lesson_tag(2)}, levels=["l2"])
+                await manager.shutdown()
+                return manager, invalidated
+            
+            manager, invalidated = run_async(scenario())
+            self.assertEqual(invalidated, 2, engine)
+            self.assertEqual(manager.l2_cache.get_keys(), ["response_general"], engine)
+
+class TestStaleWhileRevalidate(CacheTestCase):
+    """Tests del modo TTL blando (stale-while-revalidate)"""
+    
+    SOFT_TTL_HOURS = 1e-6  # ~3.6 ms
+    
+    def test_memory_serves_stale_until_hard_ttl(self):
+        cache = MemoryCache(max_size_mb=1)
+        cache.put("k", "v", ttl_hours=1, soft_ttl_hours=self.SOFT_TTL_HOURS)
+        self.assertEqual(cache.get_with_state("k"), ("v", False))
+        
+        time.sleep(0.01)
+        self.assertEqual(cache.get_with_state("k"), ("v", True))
+        self.assertEqual(cache.get("k"), "v")
+        self.assertEqual(cache.get_stats()["performance"]["stale_hits"], 1)
+        
+        # Un TTL blando mayor que el duro se ignora
+        cache.put("k2", "v", ttl_hours=self.SOFT_TTL_HOURS, soft_ttl_hours=1)
+        time.sleep(0.01)
+        self.assertEqual(cache.get_with_state("k2"), (None, False))
+    
+    def test_disk_soft_deadline_survives_reopen(self):
+        DiskCache(cache_dir=str(self.cache_dir)).put("k", {"a": 1}, ttl_hours=1,
+                                                     soft_ttl_hours=self.SOFT_TTL_HOURS)
+        time.sleep(0.01)
+        
+        reopened = DiskCache(cache_dir=str(self.cache_dir))
+        self.assertEqual(reopened.get_with_state("k"), ({"a": 1}, True))
+        self.assertEqual(reopened.get_stats()["performance"]["stale_hits"], 1)
+    
+    def test_log_and_sqlite_soft_deadline_survive_reopen(self):
+        for engine_class in (LogStructuredDiskCache, SQLiteDiskCache):
+            cache_dir = str(self.cache_dir / engine_class.__name__)
+            cache = engine_class(cache_dir=cache_dir)
+            cache.put("k", {"a": 1}, ttl_hours=1, soft_ttl_hours=self.SOFT_TTL_HOURS)
+            cache.put("fresh", "v", ttl_hours=1, soft_ttl_hours=1)
+            cache.put("k2", "v", ttl_hours=self.SOFT_TTL_HOURS, soft_ttl_hours=1)
+            cache.close()
+            time.sleep(0.01)
+            
+            reopened = engine_class(cache_dir=cache_dir)
+            self.assertEqual(reopened.get_with_state("k"), ({"a": 1}, True), engine_class.__name__)
+            self.assertEqual(reopened.get_with_state("fresh"), ("v", False), engine_class.__name__)
+            self.assertEqual(reopened.get_with_state("k2"), (None, False), engine_class.__name__)
+            self.assertEqual(reopened.get_stats()["performance"]["stale_hits"], 1)
+    
+    def test_manager_writes_soft_ttl_to_every_l2_engine(self):
+        for engine in ("files", "log", "sqlite"):
+            async def scenario():
+                config = self.make_config(disk_engine=engine, disk_path=str(self.cache_dir / engine),
+                                          stale_while_revalidate=True, stale_grace_factor=1e6)
+                manager = CacheManager(config)
+                await manager.initialize()
+                await manager.get_or_load("response_lesson_1", lambda: "v1", cache_level="l2",
+                                          ttl_hours=self.SOFT_TTL_HOURS)
+                await manager.shutdown()
+                return manager
+            
+            manager = run_async(scenario())
+            time.sleep(0.01)
+            self.assertEqual(manager.l2_cache.get_with_state("response_lesson_1"), ("v1", True), engine)
+    
+    def test_manager_serves_stale_and_refreshes_once(self):
+        versions = iter(["v1", "v2", "v3"])
+        
+        async def loader():
+            await asyncio.sleep(0.01)
+            return next(versions)
+        
+        async def scenario():
+            config = self.make_config(stale_while_revalidate=True, stale_grace_factor=1e6)
+            manager = CacheManager(config)
+            await manager.initialize()
+            first = await manager.get_or_load("response_lesson_1", loader, ttl_hours=self.SOFT_TTL_HOURS)
+            await asyncio.sleep(0.01)
+            stale = await asyncio.gather(*(
+                manager.get_or_load("response_lesson_1", loader, ttl_hours=self.SOFT_TTL_HOURS)
+                for _ in range(5)
+            ))
+            await manager.shutdown()
+            return manager, first, stale
+        
+        manager, first, stale = run_async(scenario())
+        
+        self.assertEqual(first, "v1")
+        self.assertEqual(stale, ["v1"] * 5)
+        self.assertEqual(manager.l1_cache.get("response_lesson_1"), "v2")
+        report = manager.get_performance_report()["stale_while_revalidate"]
+        self.assertEqual(report["stale_serves"], 5)
+        self.assertEqual(report["background_refreshes"], 1)
+        self.assertEqual(manager.metrics.loader_calls, 2)
+    
+    def test_engine_refreshes_stale_response_in_background(self):
+        engine = EnhancedUCDMResponseEngine(use_cache=True, cache_dir=str(self.cache_dir),
+                                            stale_while_revalidate=True)
+        self.addCleanup(engine.shutdown)
+        engine.lessons_index = {"1": {"title": "Nada de lo que veo significa nada"}}
+        old = dict(engine.generate_result("Lección 1"), generated_at="antes")
+        engine.memory_cache.put("response_lesson_1", old, ttl_hours=1, soft_ttl_hours=self.SOFT_TTL_HOURS)
+        time.sleep(0.01)
+        
+        served = engine.process_query("Lección 1")
+        engine.wait_for_refreshes()
+        
+        self.assertTrue(served["cache_hit"])
+        self.assertEqual(served["generated_at"], "antes")
+        self.assertNotEqual(engine.memory_cache.get("response_lesson_1")["generated_at"], "antes")
+        metrics = engine.get_performance_metrics()["stale_while_revalidate"]
+        self.assertEqual((metrics["stale_serves"], metrics["background_refreshes"]), (1, 1))
+    
+    def test_engine_shutdown_waits_for_refreshes(self):
+        engine = EnhancedUCDMResponseEngine(use_cache=True, cache_dir=str(self.cache_dir),
+                                            stale_while_revalidate=True)
+        self.assertEqual(engine.ttl_args(1), {"ttl_hours": 2, "soft_ttl_hours": 1})
+        engine.lessons_index = {"1": {"title": "Nada de lo que veo significa nada"}}
+        generate = engine._generate_and_store
+        engine._generate_and_store = lambda *args: (time.sleep(0.1), generate(*args))[1]
+        engine.memory_cache.put("response_lesson_1", {"generated_at": "antes"}, ttl_hours=1,
+                                soft_ttl_hours=self.SOFT_TTL_HOURS)
+        time.sleep(0.01)
+        
+        engine.process_query("Lección 1")
+        engine.shutdown()
+        self.assertEqual(engine.background_refreshes, 1)
+        
+        # Tras el cierre se sigue sirviendo el valor vencido, sin lanzar regeneraciones
+        engine.memory_cache.put("response_lesson_1", {"generated_at": "antes"}, ttl_hours=1,
+                                soft_ttl_hours=self.SOFT_TTL_HOURS)
+        time.sleep(0.01)
+        self.assertEqual(engine.process_query("Lección 1")["generated_at"], "antes")
+        self.assertEqual(engine.get_performance_metrics()["stale_while_revalidate"]["refreshing"], 0)
+    
+    def test_engine_defaults_to_hard_ttl_only(self):
+        engine = EnhancedUCDMResponseEngine(use_cache=True, cache_dir=str(self.cache_dir))
+        self.addCleanup(engine.shutdown)
+        
+        self.assertFalse(engine.stale_while_revalidate)
+        self.assertEqual(engine.ttl_args(1), {"ttl_hours": 1})
+
+class TestIndexHotReload(CacheTestCase):
+    """Tests de la recarga en caliente de índices reescritos en disco"""
+    
+    def setUp(self):
+        super().setUp()
+        self.write_json("lesson_mapper", {"1": "01-01"})
+        self.write_json("lesson_date_mapper", {"01-01": 1})
+    
+    def write_json(self, index_name, data):
+        with open(self.indices_dir / f"{index_name}.json", 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+    
+    def test_index_cache_swaps_segment_and_purges_dependents(self):
+        cache = IndexCache(indices_dir=str(self.indices_dir), preload_popular=False)
+        watcher = IndexWatcher(str(self.indices_dir), use_events=False)
+        watcher.watch(cache)
+        self.assertEqual(cache.get_index("lesson_mapper"), {"1": "01-01"})
+        cache.get_index("lesson_date_mapper")
+        cache.put_cached_query("ucdm_comprehensive_index_lessons", [1])
+        
+        self.assertEqual(watcher.scan(), [])
+        self.write_json("lesson_mapper", {"1": "01-01", "2": "01-02"})
+        
+        self.assertEqual(watcher.scan(), ["lesson_mapper"])
+        self.assertEqual(cache.get_index("lesson_mapper", auto_load=False), {"1": "01-01", "2": "01-02"})
+        self.assertNotIn("index_lesson_date_mapper", cache.get_query_keys())
+        self.assertIn("ucdm_comprehensive_index_lessons", cache.get_query_keys())
+        self.assertEqual(cache.get_stats()["performance"]["hot_reloads"], 1)
+        self.assertEqual(watcher.get_stats()["reloads"], 1)
+    
+    def test_lazy_loader_cascades_to_loaded_dependents(self):
+        loader = LazyIndexLoader(indices_dir=str(self.indices_dir), auto_preload=False)
+        loader._load_index_sync("lesson_date_mapper")
+        self.assertTrue(loader.is_loaded("lesson_mapper"))
+        
+        # El indexador reescribe el dependiente; solo se notifica la dependencia
+        self.write_json("lesson_date_mapper", {"01-01": 1, "01-02": 2})
+        
+        self.assertEqual(loader.hot_reload(["lesson_mapper"]), ["lesson_date_mapper"])
+        self.assertEqual(loader._loaded_indices["lesson_date_mapper"], {"01-01": 1, "01-02": 2})
+        self.assertEqual(loader.get_load_statistics()["summary"]["hot_reloads"], 1)
+    
+    def test_partial_write_keeps_previous_version(self):
+        cache = IndexCache(indices_dir=str(self.indices_dir), preload_popular=False)
+        cache.get_index("lesson_mapper")
+        with open(self.indices_dir / "lesson_mapper.json", 'w', encoding='utf-8') as f:
+            f.write('{"1": "01-')
+        
+        self.assertEqual(cache.hot_reload(["lesson_mapper"]), [])
+        self.assertEqual(cache.get_index("lesson_mapper", auto_load=False), {"1": "01-01"})
+    
+    def test_background_polling_reloads_without_requests(self):
+        cache = IndexCache(indices_dir=str(self.indices_dir), preload_popular=False)
+        cache.get_index("lesson_mapper")
+        watcher = IndexWatcher(str(self.indices_dir), poll_interval=0.02, use_events=False)
+        watcher.watch(cache)
+        watcher.start()
+        try:
+            self.write_json("lesson_mapper", {"1": "01-01", "3": "01-03"})
+            deadline = time.time() + 5
+            while watcher.reloads == 0 and time.time() < deadline:
+                time.sleep(0.01)
+        finally:
+            watcher.stop()
+        
+        self.assertFalse(watcher.is_running)
+        self.assertIn("3", cache.get_index("lesson_mapper", auto_load=False))
+
+class TestCompiledIndex(CacheTestCase):
+    """Tests del índice completo compilado a formato binario mapeable"""
+    
+    def setUp(self):
+        super().setUp()
+        self.source = self.indices_dir / "ucdm_comprehensive_index.json"
+        self.data = {
+            "metadata": {"total_lessons": 3},
+            "date_mapping": {"01-03": 3, "01-01": 1},
+            "concept_index": {"perdón": ["1", "3"], "amor": ["3"]},
+            "lesson_details": {
+                "3": {"title": "Lección 3", "word_count": 120, "concepts": ["perdón", "amor"],
+                      "daily_dates": ["01-03"], "file_path": "lesson_003.txt",
+                      "extraction_method": "pattern", "confidence": 0.75},
+                "1": {"title": "Lección 1", "confidence": 1, "notas": {"revisada": True}}
+            },
+            "extra_section": [1, 2]
+        }
+        self.write_source(self.data)
+    
+    def write_source(self, data):
+        with open(self.source, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False)
+    
+    def test_round_trip_preserves_json_shape(self):
+        with CompiledIndex(compile_index(self.source)) as index:
+            self.assertEqual(index.to_dict(), self.data)
+            self.assertEqual(index.lesson(3)["concepts"], ["perdón", "amor"])
+            # Campos fuera del registro fijo conservan su tipo
+            self.assertEqual(index.lesson("1")["confidence"], 1)
+            self.assertEqual(index.lessons_for_concept("perdón"), ["1", "3"])
+            self.assertIsNone(index.lessons_for_concept("miedo"))
+            self.assertEqual(index.lesson_for_date("01-03"), 3)
+            self.assertEqual(index.metadata, {"total_lessons": 3})
+    
+    def test_views_behave_like_the_json_dicts(self):
+        index = load_compiled_index(self.source)
+        lessons = index.lesson_details
+        
+        self.assertEqual(list(lessons), ["1", "3"])
+        self.assertIn("3", lessons)
+        self.assertNotIn(3, lessons)
+        self.assertNotIn("2", lessons)
+        self.assertIsNone(lessons.get("2"))
+        with self.assertRaises(KeyError):
+            lessons["2"]
+        self.assertEqual(sorted(index.concept_index), ["amor", "perdón"])
+        self.assertEqual(index.date_mapping.get("01-01"), 1)
+        self.assertEqual(len(index.date_mapping), 2)
+        index.close()
+    
+    def test_recompiles_only_when_content_changes(self):
+        load_compiled_index(self.source).close()
+        compiled = compiled_path_for(self.source)
+        compiled_stamp = compiled.stat().st_mtime_ns
+        
+        # Reescritura con el mismo contenido: se reutiliza el archivo compilado
+        time.sleep(0.01)
+        self.write_source(self.data)
+        with load_compiled_index(self.source) as index:
+            self.assertEqual(index.lesson(3)["title"], "Lección 3")
+        self.assertEqual(compiled.stat().st_mtime_ns, compiled_stamp)
+        
+        self.data["lesson_details"]["3"]["title"] = "Lección 3 revisada"
+        self.write_source(self.data)
+        with load_compiled_index(self.source) as index:
+            self.assertEqual(index.lesson(3)["title"], "Lección 3 revisada")
+        
+        # Archivo corrupto: se recompila en lugar de fallar
+        compiled.write_bytes(b"basura")
+        with load_compiled_index(self.source) as index:
+            self.assertEqual(len(index.lesson_details), 2)
+        self.assertIsNone(load_compiled_index(self.indices_dir / "no_existe.json"))
+    
+    def test_engine_serves_from_compiled_index(self):
+        engine = EnhancedUCDMResponseEngine(use_cache=False, indices_dir=str(self.indices_dir))
+        self.assertTrue(engine.load_data())
+        self.assertIsInstance(engine.compiled_index, CompiledIndex)
+        self.assertTrue(compiled_path_for(self.source).exists())
+        
+        result = engine.generate_result("Explícame la Lección 3")
+        self.assertEqual(result["lesson_number"], 3)
+        self.assertEqual(engine.get_lesson_for_date(datetime(2024, 1, 3)), 3)
+        self.assertEqual(engine.get_performance_metrics()["compiled_index"]["lessons"], 2)
+        
+        fallback = EnhancedUCDMResponseEngine(use_cache=False, indices_dir=str(self.indices_dir),
+                                              use_compiled_index=False)
+        self.assertTrue(fallback.load_data())
+        self.assertIsNone(fallback.compiled_index)
+        self.assertEqual(dict(engine.lessons_index), fallback.lessons_index)
+    
+    def test_engine_closes_replaced_and_final_compiled_index(self):
+        engine = EnhancedUCDMResponseEngine(use_cache=False, indices_dir=str(self.indices_dir))
+        self.assertTrue(engine.load_data())
+        first = engine.compiled_index
+        
+        self.data["lesson_details"]["3"]["title"] = "Lección 3 revisada"
+        self.write_source(self.data)
+        self.assertTrue(engine.load_data())
+        
+        self.assertTrue(first._mm.closed)
+        self.assertEqual(engine.lessons_index["3"]["title"], "Lección 3 revisada")
+        engine.shutdown()
+        self.assertTrue(engine.compiled_index._mm.closed)
+
+class TestIndexRegistry(CacheTestCase):
+    """Tests del registro de índices compartido por los componentes del proceso"""
+    
+    def setUp(self):
+        super().setUp()
+        self.write_json("lesson_mapper", {"1": "01-01"})
+    
+    def write_json(self, index_name, data):
+        with open(self.indices_dir / f"{index_name}.json", 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+    
+    def test_components_share_one_parsed_copy(self):
+        registry = get_index_registry(str(self.indices_dir))
+        cache = IndexCache(indices_dir=str(self.indices_dir), preload_popular=False)
+        loader = LazyIndexLoader(indices_dir=str(self.indices_dir), auto_preload=False)
+        preloader = PredictivePreloader(indices_dir=str(self.indices_dir), prediction_enabled=False)
+        
+        from_cache = cache.get_index("lesson_mapper")
+        self.assertIs(loader._load_index_sync("lesson_mapper"), from_cache)
+        self.assertIs(run_async(preloader._load_index_async("lesson_mapper")), from_cache)
+        
+        stats = registry.get_stats()
+        # Un parseo por índice (lesson_mapper y su dependencia); el resto son aciertos
+        self.assertEqual(stats["loads"], 2)
+        self.assertEqual(stats["hits"], 3)
+        self.assertEqual(stats["ref_counts"]["lesson_mapper"], 3)
+        self.assertEqual(cache.get_stats()["shared_registry"]["loaded"], 2)
+    
+    def test_shared_views_are_read_only(self):
+        registry = IndexRegistry(str(self.indices_dir))
+        data = registry.acquire("ucdm_comprehensive_index", "test").data
+        
+        with self.assertRaises(TypeError):
+            data["lesson_details"]["2"] = {}
+        with self.assertRaises(TypeError):
+            data["concept_index"]["amor"].append(2)
+        
+        # Las copias son estructuras normales y mutables
+        copied = pickle.loads(pickle.dumps(data))
+        copied["lesson_details"]["2"] = {}
+        self.assertEqual(type(copied["concept_index"]), dict)
+        self.assertEqual(json.loads(json.dumps(data)), {
+            "metadata": {"version": 1},
+            "lesson_details": {"1": {"title": "Lección 1"}},
+            "concept_index": {"amor": [1]},
+            "date_mapping": {"01-01": 1}
+        })
+    
+    def test_only_unreferenced_indices_are_evicted(self):
+        import gc
+        registry = IndexRegistry(str(self.indices_dir), max_memory_mb=0)
+        cache = IndexCache(indices_dir=str(self.indices_dir), preload_popular=False, registry=registry)
+        cache.get_index("lesson_mapper")
+        self.assertTrue(registry.is_loaded("lesson_mapper"))
+        
+        registry.acquire("lesson_mapper", "otro")
+        cache.invalidate_index("lesson_mapper")
+        self.assertEqual(registry.get_holders("lesson_mapper"), ["otro"])
+        registry.release("lesson_mapper", "otro")
+        self.assertFalse(registry.is_loaded("lesson_mapper"))
+        self.assertEqual(registry.evictions, 1)
+        
+        # Al liberar un componente se sueltan sus referencias
+        loader = LazyIndexLoader(indices_dir=str(self.indices_dir), auto_preload=False, registry=registry)
+        loader._load_index_sync("lesson_mapper")
+        self.assertTrue(registry.is_loaded("lesson_mapper"))
+        del loader
+        gc.collect()
+        self.assertFalse(registry.is_loaded("lesson_mapper"))
+        self.assertTrue(registry.is_loaded("ucdm_comprehensive_index"))  # Sigue referenciado por el cache
+    
+    def test_hot_reload_parses_once_for_all_components(self):
+        registry = IndexRegistry(str(self.indices_dir))
+        cache = IndexCache(indices_dir=str(self.indices_dir), preload_popular=False, registry=registry)
+        loader = LazyIndexLoader(indices_dir=str(self.indices_dir), auto_preload=False, registry=registry)
+        cache.get_index("lesson_mapper")
+        loader._load_index_sync("lesson_mapper")
+        watcher = IndexWatcher(str(self.indices_dir), use_events=False)
+        watcher.watch(cache)
+        watcher.watch(loader)
+        loads = registry.loads
+        
+        self.write_json("lesson_mapper", {"1": "01-01", "2": "01-02"})
+        watcher.scan()
+        
+        self.assertEqual(registry.loads, loads + 1)
+        self.assertEqual(registry.reloads, 1)
+        reloaded = cache.get_index("lesson_mapper", auto_load=False)
+        self.assertEqual(reloaded, {"1": "01-01", "2": "01-02"})
+        self.assertIs(loader._loaded_indices["lesson_mapper"], reloaded)
+        self.assertEqual(len(registry.get_holders("lesson_mapper")), 2)
+
+class TestParallelIndexLoading(CacheTestCase):
+    """Tests de la carga paralela y ordenada por dependencias de LazyIndexLoader"""
+    
+    INDICES = ["lesson_mapper", "lesson_date_mapper", "concepts_index", "concept_to_lessons_index",
+               "365_lessons_indexed", "365_lessons_advanced"]
+    
+    def setUp(self):
+        super().setUp()
+        for index_name in self.INDICES:
+            with open(self.indices_dir / f"{index_name}.json", 'w', encoding='utf-8') as f:
+                json.dump({"name": index_name}, f)
+        self.loader = LazyIndexLoader(indices_dir=str(self.indices_dir), auto_preload=False,
+                                      registry=IndexRegistry(str(self.indices_dir)), max_workers=8)
+        self.addCleanup(self.loader.shutdown)
+    
+    def slow_fetches(self, delay=0.1):
+        """Envolver _fetch con una espera y registrar llamadas y concurrencia máxima"""
+        calls, active, lock = [], [0, 0], threading.Lock()
+        original = self.loader._fetch
+        
+        def fetch(index_name):
+            with lock:
+                calls.append(index_name)
+                active[0] += 1
+                active[1] = max(active[1], active[0])
+            time.sleep(delay)
+            try:
+                return original(index_name)
+            finally:
+                with lock:
+                    active[0] -= 1
+        
+        self.loader._fetch = fetch
+        return calls, active
+    
+    def test_levels_follow_dependency_graph(self):
+        levels = self.loader._dependency_levels(["365_lessons_advanced", "concept_to_lessons_index", "lesson_date_mapper"])
+        
+        self.assertEqual([set(level) for level in levels], [
+            {"ucdm_comprehensive_index"},
+            {"lesson_mapper", "concepts_index"},
+            {"lesson_date_mapper", "concept_to_lessons_index", "365_lessons_indexed"},
+            {"365_lessons_advanced"}
+        ])
+    
+    def test_cold_start_reads_files_concurrently_and_publishes_in_order(self):
+        calls, active = self.slow_fetches()
+        installed = []
+        original_install = self.loader._install
+        self.loader._install = lambda name, fetched, preload: (installed.append(name), original_install(name, fetched, preload))
+        
+        start = time.perf_counter()
+        loaded = self.loader.load_many(["365_lessons_advanced", "concept_to_lessons_index", "lesson_date_mapper"])
+        elapsed = time.perf_counter() - start
+        
+        self.assertEqual(loaded["365_lessons_advanced"], {"name": "365_lessons_advanced"})
+        self.assertEqual(len(self.loader.get_loaded_indices()), 7)
+        self.assertGreater(active[1], 1)
+        self.assertLess(elapsed, 0.5)  # Secuencial serían 7 x 0.1s
+        for name in installed:
+            for dep in self.loader._get_dependencies(name):
+                self.assertLess(installed.index(dep), installed.index(name))
+    
+    def test_concurrent_requests_share_in_flight_loads(self):
+        calls, _ = self.slow_fetches(0.05)
+        
+        async def scenario():
+            return await asyncio.gather(
+                *(self.loader.load_index_async("lesson_date_mapper", requester=f"r{i}") for i in range(5)),
+                self.loader.load_index_async("concepts_index")
+            )
+        
+        results = run_async(scenario())
+        
+        self.assertEqual(results[:5], [{"name": "lesson_date_mapper"}] * 5)
+        self.assertEqual(results[5], {"name": "concepts_index"})
+        self.assertEqual(sorted(calls), sorted(set(calls)))
+    
+    def test_queue_is_a_priority_heap(self):
+        from performance.lazy_loader import LoadRequest
+        for number, priority in enumerate([1, 5, 3, 5]):
+            self.loader._add_to_load_queue(
+                LoadRequest(index_name=f"i{number}", priority=priority, requested_at=datetime.now(), requester="t")
+            )
+        
+        order = []
+        while self.loader._load_queue:
+            order.append(heapq.heappop(self.loader._load_queue)[2].index_name)
+        self.assertEqual(order, ["i1", "i3", "i2", "i0"])
+    
+    def test_request_is_completed_by_exactly_one_thread(self):
+        from performance.lazy_loader import LoadRequest
+        installed = []
+        original_install = self.loader._install
+        self.loader._install = lambda name, fetched, preload: (installed.append(name), original_install(name, fetched, preload))
+        futures = {name: Future() for name in ["lesson_mapper", "concepts_index"]}
+        request = LoadRequest(index_name="lesson_mapper", priority=1, requested_at=datetime.now(),
+                              requester="t", future=Future())
+        self.loader._complete_when_loaded(request, [list(futures)], futures)
+        
+        barrier = threading.Barrier(len(futures))
+        
+        def resolve(name):
+            barrier.wait()
+            futures[name].set_result(self.loader._fetch(name))
+        
+        threads = [threading.Thread(target=resolve, args=(name,)) for name in futures]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(request.future.result(timeout=5), {"name": "lesson_mapper"})
+        self.assertEqual(sorted(installed), ["concepts_index", "lesson_mapper"])
+    
+    def test_cancelled_request_is_not_resolved(self):
+        from performance.lazy_loader import LoadRequest
+        fetch = Future()
+        request = LoadRequest(index_name="lesson_mapper", priority=1, requested_at=datetime.now(),
+                              requester="t", future=Future())
+        self.loader._complete_when_loaded(request, [["lesson_mapper"]], {"lesson_mapper": fetch})
+        request.future.cancel()
+        
+        fetch.set_result(self.loader._fetch("lesson_mapper"))
+        
+        self.assertTrue(request.future.cancelled())
+        self.assertTrue(self.loader.is_loaded("lesson_mapper"))
+
+class TestLearnedPrediction(CacheTestCase):
+    """Tests del modelo de transiciones aprendido por PredictivePreloader"""
+    
+    def setUp(self):
+        super().setUp()
+        for index_name in ["lesson_mapper", "concepts_index", "365_lessons_indexed"]:
+            with open(self.indices_dir / f"{index_name}.json", 'w', encoding='utf-8') as f:
+                json.dump({"name": index_name}, f)
+        self.registry = IndexRegistry(str(self.indices_dir))
+    
+    def make_preloader(self, **kwargs) -> PredictivePreloader:
+        params = {"prediction_enabled": False, "integrity_checks": False, "registry": self.registry}
+        params.update(kwargs)
+        return PredictivePreloader(indices_dir=str(self.indices_dir), **params)
+    
+    def test_transitions_are_learned_from_access_sequence(self):
+        preloader = self.make_preloader()
+        for _ in range(3):
+            preloader.record_index_access("ucdm_comprehensive_index")
+            preloader.record_index_access("concepts_index")
+        preloader.record_index_access("ucdm_comprehensive_index")
+        preloader.record_index_access("lesson_mapper")
+        
+        predictions = preloader.predict_next("ucdm_comprehensive_index")
+        self.assertEqual(predictions[0][0], "concepts_index")
+        self.assertAlmostEqual(sum(probability for _, probability in predictions), 1.0)
+        pattern = preloader._prediction_patterns["ucdm_comprehensive_index->concepts_index"]
+        self.assertTrue(pattern.learned)
+        self.assertEqual(pattern.observed, 3)
+        
+        # El modelo aprendido sustituye a los patrones por defecto del trigger
+        matched = preloader._find_matching_patterns("ucdm_comprehensive_index")
+        self.assertEqual(matched[0][0], "concepts_index")
+        self.assertEqual(matched[0][2], "ucdm_comprehensive_index->concepts_index")
+        self.assertNotIn("lesson_workflow", [name for _, _, name in matched])
+    
+    def test_preloads_are_scored_as_useful_or_wasted(self):
+        preloader = self.make_preloader()
+        preloader.enqueue_preloads([
+            ("concepts_index", 0.9, "a->concepts_index"),
+            ("365_lessons_indexed", 0.5, "a->365_lessons_indexed")
+        ])
+        self.assertTrue(preloader.wait_for_preloads(5))
+        self.assertEqual(len(self.registry.get_holders("365_lessons_indexed")), 1)
+        
+        preloader.record_index_access("concepts_index")
+        for _ in range(preloader._preload_window):
+            preloader.record_index_access("ucdm_comprehensive_index")
+        
+        efficiency = preloader.get_prediction_statistics()["preload_efficiency"]
+        self.assertEqual(efficiency["preloads_issued"], 2)
+        self.assertEqual(efficiency["useful_preloads"], 1)
+        self.assertEqual(efficiency["wasted_preloads"], 1)
+        self.assertEqual(efficiency["precision"], 0.5)
+        self.assertEqual(preloader.wasted_bytes, (self.indices_dir / "365_lessons_indexed.json").stat().st_size)
+        # La pre-carga desperdiciada se suelta para que el registro pueda expulsarla
+        self.assertNotIn("365_lessons_indexed", preloader._loaded_indices)
+        self.assertEqual(self.registry.get_holders("365_lessons_indexed"), [])
+    
+    def test_model_persists_across_instances(self):
+        preloader = self.make_preloader()
+        preloader.record_index_access("lesson_mapper")
+        preloader.record_index_access("365_lessons_indexed")
+        pattern = preloader._prediction_patterns["lesson_mapper->365_lessons_indexed"]
+        pattern.preloads, pattern.useful_preloads, pattern.wasted_preloads = 4, 3, 1
+        run_async(preloader.cleanup_background_tasks())
+        
+        restored = self.make_preloader()
+        self.assertEqual(restored.predict_next("lesson_mapper"), [("365_lessons_indexed", 1.0)])
+        pattern = restored._prediction_patterns["lesson_mapper->365_lessons_indexed"]
+        self.assertEqual(pattern.precision, 0.75)
+        self.assertEqual(pattern.recall, 1.0)
+        self.assertEqual(restored._access_sequences[-1][0], "365_lessons_indexed")
+    
+    def test_model_is_saved_off_the_request_path(self):
+        preloader = self.make_preloader()
+        preloader._save_every = 2
+        patterns_file = self.tmp_path / "cache" / "prediction_patterns.json"
+        save_threads = []
+        original_save = preloader._save_patterns
+        
+        def recording_save():
+            save_threads.append(threading.current_thread().name)
+            original_save()
+        preloader._save_patterns = recording_save
+        
+        for index_name in ["lesson_mapper", "concepts_index", "lesson_mapper"]:
+            preloader.record_index_access(index_name)
+        preloader._saver.join(5)
+        
+        self.assertEqual(save_threads, ["PredictivePreloader-save"])
+        self.assertTrue(patterns_file.exists())
+        self.assertEqual(preloader._unsaved_transitions, 0)
+        
+        preloader.record_index_access("365_lessons_indexed")
+        preloader.shutdown()
+        saved = json.loads(patterns_file.read_text(encoding='utf-8'))
+        self.assertIn("365_lessons_indexed", saved["transitions"]["lesson_mapper"])
+    
+    def test_stale_patterns_decay_and_are_forgotten(self):
+        preloader = self.make_preloader()
+        preloader.record_index_access("lesson_mapper")
+        preloader.record_index_access("concepts_index")
+        preloader.record_index_access("lesson_mapper")
+        preloader.record_index_access("365_lessons_indexed")
+        
+        # lesson_mapper -> concepts_index no se observa desde hace dos semanas
+        stale = preloader._prediction_patterns["lesson_mapper->concepts_index"]
+        stale.last_observed = datetime.now() - timedelta(days=14)
+        with preloader._lock:
+            preloader._decay_stale_patterns()
+        probabilities = dict(preloader.predict_next("lesson_mapper"))
+        self.assertLess(probabilities["concepts_index"], 0.25)
+        
+        stale.last_observed = datetime.now() - timedelta(days=30)
+        with preloader._lock:
+            removed = preloader._decay_stale_patterns()
+        self.assertEqual(removed, 1)
+        self.assertEqual(preloader.predict_next("lesson_mapper"), [("365_lessons_indexed", 1.0)])
+        self.assertNotIn("lesson_mapper->concepts_index", preloader._prediction_patterns)
+
+class TestPreloadWorkerPool(CacheTestCase):
+    """Tests del pool acotado de workers de pre-carga de PredictivePreloader"""
+    
+    INDICES = ["lesson_mapper", "concepts_index", "365_lessons_indexed", "365_lessons_advanced", "lesson_date_mapper"]
+    
+    def setUp(self):
+        super().setUp()
+        for index_name in self.INDICES:
+            with open(self.indices_dir / f"{index_name}.json", 'w', encoding='utf-8') as f:
+                json.dump({"name": index_name}, f)
+        self.registry = IndexRegistry(str(self.indices_dir))
+    
+    def make_preloader(self, **kwargs) -> PredictivePreloader:
+        params = {"integrity_checks": False, "registry": self.registry}
+        params.update(kwargs)
+        preloader = PredictivePreloader(indices_dir=str(self.indices_dir), **params)
+        self.addCleanup(preloader.shutdown)
+        return preloader
+    
+    def gate_workers(self, preloader):
+        """Bloquear los workers hasta abrir la puerta y registrar el orden de ejecución"""
+        gate, started, order = threading.Event(), threading.Event(), []
+        original = preloader._run_preload
+        
+        def run(task):
+            order.append(task.index_name)
+            started.set()
+            gate.wait(5)
+            original(task)
+        
+        preloader._run_preload = run
+        return gate, started, order
+    
+    def test_access_without_event_loop_preloads_in_worker_threads(self):
+        preloader = self.make_preloader()
+        threads = []
+        original_acquire = self.registry.acquire
+        self.registry.acquire = lambda name, owner: (threads.append(threading.current_thread()), original_acquire(name, owner))[1]
+        
+        preloader.record_index_access("ucdm_comprehensive_index")  # Fuera de cualquier event loop
+        self.assertTrue(preloader.wait_for_preloads(5))
+        
+        self.assertIn("lesson_mapper", preloader._loaded_indices)
+        self.assertTrue(threads)
+        self.assertTrue(all(thread is not threading.main_thread() for thread in threads))
+        pool = preloader.get_prediction_statistics()["preload_pool"]
+        self.assertLessEqual(pool["workers"], 2)
+        self.assertEqual(pool["queued"], 0)
+    
+    def test_bounded_queue_keeps_highest_confidence(self):
+        preloader = self.make_preloader(max_preload_workers=1, max_preload_queue=2)
+        gate, started, order = self.gate_workers(preloader)
+        preloader.enqueue_preloads([("lesson_mapper", 0.5, "p")])
+        self.assertTrue(started.wait(5))
+        
+        preloader.enqueue_preloads([("concepts_index", 0.4, "p"), ("365_lessons_indexed", 0.9, "p")])
+        preloader.enqueue_preloads([("365_lessons_advanced", 0.6, "p"), ("lesson_date_mapper", 0.3, "p")])
+        gate.set()
+        self.assertTrue(preloader.wait_for_preloads(5))
+        
+        self.assertEqual(order, ["lesson_mapper", "365_lessons_indexed", "365_lessons_advanced"])
+        pool = preloader.get_prediction_statistics()["preload_pool"]
+        self.assertEqual(pool["cancelled"], 1)  # concepts_index desplazado por una predicción mejor
+        self.assertEqual(pool["rejected_queue_full"], 1)  # lesson_date_mapper no supera a nadie
+    
+    def test_irrelevant_predictions_are_cancelled(self):
+        preloader = self.make_preloader(prediction_enabled=False, max_preload_workers=1)
+        gate, started, order = self.gate_workers(preloader)
+        preloader.enqueue_preloads([("lesson_mapper", 0.9, "p")])
+        self.assertTrue(started.wait(5))
+        preloader.enqueue_preloads([("concepts_index", 0.8, "p"), ("365_lessons_indexed", 0.7, "p")])
+        
+        # Accedido directamente: la pre-carga encolada y la que está en curso sobran
+        preloader.record_index_access("concepts_index")
+        preloader.record_index_access("lesson_mapper")
+        # Tras _preload_window accesos la predicción restante caduca
+        for _ in range(preloader._preload_window):
+            preloader.record_index_access("ucdm_comprehensive_index")
+        gate.set()
+        self.assertTrue(preloader.wait_for_preloads(5))
+        
+        self.assertEqual(order, ["lesson_mapper"])
+        self.assertEqual(preloader.preloads_cancelled, 3)
+        self.assertEqual(preloader.preloads_issued, 0)
+        self.assertEqual(self.registry.get_holders("lesson_mapper"), [])
+    
+    def test_memory_backpressure_and_shutdown(self):
+        tight = IndexRegistry(str(self.indices_dir), max_memory_mb=0)
+        preloader = self.make_preloader(registry=tight, prediction_enabled=False)
+        preloader.enqueue_preloads([("lesson_mapper", 0.9, "p")])
+        self.assertTrue(preloader.wait_for_preloads(5))
+        self.assertEqual(preloader.preloads_skipped_memory, 1)
+        self.assertFalse(tight.is_loaded("lesson_mapper"))
+        
+        gate, started, _ = self.gate_workers(preloader)
+        preloader.enqueue_preloads([("concepts_index", 0.9, "p"), ("365_lessons_indexed", 0.8, "p")])
+        workers = list(preloader._workers)
+        gate.set()
+        run_async(preloader.cleanup_background_tasks())
+        
+        self.assertTrue(workers)
+        self.assertFalse(any(worker.is_alive() for worker in workers))
+        self.assertEqual(preloader.enqueue_preloads([("lesson_date_mapper", 0.9, "p")]), 0)
+        self.assertTrue(preloader.wait_for_preloads(1))
+
+class TestIncrementalIntegrity(CacheTestCase):
+    """Tests de la validación incremental de integridad por hash de contenido"""
+    
+    def setUp(self):
+        super().setUp()
+        self.index_file = self.indices_dir / "ucdm_comprehensive_index.json"
+        self.state_file = self.cache_dir / "index_integrity.json"
+        self.validator = IndexIntegrityValidator(str(self.indices_dir), state_file=str(self.state_file))
+    
+    def rewrite(self, mutate):
+        with open(self.index_file, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        mutate(data)
+        with open(self.index_file, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+    
+    def test_first_validation_records_hash_and_schema(self):
+        result = self.validator.validate("ucdm_comprehensive_index")
+        
+        self.assertTrue(result.is_valid)
+        self.assertFalse(result.cached)
+        self.assertEqual(result.validated_entries, 4)
+        record = self.validator.get_record("ucdm_comprehensive_index")
+        self.assertEqual(record["hash"], hashlib.sha256(self.index_file.read_bytes()).hexdigest())
+        self.assertEqual(record["schema"], {
+            "metadata": "dict", "lesson_details": "dict", "concept_index": "dict", "date_mapping": "dict"
+        })
+        self.assertEqual(record["entries"], 4)
+    
+    def test_unchanged_content_is_not_revalidated(self):
+        self.validator.validate("ucdm_comprehensive_index")
+        
+        self.assertTrue(self.validator.validate("ucdm_comprehensive_index").cached)
+        # Reescrito con el mismo contenido: cambia la firma pero no el hash
+        self.index_file.write_bytes(self.index_file.read_bytes())
+        os.utime(self.index_file, ns=(time.time_ns(), time.time_ns() + 10**9))
+        result = self.validator.validate("ucdm_comprehensive_index")
+        
+        self.assertTrue(result.cached)
+        self.assertEqual(result.validated_entries, 0)
+        stats = self.validator.get_stats()
+        self.assertEqual((stats["skipped_unchanged"], stats["hash_unchanged"]), (1, 1))
+        self.assertEqual(stats["full_validations"], 1)
+    
+    def test_only_changed_entries_are_validated(self):
+        self.validator.validate("ucdm_comprehensive_index")
+        self.rewrite(lambda data: data["lesson_details"].update({"2": {"title": "Lección 2"}, "3": "sin detalle"}))
+        
+        result = self.validator.validate("ucdm_comprehensive_index")
+        self.assertEqual(result.validated_entries, 2)
+        self.assertEqual(result.reused_entries, 4)
+        self.assertFalse(result.is_valid)
+        self.assertEqual(result.errors, ["lesson_details[3]: se esperaba dict, hay str"])
+        
+        # Al corregir la entrada solo se revalida esa; el estado persiste entre instancias
+        self.rewrite(lambda data: data["lesson_details"].update({"3": {"title": "Lección 3"}}))
+        restored = IndexIntegrityValidator(str(self.indices_dir), state_file=str(self.state_file))
+        result = restored.validate("ucdm_comprehensive_index")
+        self.assertTrue(result.is_valid)
+        self.assertEqual(result.validated_entries, 1)
+        self.assertEqual(restored.get_stats()["incremental_validations"], 1)
+    
+    def test_preloader_reuses_validation_across_preloads(self):
+        preloader = PredictivePreloader(indices_dir=str(self.indices_dir), prediction_enabled=False,
+                                        registry=IndexRegistry(str(self.indices_dir)),
+                                        integrity_validator=self.validator)
+        self.addCleanup(preloader.shutdown)
+        
+        first = preloader.check_index_integrity("ucdm_comprehensive_index")
+        self.rewrite(lambda data: data["concept_index"].update({"paz": [1]}))
+        second = preloader.check_index_integrity("ucdm_comprehensive_index")
+        third = run_async(preloader.validate_index_integrity("ucdm_comprehensive_index"))
+        
+        self.assertEqual((first.validated_entries, second.validated_entries), (4, 1))
+        self.assertTrue(third.cached)
+        self.assertNotEqual(first.checksum, second.checksum)
+        report = preloader.get_integrity_report()
+        self.assertEqual(report["incremental"]["entries_reused"], 4)
+        self.assertTrue(report["recent_checks"][-1]["cached"])
+
+def _multiprocess_writer(cache_dir: str, worker: int, count: int):
+    """Proceso hijo: escribir claves propias en un DiskCache compartido"""
+    cache = DiskCache(cache_dir=cache_dir, multiprocess=True, journal_checkpoint_ops=20)
+    for i in range(count):
+        cache.put(f"response_w{worker}_{i}", {"worker": worker, "i": i})
+        if i % 7 == 0:
+            cache.checkpoint()
+
+@unittest.skipUnless(HAS_FCNTL, "requiere fcntl")
+class TestDiskCacheMultiprocess(CacheTestCase):
+    """Tests del modo multiproceso de DiskCache (flock + journal compartido)"""
+    
+    def make_cache(self, **kwargs) -> DiskCache:
+        return DiskCache(cache_dir=str(self.cache_dir), multiprocess=True, **kwargs)
+    
+    def test_reader_sees_writes_from_other_instance(self):
+        writer = self.make_cache()
+        reader = self.make_cache()
+        
+        writer.put("response_shared", "valor")
+        self.assertEqual(reader.get("response_shared"), "valor")
+        
+        writer.delete("response_shared")
+        self.assertIsNone(reader.get("response_shared"))
+        self.assertGreater(reader.get_stats()["multiprocess"]["external_ops_applied"], 0)
+    
+    def test_checkpoint_by_other_instance_triggers_reload(self):
+        first = self.make_cache()
+        second = self.make_cache()
+        first.put("response_a", 1)
+        second.put("response_b", 2)
+        
+        first.checkpoint()
+        second.put("response_c", 3)
+        
+        self.assertEqual(sorted(first.get_keys()), ["response_a", "response_b", "response_c"])
+        self.assertGreaterEqual(second.get_stats()["multiprocess"]["index_reloads"], 1)
+        self.assertEqual(sorted(self.make_cache().get_keys()), ["response_a", "response_b", "response_c"])
+    
+    def test_torn_journal_tail_is_discarded_before_append(self):
+        cache = self.make_cache()
+        cache.put("response_a", 1)
+        with open(cache.journal_file, 'ab') as f:
+            f.write(b'{"op":"put","entry":{"key":"respo')
+        
+        other = self.make_cache()
+        other.put("response_b", 2)
+        
+        self.assertEqual(sorted(self.make_cache().get_keys()), ["response_a", "response_b"])
+    
+    def test_concurrent_processes_share_one_index(self):
+        import multiprocessing
+        context = multiprocessing.get_context("fork")
+        processes = [
+            context.Process(target=_multiprocess_writer, args=(str(self.cache_dir), worker, 30))
+            for worker in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(60)
+            self.assertEqual(process.exitcode, 0)
+        
+        cache = self.make_cache()
+        self.assertEqual(len(cache.get_keys()), 120)
+        self.assertEqual(cache.get("response_w3_29"), {"worker": 3, "i": 29})
+
+if __name__ == "__main__":
+    unittest.main()
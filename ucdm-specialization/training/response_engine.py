@@ -14,6 +14,7 @@ import logging
 
 sys.path.append(str(Path(__file__).parent.parent))
 from config.settings import *
+from performance.compiled_index import load_compiled_index
 
 class UCDMResponseEngine:
     """Motor de respuestas estructuradas para UCDM"""
@@ -153,8 +154,18 @@ class UCDMResponseEngine:
     def load_data(self) -> bool:
         """Cargar datos del sistema (lecciones, conceptos, fechas)"""
         try:
-            # Cargar índice completo
+            # Índice compilado y mapeado en memoria (se compila si falta o quedó obsoleto)
             index_file = INDICES_DIR / "ucdm_comprehensive_index.json"
+            compiled = load_compiled_index(index_file)
+            if compiled is not None:
+                self.lessons_index = compiled.lesson_details
+                self.concept_index = compiled.concept_index
+                self.date_mapper = compiled.date_mapping
+                
+                self.logger.info(f"Motor cargado (índice compilado): {len(self.lessons_index)} lecciones, {len(self.concept_index)} conceptos")
+                return True
+            
+            # Cargar índice completo
             if index_file.exists():
                 with open(index_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)